@@ -4,12 +4,17 @@ import os
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 import json
+from contextlib import closing
 
 # Importar servicios PROPIOS (sin Anthropic)
 from services.csv_detector_ml import CSVDetectorML
 from services.data_analyzer import DataAnalyzer
 from services.statistical_chatbot import StatisticalChatbot
 from services.comparison_engine import ComparisonEngine
+from services.data_cleaner import DataCleaner
+from services.dataset_store import CSVChunks, DatasetStore, read_upload
+from services.file_registry import FileRegistry
+from services.profile_index import ProfileBuilder, build_profile
 
 load_dotenv()
 
@@ -18,9 +23,15 @@ CORS(app)
 
 # Configuración
 UPLOAD_FOLDER = 'uploads'
+DATASET_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, '.datasets')  # DataFrames limpios (Parquet)
+REGISTRY_FOLDER = os.path.join(UPLOAD_FOLDER, '.registry')       # resultados por archivo (JSON)
+MAX_CACHED_FRAMES = int(os.getenv('MAX_CACHED_FRAMES', 8))        # DataFrames en memoria (LRU)
+MAX_REGISTERED_FILES = int(os.getenv('MAX_REGISTERED_FILES', 50))
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', 4096))
+CHUNKED_THRESHOLD_MB = int(os.getenv('CHUNKED_THRESHOLD_MB', 16))  # CSV más grandes: análisis por bloques
 ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
 
 # Crear carpeta de uploads si no existe
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -29,12 +40,60 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 print("Inicializando servicios de IA propios...")
 csv_detector = CSVDetectorML()  # Usa red neuronal propia
 data_analyzer = DataAnalyzer()
+data_cleaner = DataCleaner()  # modo por bloques (archivos grandes)
 ai_chatbot = StatisticalChatbot()  # Usa análisis estadístico
 comparison_engine = ComparisonEngine()
 print("✓ Servicios inicializados correctamente")
 
-# Almacenamiento temporal de archivos analizados
-analyzed_files = {}
+# Archivos analizados: DataFrames limpios en caché columnar + registro persistente
+dataset_store = DatasetStore(DATASET_CACHE_FOLDER, max_frames=MAX_CACHED_FRAMES)
+
+def _discard_file(file_id, entry):
+    """Borra el archivo subido y su DataFrame en caché"""
+    dataset_store.delete(file_id)
+    if os.path.exists(entry['filepath']):
+        os.remove(entry['filepath'])
+
+analyzed_files = FileRegistry(REGISTRY_FOLDER, max_entries=MAX_REGISTERED_FILES, on_evict=_discard_file)
+
+def _with_data(file_ids):
+    """
+    Entradas del registro con su DataFrame ('df') para los servicios; los guardados
+    por bloques se entregan como 'chunks' (función que recorre los bloques)
+    """
+    files = []
+    for file_id in file_ids:
+        entry = analyzed_files.get(file_id)
+        if entry is None:
+            continue
+        if dataset_store.is_chunked(file_id):
+            files.append({**entry, 'chunks': lambda file_id=file_id: dataset_store.iter_chunks(file_id)})
+            continue
+        df = dataset_store.get(file_id)
+        if df is not None:
+            files.append({**entry, 'df': df})
+    return files
+
+def _with_profiles(file_ids):
+    """
+    Entradas del registro para el chat: índice de perfil + carga diferida del DataFrame
+    ('load_df') o, si se guardó por bloques, recorrido de sus bloques ('load_chunks')
+    """
+    files = []
+    for file_id in file_ids:
+        entry = analyzed_files.get(file_id)
+        if entry is None:
+            continue
+        if dataset_store.is_chunked(file_id):
+            files.append({**entry, 'load_chunks': lambda file_id=file_id: dataset_store.iter_chunks(file_id)})
+        else:
+            files.append({**entry, 'load_df': lambda file_id=file_id: dataset_store.get(file_id)})
+    return files
+
+def _use_chunks(filepath):
+    """CSV demasiado grande para cargarlo entero en memoria"""
+    return (filepath.lower().endswith('.csv')
+            and os.path.getsize(filepath) > CHUNKED_THRESHOLD_MB * 1024 * 1024)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -69,32 +128,72 @@ def upload_file():
         
         print(f"\nAnalizando archivo: {filename}")
         
+        file_id = filename.replace('.', '_')
+        chunked = _use_chunks(filepath)
+        
+        if chunked:
+            # Archivo grande: detección con el primer bloque, limpieza y análisis en dos pasadas
+            chunks = CSVChunks(filepath)
+            encoding = chunks.encoding
+            print(f"  → Archivo grande: análisis por bloques de {chunks.chunksize} filas (encoding: {encoding})")
+            df_raw = chunks.head()
+        else:
+            # Leer el archivo UNA vez (detección de encoding incluida)
+            df_raw, encoding = read_upload(filepath)
+            print(f"  → Leído: {len(df_raw)} filas x {len(df_raw.columns)} columnas (encoding: {encoding or 'excel'})")
+        
         # Detectar tipo de CSV con RED NEURONAL + LIMPIAR DATOS
         print("  → Clasificando con red neuronal...")
-        detection_result = csv_detector.detect_csv_type(filepath)
+        detection_result, df_clean = csv_detector.detect_dataframe(df_raw)
         print(f"  → Categoría detectada: {detection_result['category']} (confianza: {detection_result['confidence']:.2%})")
         print(f"  → Método: {detection_result.get('method', 'unknown')}")
         
-        # Analizar datos
-        print("  → Analizando estadísticas...")
-        analysis_result = data_analyzer.analyze(filepath, detection_result)
+        # Guardar el DataFrame limpio y analizar: chat y comparaciones lo leen de aquí
+        if chunked:
+            print("  → Planificando limpieza (1ª pasada)...")
+            plan = data_cleaner.plan_chunks(chunks)
+            detection_result['cleaning_report'] = plan['cleaning_report']
+            detection_result['sample_rows'] = len(df_raw)
+            print("  → Analizando estadísticas (2ª pasada, bloques limpios a la caché)...")
+            # El perfil del chat se acumula en la misma pasada: cubre el archivo completo
+            # sin volver a cargarlo en memoria
+            profile_builder = ProfileBuilder(detection_result)
+            cleaned_chunks = (data_cleaner.clean_chunk(chunk, plan) for chunk in chunks)
+            with closing(dataset_store.put_chunks(file_id, cleaned_chunks)) as stored_chunks:
+                analysis_result = data_analyzer.analyze_chunks(profile_builder.feed(stored_chunks),
+                                                               detection_result, plan['clip'])
+            
+            if not dataset_store.is_chunked(file_id):
+                raise ValueError(analysis_result.get('error', 'No se pudieron guardar los datos limpios'))
+            print(f"  → DataFrame limpio en caché ({profile_builder.rows} filas, por bloques)")
+            profile = profile_builder.profile(analysis_result)
+        else:
+            storage_format = dataset_store.put(file_id, df_clean)
+            print(f"  → DataFrame limpio en caché ({storage_format})")
+            print("  → Analizando estadísticas...")
+            analysis_result = data_analyzer.analyze_dataframe(df_clean, detection_result)
+            # Índice de perfil: el chat responde desde aquí sin recorrer los datos
+            profile = build_profile(df_clean, detection_result, analysis_result)
         print("  ✓ Análisis completado")
+        print("  → Índice de perfil para el chat listo")
         
-        # Guardar en memoria para futuras consultas
-        file_id = filename.replace('.', '_')
-        analyzed_files[file_id] = {
+        # Registrar para futuras consultas (persistente); se responde con lo registrado
+        entry = analyzed_files.add(file_id, {
             'filename': filename,
             'filepath': filepath,
+            'encoding': encoding,
+            'mode': 'chunked' if chunked else 'full',
             'detection': detection_result,
-            'analysis': analysis_result
-        }
+            'analysis': analysis_result,
+            'profile': profile
+        })
         
         return jsonify({
             'success': True,
             'file_id': file_id,
             'filename': filename,
-            'detection': detection_result,
-            'analysis': analysis_result,
+            'detection': entry['detection'],
+            'analysis': entry['analysis'],
             'ai_info': {
                 'classification_method': detection_result.get('method', 'unknown'),
                 'data_cleaned': True,
@@ -131,11 +230,8 @@ def chat():
         if not question:
             return jsonify({'error': 'No question provided'}), 400
         
-        # Preparar contexto de archivos
-        context_files = []
-        for file_id in file_ids:
-            if file_id in analyzed_files:
-                context_files.append(analyzed_files[file_id])
+        # Preparar contexto de archivos (índices de perfil; datos solo si hacen falta)
+        context_files = _with_profiles(file_ids)
         
         if not context_files:
             return jsonify({'error': 'No valid files provided'}), 400
@@ -172,10 +268,7 @@ def compare_files():
             return jsonify({'error': 'Need at least 2 files to compare'}), 400
         
         # Obtener archivos
-        files_to_compare = []
-        for file_id in file_ids:
-            if file_id in analyzed_files:
-                files_to_compare.append(analyzed_files[file_id])
+        files_to_compare = _with_data(file_ids)
         
         if len(files_to_compare) < 2:
             return jsonify({'error': 'Invalid file IDs provided'}), 400
@@ -203,7 +296,7 @@ def get_file_details(file_id):
     
     return jsonify({
         'success': True,
-        'data': analyzed_files[file_id]
+        'data': analyzed_files.get(file_id)
     })
 
 @app.route('/api/file/<file_id>', methods=['DELETE'])
@@ -213,10 +306,7 @@ def delete_file(file_id):
         return jsonify({'error': 'File not found'}), 404
     
     try:
-        filepath = analyzed_files[file_id]['filepath']
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        del analyzed_files[file_id]
+        _discard_file(file_id, analyzed_files.remove(file_id))
         
         return jsonify({
             'success': True,
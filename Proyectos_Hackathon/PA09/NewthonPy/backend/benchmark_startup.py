@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque del clasificador neuronal
+- Runtime NumPy (lo que carga el servidor) vs. importar TensorFlow/Keras (versión anterior)
+- Cada medición corre en un proceso nuevo: tiempo de importación y memoria máxima (RSS)
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MEASURE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024  # macOS: bytes, Linux: KB
+print(json.dumps({{'seconds': elapsed, 'max_rss_mb': rss_mb, 'tensorflow': 'tensorflow' in sys.modules}}))
+'''
+
+# Dependencias que el servidor carga igual (pandas, sklearn): base común de ambas mediciones
+BASELINE = "import numpy, pandas, sklearn.preprocessing"
+
+SCENARIOS = [
+    ('Base (numpy + pandas + sklearn)', BASELINE),
+    ('Runtime NumPy (servidor)', BASELINE + "\nfrom services.neural_classifier import CSVNeuralClassifier\n"
+                                            "classifier = CSVNeuralClassifier()"),
+    ('TensorFlow/Keras (versión anterior)', BASELINE + "\nimport tensorflow as tf\n"
+                                                       "from tensorflow.keras.models import Sequential"),
+]
+
+# Forward pass de una fila con la arquitectura del clasificador (19 → 64 → 32 → 6)
+PREDICT = '''
+import numpy as np, time
+from services.dense_runtime import DenseNetwork
+rng = np.random.default_rng(0)
+shapes = [(19, 64, 'relu'), (64, 32, 'relu'), (32, 6, 'softmax')]
+net = DenseNetwork([(rng.normal(size=(i, o)), rng.normal(size=o), a) for i, o, a in shapes], ['c'] * 6)
+x = rng.normal(size=(1, 19))
+start = time.perf_counter()
+for _ in range(1000):
+    net.predict_proba(x)
+print((time.perf_counter() - start) / 1000 * 1e6)
+'''
+
+
+def run(code: str):
+    result = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr else 'error'
+    return result.stdout.strip().splitlines()[-1], None
+
+
+def main():
+    print("=" * 60)
+    print("BENCHMARK DE ARRANQUE - Clasificador neuronal")
+    print("=" * 60)
+
+    results = {}
+    for name, code in SCENARIOS:
+        output, error = run(MEASURE.format(code=code))
+        if error:
+            print(f"{name:38s} no disponible ({error})")
+            continue
+        results[name] = json.loads(output)
+        r = results[name]
+        print(f"{name:38s} {r['seconds']:7.2f} s  {r['max_rss_mb']:8.1f} MB  TensorFlow cargado: {r['tensorflow']}")
+
+    base = results.get(SCENARIOS[0][0])
+    numpy_runtime = results.get(SCENARIOS[1][0])
+    tensorflow = results.get(SCENARIOS[2][0])
+    if base and numpy_runtime:
+        print(f"\nCosto del clasificador sobre la base: "
+              f"{numpy_runtime['seconds'] - base['seconds']:.2f} s, "
+              f"{numpy_runtime['max_rss_mb'] - base['max_rss_mb']:.1f} MB")
+    if numpy_runtime and tensorflow:
+        print(f"Reducción frente a TensorFlow: "
+              f"{tensorflow['seconds'] - numpy_runtime['seconds']:.2f} s, "
+              f"{tensorflow['max_rss_mb'] - numpy_runtime['max_rss_mb']:.1f} MB")
+
+    output, error = run(PREDICT)
+    if output:
+        print(f"\nPredicción de una fila (runtime NumPy): {float(output):.1f} µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any
+from .streaming_stats import RunningStats
 
 class ComparisonEngine:
     """
@@ -10,6 +11,10 @@ class ComparisonEngine:
     def compare(self, files: List[Dict]) -> Dict[str, Any]:
         """
         Compara múltiples archivos y genera insights comparativos
+        
+        Cada archivo trae 'filename', 'detection' y 'df' (DataFrame limpio) o, si se
+        guardó por bloques, 'chunks' (función que devuelve los bloques): cada archivo
+        se recorre bloque a bloque acumulando totales, sin cargarlo entero
         """
         try:
             if len(files) < 2:
@@ -19,115 +24,134 @@ class ComparisonEngine:
             categories = [f['detection']['category'] for f in files]
             main_category = max(set(categories), key=categories.count)
             
-            # Leer todos los DataFrames
-            dfs = []
-            for f in files:
-                df = self._read_csv_safely(f['filepath'])
-                df['_source_file'] = f['filename']
-                dfs.append(df)
+            # Columnas y tipos: primer bloque del primer archivo
+            first = next(self._frames(files[0]), None)
+            if first is None:
+                return {'error': f"No data for {files[0]['filename']}"}
             
             # Comparación específica según categoría
             if main_category == 'financial':
-                comparison = self._compare_financial(dfs, files)
+                comparison = self._compare_financial(first, files)
             elif main_category == 'sales':
-                comparison = self._compare_sales(dfs, files)
+                comparison = self._compare_sales(first, files)
             elif main_category == 'hr':
-                comparison = self._compare_hr(dfs, files)
+                comparison = self._compare_hr(first, files)
             else:
-                comparison = self._compare_generic(dfs, files)
+                comparison = self._compare_generic(first, files)
             
             # Agregar información general
             comparison['files_compared'] = [f['filename'] for f in files]
             comparison['category'] = main_category
-            comparison['total_records'] = sum(len(df) for df in dfs)
+            comparison['total_records'] = sum(self._rows(f) for f in files)
             
             return comparison
             
         except Exception as e:
             return {'error': str(e)}
     
-    def _read_csv_safely(self, filepath: str) -> pd.DataFrame:
-        """Lee CSV con diferentes encodings"""
-        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-        
-        for encoding in encodings:
-            try:
-                return pd.read_csv(filepath, encoding=encoding)
-            except:
-                continue
-        
-        return pd.read_csv(filepath)
+    def _frames(self, f: Dict) -> Iterator[pd.DataFrame]:
+        """
+        Bloques del archivo con la columna de origen ('_source_file'); copia
+        superficial porque se agrega esa columna
+        """
+        frames = f['chunks']() if 'chunks' in f else [f['df']]
+        for df in frames:
+            df = df.copy(deep=False)
+            df['_source_file'] = f['filename']
+            yield df
+    
+    def _rows(self, f: Dict) -> int:
+        """Filas del archivo; por bloques, del perfil guardado si existe"""
+        if 'df' in f:
+            return len(f['df'])
+        if f.get('profile'):
+            return f['profile']['rows']
+        return sum(len(df) for df in self._frames(f))
+    
+    def _sales_numeric(self, values: pd.Series) -> pd.Series:
+        sales_clean = values.astype(str).str.replace('$', '').str.replace(',', '')
+        return pd.to_numeric(sales_clean, errors='coerce')
     
-    def _compare_financial(self, dfs: List[pd.DataFrame], files: List[Dict]) -> Dict[str, Any]:
+    def _compare_financial(self, first: pd.DataFrame, files: List[Dict]) -> Dict[str, Any]:
         """Compara datos financieros"""
         comparison = {}
         
         # Buscar columna de montos
         amount_col = None
-        for col in dfs[0].columns:
+        for col in first.columns:
             if any(kw in col.lower() for kw in ['amount', 'monto', 'total', 'gasto', 'cost']):
-                if pd.api.types.is_numeric_dtype(dfs[0][col]):
+                if pd.api.types.is_numeric_dtype(first[col]):
                     amount_col = col
                     break
         
-        if amount_col:
-            totals = []
-            for i, df in enumerate(dfs):
-                if amount_col in df.columns:
-                    total = df[amount_col].sum()
-                    totals.append({
-                        'file': files[i]['filename'],
-                        'total': float(total),
-                        'average': float(df[amount_col].mean()),
-                        'count': len(df)
-                    })
-            
-            comparison['totals_by_file'] = totals
-            
-            # Calcular diferencias
-            if len(totals) >= 2:
-                diff = totals[1]['total'] - totals[0]['total']
-                pct_change = (diff / totals[0]['total'] * 100) if totals[0]['total'] != 0 else 0
-                
-                comparison['change_analysis'] = {
-                    'absolute_change': float(diff),
-                    'percentage_change': float(pct_change),
-                    'trend': 'increase' if diff > 0 else 'decrease' if diff < 0 else 'stable'
-                }
-        
-        # Comparar por categorías
+        # Buscar columna de categorías
         category_col = None
-        for col in dfs[0].columns:
+        for col in first.columns:
             if any(kw in col.lower() for kw in ['category', 'type', 'categoria', 'tipo', 'department', 'departamento']):
                 category_col = col
                 break
         
-        if category_col and amount_col:
-            category_comparison = {}
-            
-            # Obtener todas las categorías únicas
-            all_categories = set()
-            for df in dfs:
-                if category_col in df.columns:
+        if not amount_col:
+            return comparison
+        
+        # Una pasada por archivo: total, promedio, filas y total por categoría
+        totals = []
+        category_totals = []
+        all_categories = set()
+        for f in files:
+            amount = RunningStats()
+            rows = 0
+            by_category = None
+            has_amount = False
+            for df in self._frames(f):
+                if amount_col not in df.columns:
+                    break
+                has_amount = True
+                rows += len(df)
+                amount.update(df[amount_col])
+                if category_col and category_col in df.columns:
                     all_categories.update(df[category_col].unique())
+                    sums = df.groupby(category_col)[amount_col].sum()
+                    by_category = sums if by_category is None else by_category.add(sums, fill_value=0)
+            
+            if has_amount:
+                summary = amount.to_dict()
+                totals.append({
+                    'file': f['filename'],
+                    'total': float(summary['sum']),
+                    'average': summary['mean'],
+                    'count': rows
+                })
+                if by_category is not None:
+                    category_totals.append((f['filename'], by_category))
+        
+        comparison['totals_by_file'] = totals
+        
+        # Calcular diferencias
+        if len(totals) >= 2:
+            diff = totals[1]['total'] - totals[0]['total']
+            pct_change = (diff / totals[0]['total'] * 100) if totals[0]['total'] != 0 else 0
             
+            comparison['change_analysis'] = {
+                'absolute_change': float(diff),
+                'percentage_change': float(pct_change),
+                'trend': 'increase' if diff > 0 else 'decrease' if diff < 0 else 'stable'
+            }
+        
+        # Comparar por categorías
+        if category_col:
+            category_comparison = {}
             for category in all_categories:
-                category_data = []
-                for i, df in enumerate(dfs):
-                    if category_col in df.columns and amount_col in df.columns:
-                        cat_total = df[df[category_col] == category][amount_col].sum()
-                        category_data.append({
-                            'file': files[i]['filename'],
-                            'total': float(cat_total)
-                        })
-                
-                category_comparison[str(category)] = category_data
+                category_comparison[str(category)] = [
+                    {'file': filename, 'total': float(by_category.get(category, 0))}
+                    for filename, by_category in category_totals
+                ]
             
             comparison['by_category'] = category_comparison
         
         return comparison
     
-    def _compare_sales(self, dfs: List[pd.DataFrame], files: List[Dict]) -> Dict[str, Any]:
+    def _compare_sales(self, first: pd.DataFrame, files: List[Dict]) -> Dict[str, Any]:
         """Compara datos de ventas"""
         comparison = {}
         
@@ -135,72 +159,80 @@ class ComparisonEngine:
         sales_col = None
         seller_col = None
         
-        for col in dfs[0].columns:
+        for col in first.columns:
             col_lower = col.lower()
             if any(kw in col_lower for kw in ['venta', 'sales', 'sold']):
                 sales_col = col
             if any(kw in col_lower for kw in ['vendedor', 'seller', 'nombre', 'name']):
                 seller_col = col
         
-        if sales_col:
-            # Comparar totales de ventas
-            sales_totals = []
-            for i, df in enumerate(dfs):
-                if sales_col in df.columns:
-                    # Limpiar valores
-                    sales_clean = df[sales_col].astype(str).str.replace('$', '').str.replace(',', '')
-                    sales_numeric = pd.to_numeric(sales_clean, errors='coerce')
-                    
-                    sales_totals.append({
-                        'file': files[i]['filename'],
-                        'total_sales': float(sales_numeric.sum()),
-                        'average_sales': float(sales_numeric.mean()),
-                        'num_transactions': len(df)
-                    })
+        if not sales_col:
+            return comparison
+        
+        # Una pasada por archivo: totales y, por vendedor, ventas y número de filas
+        sales_totals = []
+        seller_totals = []
+        all_sellers = set()
+        for f in files:
+            sales = RunningStats()
+            rows = 0
+            by_seller = None
+            has_sales = False
+            for df in self._frames(f):
+                if sales_col not in df.columns:
+                    break
+                has_sales = True
+                rows += len(df)
+                sales_numeric = self._sales_numeric(df[sales_col])
+                sales.update(sales_numeric)
+                if seller_col and seller_col in df.columns:
+                    all_sellers.update(df[seller_col].unique())
+                    grouped = sales_numeric.groupby(df[seller_col]).agg(['sum', 'size'])
+                    by_seller = grouped if by_seller is None else by_seller.add(grouped, fill_value=0)
             
-            comparison['sales_by_file'] = sales_totals
+            if has_sales:
+                summary = sales.to_dict()
+                sales_totals.append({
+                    'file': f['filename'],
+                    'total_sales': float(summary['sum']),
+                    'average_sales': summary['mean'],
+                    'num_transactions': rows
+                })
+                if by_seller is not None:
+                    seller_totals.append((f['filename'], by_seller))
+        
+        comparison['sales_by_file'] = sales_totals
+        
+        # Calcular crecimiento
+        if len(sales_totals) >= 2:
+            growth = sales_totals[1]['total_sales'] - sales_totals[0]['total_sales']
+            growth_pct = (growth / sales_totals[0]['total_sales'] * 100) if sales_totals[0]['total_sales'] != 0 else 0
             
-            # Calcular crecimiento
-            if len(sales_totals) >= 2:
-                growth = sales_totals[1]['total_sales'] - sales_totals[0]['total_sales']
-                growth_pct = (growth / sales_totals[0]['total_sales'] * 100) if sales_totals[0]['total_sales'] != 0 else 0
-                
-                comparison['growth_analysis'] = {
-                    'absolute_growth': float(growth),
-                    'percentage_growth': float(growth_pct),
-                    'trend': 'positive' if growth > 0 else 'negative' if growth < 0 else 'stable'
-                }
+            comparison['growth_analysis'] = {
+                'absolute_growth': float(growth),
+                'percentage_growth': float(growth_pct),
+                'trend': 'positive' if growth > 0 else 'negative' if growth < 0 else 'stable'
+            }
         
-        if seller_col and sales_col:
+        if seller_col:
             # Comparar vendedores entre períodos
             seller_comparison = {}
             
-            # Obtener todos los vendedores
-            all_sellers = set()
-            for df in dfs:
-                if seller_col in df.columns:
-                    all_sellers.update(df[seller_col].unique())
-            
             for seller in all_sellers:
                 seller_data = []
-                for i, df in enumerate(dfs):
-                    if seller_col in df.columns and sales_col in df.columns:
-                        seller_rows = df[df[seller_col] == seller]
-                        if len(seller_rows) > 0:
-                            sales_clean = seller_rows[sales_col].astype(str).str.replace('$', '').str.replace(',', '')
-                            sales_numeric = pd.to_numeric(sales_clean, errors='coerce')
-                            
-                            seller_data.append({
-                                'file': files[i]['filename'],
-                                'total_sales': float(sales_numeric.sum()),
-                                'num_sales': len(seller_rows)
-                            })
-                        else:
-                            seller_data.append({
-                                'file': files[i]['filename'],
-                                'total_sales': 0,
-                                'num_sales': 0
-                            })
+                for filename, by_seller in seller_totals:
+                    if seller in by_seller.index:
+                        seller_data.append({
+                            'file': filename,
+                            'total_sales': float(by_seller.at[seller, 'sum']),
+                            'num_sales': int(by_seller.at[seller, 'size'])
+                        })
+                    else:
+                        seller_data.append({
+                            'file': filename,
+                            'total_sales': 0,
+                            'num_sales': 0
+                        })
                 
                 # Calcular cambio para este vendedor
                 if len(seller_data) >= 2:
@@ -223,62 +255,75 @@ class ComparisonEngine:
         
         return comparison
     
-    def _compare_hr(self, dfs: List[pd.DataFrame], files: List[Dict]) -> Dict[str, Any]:
+    def _compare_hr(self, first: pd.DataFrame, files: List[Dict]) -> Dict[str, Any]:
         """Compara datos de RR.HH."""
         comparison = {}
         
-        # Comparar número de empleados
+        # Buscar columna de salarios
+        salary_col = None
+        for col in first.columns:
+            if any(kw in col.lower() for kw in ['salary', 'salario', 'sueldo']):
+                salary_col = col
+                break
+        
+        # Una pasada por archivo: número de empleados y salarios
         employee_counts = []
-        for i, df in enumerate(dfs):
+        salary_comparison = []
+        for f in files:
+            salary = RunningStats()
+            rows = 0
+            has_salary = True
+            for df in self._frames(f):
+                rows += len(df)
+                if salary_col and salary_col in df.columns:
+                    salary.update(df[salary_col])
+                else:
+                    has_salary = False
+            
             employee_counts.append({
-                'file': files[i]['filename'],
-                'count': len(df)
+                'file': f['filename'],
+                'count': rows
             })
+            if salary_col and has_salary:
+                summary = salary.to_dict()
+                salary_comparison.append({
+                    'file': f['filename'],
+                    'average_salary': summary['mean'],
+                    'min_salary': summary['min'],
+                    'max_salary': summary['max']
+                })
         
         comparison['employee_count'] = employee_counts
         
         # Comparar salarios si existe la columna
-        salary_col = None
-        for col in dfs[0].columns:
-            if any(kw in col.lower() for kw in ['salary', 'salario', 'sueldo']):
-                salary_col = col
-                break
-        
         if salary_col:
-            salary_comparison = []
-            for i, df in enumerate(dfs):
-                if salary_col in df.columns:
-                    salary_comparison.append({
-                        'file': files[i]['filename'],
-                        'average_salary': float(df[salary_col].mean()),
-                        'min_salary': float(df[salary_col].min()),
-                        'max_salary': float(df[salary_col].max())
-                    })
-            
             comparison['salary_comparison'] = salary_comparison
         
         return comparison
     
-    def _compare_generic(self, dfs: List[pd.DataFrame], files: List[Dict]) -> Dict[str, Any]:
+    def _compare_generic(self, first: pd.DataFrame, files: List[Dict]) -> Dict[str, Any]:
         """Comparación genérica"""
         comparison = {}
         
         # Comparar tamaños
         sizes = []
-        for i, df in enumerate(dfs):
+        common_cols = None
+        for f in files:
+            rows, columns = 0, None
+            for df in self._frames(f):
+                rows += len(df)
+                columns = df.columns
+            columns = set(columns if columns is not None else [])
+            common_cols = columns if common_cols is None else common_cols.intersection(columns)
             sizes.append({
-                'file': files[i]['filename'],
-                'rows': len(df),
-                'columns': len(df.columns)
+                'file': f['filename'],
+                'rows': rows,
+                'columns': len(columns)
             })
         
         comparison['size_comparison'] = sizes
         
         # Comparar columnas comunes
-        common_cols = set(dfs[0].columns)
-        for df in dfs[1:]:
-            common_cols = common_cols.intersection(set(df.columns))
-        
         comparison['common_columns'] = list(common_cols)
         comparison['num_common_columns'] = len(common_cols)
         
@@ -4,6 +4,7 @@ from typing import Dict, List, Any
 import re
 from .neural_classifier import CSVNeuralClassifier
 from .data_cleaner import DataCleaner
+from .dataset_store import read_upload
 
 class CSVDetectorML:
     """
@@ -18,10 +19,11 @@ class CSVDetectorML:
         # Inicializar limpiador de datos
         self.data_cleaner = DataCleaner()
         
-        # Si no hay modelo entrenado, entrenar uno
+        # Sin modelo exportado no se entrena al arrancar (requiere TensorFlow):
+        # se clasifica por palabras clave hasta correr train_neural_network.py
         if not self.neural_classifier.is_trained:
-            print("No se encontró modelo pre-entrenado. Entrenando nuevo modelo...")
-            self.neural_classifier.train_with_synthetic_data(n_samples=1000)
+            print("No se encontró modelo pre-entrenado. Usando clasificación por palabras clave "
+                  "(entrena con: python train_neural_network.py)")
         
         # Palabras clave por categoría (backup si la red falla)
         self.keywords = {
@@ -64,10 +66,28 @@ class CSVDetectorML:
         Detecta el tipo de CSV usando la red neuronal y limpia los datos
         """
         try:
-            # 1. Leer CSV
-            df = self._read_csv_safely(filepath)
-            
-            # 2. Información básica ANTES de limpiar
+            df, _ = read_upload(filepath)
+        except Exception as e:
+            return {
+                'error': str(e),
+                'category': 'unknown',
+                'confidence': 0,
+                'method': 'error'
+            }
+        
+        result, _ = self.detect_dataframe(df)
+        return result
+    
+    def detect_dataframe(self, df: pd.DataFrame) -> tuple:
+        """
+        Detecta el tipo de un DataFrame ya leído y lo limpia
+        
+        Returns:
+            tuple: (detection_result, df_clean) - df_clean es el original si falla la limpieza
+        """
+        df_clean = df
+        try:
+            # 1-2. Información básica ANTES de limpiar
             basic_info_raw = self._extract_basic_info(df)
             
             # 3. Calcular score de calidad ANTES de limpiar
@@ -129,7 +149,7 @@ class CSVDetectorML:
                 'cleaned_data_preview': df_clean.head(10).to_dict('records')
             }
             
-            return result
+            return result, df_clean
             
         except Exception as e:
             return {
@@ -137,21 +157,7 @@ class CSVDetectorML:
                 'category': 'unknown',
                 'confidence': 0,
                 'method': 'error'
-            }
-    
-    def _read_csv_safely(self, filepath: str) -> pd.DataFrame:
-        """Lee CSV probando diferentes encodings"""
-        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(filepath, encoding=encoding)
-                return df
-            except:
-                continue
-        
-        # Si ninguno funciona, intenta sin especificar encoding
-        return pd.read_csv(filepath)
+            }, df_clean
     
     def _extract_basic_info(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Extrae información básica del DataFrame"""
@@ -1,7 +1,13 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional
+import itertools
 import json
+from .dataset_store import read_upload
+from .streaming_stats import (
+    RunningStats, KLLSketch, HyperLogLog, TopK, GroupedStats, CorrelationAccumulator,
+    KLL_RANK_ERROR, HLL_RELATIVE_ERROR
+)
 
 class DataAnalyzer:
     """
@@ -13,7 +19,21 @@ class DataAnalyzer:
         Realiza análisis completo del CSV basado en su tipo detectado
         """
         try:
-            df = self._read_csv_safely(filepath)
+            df, _ = read_upload(filepath)
+        except Exception as e:
+            return {
+                'error': str(e),
+                'statistics': {},
+                'insights': []
+            }
+        
+        return self.analyze_dataframe(df, detection_result)
+    
+    def analyze_dataframe(self, df: pd.DataFrame, detection_result: Dict) -> Dict[str, Any]:
+        """
+        Realiza análisis completo de un DataFrame ya leído (p.ej. del DatasetStore)
+        """
+        try:
             category = detection_result.get('category', 'unknown')
             
             # Análisis estadístico básico
@@ -59,17 +79,307 @@ class DataAnalyzer:
                 'insights': []
             }
     
-    def _read_csv_safely(self, filepath: str) -> pd.DataFrame:
-        """Lee CSV con diferentes encodings"""
-        encodings = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
+    def analyze_chunks(self, chunks: Iterable[pd.DataFrame], detection_result: Dict,
+                       clip_bounds: Optional[Dict[str, tuple]] = None) -> Dict[str, Any]:
+        """
+        Análisis por bloques para archivos grandes, en memoria acotada
+        Recibe los bloques ya limpios (DataCleaner.clean_chunk) y devuelve las mismas
+        claves que analyze_dataframe, más 'mode' y 'error_bounds'
+        - Exactos: conteos, sumas, min/max, media, desviación, group-bys y correlaciones
+        - Aproximados: mediana y outliers (KLL), valores únicos (HyperLogLog),
+          moda y distribuciones (Misra-Gries)
+        - clip_bounds: límites de winsorización del plan (plan['clip']); en esas columnas
+          los outliers se cuentan con los límites previos al recorte, como en el modo completo
+        """
+        try:
+            chunks = iter(chunks)
+            first = next(chunks, None)
+            if first is None:
+                raise ValueError("El archivo no tiene filas")
+            
+            state = self._init_chunk_state(first, detection_result.get('category', 'unknown'))
+            state['clip_bounds'] = dict(clip_bounds or {})
+            for chunk in itertools.chain([first], chunks):
+                self._update_chunk_state(state, chunk)
+            
+            return self._chunk_results(state)
         
-        for encoding in encodings:
-            try:
-                return pd.read_csv(filepath, encoding=encoding)
-            except:
+        except Exception as e:
+            return {
+                'error': str(e),
+                'statistics': {},
+                'insights': []
+            }
+    
+    def _init_chunk_state(self, first: pd.DataFrame, category: str) -> Dict[str, Any]:
+        """Acumuladores del análisis por bloques (columnas y tipos del primer bloque)"""
+        numeric_cols = [col for col in first.columns if pd.api.types.is_numeric_dtype(first[col])]
+        other_cols = [col for col in first.columns if col not in numeric_cols]
+        
+        state = {
+            'category': category,
+            'rows': 0,
+            'columns': first.columns.tolist(),
+            'numeric': numeric_cols,
+            'objects': first.select_dtypes(include=['object']).columns.tolist(),
+            'missing': {col: 0 for col in first.columns},
+            'stats': {col: RunningStats() for col in numeric_cols},
+            'quantiles': {col: KLLSketch() for col in numeric_cols},
+            'distinct': {col: HyperLogLog() for col in other_cols},
+            'top': {col: TopK() for col in other_cols},
+            'correlations': CorrelationAccumulator(numeric_cols) if len(numeric_cols) >= 2 else None,
+            'histogram': [],
+            'specific': {}
+        }
+        
+        specific = state['specific']
+        if category == 'financial':
+            amount_col, cat_col, date_col = self._financial_columns(first)
+            specific['columns'] = (amount_col, cat_col, date_col)
+            if amount_col and cat_col:
+                specific['by_category'] = GroupedStats()
+            if amount_col and date_col:
+                specific['monthly'] = GroupedStats()
+        elif category == 'sales':
+            sales_col, seller_col, eff_col = self._sales_columns(first)
+            specific['columns'] = (sales_col, seller_col, eff_col)
+            specific['sales'] = RunningStats()
+            specific['effectiveness'] = RunningStats()
+            if sales_col and seller_col:
+                specific['by_seller'] = GroupedStats()
+        elif category == 'hr':
+            sal_col, dept_col, age_c = self._hr_columns(first)
+            specific['columns'] = (sal_col, dept_col, age_c)
+            specific['salary'] = RunningStats()
+            specific['age'] = RunningStats()
+            specific['age_bins'] = {}
+            if sal_col and dept_col:
+                specific['by_department'] = GroupedStats()
+        elif category == 'performance':
+            specific['metrics'] = {col: RunningStats() for col in self._performance_columns(first)}
+        
+        return state
+    
+    def _update_chunk_state(self, state: Dict[str, Any], chunk: pd.DataFrame):
+        state['rows'] += len(chunk)
+        
+        for col in state['columns']:
+            values = chunk[col]
+            state['missing'][col] += int(values.isnull().sum())
+            if col in state['stats']:
+                numeric = pd.to_numeric(values, errors='coerce')
+                state['stats'][col].update(numeric)
+                state['quantiles'][col].update(numeric)
+            else:
+                state['distinct'][col].update(values)
+                state['top'][col].update(values)
+        
+        if state['correlations'] is not None:
+            state['correlations'].update(chunk[state['numeric']].apply(pd.to_numeric, errors='coerce'))
+        
+        # Mismos puntos que el modo completo: los primeros 1000 valores no nulos
+        if state['numeric'] and len(state['histogram']) < 1000:
+            values = chunk[state['numeric'][0]].dropna().tolist()
+            state['histogram'].extend(values[:1000 - len(state['histogram'])])
+        
+        specific = state['specific']
+        category = state['category']
+        if category == 'financial':
+            amount_col, _, date_col = specific['columns']
+            if 'by_category' in specific:
+                specific['by_category'].update(chunk[specific['columns'][1]], chunk[amount_col])
+            if 'monthly' in specific:
+                specific['monthly'].update(self._months(chunk[date_col]), chunk[amount_col])
+        elif category == 'sales':
+            sales_col, seller_col, eff_col = specific['columns']
+            if sales_col:
+                sales_numeric = self._money_numeric(chunk[sales_col])
+                specific['sales'].update(sales_numeric)
+                if 'by_seller' in specific:
+                    specific['by_seller'].update(chunk[seller_col], sales_numeric)
+            if eff_col:
+                specific['effectiveness'].update(self._percent_numeric(chunk[eff_col]))
+        elif category == 'hr':
+            sal_col, dept_col, age_c = specific['columns']
+            if sal_col:
+                specific['salary'].update(chunk[sal_col])
+                if 'by_department' in specific:
+                    specific['by_department'].update(chunk[dept_col], chunk[sal_col])
+            if age_c:
+                specific['age'].update(chunk[age_c])
+                for label, count in self._age_bins(chunk[age_c]).items():
+                    specific['age_bins'][label] = specific['age_bins'].get(label, 0) + count
+        elif category == 'performance':
+            for col, acc in specific['metrics'].items():
+                acc.update(self._percent_numeric(chunk[col], decimal_comma=True))
+    
+    def _chunk_results(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        rows = state['rows']
+        
+        # Estadísticas básicas
+        stats = {
+            'total_rows': rows,
+            'total_columns': len(state['columns']),
+            'numeric_columns': [],
+            'text_columns': [],
+            'missing_data': {}
+        }
+        for col in state['columns']:
+            missing_count = state['missing'][col]
+            if missing_count > 0:
+                stats['missing_data'][col] = {
+                    'count': missing_count,
+                    'percentage': float(missing_count / rows * 100)
+                }
+            
+            if col in state['stats']:
+                summary = state['stats'][col].to_dict()
+                stats['numeric_columns'].append({
+                    'name': col,
+                    'min': summary['min'],
+                    'max': summary['max'],
+                    'mean': summary['mean'],
+                    'median': state['quantiles'][col].quantile(0.5),
+                    'std': summary['std']
+                })
+            else:
+                stats['text_columns'].append({
+                    'name': col,
+                    'unique_values': state['distinct'][col].count(),
+                    'most_common': state['top'][col].most_common()
+                })
+        
+        specific_analysis, truncated = self._chunk_specific(state)
+        
+        # Outliers con los cuartiles aproximados
+        # Columnas winsorizadas: los valores recortados quedan justo en los límites del
+        # plan; con cuartiles recalculados (aproximados) contarían como outliers
+        outliers = {}
+        for col, quantiles in state['quantiles'].items():
+            if quantiles.n == 0:
                 continue
+            if col in state['clip_bounds']:
+                lower_bound, upper_bound = state['clip_bounds'][col]
+            else:
+                Q1, Q3 = quantiles.quantile(0.25), quantiles.quantile(0.75)
+                IQR = Q3 - Q1
+                lower_bound, upper_bound = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+            count = quantiles.count_outside(lower_bound, upper_bound)
+            if count > 0:
+                outliers[col] = {
+                    'count': count,
+                    'percentage': float(count / rows * 100),
+                    'values': quantiles.sample_outside(lower_bound, upper_bound)
+                }
         
-        return pd.read_csv(filepath)
+        # Correlaciones
+        correlations = {'correlations': []}
+        if state['correlations'] is not None:
+            correlations = self._correlations_from_matrix(state['correlations'].matrix())
+        
+        insights = self._build_insights(rows, len(state['columns']), len(stats['missing_data']),
+                                        state['category'], specific_analysis)
+        
+        # Visualización
+        viz = {}
+        if state['numeric']:
+            viz['histogram'] = {'column': state['numeric'][0], 'data': state['histogram']}
+        if state['objects']:
+            cat_col = state['objects'][0]
+            top_values = state['top'][cat_col].top(10)
+            viz['bar_chart'] = {
+                'column': cat_col,
+                'labels': [k for k, _ in top_values],
+                'values': [v for _, v in top_values]
+            }
+        
+        approximate_quantiles = not all(q.exact for q in state['quantiles'].values())
+        approximate_outliers = not all(q.exact for col, q in state['quantiles'].items()
+                                       if col not in state['clip_bounds'])
+        return {
+            'mode': 'chunked',
+            'statistics': stats,
+            'specific_analysis': specific_analysis,
+            'outliers': outliers,
+            'correlations': correlations,
+            'insights': insights,
+            'visualization_data': viz,
+            'error_bounds': {
+                'exact': ['count', 'sum', 'min', 'max', 'mean', 'std', 'missing_data', 'correlations', 'group_by'],
+                'median_rank_error': KLL_RANK_ERROR if approximate_quantiles else 0.0,
+                'outliers_count_error': int(np.ceil(KLL_RANK_ERROR * rows)) if approximate_outliers else 0,
+                'unique_values_relative_error': (
+                    0.0 if all(h.exact for h in state['distinct'].values()) else HLL_RELATIVE_ERROR
+                ),
+                'most_common_max_undercount': {col: int(t.error) for col, t in state['top'].items() if t.error},
+                # min/max/media/desviación de estas columnas dependen de los límites de
+                # winsorización del plan (cuartiles con error de rango ±KLL_RANK_ERROR)
+                'winsorized_columns': sorted(col for col in state['clip_bounds'] if col in state['stats']),
+                'truncated_group_by': truncated
+            }
+        }
+    
+    def _chunk_specific(self, state: Dict[str, Any]) -> tuple:
+        """(análisis específico por categoría, group-bys truncados) del modo por bloques"""
+        analysis = {}
+        specific = state['specific']
+        category = state['category']
+        groups = {k: v for k, v in specific.items() if isinstance(v, GroupedStats)}
+        truncated = [name for name, g in groups.items() if g.truncated]
+        
+        if category == 'financial' and specific['columns'][0]:
+            amount = state['stats'][specific['columns'][0]].to_dict()
+            analysis['total_amount'] = amount['sum']
+            analysis['average_amount'] = amount['mean']
+            analysis['max_transaction'] = amount['max']
+            analysis['min_transaction'] = amount['min']
+            if 'by_category' in groups:
+                g = groups['by_category'].groups
+                analysis['by_category'] = {
+                    k: {'sum': float(row['sum']), 'mean': float(row['sum'] / row['count']) if row['count'] else None,
+                        'count': int(row['count'])}
+                    for k, row in g.iterrows()
+                }
+            if 'monthly' in groups:
+                monthly = groups['monthly'].sums().sort_index()
+                analysis['monthly_trend'] = {str(k): float(v) for k, v in monthly.items()}
+        
+        elif category == 'sales':
+            if specific['columns'][0]:
+                analysis['total_sales'] = specific['sales'].total
+                analysis['average_sales'] = specific['sales'].to_dict()['mean']
+            if 'by_seller' in groups:
+                ranking = self._rank_sellers(groups['by_seller'].sums())
+                if groups['by_seller'].truncated:
+                    # Solo se conservan los vendedores más frecuentes: el fondo no es fiable
+                    ranking.pop('bottom_sellers')
+                analysis.update(ranking)
+            if specific['columns'][2]:
+                analysis['average_effectiveness'] = specific['effectiveness'].to_dict()['mean']
+        
+        elif category == 'hr':
+            if specific['columns'][0]:
+                salary = specific['salary'].to_dict()
+                analysis['average_salary'] = salary['mean']
+                analysis['salary_range'] = {'min': salary['min'], 'max': salary['max']}
+                if 'by_department' in groups:
+                    analysis['salary_by_department'] = groups['by_department'].means().to_dict()
+            if specific['columns'][2]:
+                analysis['average_age'] = specific['age'].to_dict()['mean']
+                analysis['age_distribution'] = specific['age_bins']
+        
+        elif category == 'performance':
+            for col, acc in specific['metrics'].items():
+                summary = acc.to_dict()
+                analysis[f'{col}_average'] = summary['mean']
+                analysis[f'{col}_top'] = summary['max']
+                analysis[f'{col}_bottom'] = summary['min']
+        
+        else:
+            for col in state['objects'][:3]:  # Solo primeras 3
+                analysis[f'{col}_distribution'] = dict(state['top'][col].top(10))
+        
+        return analysis, truncated
     
     def _basic_statistics(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calcula estadísticas básicas"""
@@ -111,14 +421,7 @@ class DataAnalyzer:
     def _analyze_financial(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Análisis específico para datos financieros"""
         analysis = {}
-        
-        # Buscar columna de montos
-        amount_col = None
-        for col in df.columns:
-            if any(keyword in col.lower() for keyword in ['amount', 'monto', 'total', 'price', 'cost', 'gasto']):
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    amount_col = col
-                    break
+        amount_col, cat_col, date_col = self._financial_columns(df)
         
         if amount_col:
             analysis['total_amount'] = float(df[amount_col].sum())
@@ -127,49 +430,47 @@ class DataAnalyzer:
             analysis['min_transaction'] = float(df[amount_col].min())
         
         # Analizar por categorías si existe
-        category_cols = [col for col in df.columns if any(kw in col.lower() 
-                         for kw in ['category', 'type', 'department', 'categoria', 'tipo', 'departamento'])]
-        
-        if category_cols and amount_col:
-            cat_col = category_cols[0]
+        if cat_col and amount_col:
             analysis['by_category'] = df.groupby(cat_col)[amount_col].agg(['sum', 'mean', 'count']).to_dict('index')
         
         # Detectar fechas
-        date_cols = [col for col in df.columns if any(kw in col.lower() 
-                     for kw in ['date', 'fecha', 'time', 'timestamp'])]
-        
-        if date_cols and amount_col:
-            date_col = date_cols[0]
+        if date_col and amount_col:
             try:
-                df['parsed_date'] = pd.to_datetime(df[date_col], errors='coerce')
-                df['month'] = df['parsed_date'].dt.to_period('M')
-                monthly = df.groupby('month')[amount_col].sum()
+                monthly = df[amount_col].groupby(self._months(df[date_col])).sum()
                 analysis['monthly_trend'] = {str(k): float(v) for k, v in monthly.items()}
             except:
                 pass
         
         return analysis
     
+    def _financial_columns(self, df: pd.DataFrame) -> tuple:
+        """(columna de montos, de categoría, de fecha) de datos financieros"""
+        # Buscar columna de montos
+        amount_col = None
+        for col in df.columns:
+            if any(keyword in col.lower() for keyword in ['amount', 'monto', 'total', 'price', 'cost', 'gasto']):
+                if pd.api.types.is_numeric_dtype(df[col]):
+                    amount_col = col
+                    break
+        
+        category_cols = [col for col in df.columns if any(kw in col.lower() 
+                         for kw in ['category', 'type', 'department', 'categoria', 'tipo', 'departamento'])]
+        date_cols = [col for col in df.columns if any(kw in col.lower() 
+                     for kw in ['date', 'fecha', 'time', 'timestamp'])]
+        
+        return amount_col, category_cols[0] if category_cols else None, date_cols[0] if date_cols else None
+    
+    def _months(self, dates: pd.Series) -> pd.Series:
+        return pd.to_datetime(dates, errors='coerce').dt.to_period('M')
+    
     def _analyze_sales(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Análisis específico para datos de ventas"""
         analysis = {}
-        
-        # Buscar columnas relevantes
-        sales_col = None
-        seller_col = None
-        
-        for col in df.columns:
-            col_lower = col.lower()
-            if any(kw in col_lower for kw in ['venta', 'sales', 'sold', 'revenue']):
-                sales_col = col
-            if any(kw in col_lower for kw in ['vendedor', 'seller', 'nombre', 'name', 'empleado']):
-                seller_col = col
+        sales_col, seller_col, eff_col = self._sales_columns(df)
         
         if sales_col:
-            # Limpiar valores de ventas (remover $, comas, etc.)
-            sales_clean = df[sales_col].astype(str).str.replace('$', '').str.replace(',', '')
             try:
-                sales_numeric = pd.to_numeric(sales_clean, errors='coerce')
+                sales_numeric = self._money_numeric(df[sales_col])
                 analysis['total_sales'] = float(sales_numeric.sum())
                 analysis['average_sales'] = float(sales_numeric.mean())
             except:
@@ -177,43 +478,62 @@ class DataAnalyzer:
         
         if seller_col and sales_col:
             try:
-                sales_clean = df[sales_col].astype(str).str.replace('$', '').str.replace(',', '')
-                sales_numeric = pd.to_numeric(sales_clean, errors='coerce')
-                df['sales_numeric'] = sales_numeric
-                
-                # Top vendedores
-                top_sellers = df.groupby(seller_col)['sales_numeric'].sum().sort_values(ascending=False).head(10)
-                analysis['top_sellers'] = {str(k): float(v) for k, v in top_sellers.items()}
-                
-                # Vendedores con bajo rendimiento
-                bottom_sellers = df.groupby(seller_col)['sales_numeric'].sum().sort_values().head(5)
-                analysis['bottom_sellers'] = {str(k): float(v) for k, v in bottom_sellers.items()}
+                by_seller = self._money_numeric(df[sales_col]).groupby(df[seller_col]).sum()
+                analysis.update(self._rank_sellers(by_seller))
             except:
                 pass
         
         # Analizar efectividad si existe
-        effectiveness_col = [col for col in df.columns if 'efectividad' in col.lower() or 'efficiency' in col.lower()]
-        if effectiveness_col:
-            eff_col = effectiveness_col[0]
+        if eff_col:
             try:
-                eff_clean = df[eff_col].astype(str).str.replace('%', '')
-                eff_numeric = pd.to_numeric(eff_clean, errors='coerce')
+                eff_numeric = self._percent_numeric(df[eff_col])
                 analysis['average_effectiveness'] = float(eff_numeric.mean())
             except:
                 pass
         
         return analysis
     
+    def _sales_columns(self, df: pd.DataFrame) -> tuple:
+        """(columna de ventas, de vendedor, de efectividad) de datos de ventas"""
+        sales_col = None
+        seller_col = None
+        
+        for col in df.columns:
+            col_lower = col.lower()
+            if any(kw in col_lower for kw in ['venta', 'sales', 'sold', 'revenue']):
+                sales_col = col
+            if any(kw in col_lower for kw in ['vendedor', 'seller', 'nombre', 'name', 'empleado']):
+                seller_col = col
+        
+        effectiveness_col = [col for col in df.columns if 'efectividad' in col.lower() or 'efficiency' in col.lower()]
+        return sales_col, seller_col, effectiveness_col[0] if effectiveness_col else None
+    
+    def _money_numeric(self, values: pd.Series) -> pd.Series:
+        # Limpiar valores de ventas (remover $, comas, etc.)
+        return pd.to_numeric(values.astype(str).str.replace('$', '').str.replace(',', ''), errors='coerce')
+    
+    def _percent_numeric(self, values: pd.Series, decimal_comma: bool = False) -> pd.Series:
+        clean_vals = values.astype(str).str.replace('%', '')
+        if decimal_comma:
+            clean_vals = clean_vals.str.replace(',', '.')
+        return pd.to_numeric(clean_vals, errors='coerce')
+    
+    def _rank_sellers(self, by_seller: pd.Series) -> Dict[str, Any]:
+        # Top vendedores y vendedores con bajo rendimiento
+        top_sellers = by_seller.sort_values(ascending=False).head(10)
+        bottom_sellers = by_seller.sort_values().head(5)
+        return {
+            'top_sellers': {str(k): float(v) for k, v in top_sellers.items()},
+            'bottom_sellers': {str(k): float(v) for k, v in bottom_sellers.items()}
+        }
+    
     def _analyze_hr(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Análisis específico para datos de RR.HH."""
         analysis = {}
+        sal_col, dept_col, age_c = self._hr_columns(df)
         
         # Analizar salarios
-        salary_col = [col for col in df.columns if any(kw in col.lower() 
-                      for kw in ['salary', 'salario', 'sueldo', 'wage'])]
-        
-        if salary_col:
-            sal_col = salary_col[0]
+        if sal_col:
             analysis['average_salary'] = float(df[sal_col].mean())
             analysis['salary_range'] = {
                 'min': float(df[sal_col].min()),
@@ -221,38 +541,40 @@ class DataAnalyzer:
             }
             
             # Por departamento si existe
-            dept_cols = [col for col in df.columns if 'departamento' in col.lower() or 'department' in col.lower()]
-            if dept_cols:
-                dept_col = dept_cols[0]
+            if dept_col:
                 analysis['salary_by_department'] = df.groupby(dept_col)[sal_col].mean().to_dict()
         
         # Analizar distribución de edades
-        age_col = [col for col in df.columns if 'edad' in col.lower() or 'age' in col.lower()]
-        if age_col:
-            age_c = age_col[0]
+        if age_c:
             analysis['average_age'] = float(df[age_c].mean())
-            analysis['age_distribution'] = {
-                '<25': int((df[age_c] < 25).sum()),
-                '25-35': int(((df[age_c] >= 25) & (df[age_c] < 35)).sum()),
-                '35-45': int(((df[age_c] >= 35) & (df[age_c] < 45)).sum()),
-                '45+': int((df[age_c] >= 45).sum())
-            }
+            analysis['age_distribution'] = self._age_bins(df[age_c])
         
         return analysis
     
+    def _hr_columns(self, df: pd.DataFrame) -> tuple:
+        """(columna de salario, de departamento, de edad) de datos de RR.HH."""
+        salary_col = [col for col in df.columns if any(kw in col.lower() 
+                      for kw in ['salary', 'salario', 'sueldo', 'wage'])]
+        dept_cols = [col for col in df.columns if 'departamento' in col.lower() or 'department' in col.lower()]
+        age_col = [col for col in df.columns if 'edad' in col.lower() or 'age' in col.lower()]
+        return tuple(cols[0] if cols else None for cols in (salary_col, dept_cols, age_col))
+    
+    def _age_bins(self, ages: pd.Series) -> Dict[str, int]:
+        return {
+            '<25': int((ages < 25).sum()),
+            '25-35': int(((ages >= 25) & (ages < 35)).sum()),
+            '35-45': int(((ages >= 35) & (ages < 45)).sum()),
+            '45+': int((ages >= 45).sum())
+        }
+    
     def _analyze_performance(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Análisis específico para datos de rendimiento"""
         analysis = {}
         
-        # Buscar columnas de métricas
-        performance_cols = [col for col in df.columns if any(kw in col.lower() 
-                           for kw in ['efectividad', 'efficiency', 'performance', 'calidad', 'quality'])]
-        
-        for col in performance_cols:
+        for col in self._performance_columns(df):
             try:
                 # Limpiar valores (remover %, etc.)
-                clean_vals = df[col].astype(str).str.replace('%', '').str.replace(',', '.')
-                numeric_vals = pd.to_numeric(clean_vals, errors='coerce')
+                numeric_vals = self._percent_numeric(df[col], decimal_comma=True)
                 
                 analysis[f'{col}_average'] = float(numeric_vals.mean())
                 analysis[f'{col}_top'] = float(numeric_vals.max())
@@ -262,6 +584,11 @@ class DataAnalyzer:
         
         return analysis
     
+    def _performance_columns(self, df: pd.DataFrame) -> List[str]:
+        # Buscar columnas de métricas
+        return [col for col in df.columns if any(kw in col.lower() 
+                for kw in ['efectividad', 'efficiency', 'performance', 'calidad', 'quality'])]
+    
     def _analyze_generic(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Análisis genérico para cualquier tipo de datos"""
         analysis = {}
@@ -306,8 +633,9 @@ class DataAnalyzer:
         if len(numeric_df.columns) < 2:
             return {'correlations': []}
         
-        corr_matrix = numeric_df.corr()
-        
+        return self._correlations_from_matrix(numeric_df.corr())
+    
+    def _correlations_from_matrix(self, corr_matrix: pd.DataFrame) -> Dict[str, Any]:
         # Encontrar correlaciones fuertes (> 0.7 o < -0.7)
         strong_corr = []
         for i in range(len(corr_matrix.columns)):
@@ -327,9 +655,14 @@ class DataAnalyzer:
     
     def _generate_insights(self, df: pd.DataFrame, category: str, specific: Dict) -> List[str]:
         """Genera insights textuales automáticos"""
+        missing = df.isnull().sum()
+        return self._build_insights(len(df), len(df.columns), int((missing > 0).sum()), category, specific)
+    
+    def _build_insights(self, n_rows: int, n_columns: int, n_missing_columns: int,
+                        category: str, specific: Dict) -> List[str]:
         insights = []
         
-        insights.append(f"El dataset contiene {len(df)} registros y {len(df.columns)} columnas.")
+        insights.append(f"El dataset contiene {n_rows} registros y {n_columns} columnas.")
         
         if category == 'financial' and 'total_amount' in specific:
             insights.append(f"Total de gastos: ${specific['total_amount']:,.2f}")
@@ -353,10 +686,8 @@ class DataAnalyzer:
                 insights.append(f"Edad promedio de empleados: {specific['average_age']:.1f} años")
         
         # Agregar insights sobre datos faltantes
-        missing = df.isnull().sum()
-        if missing.sum() > 0:
-            cols_with_missing = missing[missing > 0]
-            insights.append(f"Hay {len(cols_with_missing)} columnas con datos faltantes.")
+        if n_missing_columns > 0:
+            insights.append(f"Hay {n_missing_columns} columnas con datos faltantes.")
         
         return insights
     
@@ -0,0 +1,205 @@
+import codecs
+import io
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+ENCODINGS = ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
+CHUNK_ROWS = 100_000              # filas por bloque en el modo por bloques
+ENCODING_SAMPLE_BYTES = 1 << 20   # bytes leídos para detectar el encoding de archivos grandes
+
+
+def detect_encoding(raw: bytes, partial: bool = False) -> str:
+    """
+    Primer encoding de la lista que decodifica `raw`
+    - partial: raw es solo el inicio del archivo (puede cortar un carácter multibyte)
+    """
+    for encoding in ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(raw, final=not partial)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def read_upload(filepath: str) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Lee un archivo subido UNA sola vez (CSV o Excel)
+
+    Returns:
+        tuple: (df, encoding) - encoding es None para Excel
+    """
+    if filepath.lower().endswith(('.xlsx', '.xls')):
+        return pd.read_excel(filepath), None
+
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+
+    encoding = detect_encoding(raw)
+    return pd.read_csv(io.BytesIO(raw), encoding=encoding), encoding
+
+
+class CSVChunks:
+    """
+    CSV grande leído por bloques de `chunksize` filas (memoria acotada)
+    - Se puede recorrer varias veces (cada recorrido reabre el archivo)
+    - El encoding se detecta con el primer MB; los bytes inválidos más
+      adelante se reemplazan en lugar de abortar la lectura
+    """
+
+    def __init__(self, filepath: str, chunksize: int = CHUNK_ROWS):
+        self.filepath = filepath
+        self.chunksize = chunksize
+        with open(filepath, 'rb') as f:
+            self.encoding = detect_encoding(f.read(ENCODING_SAMPLE_BYTES), partial=True)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(self.filepath, encoding=self.encoding, encoding_errors='replace',
+                         chunksize=self.chunksize) as reader:
+            yield from reader
+
+    def head(self) -> pd.DataFrame:
+        """Primer bloque (muestra para detección y tipos)"""
+        return next(iter(self))
+
+
+class DatasetStore:
+    """
+    Caché columnar de los DataFrames ya limpios
+    - En disco: Parquet (o Feather si Parquet falla); pickle si no hay pyarrow
+    - Archivos grandes: un archivo por bloque (put_chunks)
+    - En memoria: LRU con los últimos max_frames DataFrames usados
+    """
+
+    def __init__(self, cache_dir: str, max_frames: int = 8):
+        self.cache_dir = cache_dir
+        self.max_frames = max_frames
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def put(self, file_id: str, df: pd.DataFrame) -> str:
+        """Guarda el DataFrame en disco y en el LRU; devuelve el formato usado"""
+        self.delete(file_id)
+        df = df.reset_index(drop=True)  # mismo índice en memoria y tras leer de disco
+        fmt = self._write(os.path.join(self.cache_dir, file_id), df)
+        self._remember(file_id, df)
+        return fmt
+
+    def put_chunks(self, file_id: str, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Modo por bloques: guarda cada bloque en disco a medida que se recorre y lo
+        devuelve sin cambios (el archivo completo queda en caché sin tenerlo entero en memoria)
+        - Un archivo por bloque; se leen de a uno con iter_chunks (nunca pasan por el LRU)
+        - Solo queda guardado si se recorren todos los bloques
+        """
+        self.delete(file_id)
+        parts_dir = self._path(file_id, 'parts')
+        tmp_dir = parts_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            for i, chunk in enumerate(chunks):
+                self._write(os.path.join(tmp_dir, f"{i:06d}"), chunk.reset_index(drop=True))
+                yield chunk
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        os.replace(tmp_dir, parts_dir)
+
+    def is_chunked(self, file_id: str) -> bool:
+        """Guardado por bloques (put_chunks): se recorre con iter_chunks, no con get"""
+        return os.path.isdir(self._path(file_id, 'parts'))
+
+    def iter_chunks(self, file_id: str) -> Iterator[pd.DataFrame]:
+        """
+        Bloques del archivo de a uno, leídos de disco (memoria acotada);
+        un archivo guardado entero se devuelve como un solo bloque
+        """
+        parts_dir = self._path(file_id, 'parts')
+        if not os.path.isdir(parts_dir):
+            df = self.get(file_id)
+            if df is not None:
+                yield df
+            return
+
+        for base in sorted({os.path.splitext(name)[0] for name in os.listdir(parts_dir)}):
+            chunk = self._read_frame(os.path.join(parts_dir, base))
+            if chunk is not None:
+                yield chunk
+
+    def get(self, file_id: str) -> Optional[pd.DataFrame]:
+        """
+        DataFrame del archivo (compartido: quien lo modifique debe copiarlo antes)
+        None si no existe o si se guardó por bloques (usar iter_chunks)
+        """
+        with self._lock:
+            if file_id in self._frames:
+                self._frames.move_to_end(file_id)
+                return self._frames[file_id]
+
+        df = self._read(file_id)
+        if df is not None:
+            self._remember(file_id, df)
+        return df
+
+    def delete(self, file_id: str):
+        with self._lock:
+            self._frames.pop(file_id, None)
+        for ext in ('parquet', 'feather', 'pkl'):
+            path = self._path(file_id, ext)
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(self._path(file_id, 'parts'), ignore_errors=True)
+
+    def _remember(self, file_id: str, df: pd.DataFrame):
+        with self._lock:
+            self._frames[file_id] = df
+            self._frames.move_to_end(file_id)
+            while len(self._frames) > self.max_frames:
+                self._frames.popitem(last=False)
+
+    def _path(self, file_id: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_id}.{ext}")
+
+    def _write(self, base: str, df: pd.DataFrame) -> str:
+        """Escribe `df` en base.parquet (o .feather/.pkl); devuelve el formato usado"""
+        try:
+            df.to_parquet(f"{base}.parquet", index=False)
+            return 'parquet'
+        except ImportError:
+            pass  # sin pyarrow: pickle
+        except Exception:
+            # Parquet no admite p.ej. columnas object con tipos mezclados
+            try:
+                df.to_feather(f"{base}.feather")
+                return 'feather'
+            except Exception:
+                pass
+
+        for ext in ('parquet', 'feather'):
+            if os.path.exists(f"{base}.{ext}"):
+                os.remove(f"{base}.{ext}")
+        df.to_pickle(f"{base}.pkl")
+        return 'pickle'
+
+    def _read(self, file_id: str) -> Optional[pd.DataFrame]:
+        return self._read_frame(os.path.join(self.cache_dir, file_id))
+
+    @staticmethod
+    def _read_frame(base: str) -> Optional[pd.DataFrame]:
+        readers = (
+            ('parquet', pd.read_parquet),
+            ('feather', pd.read_feather),
+            ('pkl', pd.read_pickle)
+        )
+        for ext, reader in readers:
+            path = f"{base}.{ext}"
+            if os.path.exists(path):
+                return reader(path)
+        return None
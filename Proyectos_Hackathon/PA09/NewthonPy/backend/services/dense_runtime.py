@@ -0,0 +1,91 @@
+import numpy as np
+from typing import List, Tuple
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'softmax': _softmax,
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh,
+    'linear': lambda x: x,
+}
+
+
+class DenseNetwork:
+    """
+    Forward pass de una red densa (Dense + activación) solo con NumPy
+    - Sin TensorFlow: el servidor carga los pesos exportados (.npz) en milisegundos
+    - El StandardScaler va plegado en la primera capa: recibe las características sin normalizar
+    """
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]], categories: List[str]):
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Activación no soportada: {activation}")
+        self.layers = [(np.asarray(w, dtype='float64'), np.asarray(b, dtype='float64'), activation)
+                       for w, b, activation in layers]
+        self.categories = list(categories)
+
+    @property
+    def input_dim(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        x = np.asarray(features, dtype='float64').reshape(-1, self.input_dim)
+        for weights, bias, activation in self.layers:
+            x = ACTIVATIONS[activation](x @ weights + bias)
+        return x
+
+    @classmethod
+    def from_keras(cls, model, categories: List[str], scaler=None) -> 'DenseNetwork':
+        """
+        Exporta un modelo Keras secuencial de capas Dense (Dropout es la identidad al predecir)
+        - scaler: StandardScaler ajustado con las mismas características; se pliega en la
+          primera capa: W' = W / σ (por fila), b' = b - (μ / σ) · W
+        """
+        layers = []
+        for layer in model.layers:
+            kind = type(layer).__name__
+            if kind == 'Dropout':
+                continue
+            if kind != 'Dense':
+                raise ValueError(f"Capa no soportada en el runtime NumPy: {kind}")
+            weights, bias = layer.get_weights()
+            layers.append((weights, bias, layer.get_config().get('activation', 'linear')))
+
+        if scaler is not None:
+            weights, bias, activation = layers[0]
+            scale = scaler.scale_
+            layers[0] = (weights / scale[:, None], bias - (scaler.mean_ / scale) @ weights, activation)
+
+        return cls(layers, categories)
+
+    def save(self, path: str):
+        arrays = {}
+        for i, (weights, bias, _) in enumerate(self.layers):
+            arrays[f'W{i}'] = weights
+            arrays[f'b{i}'] = bias
+        np.savez(path,
+                 activations=np.array([activation for _, _, activation in self.layers]),
+                 categories=np.array(self.categories),
+                 **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'DenseNetwork':
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(a) for a in data['activations']]
+            layers = [(data[f'W{i}'], data[f'b{i}'], activation) for i, activation in enumerate(activations)]
+            return cls(layers, [str(c) for c in data['categories']])
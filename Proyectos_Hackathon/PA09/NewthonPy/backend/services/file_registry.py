@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def to_json_native(value: Any) -> Any:
+    """
+    Copia de `value` solo con tipos JSON nativos (lo mismo que devuelve json.load)
+    - Fechas (datetime, Timestamp, datetime64) en ISO 8601; NaT como None
+    - Escalares de numpy como int/float/bool de Python; tuplas y arrays como listas
+    - Claves de diccionario como las escribe json.dump (True → 'true', 1 → '1')
+    """
+    if isinstance(value, dict):
+        return {_json_key(k): to_json_native(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [to_json_native(v) for v in value]
+    if isinstance(value, (datetime, np.datetime64)):
+        timestamp = pd.Timestamp(value)
+        return None if timestamp is pd.NaT else timestamp.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def _json_key(key: Any) -> str:
+    key = to_json_native(key)
+    return key if isinstance(key, str) else json.dumps(key)
+
+
+class FileRegistry:
+    """
+    Registro persistente y acotado de archivos analizados (reemplaza el dict en memoria)
+    - Un JSON por archivo en registry_dir: sobrevive a reinicios del servidor
+    - Como máximo max_entries archivos: al superarlo se elimina el más antiguo
+      y se llama a on_evict(file_id, entry) para borrar sus datos asociados
+      (también al arrancar, si hay más registros guardados que max_entries)
+    - Las entradas se guardan con tipos JSON nativos (to_json_native): en memoria
+      son iguales a las que se leen del disco tras un reinicio
+    """
+
+    def __init__(self, registry_dir: str, max_entries: int = 50,
+                 on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.registry_dir = registry_dir
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(registry_dir, exist_ok=True)
+        self._load()
+
+    def add(self, file_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Registra el archivo y devuelve la entrada tal como quedó guardada"""
+        entry = to_json_native(dict(entry, uploaded_at=datetime.now().isoformat()))
+        self._write(file_id, entry)
+
+        with self._lock:
+            self._entries.pop(file_id, None)
+            self._entries[file_id] = entry
+            evicted = self._pop_excess()
+
+        self._evict(evicted)
+        return entry
+
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(file_id)
+
+    def remove(self, file_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self._remove_file(file_id)
+        return entry
+
+    def items(self) -> List[tuple]:
+        with self._lock:
+            return list(self._entries.items())
+
+    def __contains__(self, file_id: str) -> bool:
+        with self._lock:
+            return file_id in self._entries
+
+    def _pop_excess(self) -> List[tuple]:
+        """Saca las entradas más antiguas que superan max_entries (con el lock tomado)"""
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False))
+        return evicted
+
+    def _evict(self, evicted: List[tuple]):
+        for old_id, old_entry in evicted:
+            self._remove_file(old_id)
+            if self.on_evict is not None:
+                self.on_evict(old_id, old_entry)
+
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.registry_dir, f"{file_id}.json")
+
+    def _write(self, file_id: str, entry: Dict[str, Any]):
+        # Escritura atómica: un reinicio a mitad no deja JSON corrupto
+        tmp_path = self._path(file_id) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(file_id))
+
+    def _remove_file(self, file_id: str):
+        if os.path.exists(self._path(file_id)):
+            os.remove(self._path(file_id))
+
+    def _load(self):
+        """Carga los registros guardados, del más antiguo al más reciente (como máximo max_entries)"""
+        loaded = []
+        for name in os.listdir(self.registry_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.registry_dir, name), encoding='utf-8') as f:
+                    entry = json.load(f)
+                loaded.append((entry.get('uploaded_at', ''), name[:-len('.json')], entry))
+            except (OSError, ValueError):
+                continue
+
+        for _, file_id, entry in sorted(loaded, key=lambda item: item[:2]):
+            self._entries[file_id] = entry
+        with self._lock:
+            evicted = self._pop_excess()
+        self._evict(evicted)
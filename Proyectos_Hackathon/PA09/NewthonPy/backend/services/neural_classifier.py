@@ -1,15 +1,18 @@
 import numpy as np
 import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.impute import SimpleImputer
 from scipy import stats
-from tensorflow.keras.utils import to_categorical
 import re
 import os
+from .dense_runtime import DenseNetwork
+
+# TensorFlow solo se importa para entrenar (train_with_synthetic_data); el servidor
+# predice con los pesos exportados a NumPy, con el scaler ya plegado
+MODEL_DIR = 'ml_models'
+KERAS_MODEL_PATH = os.path.join(MODEL_DIR, 'csv_classifier.keras')
+RUNTIME_MODEL_PATH = os.path.join(MODEL_DIR, 'csv_classifier.npz')
 
 class CSVNeuralClassifier:
     """
@@ -18,7 +21,8 @@ class CSVNeuralClassifier:
     """
     
     def __init__(self):
-        self.model = None
+        self.model = None      # modelo Keras (solo tras entrenar en este proceso)
+        self.runtime = None    # DenseNetwork: forward pass NumPy usado para predecir
         self.label_encoder = LabelEncoder()
         self.scaler = StandardScaler()
         self.is_trained = False
@@ -106,6 +110,9 @@ class CSVNeuralClassifier:
     
     def build_model(self, input_dim, num_classes):
         """Construye la arquitectura de la red neuronal"""
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Dense, Dropout
+        
         model = Sequential([
             Dense(64, activation='relu', input_shape=(input_dim,)),
             Dropout(0.5),
@@ -119,26 +126,33 @@ class CSVNeuralClassifier:
         return model
     
     def train_with_synthetic_data(self, n_samples=1000):
-        X = np.random.rand(n_samples, 10)
-        y = np.random.randint(0, 6, size=n_samples)
-
-        scaler = StandardScaler()
-        X = scaler.fit_transform(X)
-
-        y = to_categorical(y, num_classes=6)
-
+        """
+        Entrena con características sintéticas (las mismas 19 de _extract_features)
+        y exporta la red al runtime NumPy
+        """
+        from tensorflow.keras.utils import to_categorical
+        
+        y = np.random.randint(0, len(self.categories), size=n_samples)
+        X = np.array([self._generate_synthetic_features(self.categories[i]) for i in y])
+        
+        self.scaler = StandardScaler()
+        X = self.scaler.fit_transform(X)
+        
+        y = to_categorical(y, num_classes=len(self.categories))
+        
         X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2)
-
-        model = self.build_model(input_dim=X.shape[1], num_classes=6)
+        
+        model = self.build_model(input_dim=X.shape[1], num_classes=len(self.categories))
         history = model.fit(X_train, y_train,
                             validation_data=(X_val, y_val),
                             epochs=20,
                             batch_size=32,
                             verbose=1)
-
-        os.makedirs("ml_models", exist_ok=True)
-        model.save("ml_models/csv_classifier.keras")
-
+        
+        self.runtime = DenseNetwork.from_keras(model, self.categories, scaler=self.scaler)
+        self.is_trained = True
+        self._save_model()
+        
         return history
     
     def _generate_synthetic_features(self, category: str) -> np.ndarray:
@@ -204,11 +218,8 @@ class CSVNeuralClassifier:
             # Extraer características
             features = self._extract_features(df)
             
-            # Normalizar
-            features_scaled = self.scaler.transform(features)
-            
-            # Predecir
-            predictions = self.model.predict(features_scaled, verbose=0)
+            # Predecir (la normalización va plegada en la primera capa)
+            predictions = self.runtime.predict_proba(features)
             predicted_idx = np.argmax(predictions[0])
             confidence = float(predictions[0][predicted_idx])
             
@@ -236,44 +247,22 @@ class CSVNeuralClassifier:
             }
     
     def _save_model(self):
-        """Guarda el modelo y sus componentes"""
-        model_dir = 'ml_models'
-        os.makedirs(model_dir, exist_ok=True)
+        """Guarda el modelo Keras (para reentrenar) y los pesos del runtime NumPy"""
+        os.makedirs(MODEL_DIR, exist_ok=True)
         
         # Guardar modelo de Keras
-        self.model.save(os.path.join(model_dir, 'csv_classifier.keras'))
-        
-        # Guardar scaler
-        with open(os.path.join(model_dir, 'scaler.pkl'), 'wb') as f:
-            pickle.dump(self.scaler, f)
-        
-        # Guardar metadata
-        metadata = {
-            'categories': self.categories,
-            'is_trained': self.is_trained
-        }
-        with open(os.path.join(model_dir, 'metadata.json'), 'w') as f:
-            json.dump(metadata, f)
+        self.model.save(KERAS_MODEL_PATH)
+        
+        # Guardar pesos para servir (scaler plegado, categorías incluidas)
+        self.runtime.save(RUNTIME_MODEL_PATH)
     
     def _load_model(self):
-        """Carga el modelo si existe"""
-        model_dir = 'ml_models'
-        model_path = os.path.join(model_dir, 'csv_classifier.keras')
-        scaler_path = os.path.join(model_dir, 'scaler.pkl')
-        metadata_path = os.path.join(model_dir, 'metadata.json')
-        
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
+        """Carga los pesos exportados si existen (sin importar TensorFlow)"""
+        if os.path.exists(RUNTIME_MODEL_PATH):
             try:
-                self.model = keras.models.load_model(model_path)
-                
-                with open(scaler_path, 'rb') as f:
-                    self.scaler = pickle.load(f)
-                
-                if os.path.exists(metadata_path):
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                        self.categories = metadata.get('categories', self.categories)
-                        self.is_trained = metadata.get('is_trained', True)
+                self.runtime = DenseNetwork.load(RUNTIME_MODEL_PATH)
+                self.categories = self.runtime.categories
+                self.is_trained = True
                 
                 print("✓ Modelo pre-entrenado cargado exitosamente")
                 
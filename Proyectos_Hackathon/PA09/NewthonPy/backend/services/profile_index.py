@@ -0,0 +1,506 @@
+import heapq
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .streaming_stats import (
+    CorrelationAccumulator, GroupedStats, HyperLogLog, KLLSketch, RunningStats,
+    HLL_RELATIVE_ERROR, KLL_RANK_ERROR
+)
+
+PROFILE_TOP_N = 10            # filas/grupos guardados en cada ranking
+STRONG_CORRELATION = 0.5      # correlaciones que el chatbot considera significativas
+NAME_WORDS = ['name', 'nombre', 'vendedor', 'empleado', 'producto']
+
+
+def tokenize(text: str) -> List[str]:
+    """Palabras en minúsculas, sin signos de puntuación ni guiones bajos"""
+    return re.findall(r'[^\W_]+', str(text).lower())
+
+
+def find_name_column(columns) -> Optional[str]:
+    """Primera columna que parece nombre/identificador (vendedor, empleado...)"""
+    for col in columns:
+        if any(word in str(col).lower() for word in NAME_WORDS):
+            return col
+    return None
+
+
+def _native(value):
+    """Valor serializable en el JSON del registro (NaN → None)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _extreme_positions(values: np.ndarray, n: int, largest: bool) -> np.ndarray:
+    """
+    Posiciones de los n mayores/menores sin ordenar la columna entera (partición O(n));
+    mismo orden que Series.nlargest/nsmallest: a igual valor, la primera fila
+    """
+    positions = np.flatnonzero(~np.isnan(values))
+    candidates = values[positions]
+    if len(candidates) > n > 0:
+        kth = len(candidates) - n if largest else n - 1
+        threshold = np.partition(candidates, kth)[kth]
+        beyond = np.flatnonzero(candidates > threshold if largest else candidates < threshold)
+        # Empates en el umbral: solo los primeros que faltan para llegar a n
+        ties = np.flatnonzero(candidates == threshold)[:n - len(beyond)]
+        keep = np.sort(np.concatenate([beyond, ties]))
+        positions, candidates = positions[keep], candidates[keep]
+    order = np.argsort(-candidates if largest else candidates, kind='stable')[:n]
+    return positions[order]
+
+
+def _ranked(values: pd.Series, as_float: np.ndarray, labels: Optional[pd.Series],
+            n: int, largest: bool) -> List[list]:
+    """[[etiqueta, valor], ...] con la etiqueta de la fila (o None sin columna de nombres)"""
+    positions = _extreme_positions(as_float, n, largest)
+    return [[_native(labels.iloc[pos]) if labels is not None else None, _native(values.iloc[pos])]
+            for pos in positions]
+
+
+def numeric_summaries(df: pd.DataFrame, cols: List[str], name_col: Optional[str],
+                      top_n: int = PROFILE_TOP_N) -> Dict[str, Dict[str, Any]]:
+    """
+    Agregados, cuartiles y top/bottom-N de columnas numéricas
+    (describe y sum sobre el bloque completo en una sola llamada)
+    """
+    if not cols:
+        return {}
+
+    block = df[cols].astype({col: 'float64' for col in cols if pd.api.types.is_bool_dtype(df[col])})
+    block = block.reset_index(drop=True)
+    described = block.describe()
+    sums = block.sum()
+    labels = df[name_col].reset_index(drop=True) if name_col is not None else None
+
+    summaries = {}
+    for col in cols:
+        stats = described[col]
+        values = block[col]
+        as_float = values.to_numpy(dtype='float64', na_value=np.nan)
+        summaries[col] = {
+            'count': int(stats['count']),
+            'sum': _native(sums[col]),
+            'mean': _native(stats['mean']),
+            'std': _native(stats['std']),
+            'min': _native(stats['min']),
+            'q1': _native(stats['25%']),
+            'median': _native(stats['50%']),
+            'q3': _native(stats['75%']),
+            'max': _native(stats['max']),
+            'top': _ranked(values, as_float, labels, top_n, largest=True),
+            'bottom': _ranked(values, as_float, labels, top_n, largest=False)
+        }
+    return summaries
+
+
+def _group_summaries(df: pd.DataFrame, group_col: str, value_cols: List[str],
+                     top_n: int = PROFILE_TOP_N) -> Dict[str, Any]:
+    """Top/bottom-N grupos por suma y por promedio de cada columna numérica"""
+    value_cols = [col for col in value_cols if col != group_col]
+    if not value_cols:
+        return {'n_groups': int(df[group_col].nunique()), 'columns': {}}
+    grouped = df.groupby(group_col, sort=False)[value_cols].agg(['sum', 'mean'])
+
+    columns = {col: _group_rankings(grouped[(col, 'sum')], grouped[(col, 'mean')], top_n) for col in value_cols}
+    return {'n_groups': len(grouped), 'columns': columns}
+
+
+def _group_rankings(sums: pd.Series, means: pd.Series, top_n: int) -> Dict[str, List[list]]:
+    """top/bottom_sum y top/bottom_mean de una columna agrupada"""
+    rankings = {}
+    for agg, values in (('sum', sums), ('mean', means)):
+        rankings[f'top_{agg}'] = _ranked_groups(values, top_n, largest=True)
+        rankings[f'bottom_{agg}'] = _ranked_groups(values, top_n, largest=False)
+    return rankings
+
+
+def _ranked_groups(values: pd.Series, n: int, largest: bool) -> List[list]:
+    ranked = values.nlargest(n) if largest else values.nsmallest(n)
+    return [[_native(k), _native(v)] for k, v in ranked.items()]
+
+
+def _correlations(df: pd.DataFrame, numeric_cols: List[str], top_n: int = PROFILE_TOP_N,
+                  correlation_matrix: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """
+    Matriz de correlación y los pares más fuertes (|r| > STRONG_CORRELATION)
+    - correlation_matrix: la que ya calculó DataAnalyzer ({col: {col: r}}), si cubre las mismas columnas
+    """
+    if len(numeric_cols) < 2:
+        return {'columns': [], 'matrix': [], 'strong': []}
+
+    if correlation_matrix is not None and list(correlation_matrix) == numeric_cols:
+        matrix = pd.DataFrame(correlation_matrix).loc[numeric_cols, numeric_cols].to_numpy(dtype='float64')
+    else:
+        matrix = df[numeric_cols].corr().to_numpy()
+    return _correlation_summary(numeric_cols, matrix, top_n)
+
+
+def _correlation_summary(numeric_cols: List[str], matrix: np.ndarray, top_n: int) -> Dict[str, Any]:
+    """Matriz serializable y los top_n pares con |r| > STRONG_CORRELATION"""
+    if len(numeric_cols) < 2:
+        return {'columns': [], 'matrix': [], 'strong': []}
+    rows, cols = np.triu_indices(len(numeric_cols), k=1)
+    values = matrix[rows, cols]
+    strong = np.flatnonzero(np.abs(values) > STRONG_CORRELATION)
+    # Orden estable: a igual |r|, el orden de las columnas
+    strong = strong[np.argsort(-np.abs(values[strong]), kind='stable')][:top_n]
+
+    return {
+        'columns': numeric_cols,
+        'matrix': [[_native(v) for v in row] for row in matrix],
+        'strong': [[numeric_cols[rows[k]], numeric_cols[cols[k]], float(values[k])] for k in strong]
+    }
+
+
+def build_profile(df: pd.DataFrame, detection_result: Optional[Dict[str, Any]] = None,
+                  analysis_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Índice de perfil de un archivo, calculado una vez al subirlo
+    - Agregados y top/bottom-N por columna numérica
+    - Resúmenes por grupo para la columna de nombres y las categóricas detectadas
+    - Matriz de correlación (reutiliza la del análisis si existe) y tabla palabra → columnas
+
+    Returns:
+        dict: serializable a JSON (se guarda en el registro de archivos)
+    """
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    summary_cols = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    name_col = find_name_column(df.columns)
+    nunique = df.nunique()
+
+    summaries = numeric_summaries(df, summary_cols, name_col)
+    columns = {}
+    for col in df.columns:
+        columns[col] = {'dtype': str(df[col].dtype), 'nunique': int(nunique[col])}
+        if col in summaries:
+            columns[col].update(kind='numeric', **summaries[col])
+        else:
+            columns[col]['kind'] = 'other'
+
+    group_cols = _group_columns(df.columns, name_col, detection_result, summaries)
+
+    return {
+        'rows': len(df),
+        'n_columns': len(df.columns),
+        'top_n': PROFILE_TOP_N,
+        'numeric_columns': numeric_cols,
+        'name_column': name_col,
+        'columns': columns,
+        'groups': {col: _group_summaries(df, col, numeric_cols) for col in group_cols},
+        'correlations': _correlations(df, numeric_cols, correlation_matrix=(analysis_result or {})
+                                      .get('correlations', {}).get('correlation_matrix')),
+        'tokens': _column_tokens(df.columns)
+    }
+
+
+def _group_columns(columns, name_col: Optional[str], detection_result: Optional[Dict[str, Any]],
+                   numeric) -> List[str]:
+    """Columnas de agrupación: nombres + categóricas que detectó CSVDetectorML"""
+    categorical = [c['name'] for c in (detection_result or {}).get('data_types', {}).get('categorical', [])]
+    group_cols = []
+    for col in [name_col] + categorical:
+        if col in columns and col not in group_cols and col not in numeric:
+            group_cols.append(col)
+    return group_cols
+
+
+def _column_tokens(columns) -> Dict[str, List[str]]:
+    """Tabla palabra → columnas que la contienen"""
+    tokens = {}
+    for col in columns:
+        for word in dict.fromkeys(tokenize(col)):
+            tokens.setdefault(word, []).append(col)
+    return tokens
+
+
+def _as_numeric(series: pd.Series) -> pd.Series:
+    """Valores de una columna numérica de un bloque (booleanos como 0/1, como numeric_summaries)"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype('float64')
+    if not pd.api.types.is_numeric_dtype(series):
+        return pd.to_numeric(series, errors='coerce')
+    return series
+
+
+def _common_dtype(dtypes: List[Any]):
+    """dtype de la columna con todos los bloques juntos (int + float → float, si no object)"""
+    dtypes = list(dict.fromkeys(dtypes))
+    if len(dtypes) == 1:
+        return dtypes[0]
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        return np.result_type(*dtypes)
+    return np.dtype(object)
+
+
+class TopRows:
+    """
+    Las n filas con mayor (o menor) valor de una columna, bloque a bloque
+    - Heap acotado a n candidatos; mismo orden que nlargest/nsmallest
+      (a igual valor, la primera fila del archivo)
+    """
+
+    def __init__(self, n: int, largest: bool = True):
+        self.n = n
+        self.largest = largest
+        self.rows = 0
+        self._candidates = []   # (clave, posición en el archivo, [etiqueta, valor])
+
+    def update(self, values: pd.Series, labels: Optional[pd.Series] = None) -> 'TopRows':
+        as_float = values.to_numpy(dtype='float64', na_value=np.nan)
+        sign = -1.0 if self.largest else 1.0
+        candidates = [
+            (sign * as_float[pos], self.rows + int(pos),
+             [_native(labels.iloc[pos]) if labels is not None else None, _native(values.iloc[pos])])
+            for pos in _extreme_positions(as_float, self.n, self.largest)
+        ]
+        self._candidates = heapq.nsmallest(self.n, self._candidates + candidates, key=lambda c: c[:2])
+        self.rows += len(values)
+        return self
+
+    def ranked(self) -> List[list]:
+        return [row for _, _, row in self._candidates]
+
+
+class ProfileBuilder:
+    """
+    Índice de perfil por bloques (archivos grandes) en memoria acotada, mismo formato
+    que build_profile, con los acumuladores del análisis por bloques
+    - Exactos: count/sum/media/desviación/min/max, top/bottom-N filas y correlaciones
+    - Aproximados: cuartiles (KLL), valores únicos (HyperLogLog) y los grupos de columnas
+      con más de MAX_GROUPS valores (se conservan los más frecuentes: 'truncated')
+    """
+
+    def __init__(self, detection_result: Optional[Dict[str, Any]] = None, top_n: int = PROFILE_TOP_N):
+        self.detection_result = detection_result
+        self.top_n = top_n
+        self.rows = 0
+        self.columns = None
+
+    def feed(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Acumula cada bloque a medida que se recorre y lo devuelve sin cambios"""
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def _init(self, first: pd.DataFrame):
+        """Columnas y tipos del primer bloque (como DataAnalyzer.analyze_chunks)"""
+        self.columns = first.columns.tolist()
+        self.numeric_cols = first.select_dtypes(include=[np.number]).columns.tolist()
+        self.name_col = find_name_column(self.columns)
+        self.dtypes = {col: [] for col in self.columns}
+        self.distinct = {col: HyperLogLog() for col in self.columns}
+        self.summaries = {
+            col: {'stats': RunningStats(), 'quantiles': KLLSketch(),
+                  'top': TopRows(self.top_n, largest=True), 'bottom': TopRows(self.top_n, largest=False)}
+            for col in self.columns if pd.api.types.is_numeric_dtype(first[col])
+        }
+        self.group_cols = _group_columns(self.columns, self.name_col, self.detection_result, self.summaries)
+        self.groups = {(group_col, col): GroupedStats()
+                       for group_col in self.group_cols for col in self.numeric_cols if col != group_col}
+        self.correlations = CorrelationAccumulator(self.numeric_cols) if len(self.numeric_cols) >= 2 else None
+
+    def update(self, chunk: pd.DataFrame) -> 'ProfileBuilder':
+        if self.columns is None:
+            self._init(chunk)
+
+        labels = chunk[self.name_col] if self.name_col is not None else None
+        for col in self.columns:
+            self.dtypes[col].append(chunk[col].dtype)
+            self.distinct[col].update(chunk[col])
+        for col, acc in self.summaries.items():
+            values = _as_numeric(chunk[col])
+            acc['stats'].update(values)
+            acc['quantiles'].update(values)
+            acc['top'].update(values, labels)
+            acc['bottom'].update(values, labels)
+        for (group_col, col), acc in self.groups.items():
+            acc.update(chunk[group_col], _as_numeric(chunk[col]))
+        if self.correlations is not None:
+            self.correlations.update(chunk[self.numeric_cols].apply(pd.to_numeric, errors='coerce'))
+
+        self.rows += len(chunk)
+        return self
+
+    def profile(self, analysis_result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: perfil como build_profile, más 'error_bounds' de los valores aproximados
+        """
+        if self.columns is None:
+            raise ValueError("El archivo no tiene filas")
+
+        columns = {}
+        for col in self.columns:
+            dtype = _common_dtype(self.dtypes[col])
+            columns[col] = {'dtype': str(dtype), 'nunique': self.distinct[col].count()}
+            if col not in self.summaries:
+                columns[col]['kind'] = 'other'
+                continue
+            acc = self.summaries[col]
+            stats, quantiles = acc['stats'].to_dict(), acc['quantiles']
+            total = int(round(stats['sum'])) if pd.api.types.is_integer_dtype(dtype) else stats['sum']
+            columns[col].update(
+                kind='numeric', count=stats['count'], sum=_native(total), mean=stats['mean'], std=stats['std'],
+                min=stats['min'], q1=quantiles.quantile(0.25), median=quantiles.quantile(0.5),
+                q3=quantiles.quantile(0.75), max=stats['max'],
+                top=acc['top'].ranked(), bottom=acc['bottom'].ranked()
+            )
+
+        groups = {}
+        truncated = []
+        for group_col in self.group_cols:
+            value_cols = [col for col in self.numeric_cols if col != group_col]
+            accs = {col: self.groups[(group_col, col)] for col in value_cols}
+            groups[group_col] = {
+                'n_groups': (len(accs[value_cols[0]].groups)
+                             if value_cols and not accs[value_cols[0]].truncated else self.distinct[group_col].count()),
+                'columns': {col: _group_rankings(acc.sums(), acc.means(), self.top_n) for col, acc in accs.items()}
+            }
+            if any(acc.truncated for acc in accs.values()):
+                groups[group_col]['truncated'] = True
+                truncated.append(group_col)
+
+        # Reutiliza la matriz del análisis si cubre las mismas columnas
+        correlation_matrix = (analysis_result or {}).get('correlations', {}).get('correlation_matrix')
+        if (correlation_matrix is None or list(correlation_matrix) != self.numeric_cols) and self.correlations:
+            correlation_matrix = self.correlations.matrix().to_dict()
+
+        approximate_quantiles = not all(acc['quantiles'].exact for acc in self.summaries.values())
+        return {
+            'rows': self.rows,
+            'n_columns': len(self.columns),
+            'top_n': self.top_n,
+            'numeric_columns': self.numeric_cols,
+            'name_column': self.name_col,
+            'columns': columns,
+            'groups': groups,
+            'correlations': _correlations(None, self.numeric_cols, self.top_n, correlation_matrix),
+            'tokens': _column_tokens(self.columns),
+            'error_bounds': {
+                'quantile_rank_error': KLL_RANK_ERROR if approximate_quantiles else 0.0,
+                'nunique_relative_error': (
+                    0.0 if all(h.exact for h in self.distinct.values()) else HLL_RELATIVE_ERROR
+                ),
+                'truncated_groups': truncated
+            }
+        }
+
+
+class ProfileIndex:
+    """
+    Consultas del chatbot sobre el perfil de un archivo
+    - Lo que el perfil no cubre (rankings más largos que top_n, archivos
+      registrados antes de existir el perfil) se calcula con el DataFrame,
+      que solo se carga en ese momento
+    - Archivos guardados por bloques (load_chunks): se recorren los bloques, sin
+      cargar el archivo entero
+    """
+
+    def __init__(self, profile: Optional[Dict[str, Any]] = None, df: Optional[pd.DataFrame] = None,
+                 load_df: Optional[Callable[[], Optional[pd.DataFrame]]] = None,
+                 load_chunks: Optional[Callable[[], Iterable[pd.DataFrame]]] = None):
+        self._df = df
+        self._load_df = load_df
+        self._load_chunks = load_chunks
+        if profile is None and df is None and load_df is None and load_chunks is not None:
+            profile_builder = ProfileBuilder()
+            for chunk in load_chunks():
+                profile_builder.update(chunk)
+            profile = profile_builder.profile()
+        self.profile = profile if profile is not None else build_profile(self.df)
+        self._position = {col: i for i, col in enumerate(self.profile['columns'])}
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None and self._load_df is not None:
+            self._df = self._load_df()
+        if self._df is None:
+            raise ValueError("Los datos del archivo ya no están disponibles")
+        return self._df
+
+    @property
+    def rows(self) -> int:
+        return self.profile['rows']
+
+    @property
+    def n_columns(self) -> int:
+        return self.profile['n_columns']
+
+    @property
+    def numeric_columns(self) -> List[str]:
+        return self.profile['numeric_columns']
+
+    @property
+    def name_column(self) -> Optional[str]:
+        return self.profile['name_column']
+
+    def column(self, col: str) -> Optional[Dict[str, Any]]:
+        return self.profile['columns'].get(col)
+
+    def is_numeric(self, col: Optional[str]) -> bool:
+        info = self.column(col) if col is not None else None
+        return info is not None and info['kind'] == 'numeric'
+
+    def find_column(self, question: str, among: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Columna con más palabras en común con la pregunta (a igualdad, la primera);
+        sin coincidencias, la primera columna numérica
+        """
+        best = self._best_match(question, among)
+        if best is None and among is None and self.numeric_columns:
+            best = self.numeric_columns[0]
+        return best
+
+    def find_group_column(self, question: str) -> Optional[str]:
+        """Columna de agrupación (vendedor, departamento...) nombrada en la pregunta"""
+        return self._best_match(question, list(self.profile['groups']))
+
+    def _best_match(self, question: str, among: Optional[List[str]]) -> Optional[str]:
+        scores = {}
+        for word in set(tokenize(question)):
+            for col in self.profile['tokens'].get(word, []):
+                if among is None or col in among:
+                    scores[col] = scores.get(col, 0) + 1
+        if not scores:
+            return None
+        return max(scores, key=lambda col: (scores[col], -self._position[col]))
+
+    def ranking(self, col: str, n: int, largest: bool = True) -> List[list]:
+        """Top/bottom-n filas de una columna numérica como [[etiqueta, valor], ...]"""
+        if n <= self.profile['top_n']:
+            return self.column(col)['top' if largest else 'bottom'][:n]
+        if self._load_chunks is not None:
+            rows = TopRows(n, largest)
+            for chunk in self._load_chunks():
+                rows.update(_as_numeric(chunk[col]), chunk[self.name_column] if self.name_column else None)
+            return rows.ranked()
+        return numeric_summaries(self.df, [col], self.name_column, top_n=n)[col]['top' if largest else 'bottom']
+
+    def group_ranking(self, group_col: str, col: str, agg: str, n: int, largest: bool = True) -> List[list]:
+        """Top/bottom-n grupos por suma ('sum') o promedio ('mean') de `col`"""
+        if n <= self.profile['top_n']:
+            return self.profile['groups'][group_col]['columns'][col][f"{'top' if largest else 'bottom'}_{agg}"][:n]
+        if self._load_chunks is not None:
+            groups = GroupedStats()
+            for chunk in self._load_chunks():
+                groups.update(chunk[group_col], _as_numeric(chunk[col]))
+            return _ranked_groups(groups.sums() if agg == 'sum' else groups.means(), n, largest)
+        return _group_summaries(self.df, group_col, [col], top_n=n)['columns'][col][f"{'top' if largest else 'bottom'}_{agg}"]
+
+    def strong_correlations(self, n: int) -> List[list]:
+        """Pares [col1, col2, r] con |r| > STRONG_CORRELATION, del más fuerte al más débil"""
+        if n <= self.profile['top_n']:
+            return self.profile['correlations']['strong'][:n]
+        # La matriz completa ya está en el perfil: no hace falta leer los datos
+        correlations = self.profile['correlations']
+        matrix = np.array(correlations['matrix'], dtype='float64')
+        return _correlation_summary(correlations['columns'], matrix, top_n=n)['strong']
@@ -1,13 +1,14 @@
-import pandas as pd
-import numpy as np
 from typing import Dict, List, Any
 import re
 from datetime import datetime
+from .profile_index import ProfileIndex, tokenize
 
 class StatisticalChatbot:
     """
     Chatbot basado en análisis estadístico
     NO usa APIs externas - solo análisis de datos con Python
+    Responde desde el índice de perfil de cada archivo (calculado al subirlo);
+    solo lee el DataFrame para lo que el índice no cubre
     """
     
     def __init__(self):
@@ -28,6 +29,10 @@ class StatisticalChatbot:
     def ask(self, question: str, context_files: List[Dict]) -> str:
         """
         Responde preguntas analizando los datos estadísticamente
+        
+        context_files: entradas del registro con 'profile' (índice de perfil) y
+        'load_df' para cargar el DataFrame solo si hace falta ('load_chunks' para
+        recorrer por bloques los archivos grandes); sin perfil se usa 'df'
         """
         try:
             question_lower = question.lower()
@@ -35,60 +40,58 @@ class StatisticalChatbot:
             # Identificar tipo de pregunta
             question_type = self._identify_question_type(question_lower)
             
-            # Extraer datos del contexto
-            all_dataframes = []
+            # Índice de perfil de cada archivo del contexto
+            all_files = []
             all_analysis = []
             
             for file_data in context_files:
-                # Cargar DataFrame
-                try:
-                    df = pd.read_csv(file_data['filepath'])
-                    all_dataframes.append({
-                        'df': df,
-                        'filename': file_data['filename'],
-                        'category': file_data['detection']['category']
-                    })
-                    all_analysis.append(file_data['analysis'])
-                except:
+                sources = ('profile', 'df', 'load_df', 'load_chunks')
+                if all(file_data.get(key) is None for key in sources):
                     continue
-            
-            if not all_dataframes:
+                all_files.append({
+                    'index': ProfileIndex(*(file_data.get(key) for key in sources)),
+                    'filename': file_data['filename'],
+                    'category': file_data['detection']['category']
+                })
+                all_analysis.append(file_data['analysis'])
+            
+            if not all_files:
                 return "No pude acceder a los datos de los archivos."
             
             # Responder según el tipo de pregunta
             if question_type == 'total':
-                return self._answer_total(question_lower, all_dataframes)
+                return self._answer_total(question_lower, all_files)
             
             elif question_type == 'average':
-                return self._answer_average(question_lower, all_dataframes)
+                return self._answer_average(question_lower, all_files)
             
             elif question_type == 'max':
-                return self._answer_max(question_lower, all_dataframes)
+                return self._answer_max(question_lower, all_files)
             
             elif question_type == 'min':
-                return self._answer_min(question_lower, all_dataframes)
+                return self._answer_min(question_lower, all_files)
             
             elif question_type == 'count':
-                return self._answer_count(question_lower, all_dataframes)
+                return self._answer_count(question_lower, all_files)
             
             elif question_type == 'top':
-                return self._answer_top(question_lower, all_dataframes)
+                return self._answer_top(question_lower, all_files)
             
             elif question_type == 'bottom':
-                return self._answer_bottom(question_lower, all_dataframes)
+                return self._answer_bottom(question_lower, all_files)
             
             elif question_type == 'comparison':
-                return self._answer_comparison(question_lower, all_dataframes, all_analysis)
+                return self._answer_comparison(question_lower, all_files, all_analysis)
             
             elif question_type == 'distribution':
-                return self._answer_distribution(question_lower, all_dataframes)
+                return self._answer_distribution(question_lower, all_files)
             
             elif question_type == 'correlation':
-                return self._answer_correlation(question_lower, all_dataframes)
+                return self._answer_correlation(question_lower, all_files)
             
             else:
                 # Respuesta general
-                return self._generate_general_summary(all_dataframes, all_analysis)
+                return self._generate_general_summary(all_files, all_analysis)
         
         except Exception as e:
             return f"Hubo un error al analizar tu pregunta: {str(e)}"
@@ -100,42 +103,19 @@ class StatisticalChatbot:
                 return q_type
         return 'general'
     
-    def _find_relevant_column(self, question: str, df: pd.DataFrame) -> str:
-        """Encuentra la columna más relevante para la pregunta"""
-        question_words = set(question.lower().split())
-        
-        best_match = None
-        best_score = 0
-        
-        for col in df.columns:
-            col_words = set(col.lower().replace('_', ' ').split())
-            score = len(question_words.intersection(col_words))
-            
-            if score > best_score:
-                best_score = score
-                best_match = col
-        
-        # Si no hay match, usar la primera columna numérica
-        if best_match is None:
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 0:
-                best_match = numeric_cols[0]
-        
-        return best_match
-    
-    def _answer_total(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_total(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre totales"""
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
             # Encontrar columna relevante
-            col = self._find_relevant_column(question, df)
+            col = index.find_column(question)
             
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                total = df[col].sum()
+            if index.is_numeric(col):
+                total = index.column(col)['sum']
                 responses.append(f"**{filename}**: El total de {col} es **{total:,.2f}**")
         
         if responses:
@@ -143,18 +123,18 @@ class StatisticalChatbot:
         else:
             return "No encontré columnas numéricas relevantes para calcular totales."
     
-    def _answer_average(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_average(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre promedios"""
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            col = self._find_relevant_column(question, df)
+            col = index.find_column(question)
             
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                avg = df[col].mean()
+            if index.is_numeric(col):
+                avg = self._number(index.column(col)['mean'])
                 responses.append(f"**{filename}**: El promedio de {col} es **{avg:,.2f}**")
         
         if responses:
@@ -162,146 +142,101 @@ class StatisticalChatbot:
         else:
             return "No encontré columnas numéricas relevantes para calcular promedios."
     
-    def _answer_max(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_max(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre valores máximos"""
-        responses = []
-        
-        for data in dataframes:
-            df = data['df']
-            filename = data['filename']
-            
-            col = self._find_relevant_column(question, df)
-            
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                max_val = df[col].max()
-                max_idx = df[col].idxmax()
-                
-                # Intentar encontrar una columna de nombre/identificador
-                name_col = None
-                for c in df.columns:
-                    if any(word in c.lower() for word in ['name', 'nombre', 'vendedor', 'empleado', 'producto']):
-                        name_col = c
-                        break
-                
-                if name_col:
-                    name = df.loc[max_idx, name_col]
-                    responses.append(f"**{filename}**: El valor máximo de {col} es **{max_val:,.2f}** ({name})")
-                else:
-                    responses.append(f"**{filename}**: El valor máximo de {col} es **{max_val:,.2f}**")
-        
-        if responses:
-            return "\n".join(responses)
-        else:
-            return "No encontré columnas numéricas relevantes para encontrar el máximo."
+        return self._answer_extreme(question, files, largest=True)
     
-    def _answer_min(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_min(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre valores mínimos"""
+        return self._answer_extreme(question, files, largest=False)
+    
+    def _answer_extreme(self, question: str, files: List[Dict], largest: bool) -> str:
+        """Máximo/mínimo de la columna relevante, con el nombre de su fila si lo hay"""
+        label = 'máximo' if largest else 'mínimo'
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            col = self._find_relevant_column(question, df)
+            col = index.find_column(question)
             
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                min_val = df[col].min()
-                min_idx = df[col].idxmin()
-                
-                name_col = None
-                for c in df.columns:
-                    if any(word in c.lower() for word in ['name', 'nombre', 'vendedor', 'empleado', 'producto']):
-                        name_col = c
-                        break
+            if index.is_numeric(col):
+                ranking = index.ranking(col, 1, largest)
+                if not ranking:
+                    # Columna sin valores: el máximo/mínimo es NaN
+                    responses.append(f"**{filename}**: El valor {label} de {col} es **nan**")
+                    continue
                 
-                if name_col:
-                    name = df.loc[min_idx, name_col]
-                    responses.append(f"**{filename}**: El valor mínimo de {col} es **{min_val:,.2f}** ({name})")
+                name, value = ranking[0]
+                if index.name_column:
+                    responses.append(f"**{filename}**: El valor {label} de {col} es **{value:,.2f}** ({name})")
                 else:
-                    responses.append(f"**{filename}**: El valor mínimo de {col} es **{min_val:,.2f}**")
+                    responses.append(f"**{filename}**: El valor {label} de {col} es **{value:,.2f}**")
         
         if responses:
             return "\n".join(responses)
         else:
-            return "No encontré columnas numéricas relevantes para encontrar el mínimo."
+            return f"No encontré columnas numéricas relevantes para encontrar el {label}."
     
-    def _answer_count(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_count(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre conteos"""
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            responses.append(f"**{filename}**: Hay **{len(df)}** registros en total")
+            responses.append(f"**{filename}**: Hay **{index.rows}** registros en total")
             
             # Si pregunta por algo específico
-            col = self._find_relevant_column(question, df)
+            col = index.find_column(question)
             if col:
-                unique_count = df[col].nunique()
+                unique_count = index.column(col)['nunique']
                 responses.append(f"  - {unique_count} valores únicos en {col}")
         
         return "\n".join(responses)
     
-    def _answer_top(self, question: str, dataframes: List[Dict], n: int = 5) -> str:
+    def _answer_top(self, question: str, files: List[Dict], n: int = 5) -> str:
         """Responde preguntas sobre los mejores/top"""
-        responses = []
-        
-        for data in dataframes:
-            df = data['df']
-            filename = data['filename']
-            
-            col = self._find_relevant_column(question, df)
-            
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                top_n = df.nlargest(n, col)
-                
-                name_col = None
-                for c in df.columns:
-                    if any(word in c.lower() for word in ['name', 'nombre', 'vendedor', 'empleado', 'producto']):
-                        name_col = c
-                        break
-                
-                response = f"**{filename}** - Top {n} en {col}:\n"
-                for i, (idx, row) in enumerate(top_n.iterrows(), 1):
-                    val = row[col]
-                    if name_col:
-                        name = row[name_col]
-                        response += f"  {i}. {name}: {val:,.2f}\n"
-                    else:
-                        response += f"  {i}. {val:,.2f}\n"
-                
-                responses.append(response)
-        
-        if responses:
-            return "\n".join(responses)
-        else:
-            return "No encontré columnas numéricas relevantes para generar el ranking."
+        return self._answer_ranking(question, files, n, largest=True)
     
-    def _answer_bottom(self, question: str, dataframes: List[Dict], n: int = 5) -> str:
+    def _answer_bottom(self, question: str, files: List[Dict], n: int = 5) -> str:
         """Responde preguntas sobre los peores/bottom"""
+        return self._answer_ranking(question, files, n, largest=False)
+    
+    def _answer_ranking(self, question: str, files: List[Dict], n: int, largest: bool) -> str:
+        """
+        Top/bottom-n filas de la columna relevante; si la pregunta nombra una
+        columna de agrupación (vendedor, departamento...), ranking de grupos
+        por total (o por promedio si se pregunta por el promedio)
+        """
+        title = 'Top' if largest else 'Bottom'
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            col = self._find_relevant_column(question, df)
+            group_col = index.find_group_column(question)
+            if group_col and index.numeric_columns:
+                # Columna numérica nombrada en la pregunta; si no, la primera que no sea un id
+                values = [c for c in index.numeric_columns if 'id' not in tokenize(c)] or index.numeric_columns
+                col = index.find_column(question, among=index.numeric_columns) or values[0]
+                if col != group_col:
+                    agg = 'mean' if any(k in question for k in self.question_patterns['average']) else 'sum'
+                    response = f"**{filename}** - {title} {n} {group_col} por {'promedio' if agg == 'mean' else 'total'} de {col}:\n"
+                    for i, (name, val) in enumerate(index.group_ranking(group_col, col, agg, n, largest), 1):
+                        response += f"  {i}. {name}: {val:,.2f}\n"
+                    responses.append(response)
+                    continue
             
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                bottom_n = df.nsmallest(n, col)
-                
-                name_col = None
-                for c in df.columns:
-                    if any(word in c.lower() for word in ['name', 'nombre', 'vendedor', 'empleado', 'producto']):
-                        name_col = c
-                        break
-                
-                response = f"**{filename}** - Bottom {n} en {col}:\n"
-                for i, (idx, row) in enumerate(bottom_n.iterrows(), 1):
-                    val = row[col]
-                    if name_col:
-                        name = row[name_col]
+            col = index.find_column(question)
+            
+            if index.is_numeric(col):
+                response = f"**{filename}** - {title} {n} en {col}:\n"
+                for i, (name, val) in enumerate(index.ranking(col, n, largest), 1):
+                    if index.name_column:
                         response += f"  {i}. {name}: {val:,.2f}\n"
                     else:
                         response += f"  {i}. {val:,.2f}\n"
@@ -313,22 +248,22 @@ class StatisticalChatbot:
         else:
             return "No encontré columnas numéricas relevantes para generar el ranking."
     
-    def _answer_comparison(self, question: str, dataframes: List[Dict], all_analysis: List[Dict]) -> str:
+    def _answer_comparison(self, question: str, files: List[Dict], all_analysis: List[Dict]) -> str:
         """Responde preguntas de comparación"""
-        if len(dataframes) < 2:
+        if len(files) < 2:
             return "Necesito al menos 2 archivos para hacer comparaciones."
         
         responses = []
         
         # Comparar totales
-        col = self._find_relevant_column(question, dataframes[0]['df'])
+        col = files[0]['index'].find_column(question)
         
         if col:
-            for data in dataframes:
-                df = data['df']
-                if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
-                    total = df[col].sum()
-                    avg = df[col].mean()
+            for data in files:
+                index = data['index']
+                if index.is_numeric(col):
+                    total = index.column(col)['sum']
+                    avg = self._number(index.column(col)['mean'])
                     responses.append(f"**{data['filename']}**:\n  - Total: {total:,.2f}\n  - Promedio: {avg:,.2f}")
         
         if responses:
@@ -336,23 +271,23 @@ class StatisticalChatbot:
         else:
             return "No pude encontrar datos comparables entre los archivos."
     
-    def _answer_distribution(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_distribution(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre distribución"""
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            col = self._find_relevant_column(question, df)
+            col = index.find_column(question)
             
-            if col and pd.api.types.is_numeric_dtype(df[col]):
-                stats = df[col].describe()
+            if index.is_numeric(col):
+                stats = {k: self._number(v) for k, v in index.column(col).items() if k not in ('top', 'bottom')}
                 response = f"**{filename}** - Distribución de {col}:\n"
                 response += f"  - Mínimo: {stats['min']:,.2f}\n"
-                response += f"  - Q1 (25%): {stats['25%']:,.2f}\n"
-                response += f"  - Mediana: {stats['50%']:,.2f}\n"
-                response += f"  - Q3 (75%): {stats['75%']:,.2f}\n"
+                response += f"  - Q1 (25%): {stats['q1']:,.2f}\n"
+                response += f"  - Mediana: {stats['median']:,.2f}\n"
+                response += f"  - Q3 (75%): {stats['q3']:,.2f}\n"
                 response += f"  - Máximo: {stats['max']:,.2f}\n"
                 response += f"  - Media: {stats['mean']:,.2f}\n"
                 response += f"  - Desv. Est.: {stats['std']:,.2f}"
@@ -364,62 +299,48 @@ class StatisticalChatbot:
         else:
             return "No encontré columnas numéricas relevantes para analizar la distribución."
     
-    def _answer_correlation(self, question: str, dataframes: List[Dict]) -> str:
+    def _answer_correlation(self, question: str, files: List[Dict]) -> str:
         """Responde preguntas sobre correlaciones"""
         responses = []
         
-        for data in dataframes:
-            df = data['df']
+        for data in files:
+            index = data['index']
             filename = data['filename']
             
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
+            # Correlaciones más fuertes, ya ordenadas en el índice
+            strong_corr = index.strong_correlations(5)
             
-            if len(numeric_cols) >= 2:
-                corr_matrix = df[numeric_cols].corr()
-                
-                # Encontrar las correlaciones más fuertes
-                strong_corr = []
-                for i in range(len(corr_matrix.columns)):
-                    for j in range(i+1, len(corr_matrix.columns)):
-                        corr_val = corr_matrix.iloc[i, j]
-                        if abs(corr_val) > 0.5:  # Correlación significativa
-                            strong_corr.append({
-                                'col1': corr_matrix.columns[i],
-                                'col2': corr_matrix.columns[j],
-                                'corr': corr_val
-                            })
-                
-                if strong_corr:
-                    response = f"**{filename}** - Correlaciones significativas:\n"
-                    for sc in sorted(strong_corr, key=lambda x: abs(x['corr']), reverse=True)[:5]:
-                        response += f"  - {sc['col1']} ↔ {sc['col2']}: {sc['corr']:.2f}\n"
-                    responses.append(response)
+            if strong_corr:
+                response = f"**{filename}** - Correlaciones significativas:\n"
+                for col1, col2, corr in strong_corr:
+                    response += f"  - {col1} ↔ {col2}: {corr:.2f}\n"
+                responses.append(response)
         
         if responses:
             return "\n\n".join(responses)
         else:
             return "No encontré correlaciones significativas entre las variables numéricas."
     
-    def _generate_general_summary(self, dataframes: List[Dict], all_analysis: List[Dict]) -> str:
+    def _generate_general_summary(self, files: List[Dict], all_analysis: List[Dict]) -> str:
         """Genera un resumen general de los datos"""
         responses = []
         
-        for data, analysis in zip(dataframes, all_analysis):
-            df = data['df']
+        for data, analysis in zip(files, all_analysis):
+            index = data['index']
             filename = data['filename']
             category = data['category']
             
             response = f"**{filename}** ({category}):\n"
-            response += f"  - {len(df)} registros, {len(df.columns)} columnas\n"
+            response += f"  - {index.rows} registros, {index.n_columns} columnas\n"
             
             # Columnas numéricas
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
+            numeric_cols = index.numeric_columns
             if len(numeric_cols) > 0:
                 response += f"  - {len(numeric_cols)} columnas numéricas\n"
                 
                 for col in numeric_cols[:3]:  # Primeras 3
-                    total = df[col].sum()
-                    avg = df[col].mean()
+                    total = index.column(col)['sum']
+                    avg = self._number(index.column(col)['mean'])
                     response += f"    • {col}: Total={total:,.2f}, Promedio={avg:,.2f}\n"
             
             # Insights del análisis
@@ -433,6 +354,10 @@ class StatisticalChatbot:
         
         return "\n".join(responses)
     
+    def _number(self, value) -> float:
+        """Valores del índice: None es NaN (columna sin datos)"""
+        return float('nan') if value is None else value
+    
     def get_suggested_questions(self, category: str) -> List[str]:
         """
         Genera preguntas sugeridas según el tipo de datos
@@ -0,0 +1,380 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cotas de error de los acumuladores aproximados (se reportan en el análisis por bloques)
+KLL_K = 1000
+KLL_RANK_ERROR = 2.446 / KLL_K ** 0.9433   # error de rango normalizado (~0.36%, 99% de confianza)
+HLL_PRECISION = 14
+HLL_RELATIVE_ERROR = 1.04 / np.sqrt(1 << HLL_PRECISION)  # ~0.81% (1 desviación estándar)
+HLL_EXACT_LIMIT = 4096         # hasta aquí se cuentan distintos de forma exacta
+TOPK_CAPACITY = 1000
+MAX_GROUPS = 10000
+
+
+def hash_values(series: pd.Series) -> np.ndarray:
+    """
+    Hash de 64 bits por valor, estable entre bloques
+    - Numéricos como float64 (5 y 5.0 son el mismo valor aunque cambie el dtype del bloque)
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        series = series.astype('float64')
+    elif not pd.api.types.is_datetime64_any_dtype(series):
+        series = series.astype(str)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def _finite(values) -> np.ndarray:
+    values = np.asarray(values, dtype='float64')
+    return values[np.isfinite(values)]
+
+
+class RunningStats:
+    """
+    count/sum/min/max/media/varianza exactos y combinables (Chan et al.)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values) -> 'RunningStats':
+        values = _finite(values)
+        if len(values) == 0:
+            return self
+
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.total = float(values.sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        return self.merge(chunk)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self) -> Optional[float]:
+        """Desviación estándar muestral (ddof=1, como pandas)"""
+        if self.count < 2:
+            return None
+        return float(np.sqrt(self.m2 / (self.count - 1)))
+
+    def to_dict(self) -> Dict[str, Optional[float]]:
+        empty = self.count == 0
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': None if empty else self.min,
+            'max': None if empty else self.max,
+            'mean': None if empty else self.mean,
+            'std': self.std
+        }
+
+
+class KLLSketch:
+    """
+    Cuantiles aproximados combinables (sketch KLL)
+    - Memoria O(k); error de rango ±KLL_RANK_ERROR para k=KLL_K
+    - Mientras no compacta (n pequeño) los cuantiles son exactos, como pandas
+    """
+
+    def __init__(self, k: int = KLL_K, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> 'KLLSketch':
+        values = _finite(values)
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.n += len(values)
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 8)
+
+    def _compress(self):
+        while True:
+            level = next((h for h, items in enumerate(self.levels) if len(items) > self._capacity(h)), None)
+            if level is None:
+                return
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            # Compactar: ordenar y promover uno de cada dos (con peso doble)
+            items = np.sort(self.levels[level])
+            odd = len(items) % 2
+            promoted = items[odd:][self._rng.integers(2)::2]
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def _weighted(self) -> Tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2 ** h, dtype='float64') for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))  # interpolación lineal, como pandas
+
+        items, weights = self._weighted()
+        cumulative = np.cumsum(weights)
+        idx = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(items[min(idx, len(items) - 1)])
+
+    def count_outside(self, lower: float, upper: float) -> int:
+        """Número (estimado) de valores < lower o > upper"""
+        if self.n == 0:
+            return 0
+        items, weights = self._weighted()
+        return int(round(weights[(items < lower) | (items > upper)].sum()))
+
+    def sample_outside(self, lower: float, upper: float, limit: int = 10) -> List[float]:
+        """Algunos valores retenidos fuera de [lower, upper] (ejemplos de outliers)"""
+        items = np.concatenate(self.levels)
+        return items[(items < lower) | (items > upper)][:limit].tolist()
+
+
+class HyperLogLog:
+    """
+    Conteo aproximado de valores distintos combinable
+    - Exacto hasta HLL_EXACT_LIMIT distintos; después, error relativo ~HLL_RELATIVE_ERROR
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, exact_limit: int = HLL_EXACT_LIMIT):
+        # Con precision >= 11 los bits restantes caben exactos en un float64
+        if not 11 <= precision <= 18:
+            raise ValueError("precision debe estar entre 11 y 18")
+        self.precision = precision
+        self.exact_limit = exact_limit
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self._exact = set()
+
+    def update(self, series: pd.Series) -> 'HyperLogLog':
+        series = series.dropna()
+        if series.empty:
+            return self
+        self.add_hashes(hash_values(series))
+        return self
+
+    def add_hashes(self, hashes: np.ndarray) -> 'HyperLogLog':
+        p = self.precision
+        hashes = hashes.astype(np.uint64, copy=False)
+        idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        _, bit_length = np.frexp(rest.astype('float64'))
+        rho = ((64 - p) - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rho)
+
+        if self._exact is not None:
+            self._exact.update(np.unique(hashes).tolist())
+            if len(self._exact) > self.exact_limit:
+                self._exact = None
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        np.maximum(self.registers, other.registers, out=self.registers)
+        if self._exact is not None and other._exact is not None:
+            self._exact |= other._exact
+            if len(self._exact) > self.exact_limit:
+                self._exact = None
+        else:
+            self._exact = None
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return self._exact is not None
+
+    def count(self) -> int:
+        if self._exact is not None:
+            return len(self._exact)
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype('float64'))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # corrección de rango pequeño
+        return int(round(estimate))
+
+
+class TopK:
+    """
+    Valores más frecuentes (Misra-Gries) combinables
+    - Guarda a lo sumo `capacity` valores
+    - Cada conteo está subestimado como mucho en `error` (<= n / (capacity + 1))
+    """
+
+    def __init__(self, capacity: int = TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='float64')
+        self.error = 0.0
+
+    def update(self, series: pd.Series) -> 'TopK':
+        return self._add(series.value_counts())
+
+    def merge(self, other: 'TopK') -> 'TopK':
+        self.error += other.error
+        return self._add(other.counts)
+
+    def _add(self, counts: pd.Series) -> 'TopK':
+        if counts.empty:
+            return self
+        counts = counts.astype('float64')
+        combined = counts if self.counts.empty else self.counts.add(counts, fill_value=0)
+        if len(combined) > self.capacity:
+            # Se conservan `capacity` candidatos aunque queden en 0 (valores casi
+            # uniformes): la moda sigue teniendo un candidato, como Series.mode()
+            kept = combined.nlargest(self.capacity + 1)
+            cut = kept.iloc[-1]
+            combined = kept.iloc[:-1] - cut
+            self.error += cut
+        self.counts = combined
+        return self
+
+    def top(self, n: int) -> List[Tuple[Any, int]]:
+        return [(k, int(v)) for k, v in self.counts.nlargest(n).items() if v > 0]
+
+    def most_common(self) -> Any:
+        """Valor más frecuente; en empate el menor, como Series.mode()"""
+        if self.counts.empty:
+            return None
+        tied = self.counts[self.counts == self.counts.max()].index.tolist()
+        try:
+            return min(tied)
+        except TypeError:
+            return tied[0]
+
+
+class GroupedStats:
+    """
+    count/sum por grupo (group-by) combinables
+    - Exacto mientras haya <= max_groups grupos; si no, conserva los de mayor
+      conteo y marca `truncated`
+    """
+
+    def __init__(self, max_groups: int = MAX_GROUPS):
+        self.max_groups = max_groups
+        self.groups = pd.DataFrame(columns=['count', 'sum'], dtype='float64')
+        self.truncated = False
+
+    def update(self, keys: pd.Series, values: pd.Series) -> 'GroupedStats':
+        chunk = values.groupby(keys).agg(['count', 'sum'])
+        return self._add(chunk.astype('float64'))
+
+    def merge(self, other: 'GroupedStats') -> 'GroupedStats':
+        self.truncated = self.truncated or other.truncated
+        return self._add(other.groups)
+
+    def _add(self, chunk: pd.DataFrame) -> 'GroupedStats':
+        if chunk.empty:
+            return self
+        combined = chunk if self.groups.empty else self.groups.add(chunk, fill_value=0)
+        if len(combined) > self.max_groups:
+            combined = combined.nlargest(self.max_groups, 'count')
+            self.truncated = True
+        self.groups = combined
+        return self
+
+    def sums(self) -> pd.Series:
+        return self.groups['sum']
+
+    def means(self) -> pd.Series:
+        return self.groups['sum'] / self.groups['count']
+
+
+class CorrelationAccumulator:
+    """
+    Matriz de correlación de Pearson exacta (observaciones completas por pares, como DataFrame.corr)
+    - Acumula momentos por pares centrados en la media del primer bloque
+    """
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        p = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((p, p))
+        self.sx = np.zeros((p, p))   # sx[i, j]: suma de x_i donde x_i y x_j existen
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros((p, p))
+
+    def update(self, df: pd.DataFrame) -> 'CorrelationAccumulator':
+        X = df[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        if self.shift is None:
+            self.shift = np.nan_to_num(pd.DataFrame(X).mean().to_numpy())
+
+        X = X - self.shift
+        present = (~np.isnan(X)).astype('float64')
+        X0 = np.where(present > 0, X, 0.0)
+
+        self.n += present.T @ present
+        self.sx += X0.T @ present
+        self.sxx += (X0 ** 2).T @ present
+        self.sxy += X0.T @ X0
+        return self
+
+    def merge(self, other: 'CorrelationAccumulator') -> 'CorrelationAccumulator':
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.__dict__.update({k: np.copy(v) for k, v in other.__dict__.items() if k != 'columns'})
+            return self
+
+        # Llevar los momentos de `other` al centro de `self`
+        d = (self.shift - other.shift)[:, None]
+        sx_t = other.sx.T
+        self.n += other.n
+        self.sx += other.sx - d * other.n
+        self.sxx += other.sxx - 2 * d * other.sx + d ** 2 * other.n
+        self.sxy += other.sxy - d.T * other.sx - d * sx_t + d * d.T * other.n
+        return self
+
+    def matrix(self) -> pd.DataFrame:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.n * self.sxy - self.sx * self.sx.T
+            var = self.n * self.sxx - self.sx ** 2
+            corr = cov / np.sqrt(var * var.T)
+        corr[self.n < 2] = np.nan
+        corr = np.clip(corr, -1, 1)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
@@ -0,0 +1,155 @@
+"""
+Paridad del modo por bloques (plan_chunks → clean_chunk → analyze_chunks) con el
+modo completo (clean_dataframe → analyze_dataframe) sobre el mismo CSV:
+cada estadística dentro de la cota que reporta 'error_bounds'.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.data_analyzer import DataAnalyzer
+from services.data_cleaner import DataCleaner
+from services.dataset_store import CSVChunks, read_upload
+from services.streaming_stats import KLL_RANK_ERROR
+
+ROWS = 60_000
+CHUNK_ROWS = 7_000
+
+
+@pytest.fixture(scope='module')
+def financial_csv(tmp_path_factory):
+    rng = np.random.default_rng(1)
+    salario = rng.normal(3000, 800, ROWS)
+    salario[rng.random(ROWS) < 0.01] = 20_000      # <5% outliers: se winsorizan
+    salario[rng.random(ROWS) < 0.1] = np.nan       # >5% nulls: imputación exacta (media)
+    df = pd.DataFrame({
+        'id': np.arange(ROWS),
+        'fecha': rng.permutation(pd.date_range('1900-01-01', periods=ROWS, freq='D').strftime('%Y-%m-%d')),
+        'categoria': rng.choice(['alquiler', 'comida', 'ocio', 'transporte'], ROWS),
+        'monto': rng.lognormal(4, 1, ROWS),         # >5% outliers: sin tratar
+        'salario': salario
+    })
+    path = tmp_path_factory.mktemp('csv') / 'gastos.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def both_modes(financial_csv):
+    raw, _ = read_upload(financial_csv)
+    clean, _ = DataCleaner().clean_dataframe(raw)
+    exact = DataAnalyzer().analyze_dataframe(clean, {'category': 'financial'})
+
+    chunks = CSVChunks(financial_csv, chunksize=CHUNK_ROWS)
+    cleaner = DataCleaner()
+    plan = cleaner.plan_chunks(chunks)
+    chunked = DataAnalyzer().analyze_chunks((cleaner.clean_chunk(chunk, plan) for chunk in chunks),
+                                            {'category': 'financial'}, plan['clip'])
+
+    # Columnas numéricas antes de winsorizar (mismas reglas de imputación que el limpiador)
+    unclipped = raw.rename(columns=str.lower)[['id', 'monto', 'salario']]
+    unclipped = unclipped.fillna({'salario': unclipped['salario'].mean()})
+    return exact, chunked, clean, unclipped
+
+
+def _by_name(columns):
+    return {col['name']: col for col in columns}
+
+
+def _clip_interval(values: pd.Series) -> tuple:
+    """Límites de winsorización posibles con cuartiles de error de rango ±KLL_RANK_ERROR"""
+    q1_low, q1_high, q3_low, q3_high = values.quantile(
+        [0.25 - KLL_RANK_ERROR, 0.25 + KLL_RANK_ERROR, 0.75 - KLL_RANK_ERROR, 0.75 + KLL_RANK_ERROR])
+    lower = (q1_low - 1.5 * (q3_high - q1_low), q1_high - 1.5 * (q3_low - q1_high))
+    upper = (q3_low + 1.5 * (q3_low - q1_high), q3_high + 1.5 * (q3_high - q1_low))
+    return lower, upper
+
+
+def test_chunked_mode_reports_error_bounds(both_modes):
+    _, chunked, _, _ = both_modes
+    assert 'error' not in chunked
+    assert chunked['mode'] == 'chunked'
+    bounds = chunked['error_bounds']
+    assert bounds['winsorized_columns'] == ['salario']
+    assert bounds['median_rank_error'] == KLL_RANK_ERROR
+    assert bounds['truncated_group_by'] == []
+
+
+def test_exact_statistics_match(both_modes):
+    exact, chunked, _, _ = both_modes
+    exact_stats, chunked_stats = exact['statistics'], chunked['statistics']
+    assert chunked_stats['total_rows'] == exact_stats['total_rows'] == ROWS
+    assert chunked_stats['total_columns'] == exact_stats['total_columns']
+    assert chunked_stats['missing_data'] == exact_stats['missing_data']
+
+    winsorized = chunked['error_bounds']['winsorized_columns']
+    exact_numeric = _by_name(exact_stats['numeric_columns'])
+    for name, col in _by_name(chunked_stats['numeric_columns']).items():
+        if name in winsorized:
+            continue
+        for key in ('min', 'max', 'mean', 'std'):
+            assert col[key] == pytest.approx(exact_numeric[name][key], rel=1e-9)
+
+    for key in ('total_amount', 'average_amount', 'max_transaction', 'min_transaction'):
+        assert chunked['specific_analysis'][key] == pytest.approx(exact['specific_analysis'][key], rel=1e-9)
+    for category, row in exact['specific_analysis']['by_category'].items():
+        for key in ('sum', 'mean', 'count'):
+            assert chunked['specific_analysis']['by_category'][category][key] == pytest.approx(row[key], rel=1e-9)
+    assert chunked['specific_analysis']['monthly_trend'] == pytest.approx(exact['specific_analysis']['monthly_trend'])
+
+    exact_matrix = exact['correlations']['correlation_matrix']
+    chunked_matrix = chunked['correlations']['correlation_matrix']
+    for a in ('id', 'monto'):
+        for b in ('id', 'monto'):
+            assert chunked_matrix[a][b] == pytest.approx(exact_matrix[a][b], abs=1e-9)
+
+
+def test_winsorized_columns_within_clip_bound_error(both_modes):
+    _, chunked, _, unclipped = both_modes
+    salario = unclipped['salario']
+    (lower_low, lower_high), (upper_low, upper_high) = _clip_interval(salario)
+    col = _by_name(chunked['statistics']['numeric_columns'])['salario']
+
+    assert lower_low <= col['min'] <= lower_high
+    assert upper_low <= col['max'] <= upper_high
+    # La media de clip(x, l, u) crece con l y con u
+    assert salario.clip(lower_low, upper_low).mean() <= col['mean'] <= salario.clip(lower_high, upper_high).mean()
+
+
+def test_medians_within_rank_error(both_modes):
+    _, chunked, clean, _ = both_modes
+    rank_error = chunked['error_bounds']['median_rank_error']
+    for name, col in _by_name(chunked['statistics']['numeric_columns']).items():
+        values = clean[name].to_numpy()
+        if name in chunked['error_bounds']['winsorized_columns']:
+            # Mismo rango que el límite de recorte: la mediana no cambia de posición
+            values = values.clip(col['min'], col['max'])
+        low, high = (values < col['median']).mean(), (values <= col['median']).mean()
+        assert low - rank_error <= 0.5 <= high + rank_error
+
+
+def test_outlier_counts_within_error(both_modes):
+    exact, chunked, _, _ = both_modes
+    count_error = chunked['error_bounds']['outliers_count_error']
+    assert 'salario' not in chunked['outliers']   # winsorizada: los recortados no son outliers
+    for name in set(exact['outliers']) | set(chunked['outliers']):
+        exact_count = exact['outliers'].get(name, {}).get('count', 0)
+        chunked_count = chunked['outliers'].get(name, {}).get('count', 0)
+        assert abs(chunked_count - exact_count) <= count_error
+
+
+def test_text_columns_within_error(both_modes):
+    exact, chunked, clean, _ = both_modes
+    bounds = chunked['error_bounds']
+    exact_text = _by_name(exact['statistics']['text_columns'])
+    for name, col in _by_name(chunked['statistics']['text_columns']).items():
+        expected = exact_text[name]
+        relative_error = bounds['unique_values_relative_error']
+        assert abs(col['unique_values'] - expected['unique_values']) <= 3 * relative_error * expected['unique_values']
+
+        assert col['most_common'] is not None
+        undercount = bounds['most_common_max_undercount'].get(name, 0)
+        counts = clean[name].value_counts()
+        assert counts[col['most_common']] >= counts[expected['most_common']] - undercount
+    assert 'fecha' in bounds['most_common_max_undercount']   # fechas sin repetir: el TopK se desborda
@@ -0,0 +1,78 @@
+"""
+Tests del comparador: un archivo guardado por bloques ('chunks') da la misma
+comparación que el DataFrame completo ('df').
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.comparison_engine import ComparisonEngine
+
+
+def _period(seed, n, sellers):
+    rng = np.random.default_rng(seed)
+    monto = np.round(rng.gamma(2, 300, n), 2)
+    return pd.DataFrame({
+        'vendedor': rng.choice(sellers, n),
+        'categoria': rng.choice(['alquiler', 'comida', 'ocio'], n),
+        'monto': monto,
+        'ventas': [f"${v:,.2f}" for v in monto],
+        'salario': rng.normal(3000, 500, n),
+    })
+
+
+@pytest.fixture(scope='module')
+def periodos():
+    return [_period(0, 500, ['Ana', 'Luis', 'Eva']), _period(1, 450, ['Ana', 'Luis', 'Marta'])]
+
+
+def _files(dfs, category, chunked):
+    files = []
+    for i, df in enumerate(dfs):
+        f = {'filename': f'periodo_{i}.csv', 'detection': {'category': category}}
+        if chunked:
+            parts = [df.iloc[start:start + 120].reset_index(drop=True) for start in range(0, len(df), 120)]
+            f['chunks'] = lambda parts=parts: iter(parts)
+        else:
+            f['df'] = df
+        files.append(f)
+    return files
+
+
+def _approx(value):
+    if isinstance(value, dict):
+        return {k: _approx(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_approx(v) for v in value]
+    if isinstance(value, float):
+        return pytest.approx(value)
+    return value
+
+
+@pytest.mark.parametrize('category', ['financial', 'sales', 'hr', 'generic'])
+def test_chunks_match_dataframe(periodos, category):
+    engine = ComparisonEngine()
+    whole = engine.compare(_files(periodos, category, chunked=False))
+    chunked = engine.compare(_files(periodos, category, chunked=True))
+
+    assert 'error' not in whole
+    if category == 'generic':
+        whole['common_columns'].sort()
+        chunked['common_columns'].sort()
+    assert chunked == _approx(whole)
+    assert whole['total_records'] == 950
+
+
+def test_sales_by_seller(periodos):
+    comparison = ComparisonEngine().compare(_files(periodos, 'sales', chunked=True))
+    df = periodos[0].copy()
+    df['ventas'] = df['monto']
+    expected = df.groupby('vendedor')['ventas'].agg(['sum', 'size'])
+
+    # Marta no vende en el primer período: total 0
+    assert comparison['seller_performance']['Marta']['data'][0] == {'file': 'periodo_0.csv', 'total_sales': 0,
+                                                                     'num_sales': 0}
+    eva = comparison['seller_performance']['Eva']['data'][0]
+    assert eva['total_sales'] == pytest.approx(expected.at['Eva', 'sum'])
+    assert eva['num_sales'] == expected.at['Eva', 'size']
@@ -0,0 +1,89 @@
+"""
+Tests del limpiador: un DataFrame pequeño con cada caso (tipos, nombres, duplicados,
+imputación, outliers, texto) frente al resultado esperado escrito a mano.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.data_cleaner import DataCleaner
+from services.dataset_store import CSVChunks
+
+ROWS = range(1, 41)
+
+
+def _raw() -> pd.DataFrame:
+    df = pd.DataFrame({
+        'ID': list(ROWS),
+        'Monto ($)': [f"${i * 10:,.2f}" if i < 40 else "$99,999.00" for i in ROWS],
+        'Edad': [np.nan if i % 10 == 5 else 20 + i % 10 for i in ROWS],
+        'Salario': [np.nan if i == 1 else 1000 + 10 * i for i in ROWS],
+        'Notas': ['ok' if i <= 10 else np.nan for i in ROWS],
+        'Ciudad': [np.nan if i == 2 else '  quito ' if i % 3 == 0 else 'lima' for i in ROWS],
+        'Segmento': [np.nan if i % 10 == 3 else 'A' if i % 2 == 0 else 'B' for i in ROWS],
+        'Nombre Cliente': [f" cliente   {i}" for i in ROWS],
+        'Fecha': [f"2024-01-{(i - 1) % 28 + 1:02d}" for i in ROWS],
+    })
+    return pd.concat([df, df.tail(1)], ignore_index=True)   # última fila duplicada
+
+
+def _expected() -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': list(ROWS),
+        # Q1 = 107.5, Q3 = 302.5 → límite superior 302.5 + 1.5 · 195 = 595
+        'monto': [i * 10.0 if i < 40 else 595.0 for i in ROWS],
+        # 10% nulos: media de los 36 valores restantes = 20 + 40/9
+        'edad': [20 + 40 / 9 if i % 10 == 5 else 20.0 + i % 10 for i in ROWS],
+        # 2.5% nulos: mediana de 1020..1400
+        'salario': [1210.0 if i == 1 else 1000.0 + 10 * i for i in ROWS],
+        # 'notas' (75% nulos) se elimina
+        'ciudad': ['Lima' if i == 2 else 'Quito' if i % 3 == 0 else 'Lima' for i in ROWS],
+        'segmento': ['Unknown' if i % 10 == 3 else 'A' if i % 2 == 0 else 'B' for i in ROWS],
+        'nombre_cliente': [f"Cliente {i}" for i in ROWS],
+        'fecha': pd.to_datetime([f"2024-01-{(i - 1) % 28 + 1:02d}" for i in ROWS]),
+    })
+
+
+EXPECTED_STRATEGIES = {
+    'edad': 'media',
+    'salario': 'mediana',
+    'notas': 'columna eliminada (>50% nulls)',
+    'ciudad': 'moda',
+    'segmento': 'categoría "Unknown"',
+}
+
+
+def _step(report: dict, name: str) -> dict:
+    return next(step for step in report['steps'] if step['step'] == name)
+
+
+def test_clean_dataframe_matches_expected():
+    raw = _raw()
+    cleaned, report = DataCleaner().clean_dataframe(raw)
+
+    pd.testing.assert_frame_equal(cleaned, _expected())
+    assert len(raw) == 41   # el original no se modifica
+
+    missing = _step(report, 'Manejo de valores faltantes')['details']
+    assert {d['column']: d['strategy'] for d in missing} == EXPECTED_STRATEGIES
+    outliers = _step(report, 'Detección y manejo de outliers')['details']
+    assert [(d['column'], d['strategy'], d['lower_bound'], d['upper_bound']) for d in outliers] == \
+        [('monto', 'winsorización', -185.0, 595.0)]
+    assert report['rows_removed'] == 1
+    assert report['columns_removed'] == 1
+
+
+def test_chunked_cleaning_matches_expected(tmp_path):
+    path = tmp_path / 'clientes.csv'
+    _raw().to_csv(path, index=False)
+    chunks = CSVChunks(str(path))
+    cleaner = DataCleaner()
+    plan = cleaner.plan_chunks(chunks)
+
+    cleaned = pd.concat([cleaner.clean_chunk(chunk, plan) for chunk in chunks])
+    pd.testing.assert_frame_equal(cleaned, _expected())
+
+    missing = _step(plan['cleaning_report'], 'Manejo de valores faltantes')['details']
+    assert {d['column']: d['strategy'] for d in missing} == EXPECTED_STRATEGIES
+    assert plan['clip'] == {'monto': pytest.approx((-185.0, 595.0))}
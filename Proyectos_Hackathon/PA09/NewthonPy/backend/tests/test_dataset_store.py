@@ -0,0 +1,65 @@
+"""
+Tests de la caché de DataFrames limpios (modo por bloques incluido).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.dataset_store import DatasetStore
+
+
+def _chunks():
+    # Los dtypes cambian entre bloques (int → float, texto → nulos)
+    yield pd.DataFrame({'n': [1, 2], 'txt': ['a', 'b']}, index=[0, 1])
+    yield pd.DataFrame({'n': [3.5, np.nan], 'txt': [np.nan, np.nan]}, index=[2, 3])
+    yield pd.DataFrame({'n': [5, 6], 'txt': ['c', 'd']}, index=[4, 5])
+
+
+def test_put_chunks_stores_every_chunk(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    passed = list(store.put_chunks('big_csv', _chunks()))
+    assert len(passed) == 3
+
+    # Se leen de disco bloque a bloque, sin concatenarlos ni pasar por el LRU
+    for store_instance in (store, DatasetStore(str(tmp_path))):
+        assert store_instance.is_chunked('big_csv')
+        assert store_instance.get('big_csv') is None
+        stored = list(store_instance.iter_chunks('big_csv'))
+        assert len(stored) == 3
+        for chunk, expected in zip(stored, _chunks()):
+            pd.testing.assert_frame_equal(chunk, expected.reset_index(drop=True))
+    assert 'big_csv' not in store._frames
+
+    store.delete('big_csv')
+    assert not store.is_chunked('big_csv')
+    assert list(DatasetStore(str(tmp_path)).iter_chunks('big_csv')) == []
+
+
+def test_iter_chunks_of_whole_frame(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    df = pd.DataFrame({'n': [1, 2, 3]})
+    store.put('small_csv', df)
+    assert not store.is_chunked('small_csv')
+    [chunk] = store.iter_chunks('small_csv')
+    pd.testing.assert_frame_equal(chunk, df)
+
+
+def test_put_chunks_not_stored_if_interrupted(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    store.put('big_csv', pd.DataFrame({'n': [0]}))
+
+    stored = store.put_chunks('big_csv', _chunks())
+    next(stored)
+    stored.close()
+    assert store.get('big_csv') is None
+    assert not store.is_chunked('big_csv')
+
+    def failing():
+        yield from _chunks()
+        raise ValueError("bloque ilegible")
+
+    with pytest.raises(ValueError):
+        list(store.put_chunks('big_csv', failing()))
+    assert not store.is_chunked('big_csv')
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,141 @@
+"""
+Tests del runtime NumPy del clasificador: exportación desde capas tipo Keras
+(sin TensorFlow) con el StandardScaler plegado, guardado y carga del .npz.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+import services.neural_classifier as neural_classifier
+from services.dense_runtime import DenseNetwork
+
+CATEGORIES = ['financial', 'sales', 'hr', 'inventory', 'operations', 'performance']
+N_FEATURES = 19   # las de CSVNeuralClassifier._extract_features
+
+
+class FakeLayer:
+    """Capa con la interfaz de Keras que usa from_keras (get_weights/get_config)"""
+
+    def __init__(self, weights=None, activation=None):
+        self._weights = weights or []
+        self._config = {'activation': activation} if activation else {}
+
+    def get_weights(self):
+        return self._weights
+
+    def get_config(self):
+        return self._config
+
+
+# from_keras decide por el nombre de la clase, como con las capas de Keras
+Dense = type('Dense', (FakeLayer,), {})
+Dropout = type('Dropout', (FakeLayer,), {})
+Conv1D = type('Conv1D', (FakeLayer,), {})
+
+
+class FakeModel:
+    def __init__(self, layers):
+        self.layers = layers
+
+
+def _dense(rng, n_in, n_out, activation):
+    return Dense([rng.normal(0, 0.3, (n_in, n_out)), rng.normal(0, 0.1, n_out)], activation)
+
+
+@pytest.fixture
+def keras_like():
+    """(modelo 19 → 64 → 32 → 6 con Dropout, scaler ajustado, características sin normalizar)"""
+    rng = np.random.default_rng(0)
+    model = FakeModel([
+        _dense(rng, N_FEATURES, 64, 'relu'),
+        Dropout(),
+        _dense(rng, 64, 32, 'relu'),
+        _dense(rng, 32, len(CATEGORIES), 'softmax'),
+    ])
+    # Escalas muy distintas por característica, como filas vs. porcentajes
+    X = rng.normal(rng.uniform(-50, 5000, N_FEATURES), rng.uniform(0.1, 800, N_FEATURES), (200, N_FEATURES))
+    return model, StandardScaler().fit(X), X
+
+
+def _manual_forward(model, scaler, X):
+    """StandardScaler.transform y la pila de capas, sin plegar nada"""
+    x = scaler.transform(X)
+    for layer in model.layers:
+        if type(layer).__name__ == 'Dropout':
+            continue
+        weights, bias = layer.get_weights()
+        x = x @ weights + bias
+        activation = layer.get_config()['activation']
+        if activation == 'relu':
+            x = np.maximum(x, 0)
+        elif activation == 'softmax':
+            x = np.exp(x - x.max(axis=1, keepdims=True))
+            x = x / x.sum(axis=1, keepdims=True)
+    return x
+
+
+def test_from_keras_folds_scaler(keras_like):
+    model, scaler, X = keras_like
+    net = DenseNetwork.from_keras(model, CATEGORIES, scaler=scaler)
+
+    assert net.input_dim == N_FEATURES
+    assert [activation for _, _, activation in net.layers] == ['relu', 'relu', 'softmax']
+    probabilities = net.predict_proba(X)
+    np.testing.assert_allclose(probabilities, _manual_forward(model, scaler, X), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+    # Una sola fila, como en CSVNeuralClassifier.predict
+    np.testing.assert_allclose(net.predict_proba(X[0]), probabilities[:1])
+
+
+def test_from_keras_without_scaler(keras_like):
+    model, _, X = keras_like
+    identity = StandardScaler().fit(np.array([[0.0] * N_FEATURES, [0.0] * N_FEATURES]))   # μ = 0, σ = 1
+    np.testing.assert_allclose(DenseNetwork.from_keras(model, CATEGORIES).predict_proba(X),
+                               _manual_forward(model, identity, X))
+
+
+def test_from_keras_rejects_unsupported_layers(keras_like):
+    model, scaler, _ = keras_like
+    with pytest.raises(ValueError, match='Conv1D'):
+        DenseNetwork.from_keras(FakeModel(model.layers + [Conv1D()]), CATEGORIES, scaler=scaler)
+    with pytest.raises(ValueError, match='gelu'):
+        DenseNetwork.from_keras(FakeModel([_dense(np.random.default_rng(1), N_FEATURES, 6, 'gelu')]), CATEGORIES)
+
+
+def test_save_load_round_trip(keras_like, tmp_path):
+    model, scaler, X = keras_like
+    net = DenseNetwork.from_keras(model, CATEGORIES, scaler=scaler)
+    path = str(tmp_path / 'csv_classifier.npz')
+    net.save(path)
+
+    loaded = DenseNetwork.load(path)
+    assert loaded.categories == CATEGORIES
+    assert [a for _, _, a in loaded.layers] == [a for _, _, a in net.layers]
+    for (w, b, _), (w_loaded, b_loaded, _) in zip(net.layers, loaded.layers):
+        np.testing.assert_array_equal(w, w_loaded)
+        np.testing.assert_array_equal(b, b_loaded)
+    np.testing.assert_array_equal(loaded.predict_proba(X), net.predict_proba(X))
+
+
+def test_classifier_predicts_with_saved_runtime(keras_like, tmp_path, monkeypatch):
+    model, scaler, _ = keras_like
+    path = str(tmp_path / 'csv_classifier.npz')
+    DenseNetwork.from_keras(model, CATEGORIES, scaler=scaler).save(path)
+    monkeypatch.setattr(neural_classifier, 'RUNTIME_MODEL_PATH', path)
+
+    classifier = neural_classifier.CSVNeuralClassifier()
+    assert classifier.is_trained
+    assert classifier.categories == CATEGORIES
+
+    df = pd.DataFrame({'fecha': ['2024-01-01', '2024-01-02', None], 'monto': [10.5, 20.0, 7.25],
+                       'categoria': ['a', 'b', 'a']})
+    features = classifier._extract_features(df)
+    expected = _manual_forward(model, scaler, features)[0]
+    result = classifier.predict(df)
+
+    assert result['method'] == 'neural_network'
+    assert result['category'] == CATEGORIES[int(np.argmax(expected))]
+    assert result['confidence'] == pytest.approx(expected.max())
+    assert list(result['all_probabilities'].values()) == pytest.approx(expected.tolist())
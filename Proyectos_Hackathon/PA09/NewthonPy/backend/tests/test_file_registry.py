@@ -0,0 +1,81 @@
+"""
+Tests del registro persistente de archivos: lo que queda en memoria es lo mismo
+que se lee del disco tras un reinicio, y el límite de entradas se respeta siempre.
+"""
+
+import numpy as np
+import pandas as pd
+
+from services.file_registry import FileRegistry
+
+
+def _entry(i):
+    # Tipos que producen detección y análisis: Timestamp, escalares de numpy, tuplas
+    return {
+        'filename': f'archivo_{i}.csv',
+        'detection': {'cleaned_data_preview': [{'fecha': pd.Timestamp('2024-01-01') + pd.Timedelta(days=i),
+                                                'monto': np.float64(10.5 * i)}]},
+        'analysis': {'statistics': {'text_columns': [{'name': 'fecha', 'most_common': pd.Timestamp('2024-03-01'),
+                                                      'unique_values': np.int64(i)}]},
+                     'groups': {True: (1, 2)}, 'vacio': pd.NaT}
+    }
+
+
+class Evictions(list):
+    def __call__(self, file_id, entry):
+        self.append((file_id, entry['filename']))
+
+
+def test_entries_persist_across_instances(tmp_path):
+    registry = FileRegistry(str(tmp_path))
+    stored = registry.add('a_csv', _entry(1))
+
+    preview = stored['detection']['cleaned_data_preview'][0]
+    assert preview == {'fecha': '2024-01-02T00:00:00', 'monto': 10.5}
+    assert type(preview['monto']) is float
+    assert stored['analysis']['statistics']['text_columns'][0]['most_common'] == '2024-03-01T00:00:00'
+    assert stored['analysis']['groups'] == {'true': [1, 2]}
+    assert stored['analysis']['vacio'] is None
+
+    reloaded = FileRegistry(str(tmp_path))
+    assert 'a_csv' in reloaded
+    assert reloaded.get('a_csv') == registry.get('a_csv') == stored
+
+
+def test_oldest_first_eviction(tmp_path):
+    evicted = Evictions()
+    registry = FileRegistry(str(tmp_path), max_entries=2, on_evict=evicted)
+    for i in range(3):
+        registry.add(f'f{i}', _entry(i))
+    assert [file_id for file_id, _ in registry.items()] == ['f1', 'f2']
+    assert evicted == [('f0', 'archivo_0.csv')]
+    assert not (tmp_path / 'f0.json').exists()
+
+    # Volver a subir un archivo lo pasa al final
+    registry.add('f1', _entry(1))
+    registry.add('f3', _entry(3))
+    assert [file_id for file_id, _ in registry.items()] == ['f1', 'f3']
+    assert evicted[-1] == ('f2', 'archivo_2.csv')
+
+
+def test_load_respects_max_entries(tmp_path):
+    registry = FileRegistry(str(tmp_path), max_entries=5)
+    for i in range(4):
+        registry.add(f'f{i}', _entry(i))
+
+    evicted = Evictions()
+    smaller = FileRegistry(str(tmp_path), max_entries=2, on_evict=evicted)
+    assert [file_id for file_id, _ in smaller.items()] == ['f2', 'f3']
+    assert evicted == [('f0', 'archivo_0.csv'), ('f1', 'archivo_1.csv')]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['f2.json', 'f3.json']
+
+
+def test_remove(tmp_path):
+    registry = FileRegistry(str(tmp_path))
+    registry.add('a_csv', _entry(1))
+    removed = registry.remove('a_csv')
+    assert removed['filename'] == 'archivo_1.csv'
+    assert 'a_csv' not in registry
+    assert registry.remove('a_csv') is None
+    assert not (tmp_path / 'a_csv.json').exists()
+    assert FileRegistry(str(tmp_path)).items() == []
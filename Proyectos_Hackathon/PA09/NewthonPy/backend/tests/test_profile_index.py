@@ -0,0 +1,222 @@
+"""
+Tests del índice de perfil del chatbot: respuestas desde el perfil frente al
+cálculo directo sobre el DataFrame, y carga diferida cuando el perfil no alcanza.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.profile_index import PROFILE_TOP_N, STRONG_CORRELATION, ProfileBuilder, ProfileIndex, build_profile
+from services.streaming_stats import HLL_RELATIVE_ERROR, KLL_RANK_ERROR
+
+DETECTION = {'data_types': {'categorical': [{'name': 'departamento'}]}}
+
+
+@pytest.fixture(scope='module')
+def ventas():
+    rng = np.random.default_rng(0)
+    n = 300
+    ventas = np.round(rng.gamma(2, 500, n), 2)
+    ventas[[10, 20, 30]] = ventas[5]   # empates: gana la primera fila, como nlargest
+    return pd.DataFrame({
+        'vendedor': [f"Vendedor {i % 40}" for i in range(n)],
+        'departamento': rng.choice(['Norte', 'Sur', 'Este', 'Oeste', 'Centro'], n),
+        'ventas': ventas,
+        'comision': ventas * 0.1 + rng.normal(0, 5, n),
+        'edad': rng.integers(20, 65, n),
+        'activo': rng.random(n) < 0.5,
+    })
+
+
+class CountingLoader:
+    """load_df que cuenta cuántas veces se leyó el DataFrame"""
+
+    def __init__(self, df):
+        self.df = df
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.df
+
+
+def _profile(df):
+    # Mismo camino que el registro: el perfil se guarda como JSON
+    return json.loads(json.dumps(build_profile(df, DETECTION)))
+
+
+def _chunks(df, size):
+    return [df.iloc[start:start + size].reset_index(drop=True) for start in range(0, len(df), size)]
+
+
+def _chunked_profile(df, size):
+    builder = ProfileBuilder(DETECTION)
+    assert sum(len(chunk) for chunk in builder.feed(_chunks(df, size))) == len(df)
+    return json.loads(json.dumps(builder.profile()))
+
+
+def _approx(value):
+    """pytest.approx en cada número de un perfil (dicts y listas anidados)"""
+    if isinstance(value, dict):
+        return {k: _approx(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_approx(v) for v in value]
+    if isinstance(value, float):
+        return pytest.approx(value)
+    return value
+
+
+def _expected_ranking(df, col, n, largest):
+    rows = df.nlargest(n, col) if largest else df.nsmallest(n, col)
+    return [[row['vendedor'], row[col]] for _, row in rows.iterrows()]
+
+
+def _expected_groups(df, group_col, col, agg, n, largest):
+    values = df.groupby(group_col)[col].agg(agg)
+    values = values.nlargest(n) if largest else values.nsmallest(n)
+    return [[k, pytest.approx(v)] for k, v in values.items()]
+
+
+def test_profile_summary(ventas):
+    profile = ProfileIndex(_profile(ventas))
+    assert profile.rows == len(ventas)
+    assert profile.n_columns == len(ventas.columns)
+    assert profile.name_column == 'vendedor'
+    assert profile.numeric_columns == ['ventas', 'comision', 'edad']
+    assert list(profile.profile['groups']) == ['vendedor', 'departamento']
+
+    ventas_info = profile.column('ventas')
+    described = ventas['ventas'].describe()
+    for key, stat in (('count', 'count'), ('mean', 'mean'), ('std', 'std'), ('min', 'min'),
+                      ('q1', '25%'), ('median', '50%'), ('q3', '75%'), ('max', 'max')):
+        assert ventas_info[key] == pytest.approx(described[stat])
+    assert ventas_info['sum'] == pytest.approx(ventas['ventas'].sum())
+    assert profile.is_numeric('activo')   # booleanos: resumen numérico, sin correlaciones
+    assert not profile.is_numeric('vendedor')
+
+
+@pytest.mark.parametrize('largest', [True, False])
+@pytest.mark.parametrize('col', ['ventas', 'edad'])
+def test_ranking_matches_dataframe(ventas, col, largest):
+    loader = CountingLoader(ventas)
+    profile = ProfileIndex(_profile(ventas), load_df=loader)
+    assert profile.ranking(col, PROFILE_TOP_N, largest) == _expected_ranking(ventas, col, PROFILE_TOP_N, largest)
+    assert profile.ranking(col, 3, largest) == _expected_ranking(ventas, col, 3, largest)
+    assert loader.calls == 0
+
+
+@pytest.mark.parametrize('largest', [True, False])
+@pytest.mark.parametrize('agg', ['sum', 'mean'])
+@pytest.mark.parametrize('group_col', ['vendedor', 'departamento'])
+def test_group_ranking_matches_groupby(ventas, group_col, agg, largest):
+    loader = CountingLoader(ventas)
+    profile = ProfileIndex(_profile(ventas), load_df=loader)
+    assert profile.group_ranking(group_col, 'ventas', agg, 5, largest) == \
+        _expected_groups(ventas, group_col, 'ventas', agg, 5, largest)
+    assert loader.calls == 0
+
+
+def test_strong_correlations_match_corr(ventas):
+    profile = ProfileIndex(_profile(ventas))
+    corr = ventas[['ventas', 'comision', 'edad']].corr()
+    expected = sorted(
+        ([a, b, pytest.approx(corr.loc[a, b])] for i, a in enumerate(corr.columns) for b in corr.columns[i + 1:]
+         if abs(corr.loc[a, b]) > STRONG_CORRELATION),
+        key=lambda pair: -abs(pair[2].expected)
+    )
+    assert expected and profile.strong_correlations(5) == expected
+
+    # Reutiliza la matriz del análisis cuando cubre las mismas columnas (no la recalcula)
+    marked = corr.copy()
+    marked.loc['ventas', 'edad'] = marked.loc['edad', 'ventas'] = -0.9
+    analysis = {'correlations': {'correlation_matrix': marked.to_dict()}}
+    reused = ProfileIndex(build_profile(ventas, DETECTION, analysis))
+    assert reused.strong_correlations(5) == [expected[0], ['ventas', 'edad', -0.9]]
+
+
+def test_find_columns(ventas):
+    profile = ProfileIndex(_profile(ventas))
+    assert profile.find_column('¿cuál es la comisión promedio?') == 'ventas'   # sin coincidencia: primera numérica
+    assert profile.find_column('total de comision') == 'comision'
+    assert profile.find_column('nada', among=['edad']) is None
+    assert profile.find_group_column('ventas por departamento') == 'departamento'
+    assert profile.find_group_column('ventas totales') is None
+
+
+def test_lazy_loader_fallback_matches_dataframe_path(ventas):
+    n = PROFILE_TOP_N + 5
+    loader = CountingLoader(ventas)
+    lazy = ProfileIndex(_profile(ventas), load_df=loader)
+    direct = ProfileIndex(df=ventas)   # sin perfil guardado: se construye del DataFrame
+
+    assert lazy.ranking('ventas', n) == direct.ranking('ventas', n) == _expected_ranking(ventas, 'ventas', n, True)
+    assert lazy.ranking('edad', n, largest=False) == direct.ranking('edad', n, largest=False)
+    assert lazy.group_ranking('vendedor', 'comision', 'mean', n) == \
+        direct.group_ranking('vendedor', 'comision', 'mean', n) == \
+        _expected_groups(ventas, 'vendedor', 'comision', 'mean', n, True)
+    assert lazy.strong_correlations(n) == direct.strong_correlations(n)
+    assert loader.calls == 1   # se carga una vez y se reutiliza
+
+
+def test_lazy_loader_without_data():
+    profile = ProfileIndex(_profile(pd.DataFrame({'ventas': range(50), 'vendedor': 'x'})), load_df=lambda: None)
+    assert profile.ranking('ventas', 2) == [['x', 49], ['x', 48]]
+    with pytest.raises(ValueError):
+        profile.ranking('ventas', PROFILE_TOP_N + 1)
+
+
+def test_chunked_profile_matches_build_profile(ventas):
+    chunked = _chunked_profile(ventas, 70)
+    assert chunked.pop('error_bounds') == {
+        'quantile_rank_error': 0.0, 'nunique_relative_error': 0.0, 'truncated_groups': []
+    }
+    assert chunked == _approx(_profile(ventas))
+
+
+def test_chunked_profile_error_bounds():
+    rng = np.random.default_rng(3)
+    n = 60_000
+    df = pd.DataFrame({
+        'vendedor': [f"Vendedor {i}" for i in rng.integers(0, 15_000, n)],   # > MAX_GROUPS
+        'ventas': np.round(rng.gamma(2, 500, n), 2),
+    })
+    chunked = _chunked_profile(df, 7_000)
+    exact = _profile(df)
+
+    bounds = chunked['error_bounds']
+    assert bounds == {'quantile_rank_error': KLL_RANK_ERROR, 'nunique_relative_error': HLL_RELATIVE_ERROR,
+                      'truncated_groups': ['vendedor']}
+    assert chunked['groups']['vendedor']['truncated']
+
+    info, expected = chunked['columns']['ventas'], exact['columns']['ventas']
+    for key in ('count', 'sum', 'mean', 'std', 'min', 'max', 'top', 'bottom'):
+        assert info[key] == _approx(expected[key])
+    ordered = np.sort(df['ventas'])
+    for key, q in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+        rank = np.searchsorted(ordered, info[key]) / n
+        assert abs(rank - q) <= KLL_RANK_ERROR
+    nunique = exact['columns']['vendedor']['nunique']
+    assert abs(chunked['columns']['vendedor']['nunique'] - nunique) <= 3 * HLL_RELATIVE_ERROR * nunique
+
+
+def test_load_chunks_fallback_matches_dataframe_path(ventas):
+    n = PROFILE_TOP_N + 5
+    loader = CountingLoader(_chunks(ventas, 70))
+    chunked = ProfileIndex(_chunked_profile(ventas, 70), load_chunks=loader)
+    direct = ProfileIndex(df=ventas)
+
+    assert chunked.ranking('ventas', n) == direct.ranking('ventas', n)
+    assert chunked.ranking('edad', n, largest=False) == direct.ranking('edad', n, largest=False)
+    for agg in ('sum', 'mean'):
+        assert chunked.group_ranking('vendedor', 'comision', agg, n) == \
+            _approx(direct.group_ranking('vendedor', 'comision', agg, n))
+    assert chunked.strong_correlations(n) == _approx(direct.strong_correlations(n))
+    assert loader.calls == 4   # cada consulta recorre los bloques; las correlaciones salen del perfil
+
+    # Sin perfil guardado: se construye recorriendo los bloques
+    unprofiled = ProfileIndex(load_chunks=lambda: _chunks(ventas, 70))
+    assert unprofiled.rows == len(ventas)
+    assert unprofiled.ranking('ventas', n) == direct.ranking('ventas', n)
@@ -0,0 +1,181 @@
+"""
+Tests de los acumuladores del modo por bloques: cada uno frente al cálculo
+directo de pandas/NumPy, por bloques y combinando acumuladores (merge).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.streaming_stats import (
+    CorrelationAccumulator, GroupedStats, HyperLogLog, KLLSketch, RunningStats, TopK,
+    HLL_RELATIVE_ERROR, KLL_RANK_ERROR
+)
+
+
+def _split(values, parts: int = 7):
+    """Bloques consecutivos de un array, Series o DataFrame"""
+    bounds = np.linspace(0, len(values), parts + 1).astype(int)
+    rows = values.iloc if hasattr(values, 'iloc') else values
+    return [rows[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _rank_bracket(values: np.ndarray, x: float) -> tuple:
+    """Rango normalizado (mínimo, máximo) de x dentro de values"""
+    return (values < x).mean(), (values <= x).mean()
+
+
+def test_running_stats_chunks_and_merge_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(50, 10, 20_000)
+    values[::97] = np.nan
+    values[5] = np.inf
+
+    by_chunks = RunningStats()
+    for part in _split(values):
+        by_chunks.update(part)
+    merged = RunningStats()
+    for part in _split(values, 3):
+        merged.merge(RunningStats().update(part))
+
+    finite = values[np.isfinite(values)]
+    for acc in (by_chunks, merged):
+        summary = acc.to_dict()
+        assert summary['count'] == len(finite)
+        assert summary['sum'] == pytest.approx(finite.sum())
+        assert summary['min'] == finite.min()
+        assert summary['max'] == finite.max()
+        assert summary['mean'] == pytest.approx(finite.mean())
+        assert summary['std'] == pytest.approx(finite.std(ddof=1))
+
+
+def test_running_stats_empty():
+    acc = RunningStats().merge(RunningStats()).update(np.array([np.nan]))
+    assert acc.to_dict() == {'count': 0, 'sum': 0.0, 'min': None, 'max': None, 'mean': None, 'std': None}
+
+
+def test_kll_exact_while_small():
+    values = np.random.default_rng(1).exponential(3, 500)
+    sketch = KLLSketch().update(values)
+    assert sketch.exact
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        assert sketch.quantile(q) == pytest.approx(pd.Series(values).quantile(q))
+
+
+def test_kll_rank_error_by_chunks_and_merge():
+    values = np.random.default_rng(2).lognormal(4, 1, 200_000)
+    by_chunks = KLLSketch()
+    for part in _split(values, 20):
+        by_chunks.update(part)
+    merged = KLLSketch()
+    for i, part in enumerate(_split(values, 4)):
+        merged.merge(KLLSketch(seed=i).update(part))
+
+    for sketch in (by_chunks, merged):
+        assert not sketch.exact
+        assert sketch.n == len(values)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            low, high = _rank_bracket(values, sketch.quantile(q))
+            assert low - KLL_RANK_ERROR <= q <= high + KLL_RANK_ERROR
+
+        lower, upper = np.quantile(values, [0.05, 0.95])
+        expected = int(((values < lower) | (values > upper)).sum())
+        assert abs(sketch.count_outside(lower, upper) - expected) <= 2 * KLL_RANK_ERROR * len(values)
+        assert all(v < lower or v > upper for v in sketch.sample_outside(lower, upper))
+
+
+def test_hyperloglog_exact_below_limit():
+    series = pd.Series(np.arange(3000) % 1000)
+    acc = HyperLogLog()
+    for part in _split(series):
+        acc.update(part)
+    assert acc.exact
+    assert acc.count() == 1000
+
+    # 5 y 5.0 son el mismo valor aunque cambie el dtype del bloque
+    assert HyperLogLog().update(pd.Series([5, 6])).merge(HyperLogLog().update(pd.Series([5.0, np.nan]))).count() == 2
+
+
+def test_hyperloglog_estimate_and_merge():
+    values = pd.Series([f"id-{i}" for i in range(60_000)])
+    halves = [HyperLogLog().update(values[:40_000]), HyperLogLog().update(values[20_000:])]
+    merged = halves[0].merge(halves[1])
+    assert not merged.exact
+    assert abs(merged.count() - 60_000) <= 3 * HLL_RELATIVE_ERROR * 60_000
+
+
+def test_topk_exact_under_capacity():
+    series = pd.Series(np.random.default_rng(3).choice(['a', 'b', 'c', 'd'], 10_000, p=[0.4, 0.3, 0.2, 0.1]))
+    acc = TopK()
+    for part in _split(series):
+        acc.update(part)
+    expected = series.value_counts()
+    assert acc.error == 0
+    assert acc.top(4) == [(k, int(v)) for k, v in expected.items()]
+    assert acc.most_common() == series.mode()[0]
+
+
+def test_topk_error_bound_over_capacity_and_merge():
+    rng = np.random.default_rng(4)
+    series = pd.Series(np.concatenate([rng.integers(0, 5000, 30_000), np.full(2000, 7), np.full(1000, 11)]))
+    series = series.sample(frac=1, random_state=0).reset_index(drop=True)
+    merged = TopK(capacity=100)
+    for part in _split(series, 5):
+        merged.merge(TopK(capacity=100).update(part))
+
+    expected = series.value_counts()
+    assert 0 < merged.error <= len(series) / (100 + 1)
+    assert len(merged.counts) <= 100
+    for value, count in merged.counts.items():
+        assert expected[value] - merged.error <= count <= expected[value]
+    assert merged.most_common() == 7
+    assert [k for k, _ in merged.top(2)] == [7, 11]
+
+
+def test_topk_keeps_a_mode_candidate_for_uniform_values():
+    series = pd.Series(pd.date_range('2020-01-01', periods=3000, freq='D').repeat(2))
+    acc = TopK(capacity=1000)
+    for part in _split(series, 6):
+        acc.update(part)
+    assert acc.most_common() is not None
+    assert series.value_counts()[acc.most_common()] >= 2 - acc.error
+
+
+def test_grouped_stats_match_groupby():
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({'k': rng.choice(list('abcdefg'), 5000), 'v': rng.normal(100, 20, 5000)})
+    df.loc[::50, 'v'] = np.nan
+    merged = GroupedStats()
+    for part in _split(df, 3):
+        merged.merge(GroupedStats().update(part['k'], part['v']))
+
+    expected = df.groupby('k')['v']
+    assert not merged.truncated
+    pd.testing.assert_series_equal(merged.sums().sort_index(), expected.sum(), check_names=False)
+    pd.testing.assert_series_equal(merged.means().sort_index(), expected.mean(), check_names=False)
+
+
+def test_grouped_stats_truncates_to_most_frequent():
+    keys = pd.Series(['big'] * 50 + [f'g{i}' for i in range(20)])
+    acc = GroupedStats(max_groups=5).update(keys, pd.Series(np.ones(len(keys))))
+    assert acc.truncated
+    assert len(acc.groups) == 5
+    assert acc.sums()['big'] == 50
+
+
+def test_correlation_accumulator_matches_dataframe_corr():
+    rng = np.random.default_rng(6)
+    x = rng.normal(1e6, 10, 9000)   # media grande: los momentos van centrados
+    df = pd.DataFrame({'x': x, 'y': 0.5 * x + rng.normal(0, 5, 9000), 'z': rng.uniform(0, 1, 9000)})
+    df.loc[::13, 'y'] = np.nan
+    df.loc[::29, 'z'] = np.nan
+
+    by_chunks = CorrelationAccumulator(['x', 'y', 'z'])
+    for part in _split(df):
+        by_chunks.update(part)
+    merged = CorrelationAccumulator(['x', 'y', 'z'])
+    for part in _split(df, 3):
+        merged.merge(CorrelationAccumulator(['x', 'y', 'z']).update(part))
+
+    for acc in (by_chunks, merged):
+        pd.testing.assert_frame_equal(acc.matrix(), df.corr(), atol=1e-9)
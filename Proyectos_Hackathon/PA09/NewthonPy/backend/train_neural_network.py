@@ -41,6 +41,7 @@ def main():
     print(f"Val loss:                {history.history['val_loss'][-1]:.4f}")
     print()
     print("Modelo guardado en: ml_models/csv_classifier.keras")
+    print("Runtime NumPy (lo usa el servidor): ml_models/csv_classifier.npz")
     print()
     
     # Graficar resultados (opcional)
@@ -14,7 +14,7 @@ from typing import Optional, List
 from datetime import datetime
 
 from backend.config.database import get_db
-from backend.ia.iaCore import NLPAnalyzer
+from backend.ia.iaCore import get_shared_analyzer
 from backend.ia.iaAgent import AgenteAutonomo
 from backend.core.coreModels import ConversacionAgente, MensajeAgente, InsightAgente
 
@@ -22,7 +22,7 @@ router = APIRouter(tags=["Agente"])
 
 # Instancias globales
 try:
-    nlp_analyzer = NLPAnalyzer()
+    nlp_analyzer = get_shared_analyzer()
     agente = AgenteAutonomo(nlp_analyzer)
     print("[OK] Agente autonomo inicializado correctamente")
 except Exception as e:
@@ -1,12 +1,14 @@
 # api/alertasAutomaticas.py
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, case, cast, Integer
+from collections import defaultdict
 from typing import Optional
 
 from backend.config.database import get_db
+from backend.core.coreResumen import diaFecha
 from backend.core.coreServices import obtenerAlertas
-from backend.core.coreModels import AnalisisComentario
+from backend.core.coreModels import AnalisisComentario, ResumenAnalisis
 
 
 router = APIRouter(tags=["Alertas"])
@@ -40,9 +42,19 @@ def alertas(
         } for r in rows
     ]
 
+# Ventana de "últimos registros" para la tendencia creciente, en comentarios
+VENTANA_RECIENTE = 20
+
 @router.get("/alertas/patrones/")
 def detectarPatrones(db: Session = Depends(get_db)):
-    total = db.query(func.count(AnalisisComentario.id)).scalar()
+    # Solo lee los rollups (resumen_analisis): el coste no depende del número de comentarios
+    t = ResumenAnalisis.__table__
+    grupos = db.execute(
+        select(t.c.departamento, t.c.stress_level, t.c.emotion_label, cast(func.sum(t.c.total), Integer))
+        .group_by(t.c.departamento, t.c.stress_level, t.c.emotion_label)
+    ).all()
+
+    total = sum(n for _, _, _, n in grupos)
 
     if total == 0:
         return {
@@ -50,9 +62,7 @@ def detectarPatrones(db: Session = Depends(get_db)):
             "mensaje": "No hay datos suficientes"
         }
 
-    stress_alto = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.stress_level == "alto"
-    ).scalar()
+    stress_alto = sum(n for _, stress, _, n in grupos if stress == "alto")
 
     stress_alto_pct = (stress_alto / total) * 100 if total > 0 else 0
 
@@ -66,27 +76,47 @@ def detectarPatrones(db: Session = Depends(get_db)):
             "accion": "Intervención inmediata requerida. Revisar carga laboral y recursos."
         })
 
-    registros_recientes = db.query(AnalisisComentario).order_by(
-        AnalisisComentario.id.desc()
-    ).limit(20).all()
-
-    stress_reciente = sum(1 for r in registros_recientes if r.stress_level == "alto")
-    if stress_reciente > 15:
+    # Días más recientes hasta reunir la ventana de comentarios. `fecha` es texto
+    # libre del CSV: se ordena por el día interpretado (diaFecha), no por el texto
+    por_dia = defaultdict(lambda: [0, 0])
+    for fecha, n, alto in db.execute(
+        select(
+            t.c.fecha,
+            cast(func.sum(t.c.total), Integer),
+            cast(func.sum(case((t.c.stress_level == "alto", t.c.total), else_=0)), Integer)
+        )
+        .where(t.c.fecha != "")
+        .group_by(t.c.fecha)
+    ):
+        dia = diaFecha(fecha)
+        if dia is not None:
+            por_dia[dia][0] += n
+            por_dia[dia][1] += alto
+
+    recientes, stress_reciente = 0, 0
+    for dia in sorted(por_dia, reverse=True):
+        n, alto = por_dia[dia]
+        recientes += n
+        stress_reciente += alto
+        if recientes >= VENTANA_RECIENTE:
+            break
+
+    if recientes >= VENTANA_RECIENTE and stress_reciente / recientes > 0.75:
         patrones.append({
             "tipo": "tendencia_creciente",
             "severidad": "media",
-            "mensaje": f"Incremento en comentarios con estrés alto en últimos registros ({stress_reciente}/20)",
+            "mensaje": f"Incremento en comentarios con estrés alto en los últimos días ({stress_reciente}/{recientes})",
             "accion": "Monitorear situación y preparar plan de acción preventivo."
         })
 
     dept_stress = {}
-    for r in db.query(AnalisisComentario).all():
-        dept = r.departamento or "Sin departamento"
+    for departamento, stress, _, n in grupos:
+        dept = departamento or "Sin departamento"
         if dept not in dept_stress:
             dept_stress[dept] = {"total": 0, "alto": 0}
-        dept_stress[dept]["total"] += 1
-        if r.stress_level == "alto":
-            dept_stress[dept]["alto"] += 1
+        dept_stress[dept]["total"] += n
+        if stress == "alto":
+            dept_stress[dept]["alto"] += n
 
     for dept, data in dept_stress.items():
         if data["total"] >= 5:
@@ -99,9 +129,7 @@ def detectarPatrones(db: Session = Depends(get_db)):
                     "accion": f"Reunión urgente con liderazgo de {dept}. Evaluación de condiciones laborales."
                 })
 
-    emociones_negativas = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.emotion_label.in_(["anger", "fear", "sadness"])
-    ).scalar()
+    emociones_negativas = sum(n for _, _, emo, n in grupos if emo in ("anger", "fear", "sadness"))
 
     if emociones_negativas > total * 0.4:
         patrones.append({
@@ -111,10 +139,10 @@ def detectarPatrones(db: Session = Depends(get_db)):
             "accion": "Implementar espacios de escucha activa y feedback bidireccional."
         })
 
-    comentarios_positivos = db.query(func.count(AnalisisComentario.id)).filter(
-        AnalisisComentario.stress_level == "bajo",
-        AnalisisComentario.emotion_label.in_(["joy", "happiness", "neutral"])
-    ).scalar()
+    comentarios_positivos = sum(
+        n for _, stress, emo, n in grupos
+        if stress == "bajo" and emo in ("joy", "happiness", "neutral")
+    )
 
     if comentarios_positivos > total * 0.6:
         patrones.append({
@@ -4,12 +4,12 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from backend.config.database import get_db
-from backend.ia.iaCore import NLPAnalyzer
+from backend.ia.iaCore import get_shared_analyzer
 from backend.core.coreServices import guardarAnalisis
 
 router = APIRouter(tags=["Analisis"])
 
-analyzer = NLPAnalyzer()
+analyzer = get_shared_analyzer()
 
 class AnalizarPayload(BaseModel):
     comentario: str
@@ -1,33 +1,42 @@
 # backend/api/analizarLote.py
-from fastapi import APIRouter, Depends
-from backend.config.database import get_db
-from backend.core.coreServices import guardarAnalisis
+from typing import Any, Dict, List, Union
+
+from fastapi import APIRouter, Body, HTTPException
+from pydantic import BaseModel
+
+from backend.core.coreLotes import obtenerGestorLotes
 
 router = APIRouter(
     prefix="/analizar",
     tags=["Análisis"]
 )
 
-@router.post("/lote")
-def analizar_lote(data: list, db=Depends(get_db)):
-    procesados = 0
-
-    for fila in data:
-        comentario = fila.get("comentario")
-        if not comentario:
-            continue
+class LotePayload(BaseModel):
+    datos: List[Dict[str, Any]]
 
-        meta = {
-            "departamento": fila.get("departamento"),
-            "equipo": fila.get("equipo"),
-            "fecha": fila.get("fecha")
-        }
+@router.post("/lote", status_code=202)
+def analizar_lote(payload: Union[LotePayload, List[Dict[str, Any]]] = Body(...)):
+    """
+    Encola el análisis de un lote de filas (comentario, departamento, equipo, fecha).
 
-        guardarAnalisis(db, comentario, meta)
-        procesados += 1
+    Responde de inmediato con el id del trabajo; el progreso se consulta en
+    GET /analizar/lote/{job_id}.
+    """
+    filas = payload.datos if isinstance(payload, LotePayload) else payload
+    trabajo = obtenerGestorLotes().encolar(filas)
 
     return {
         "success": True,
-        "procesados": procesados,
-        "guardados": procesados
+        **trabajo.to_dict()
     }
+
+@router.get("/lote/{job_id}")
+def estado_lote(job_id: str):
+    trabajo = obtenerGestorLotes().obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo de lote no encontrado")
+    return trabajo.to_dict()
+
+@router.get("/lotes")
+def listar_lotes():
+    return [t.to_dict() for t in obtenerGestorLotes().listar()]
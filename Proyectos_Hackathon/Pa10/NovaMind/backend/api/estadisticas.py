@@ -1,14 +1,74 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select, text, desc, cast, Integer
 from typing import Optional
 from datetime import datetime
 
 from backend.config.database import get_db
-from backend.core.coreModels import AnalisisComentario
+from backend.config.settings import settings
+from backend.core.coreModels import AnalisisComentario, ResumenAnalisis, ResumenCategoria
+from backend.core.coreResumen import expansionCategorias
 
 router = APIRouter(tags=["Estadisticas"])
 
+# Todas las consultas agregan en la base (GROUP BY) y solo traen los grupos.
+# Con ESTADISTICAS_RESUMEN (por defecto) se agrega sobre los rollups resumen_*
+# en lugar de analisis_comentarios; ambas tienen las mismas columnas de agrupación.
+
+def _fuente():
+    """(tabla, expresión de conteo) sobre la que agregar."""
+    if settings.estadisticas_resumen:
+        tabla = ResumenAnalisis.__table__
+        return tabla, cast(func.sum(tabla.c.total), Integer)
+    return AnalisisComentario.__table__, func.count()
+
+def _filtros(tabla, departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None):
+    condiciones = []
+    if departamento:
+        condiciones.append(tabla.c.departamento == departamento)
+    if equipo:
+        condiciones.append(tabla.c.equipo == equipo)
+    if fecha_inicio:
+        condiciones.append(tabla.c.fecha >= fecha_inicio)
+    if fecha_fin:
+        condiciones.append(tabla.c.fecha <= fecha_fin)
+    return condiciones
+
+def _topCategorias(db: Session, limite: int, **filtros):
+    if settings.estadisticas_resumen:
+        tabla = ResumenCategoria.__table__
+        stmt = (
+            select(tabla.c.categoria, cast(func.sum(tabla.c.total), Integer).label("n"))
+            .where(*_filtros(tabla, **filtros))
+            .group_by(tabla.c.categoria)
+            .order_by(desc("n"))
+            .limit(limite)
+        )
+        return db.execute(stmt).all()
+
+    # Una fila por (comentario, categoría) expandiendo el JSON en la base
+    desde, categoria, es_categoria = expansionCategorias(db.get_bind().dialect.name)
+    columnas = {
+        "departamento": "a.departamento = :departamento",
+        "equipo": "a.equipo = :equipo",
+        "fecha_inicio": "a.fecha >= :fecha_inicio",
+        "fecha_fin": "a.fecha <= :fecha_fin",
+    }
+    params = {k: v for k, v in filtros.items() if v}
+    where = " AND ".join([es_categoria] + [columnas[k] for k in params])
+
+    return db.execute(
+        text(f"""
+            SELECT {categoria} AS categoria, COUNT(*) AS n
+            FROM analisis_comentarios a, {desde}
+            WHERE {where}
+            GROUP BY 1
+            ORDER BY n DESC
+            LIMIT :limite
+        """),
+        {**params, "limite": limite}
+    ).all()
+
 @router.get("/estadisticas/")
 def obtenerEstadisticas(
     departamento: Optional[str] = None,
@@ -17,19 +77,19 @@ def obtenerEstadisticas(
     fecha_fin: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario)
+    filtros = dict(departamento=departamento, equipo=equipo, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
+    tabla, conteo = _fuente()
 
-    if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
-    if equipo:
-        query = query.filter(AnalisisComentario.equipo == equipo)
-    if fecha_inicio:
-        query = query.filter(AnalisisComentario.fecha >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(AnalisisComentario.fecha <= fecha_fin)
+    grupos = db.execute(
+        select(
+            tabla.c.stress_level, tabla.c.emotion_label, conteo,
+            func.sum(tabla.c.sent_pos), func.sum(tabla.c.sent_neu), func.sum(tabla.c.sent_neg)
+        )
+        .where(*_filtros(tabla, **filtros))
+        .group_by(tabla.c.stress_level, tabla.c.emotion_label)
+    ).all()
 
-    registros = query.all()
-    total = len(registros)
+    total = sum(n for _, _, n, _, _, _ in grupos)
 
     if total == 0:
         return {
@@ -43,21 +103,15 @@ def obtenerEstadisticas(
     stress_counts = {"alto": 0, "medio": 0, "bajo": 0}
     emo_counts = {}
     sent_sum = {"pos": 0.0, "neu": 0.0, "neg": 0.0}
-    cat_counts = {}
-
-    for r in registros:
-        stress_counts[r.stress_level] = stress_counts.get(r.stress_level, 0) + 1
-        emo_counts[r.emotion_label] = emo_counts.get(r.emotion_label, 0) + 1
-        sent_sum["pos"] += r.sent_pos
-        sent_sum["neu"] += r.sent_neu
-        sent_sum["neg"] += r.sent_neg
 
-        if isinstance(r.categories, list):
-            for cat in r.categories:
-                label = cat.get("label", "")
-                cat_counts[label] = cat_counts.get(label, 0) + 1
+    for stress, emo, n, pos, neu, neg in grupos:
+        stress_counts[stress] = stress_counts.get(stress, 0) + n
+        emo_counts[emo] = emo_counts.get(emo, 0) + n
+        sent_sum["pos"] += pos or 0.0
+        sent_sum["neu"] += neu or 0.0
+        sent_sum["neg"] += neg or 0.0
 
-    categorias_ord = sorted(cat_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    categorias_ord = _topCategorias(db, 5, **filtros)
 
     return {
         "total": total,
@@ -68,16 +122,21 @@ def obtenerEstadisticas(
             "neutral": sent_sum["neu"] / total,
             "negativo": sent_sum["neg"] / total
         },
-        "categorias_principales": [{"categoria": c, "count": cnt} for c, cnt in categorias_ord]
+        "categorias_principales": [{"categoria": c, "count": int(cnt)} for c, cnt in categorias_ord]
     }
 
 @router.get("/estadisticas/departamentos/")
 def estadisticasPorDepartamento(db: Session = Depends(get_db)):
-    registros = db.query(AnalisisComentario).all()
+    tabla, conteo = _fuente()
+    grupos = db.execute(
+        select(tabla.c.departamento, tabla.c.stress_level, tabla.c.emotion_label, conteo)
+        .group_by(tabla.c.departamento, tabla.c.stress_level, tabla.c.emotion_label)
+    ).all()
+
     dept_data = {}
 
-    for r in registros:
-        dept = r.departamento or "Sin departamento"
+    for departamento, stress, emo, n in grupos:
+        dept = departamento or "Sin departamento"
         if dept not in dept_data:
             dept_data[dept] = {
                 "total": 0,
@@ -87,40 +146,42 @@ def estadisticasPorDepartamento(db: Session = Depends(get_db)):
                 "emociones": {}
             }
 
-        dept_data[dept]["total"] += 1
-        if r.stress_level == "alto":
-            dept_data[dept]["stress_alto"] += 1
-        elif r.stress_level == "medio":
-            dept_data[dept]["stress_medio"] += 1
+        dept_data[dept]["total"] += n
+        if stress == "alto":
+            dept_data[dept]["stress_alto"] += n
+        elif stress == "medio":
+            dept_data[dept]["stress_medio"] += n
         else:
-            dept_data[dept]["stress_bajo"] += 1
+            dept_data[dept]["stress_bajo"] += n
 
-        emo = r.emotion_label
-        dept_data[dept]["emociones"][emo] = dept_data[dept]["emociones"].get(emo, 0) + 1
+        dept_data[dept]["emociones"][emo] = dept_data[dept]["emociones"].get(emo, 0) + n
 
     return dept_data
 
 @router.get("/estadisticas/equipos/")
 def estadisticasPorEquipo(departamento: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(AnalisisComentario)
-    if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
+    tabla, conteo = _fuente()
+    grupos = db.execute(
+        select(tabla.c.equipo, tabla.c.departamento, tabla.c.stress_level == "alto", conteo)
+        .where(*_filtros(tabla, departamento=departamento))
+        .group_by(tabla.c.equipo, tabla.c.departamento, tabla.c.stress_level == "alto")
+        .order_by(tabla.c.equipo, tabla.c.departamento)
+    ).all()
 
-    registros = query.all()
     equipo_data = {}
 
-    for r in registros:
-        eq = r.equipo or "Sin equipo"
+    for equipo, dept, alto, n in grupos:
+        eq = equipo or "Sin equipo"
         if eq not in equipo_data:
             equipo_data[eq] = {
                 "total": 0,
                 "stress_alto": 0,
-                "departamento": r.departamento
+                "departamento": dept
             }
 
-        equipo_data[eq]["total"] += 1
-        if r.stress_level == "alto":
-            equipo_data[eq]["stress_alto"] += 1
+        equipo_data[eq]["total"] += n
+        if alto:
+            equipo_data[eq]["stress_alto"] += n
 
     return equipo_data
 
@@ -130,15 +191,19 @@ def obtenerTendencias(
     departamento: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario)
-    if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
-
-    registros = query.order_by(AnalisisComentario.fecha).all()
+    # Siempre desde los rollups: el coste depende de los días, no de los comentarios
+    tabla = ResumenAnalisis.__table__
+    conteo = cast(func.sum(tabla.c.total), Integer)
+    grupos = db.execute(
+        select(tabla.c.fecha, tabla.c.stress_level, conteo)
+        .where(*_filtros(tabla, departamento=departamento))
+        .group_by(tabla.c.fecha, tabla.c.stress_level)
+        .order_by(tabla.c.fecha)
+    ).all()
 
     fechas_data = {}
-    for r in registros:
-        fecha = r.fecha or "Sin fecha"
+    for fecha, stress, n in grupos:
+        fecha = fecha or "Sin fecha"
         if fecha not in fechas_data:
             fechas_data[fecha] = {
                 "total": 0,
@@ -147,12 +212,12 @@ def obtenerTendencias(
                 "stress_bajo": 0
             }
 
-        fechas_data[fecha]["total"] += 1
-        if r.stress_level == "alto":
-            fechas_data[fecha]["stress_alto"] += 1
-        elif r.stress_level == "medio":
-            fechas_data[fecha]["stress_medio"] += 1
+        fechas_data[fecha]["total"] += n
+        if stress == "alto":
+            fechas_data[fecha]["stress_alto"] += n
+        elif stress == "medio":
+            fechas_data[fecha]["stress_medio"] += n
         else:
-            fechas_data[fecha]["stress_bajo"] += 1
+            fechas_data[fecha]["stress_bajo"] += n
 
     return fechas_data
@@ -1,18 +1,62 @@
 # api/manejarHistoricos.py
-from fastapi import APIRouter, Depends
+import csv
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional
 
-from backend.config.database import get_db
+from backend.config.database import get_db, SessionLocal
 from backend.core.coreServices import obtenerHistoricos
 from backend.core.coreModels import AnalisisComentario
 
 
 router = APIRouter(tags=["Historicos"])
 
+# Columnas que se pueden pedir con ?campos=a,b,c (por defecto, todas)
+COLUMNAS = [
+    "id", "comentario", "emotion_label", "emotion_score", "stress_level",
+    "sent_pos", "sent_neu", "sent_neg", "categories", "summary", "suggestion",
+    "departamento", "equipo", "fecha", "created_at"
+]
+EXPORT_LOTE = 1000   # filas por fetch del cursor de servidor y por chunk de la respuesta
+
+def _columnas(campos: Optional[str]) -> List[str]:
+    if not campos:
+        return COLUMNAS
+    nombres = [c.strip() for c in campos.split(",") if c.strip()]
+    desconocidos = [c for c in nombres if c not in COLUMNAS]
+    if desconocidos:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(desconocidos)}")
+    return nombres
+
+def _filtrar(stmt, departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None, stress_level=None):
+    if departamento:
+        stmt = stmt.where(AnalisisComentario.departamento == departamento)
+    if equipo:
+        stmt = stmt.where(AnalisisComentario.equipo == equipo)
+    if fecha_inicio:
+        stmt = stmt.where(AnalisisComentario.fecha >= fecha_inicio)
+    if fecha_fin:
+        stmt = stmt.where(AnalisisComentario.fecha <= fecha_fin)
+    if stress_level:
+        stmt = stmt.where(AnalisisComentario.stress_level == stress_level)
+    return stmt
+
+def _fila(row: Dict[str, Any]) -> Dict[str, Any]:
+    fila = dict(row)
+    if "created_at" in fila:
+        fila["created_at"] = str(fila["created_at"])
+    return fila
+
 @router.get("/historicos/")
 def historicos(
+    response: Response,
     limit: int = 100,
+    cursor: Optional[int] = None,
+    campos: Optional[str] = None,
     departamento: Optional[str] = None,
     equipo: Optional[str] = None,
     fecha_inicio: Optional[str] = None,
@@ -20,54 +64,110 @@ def historicos(
     stress_level: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario)
+    """
+    Comentarios del más reciente al más antiguo, paginados por id.
 
-    if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
-    if equipo:
-        query = query.filter(AnalisisComentario.equipo == equipo)
-    if fecha_inicio:
-        query = query.filter(AnalisisComentario.fecha >= fecha_inicio)
-    if fecha_fin:
-        query = query.filter(AnalisisComentario.fecha <= fecha_fin)
-    if stress_level:
-        query = query.filter(AnalisisComentario.stress_level == stress_level)
-
-    rows = query.order_by(AnalisisComentario.id.desc()).limit(limit).all()
-
-    return [
-        {
-            "id": r.id,
-            "comentario": r.comentario,
-            "emotion_label": r.emotion_label,
-            "emotion_score": r.emotion_score,
-            "stress_level": r.stress_level,
-            "sent_pos": r.sent_pos,
-            "sent_neu": r.sent_neu,
-            "sent_neg": r.sent_neg,
-            "categories": r.categories,
-            "summary": r.summary,
-            "suggestion": r.suggestion,
-            "departamento": r.departamento,
-            "equipo": r.equipo,
-            "fecha": r.fecha,
-            "created_at": str(r.created_at)
-        } for r in rows
-    ]
+    La siguiente página se pide con ?cursor=<X-Siguiente-Cursor> (cabecera de la
+    respuesta; no viene si no hay más filas). ?campos=id,comentario,... limita
+    las columnas que se leen y devuelven.
+    """
+    nombres = _columnas(campos)
+    tabla = AnalisisComentario.__table__
+
+    stmt = _filtrar(
+        select(*[tabla.c[c] for c in nombres], tabla.c.id.label("_cursor")),
+        departamento, equipo, fecha_inicio, fecha_fin, stress_level
+    )
+    if cursor is not None:
+        stmt = stmt.where(tabla.c.id < cursor)
+
+    rows = db.execute(stmt.order_by(tabla.c.id.desc()).limit(limit)).mappings().all()
+
+    if rows and len(rows) == limit:
+        response.headers["X-Siguiente-Cursor"] = str(rows[-1]["_cursor"])
+
+    return [_fila({c: r[c] for c in nombres}) for r in rows]
 
 @router.get("/historicos/texto/")
 def obtenerTextoComentarios(
     departamento: Optional[str] = None,
     limit: int = 500,
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    query = db.query(AnalisisComentario.comentario)
+    stmt = select(AnalisisComentario.id, AnalisisComentario.comentario)
 
     if departamento:
-        query = query.filter(AnalisisComentario.departamento == departamento)
+        stmt = stmt.where(AnalisisComentario.departamento == departamento)
+    if cursor is not None:
+        stmt = stmt.where(AnalisisComentario.id < cursor)
+
+    rows = db.execute(stmt.order_by(AnalisisComentario.id.desc()).limit(limit)).all()
+    return {
+        "comentarios": [r[1] for r in rows if r[1]],
+        "siguiente_cursor": rows[-1][0] if rows and len(rows) == limit else None
+    }
+
+@router.get("/historicos/exportar/")
+def exportarHistoricos(
+    formato: str = "ndjson",
+    campos: Optional[str] = None,
+    departamento: Optional[str] = None,
+    equipo: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    stress_level: Optional[str] = None
+):
+    """
+    Exporta los comentarios filtrados (del más antiguo al más reciente) como
+    NDJSON o CSV, en streaming: las filas se leen con un cursor de servidor en
+    bloques de EXPORT_LOTE y se envían según llegan, con memoria constante.
+    """
+    if formato not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Formato no soportado (ndjson o csv)")
+
+    nombres = _columnas(campos)
+    tabla = AnalisisComentario.__table__
+    stmt = _filtrar(
+        select(*[tabla.c[c] for c in nombres]),
+        departamento, equipo, fecha_inicio, fecha_fin, stress_level
+    ).order_by(tabla.c.id)
+
+    return StreamingResponse(
+        _streamExportacion(stmt, nombres, formato),
+        media_type="application/x-ndjson" if formato == "ndjson" else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="historicos.{formato}"'}
+    )
+
+def _streamExportacion(stmt, nombres: List[str], formato: str) -> Iterator[str]:
+    # Sesión propia: la de get_db se cierra antes de que termine el streaming
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_LOTE))
+
+        if formato == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(nombres)
+            yield buffer.getvalue()
 
-    rows = query.limit(limit).all()
-    return {"comentarios": [r[0] for r in rows if r[0]]}
+        for bloque in result.mappings().partitions():
+            if formato == "ndjson":
+                yield "".join(
+                    json.dumps(_fila(r), ensure_ascii=False, default=str) + "\n" for r in bloque
+                )
+            else:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for r in bloque:
+                    fila = _fila(r)
+                    writer.writerow(
+                        json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+                        for v in (fila[c] for c in nombres)
+                    )
+                yield buffer.getvalue()
+    finally:
+        db.close()
 
 @router.get("/historicos/categorias/")
 def obtenerTodasCategorias(db: Session = Depends(get_db)):
@@ -0,0 +1,48 @@
+# api/terminos.py
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, func, desc, cast, Integer
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from backend.config.database import get_db
+from backend.core.coreModels import ResumenTermino
+
+router = APIRouter(tags=["Terminos"])
+
+@router.get("/terminos/")
+def obtenerTerminos(
+    departamento: Optional[str] = None,
+    equipo: Optional[str] = None,
+    fecha_inicio: Optional[str] = None,
+    fecha_fin: Optional[str] = None,
+    limite: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Términos más frecuentes de los comentarios (para la nube de palabras), leídos
+    del índice resumen_terminos. Las fechas filtran por mes (YYYY-MM).
+    """
+    t = ResumenTermino.__table__
+    frecuencia = cast(func.sum(t.c.total), Integer).label("frecuencia")
+    stmt = select(t.c.termino, frecuencia)
+
+    if departamento:
+        stmt = stmt.where(t.c.departamento == departamento)
+    if equipo:
+        stmt = stmt.where(t.c.equipo == equipo)
+    if fecha_inicio:
+        stmt = stmt.where(t.c.periodo >= fecha_inicio[:7])
+    if fecha_fin:
+        stmt = stmt.where(t.c.periodo <= fecha_fin[:7])
+
+    rows = db.execute(
+        stmt.group_by(t.c.termino).order_by(desc("frecuencia"), t.c.termino).limit(limite)
+    ).all()
+
+    maximo = rows[0][1] if rows else 1
+    return {
+        "terminos": [
+            {"termino": termino, "frecuencia": n, "peso": round(n / maximo, 4)}
+            for termino, n in rows
+        ]
+    }
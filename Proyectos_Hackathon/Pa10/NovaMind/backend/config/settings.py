@@ -16,6 +16,10 @@ class Settings(BaseSettings):
     mysql_port: int = 3306
     mysql_db: str = "novamind"
 
+    # /estadisticas agrega sobre los rollups (tablas resumen_*, ver core/coreResumen.py);
+    # en false agrega sobre analisis_comentarios
+    estadisticas_resumen: bool = True
+
     # IA models (puedes cambiarlos aquí)
     sentiment_model: str = "cardiffnlp/twitter-roberta-base-sentiment-latest"
     emotion_model: str = "j-hartmann/emotion-english-distilroberta-base"
@@ -0,0 +1,186 @@
+# core/coreLotes.py
+"""
+Cola de trabajos para el análisis masivo de comentarios (/analizar/lote).
+
+Cada carga se convierte en un TrabajoLote que un pool de workers procesa en
+bloques: inferencia por lotes con NLPAnalyzer.analyze_batch y un INSERT
+multi-fila por bloque con guardarAnalisisLote. El endpoint responde en cuanto
+el trabajo queda en cola y el frontend consulta el progreso por su id.
+"""
+import logging
+import math
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from backend.config.database import SessionLocal
+from backend.core.coreServices import guardarAnalisisLote
+
+logger = logging.getLogger(__name__)
+
+# La inferencia ya usa todos los núcleos (torch); más workers solo solapan
+# la escritura en BD de un bloque con la inferencia del siguiente trabajo
+LOTE_MAX_WORKERS = int(os.getenv("LOTE_MAX_WORKERS", "2"))
+LOTE_BLOQUE = int(os.getenv("LOTE_BLOQUE", "64"))   # comentarios por analyze_batch + INSERT
+LOTE_HISTORIAL = 50                                # trabajos terminados que se conservan
+
+EN_COLA = "en_cola"
+PROCESANDO = "procesando"
+COMPLETADO = "completado"
+FALLIDO = "fallido"
+
+
+def get_shared_analyzer():
+    """NLPAnalyzer compartido; se importa en el worker para no cargar torch al importar el módulo."""
+    from backend.ia.iaCore import get_shared_analyzer as analizador_compartido
+    return analizador_compartido()
+
+
+def _ahora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _texto(valor: Any) -> str:
+    """Valores de CSV a texto: None/NaN se guardan vacíos."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return ""
+    return str(valor)
+
+
+class TrabajoLote:
+    """Estado de un análisis masivo en curso o terminado."""
+
+    def __init__(self, total: int, omitidos: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.estado = EN_COLA
+        self.total = total
+        self.omitidos = omitidos
+        self.procesados = 0
+        self.guardados = 0
+        self.error: Optional[str] = None
+        self.creado = _ahora()
+        self.iniciado: Optional[str] = None
+        self.terminado: Optional[str] = None
+
+    @property
+    def activo(self) -> bool:
+        return self.estado in (EN_COLA, PROCESANDO)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "estado": self.estado,
+            "total": self.total,
+            "procesados": self.procesados,
+            "guardados": self.guardados,
+            "omitidos": self.omitidos,
+            "progreso": round(self.procesados / self.total, 4) if self.total else 1.0,
+            "error": self.error,
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "terminado": self.terminado,
+        }
+
+
+class GestorLotes:
+    """Pool de workers que ejecuta los trabajos de análisis masivo."""
+
+    def __init__(self, max_workers: int = LOTE_MAX_WORKERS, bloque: int = LOTE_BLOQUE):
+        self.bloque = bloque
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lote")
+        self._trabajos: "OrderedDict[str, TrabajoLote]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encolar(self, filas: List[Dict[str, Any]]) -> TrabajoLote:
+        """Crea un trabajo con las filas que traen comentario y lo deja en cola."""
+        validas = [f for f in filas if _texto(f.get("comentario")).strip()]
+        trabajo = TrabajoLote(total=len(validas), omitidos=len(filas) - len(validas))
+
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._recortarHistorial()
+
+        futuro = self._executor.submit(self._ejecutar, trabajo, validas)
+        futuro.add_done_callback(lambda f: self._marcarCancelado(trabajo, f))
+        logger.info(f"Trabajo de lote {trabajo.id} en cola: {trabajo.total} comentarios")
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoLote]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def listar(self) -> List[TrabajoLote]:
+        with self._lock:
+            return list(reversed(self._trabajos.values()))
+
+    def cerrar(self):
+        """Detiene el pool: los trabajos que seguían en cola quedan fallidos (cancelados)."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _marcarCancelado(self, trabajo: TrabajoLote, futuro: Future):
+        # Solo los futuros cancelados por shutdown(cancel_futures=True) no llegaron a ejecutarse
+        if futuro.cancelled():
+            trabajo.estado = FALLIDO
+            trabajo.error = "Cancelado: el servidor se detuvo antes de procesar el trabajo"
+            trabajo.terminado = _ahora()
+            logger.warning(f"Trabajo de lote {trabajo.id} cancelado sin procesar")
+
+    def _ejecutar(self, trabajo: TrabajoLote, filas: List[Dict[str, Any]]):
+        trabajo.estado = PROCESANDO
+        trabajo.iniciado = _ahora()
+
+        try:
+            analyzer = get_shared_analyzer()
+
+            for inicio in range(0, len(filas), self.bloque):
+                bloque = filas[inicio:inicio + self.bloque]
+                textos = [_texto(f.get("comentario")) for f in bloque]
+                metas = [
+                    {
+                        "departamento": _texto(f.get("departamento")),
+                        "equipo": _texto(f.get("equipo")),
+                        "fecha": _texto(f.get("fecha")),
+                        "comentario_original": texto,
+                    }
+                    for f, texto in zip(bloque, textos)
+                ]
+
+                resultados = analyzer.analyze_batch(textos, metas)
+
+                db = SessionLocal()
+                try:
+                    trabajo.guardados += guardarAnalisisLote(db, resultados)
+                finally:
+                    db.close()
+
+                trabajo.procesados += len(bloque)
+
+            trabajo.estado = COMPLETADO
+            logger.info(f"Trabajo de lote {trabajo.id} completado: {trabajo.guardados}/{trabajo.total} guardados")
+        except Exception as e:
+            trabajo.estado = FALLIDO
+            trabajo.error = str(e)
+            logger.error(f"Trabajo de lote {trabajo.id} falló: {e}", exc_info=True)
+        finally:
+            trabajo.terminado = _ahora()
+
+    def _recortarHistorial(self):
+        terminados = [t.id for t in self._trabajos.values() if not t.activo]
+        for trabajo_id in terminados[:max(0, len(terminados) - LOTE_HISTORIAL)]:
+            del self._trabajos[trabajo_id]
+
+
+_gestor: Optional[GestorLotes] = None
+_gestor_lock = threading.Lock()
+
+
+def obtenerGestorLotes() -> GestorLotes:
+    global _gestor
+    with _gestor_lock:
+        if _gestor is None:
+            _gestor = GestorLotes()
+        return _gestor
@@ -1,5 +1,5 @@
 # core/coreModels.py
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Float, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import Mapped, mapped_column
 from backend.config.database import Base
@@ -29,6 +29,58 @@ class AnalisisComentario(Base):
 
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # Filtros y GROUP BY de /estadisticas (prefijos: departamento, departamento+equipo, ...)
+        Index("idx_dep_eq_fecha_stress", "departamento", "equipo", "fecha", "stress_level"),
+    )
+
+class ResumenAnalisis(Base):
+    """Conteos y sumas de sentimiento por fecha/departamento/equipo/estrés/emoción (se actualiza al insertar)"""
+    __tablename__ = "resumen_analisis"
+
+    fecha: Mapped[str] = mapped_column(String(20), primary_key=True)
+    departamento: Mapped[str] = mapped_column(String(80), primary_key=True)
+    equipo: Mapped[str] = mapped_column(String(80), primary_key=True)
+    stress_level: Mapped[str] = mapped_column(String(32), primary_key=True)
+    emotion_label: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    sent_pos: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sent_neu: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    sent_neg: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+class ResumenCategoria(Base):
+    """Conteo de categorías por fecha/departamento/equipo (se actualiza al insertar)"""
+    __tablename__ = "resumen_categorias"
+
+    fecha: Mapped[str] = mapped_column(String(20), primary_key=True)
+    departamento: Mapped[str] = mapped_column(String(80), primary_key=True)
+    equipo: Mapped[str] = mapped_column(String(80), primary_key=True)
+    categoria: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+class ResumenTermino(Base):
+    """Frecuencia de términos por mes/departamento/equipo para la nube de palabras (se actualiza al insertar)"""
+    __tablename__ = "resumen_terminos"
+
+    periodo: Mapped[str] = mapped_column(String(7), primary_key=True)   # YYYY-MM, "" sin fecha ISO
+    departamento: Mapped[str] = mapped_column(String(80), primary_key=True)
+    equipo: Mapped[str] = mapped_column(String(80), primary_key=True)
+    termino: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+class CacheAnalisis(Base):
+    """Resultados de NLPAnalyzer por hash del texto normalizado + configuración de modelos"""
+    __tablename__ = "cache_analisis"
+
+    clave: Mapped[str] = mapped_column(String(64), primary_key=True)
+    config_hash: Mapped[str] = mapped_column(String(16), nullable=False, index=True)
+    resultado: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
 class UsuarioRRHH(Base):
     __tablename__ = "usuarios_rrhh"
 
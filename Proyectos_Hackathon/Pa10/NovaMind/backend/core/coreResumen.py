@@ -0,0 +1,227 @@
+# core/coreResumen.py
+"""
+Rollups de análisis (tablas resumen_analisis, resumen_categorias y resumen_terminos).
+
+Contadores por fecha, departamento y equipo (niveles de estrés, emociones,
+categorías y sumas de sentimiento), más la frecuencia de términos por mes
+(resumen_terminos) para /terminos. guardarAnalisis/guardarAnalisisLote los
+actualizan en la misma transacción que la inserción, así que /tendencias,
+/alertas/patrones/, /terminos y (con ESTADISTICAS_RESUMEN) /estadisticas
+agregan sobre unos pocos grupos en lugar de sobre todos los comentarios.
+
+En el primer arranque con datos previos se pueblan con asegurarResumen();
+para recalcularlos a mano:
+    python -m backend.core.coreResumen
+"""
+import logging
+import re
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from backend.core.coreModels import AnalisisComentario, ResumenAnalisis, ResumenCategoria, ResumenTermino
+from backend.ia.preProcesamiento import extraerTerminos
+
+logger = logging.getLogger(__name__)
+
+RESUMEN_LOTE = 1000     # filas por upsert / por fetch al reconstruir
+
+
+def periodoFecha(fecha: str) -> str:
+    """Mes (YYYY-MM) de una fecha ISO; "" si no lo es."""
+    return fecha[:7] if fecha and re.match(r"\d{4}-\d{2}", fecha) else ""
+
+
+# Formatos de `fecha` que llegan en los CSV (texto libre): ISO y día/mes/año
+_FORMATOS_FECHA = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y")
+
+
+def diaFecha(fecha: str) -> Optional[date]:
+    """Día de una `fecha` de comentario (ISO, con o sin hora, o d/m/a); None si no se reconoce."""
+    fecha = (fecha or "").strip()
+    if re.match(r"\d{4}-\d{2}-\d{2}[T ]", fecha):
+        fecha = fecha[:10]
+    for formato in _FORMATOS_FECHA:
+        try:
+            return datetime.strptime(fecha, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def expansionCategorias(dialecto: str) -> Tuple[str, str, str]:
+    """
+    Fragmento FROM que expande el JSON `categories` de `a` (una fila por categoría),
+    la expresión de su etiqueta y la condición que descarta lo que no es una lista
+    de objetos (igual que acumularResumen, que solo cuenta los dict), según el motor.
+    """
+    if dialecto == "mysql":
+        return (
+            "JSON_TABLE(a.categories, '$[*]' COLUMNS ("
+            "categoria VARCHAR(100) PATH '$.label', elemento JSON PATH '$')) AS jt",
+            "COALESCE(jt.categoria, '')",
+            "JSON_TYPE(a.categories) = 'ARRAY' AND JSON_TYPE(jt.elemento) = 'OBJECT'",
+        )
+    # SQLite (desarrollo y pruebas)
+    return (
+        "json_each(a.categories) AS jt",
+        "COALESCE(json_extract(jt.value, '$.label'), '')",
+        "json_type(a.categories) = 'array' AND jt.type = 'object'",
+    )
+
+
+def _upsertSumando(db: Session, tabla, filas: List[Dict[str, Any]], sumas: List[str]):
+    """INSERT multi-fila que, si la clave ya existe, suma las columnas `sumas`."""
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla)
+        stmt = stmt.on_duplicate_key_update({c: tabla.c[c] + stmt.inserted[c] for c in sumas})
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in tabla.primary_key],
+            set_={c: tabla.c[c] + stmt.excluded[c] for c in sumas}
+        )
+    for i in range(0, len(filas), RESUMEN_LOTE):
+        db.execute(stmt, filas[i:i + RESUMEN_LOTE])
+
+
+def _contarTerminos(terminos: Counter, fecha, departamento, equipo, comentario):
+    base = (periodoFecha(fecha or ""), departamento or "", equipo or "")
+    for termino, n in extraerTerminos(comentario).items():
+        terminos[base + (termino,)] += n
+
+
+def _upsertTerminos(db: Session, terminos: Counter):
+    if terminos:
+        _upsertSumando(
+            db, ResumenTermino.__table__,
+            [
+                dict(periodo=k[0], departamento=k[1], equipo=k[2], termino=k[3], total=n)
+                for k, n in terminos.items()
+            ],
+            ["total"]
+        )
+
+
+def acumularResumen(db: Session, filas: List[Dict[str, Any]]):
+    """
+    Suma al resumen las filas (columnas de AnalisisComentario) que se están insertando.
+    No hace commit: va en la transacción de la inserción.
+    """
+    if not filas:
+        return
+
+    analisis: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    categorias: Counter = Counter()
+    terminos: Counter = Counter()
+
+    for f in filas:
+        base = (f.get("fecha") or "", f.get("departamento") or "", f.get("equipo") or "")
+        acc = analisis[base + (f.get("stress_level") or "", f.get("emotion_label") or "")]
+        acc[0] += 1
+        acc[1] += f.get("sent_pos") or 0.0
+        acc[2] += f.get("sent_neu") or 0.0
+        acc[3] += f.get("sent_neg") or 0.0
+
+        for cat in f.get("categories") or []:
+            if isinstance(cat, dict):
+                categorias[base + (cat.get("label") or "",)] += 1
+
+        _contarTerminos(terminos, *base, f.get("comentario"))
+
+    _upsertSumando(
+        db, ResumenAnalisis.__table__,
+        [
+            dict(fecha=k[0], departamento=k[1], equipo=k[2], stress_level=k[3], emotion_label=k[4],
+                 total=v[0], sent_pos=v[1], sent_neu=v[2], sent_neg=v[3])
+            for k, v in analisis.items()
+        ],
+        ["total", "sent_pos", "sent_neu", "sent_neg"]
+    )
+    if categorias:
+        _upsertSumando(
+            db, ResumenCategoria.__table__,
+            [
+                dict(fecha=k[0], departamento=k[1], equipo=k[2], categoria=k[3], total=n)
+                for k, n in categorias.items()
+            ],
+            ["total"]
+        )
+    _upsertTerminos(db, terminos)
+
+
+def reconstruirResumen(db: Session) -> Dict[str, int]:
+    """Recalcula el resumen completo desde analisis_comentarios con INSERT ... SELECT GROUP BY."""
+    desde, categoria, es_categoria = expansionCategorias(db.get_bind().dialect.name)
+
+    db.execute(text("DELETE FROM resumen_analisis"))
+    db.execute(text("DELETE FROM resumen_categorias"))
+    db.execute(text("DELETE FROM resumen_terminos"))
+
+    analisis = db.execute(text("""
+        INSERT INTO resumen_analisis
+            (fecha, departamento, equipo, stress_level, emotion_label, total, sent_pos, sent_neu, sent_neg)
+        SELECT COALESCE(fecha, ''), COALESCE(departamento, ''), COALESCE(equipo, ''),
+               COALESCE(stress_level, ''), COALESCE(emotion_label, ''),
+               COUNT(*), SUM(COALESCE(sent_pos, 0)), SUM(COALESCE(sent_neu, 0)), SUM(COALESCE(sent_neg, 0))
+        FROM analisis_comentarios
+        GROUP BY 1, 2, 3, 4, 5
+    """)).rowcount
+
+    categorias = db.execute(text(f"""
+        INSERT INTO resumen_categorias (fecha, departamento, equipo, categoria, total)
+        SELECT COALESCE(a.fecha, ''), COALESCE(a.departamento, ''), COALESCE(a.equipo, ''),
+               {categoria}, COUNT(*)
+        FROM analisis_comentarios a, {desde}
+        WHERE {es_categoria}
+        GROUP BY 1, 2, 3, 4
+    """)).rowcount
+
+    # Los términos se tokenizan en Python: se recorren los comentarios con un cursor de servidor
+    terminos: Counter = Counter()
+    filas = db.execute(
+        select(
+            AnalisisComentario.fecha, AnalisisComentario.departamento,
+            AnalisisComentario.equipo, AnalisisComentario.comentario
+        ).execution_options(stream_results=True, yield_per=RESUMEN_LOTE)
+    )
+    for fecha, departamento, equipo, comentario in filas:
+        _contarTerminos(terminos, fecha, departamento, equipo, comentario)
+    _upsertTerminos(db, terminos)
+
+    db.commit()
+    logger.info(
+        f"Resumen reconstruido: {analisis} grupos, {categorias} grupos de categorías, "
+        f"{len(terminos)} grupos de términos"
+    )
+    return {"resumen_analisis": analisis, "resumen_categorias": categorias, "resumen_terminos": len(terminos)}
+
+
+def asegurarResumen(db: Session) -> bool:
+    """Puebla el resumen si alguna tabla está vacía y ya hay comentarios (bases anteriores a los rollups)."""
+    if (
+        db.query(ResumenAnalisis.fecha).first() is not None
+        and db.query(ResumenTermino.termino).first() is not None
+    ):
+        return False
+    if db.query(AnalisisComentario.id).first() is None:
+        return False
+    reconstruirResumen(db)
+    return True
+
+
+if __name__ == "__main__":
+    from backend.config.database import Base, SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        print(reconstruirResumen(db))
+    finally:
+        db.close()
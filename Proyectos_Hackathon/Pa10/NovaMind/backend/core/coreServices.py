@@ -1,43 +1,69 @@
 # core/coreServices.py
 from typing import List, Dict, Any
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from backend.core.coreModels import AnalisisComentario  # ✔ IMPORT CORRECTO
+from backend.core.coreResumen import acumularResumen
 import logging
 
 logger = logging.getLogger(__name__)
 
-def guardarAnalisis(db: Session, payload: Dict[str, Any]) -> AnalisisComentario:
+def filaAnalisis(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Columnas de AnalisisComentario a partir del resultado de NLPAnalyzer."""
     stress = payload.get("stress", {})
     sent = stress.get("sentiment_dist", {})
-    cats = payload.get("categories", [])
+    meta = payload.get("meta", {})
 
-    row = AnalisisComentario(
-        comentario     = payload.get("meta", {}).get("comentario_original", "") or payload.get("meta", {}).get("comentario", ""),
+    return dict(
+        comentario     = meta.get("comentario_original", "") or meta.get("comentario", ""),
         emotion_label  = payload.get("emotion", {}).get("label", ""),
         emotion_score  = payload.get("emotion", {}).get("score", 0.0),
         stress_level   = stress.get("level", "desconocido"),
         sent_pos       = float(sent.get("positive", 0.0) or 0.0),
         sent_neu       = float(sent.get("neutral", 0.0) or 0.0),
         sent_neg       = float(sent.get("negative", 0.0) or 0.0),
-        categories     = cats,
+        categories     = payload.get("categories", []),
         summary        = payload.get("summary", ""),
         suggestion     = payload.get("suggestion", ""),
-        departamento   = payload.get("meta", {}).get("departamento", ""),
-        equipo         = payload.get("meta", {}).get("equipo", ""),
-        fecha          = payload.get("meta", {}).get("fecha", "")
+        departamento   = meta.get("departamento", ""),
+        equipo         = meta.get("equipo", ""),
+        fecha          = meta.get("fecha", "")
     )
+
+def guardarAnalisis(db: Session, payload: Dict[str, Any]) -> AnalisisComentario:
+    fila = filaAnalisis(payload)
+    row = AnalisisComentario(**fila)
     db.add(row)
+    acumularResumen(db, [fila])
     db.commit()
     db.refresh(row)
     return row
 
 def guardarAnalisisLote(db: Session, resultados: List[Dict[str, Any]]) -> int:
+    """
+    Guarda un lote de análisis con un único INSERT multi-fila y un commit.
+
+    Si el lote falla (p.ej. un registro inválido), se reintenta fila por fila
+    para guardar las válidas y registrar las que fallan.
+    """
+    if not resultados:
+        return 0
+
+    try:
+        filas = [filaAnalisis(r) for r in resultados]
+        db.execute(insert(AnalisisComentario), filas)
+        acumularResumen(db, filas)
+        db.commit()
+        return len(resultados)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Error en inserción por lote ({len(resultados)} registros), reintentando uno a uno: {e}")
+
     count = 0
     for i, r in enumerate(resultados):
         try:
             guardarAnalisis(db, r)
             count += 1
-            logger.info(f"Registro {i+1} guardado exitosamente")
         except Exception as e:
             logger.error(f"Error guardando registro {i+1}: {e}")
             logger.error(f"Datos del registro: {r}")
@@ -0,0 +1,186 @@
+# ia/cacheAnalisis.py
+"""
+Caché de resultados de NLPAnalyzer por contenido.
+
+La clave es el hash del texto ya normalizado (limpiarTextoBasico) junto con una
+huella de IAConfig (modelos, categorías, umbrales). Dos niveles:
+- LRU en memoria, por proceso
+- Tabla cache_analisis en la base de datos, compartida y persistente
+
+Cambiar cualquier campo de IAConfig cambia la huella: las entradas anteriores
+dejan de coincidir y se purgan de la tabla en el primer acceso.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from backend.ia.configIA import IAConfig
+
+logger = logging.getLogger("NLPAnalyzer")
+
+CACHE_MAX_ENTRADAS = 5000
+CACHE_LOTE_DB = 500     # claves por consulta IN (...)
+
+
+# Campos de IAConfig que no cambian el resultado (rutas locales, arranque)
+CAMPOS_SIN_EFECTO = ("onnx_dir", "warmup_on_startup")
+
+
+def huellaConfig(cfg: IAConfig) -> str:
+    """Hash corto de todo lo que influye en el resultado del análisis (incluido el backend)."""
+    campos = {k: v for k, v in asdict(cfg).items() if k not in CAMPOS_SIN_EFECTO}
+    datos = json.dumps(campos, sort_keys=True, default=sorted, ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()[:16]
+
+
+class AnalysisCache:
+    def __init__(
+        self,
+        cfg: IAConfig,
+        session_factory: Optional[Callable[[], Any]] = None,
+        max_entradas: int = CACHE_MAX_ENTRADAS
+    ):
+        self.config_hash = huellaConfig(cfg)
+        self.session_factory = session_factory
+        self.max_entradas = max_entradas
+        self._memoria: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._purgado = False
+        self.hits_memoria = 0
+        self.hits_db = 0
+        self.misses = 0
+
+    def clave(self, texto_limpio: str) -> str:
+        return hashlib.sha256(f"{self.config_hash}\n{texto_limpio}".encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------
+    # LECTURA
+    # --------------------------------------------------
+    def get_many(self, textos: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultados cacheados (copias) para los textos normalizados que los tengan."""
+        claves = {self.clave(t): t for t in set(textos)}
+        encontrados: Dict[str, Dict[str, Any]] = {}
+
+        with self._lock:
+            for clave, texto in claves.items():
+                if clave in self._memoria:
+                    self._memoria.move_to_end(clave)
+                    encontrados[texto] = self._memoria[clave]
+            self.hits_memoria += len(encontrados)
+
+        faltantes = [c for c, t in claves.items() if t not in encontrados]
+        if faltantes:
+            desde_db = self._leerDB(faltantes)
+            self._recordar(desde_db)
+            for clave, resultado in desde_db.items():
+                encontrados[claves[clave]] = resultado
+            with self._lock:
+                self.hits_db += len(desde_db)
+                self.misses += len(faltantes) - len(desde_db)
+
+        return {t: copy.deepcopy(r) for t, r in encontrados.items()}
+
+    # --------------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------------
+    def put_many(self, resultados: Dict[str, Dict[str, Any]]):
+        """Guarda resultados (sin meta) por texto normalizado en ambos niveles."""
+        if not resultados:
+            return
+        por_clave = {self.clave(t): copy.deepcopy(r) for t, r in resultados.items()}
+        self._recordar(por_clave)
+        self._escribirDB(por_clave)
+
+    def clear(self):
+        with self._lock:
+            self._memoria.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "config_hash": self.config_hash,
+                "entradas_memoria": len(self._memoria),
+                "hits_memoria": self.hits_memoria,
+                "hits_db": self.hits_db,
+                "misses": self.misses,
+            }
+
+    def _recordar(self, por_clave: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            for clave, resultado in por_clave.items():
+                self._memoria[clave] = resultado
+                self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_entradas:
+                self._memoria.popitem(last=False)
+
+    # --------------------------------------------------
+    # NIVEL BASE DE DATOS (errores: se registran y el análisis sigue sin caché)
+    # --------------------------------------------------
+    def _leerDB(self, claves: List[str]) -> Dict[str, Dict[str, Any]]:
+        if self.session_factory is None:
+            return {}
+        from backend.core.coreModels import CacheAnalisis
+
+        db = self.session_factory()
+        try:
+            self._purgarConfigAnterior(db)
+            encontrados = {}
+            for i in range(0, len(claves), CACHE_LOTE_DB):
+                filas = (
+                    db.query(CacheAnalisis.clave, CacheAnalisis.resultado)
+                    .filter(CacheAnalisis.clave.in_(claves[i:i + CACHE_LOTE_DB]))
+                    .all()
+                )
+                encontrados.update({clave: resultado for clave, resultado in filas})
+            return encontrados
+        except Exception as e:
+            logger.warning(f"Caché de análisis (lectura) no disponible: {e}")
+            return {}
+        finally:
+            db.close()
+
+    def _escribirDB(self, por_clave: Dict[str, Dict[str, Any]]):
+        if self.session_factory is None:
+            return
+        from sqlalchemy import insert
+        from backend.core.coreModels import CacheAnalisis
+
+        db = self.session_factory()
+        try:
+            # Otro proceso pudo guardar la misma clave: ignorar duplicados
+            prefijo = "OR IGNORE" if db.get_bind().dialect.name == "sqlite" else "IGNORE"
+            db.execute(
+                insert(CacheAnalisis).prefix_with(prefijo),
+                [
+                    {"clave": clave, "config_hash": self.config_hash, "resultado": resultado}
+                    for clave, resultado in por_clave.items()
+                ]
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Caché de análisis (escritura) no disponible: {e}")
+        finally:
+            db.close()
+
+    def _purgarConfigAnterior(self, db):
+        if self._purgado:
+            return
+        from backend.core.coreModels import CacheAnalisis
+
+        borradas = (
+            db.query(CacheAnalisis)
+            .filter(CacheAnalisis.config_hash != self.config_hash)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        self._purgado = True
+        if borradas:
+            logger.info(f"Caché de análisis: {borradas} entradas de una configuración anterior eliminadas")
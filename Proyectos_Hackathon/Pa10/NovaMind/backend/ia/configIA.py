@@ -1,5 +1,7 @@
 # ia/configIA.py
+import os
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import List, Dict
 
 CATEGORIAS_BASE = [
@@ -9,6 +11,9 @@ CATEGORIAS_BASE = [
     "recursos insuficientes", "formación/capacitación", "satisfacción general", "motivación"
 ]
 
+# Backends de inferencia en CPU (ver ModelRegistry)
+BACKENDS = ("pytorch", "int8", "onnx")
+
 STRESS_FROM_SENTIMENT = {"negative": "alto", "neutral": "medio", "positive": "bajo"}
 STRESS_KEYWORDS = {
     "alto": {"agotado","estresado","quemado","burnout","ansioso","ansiedad","colapsado"},
@@ -30,3 +35,18 @@ class IAConfig:
     stress_keywords: Dict[str,set] = field(default_factory=lambda: STRESS_KEYWORDS)
     max_len_summary: int = 800
     max_len_models: int = 1000
+
+    # Inferencia por lotes (analyze_batch)
+    batch_size: int = 16              # textos por forward en sentiment/emotion/summarizer
+    zeroshot_batch_size: int = 64     # pares (texto, hipótesis) por forward en zero-shot
+    hypothesis_template: str = "This example is {}."
+    summary_min_chars: int = 140      # solo se resumen textos más largos
+
+    # Backend de inferencia: "pytorch" (fp32), "int8" (cuantización dinámica) u "onnx"
+    backend: str = field(default_factory=lambda: os.getenv("NLP_BACKEND", "pytorch"))
+    onnx_dir: str = str(Path(__file__).parent / "modelos_onnx")
+    warmup_on_startup: bool = True
+
+    def __post_init__(self):
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend de IA no soportado: {self.backend} (opciones: {', '.join(BACKENDS)})")
@@ -1,9 +1,15 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple
+import copy
 import logging
+import threading
+import time
 
+import numpy as np
+import torch
 from transformers import pipeline, Pipeline
 from backend.ia.configIA import IAConfig
+from backend.ia.cacheAnalisis import AnalysisCache
 from backend.ia.preProcesamiento import limpiarTextoBasico
 
 # ======================================================
@@ -55,138 +61,233 @@ def trim(text: str, max_len: int) -> str:
 # REGISTRO DE MODELOS
 # ======================================================
 class ModelRegistry:
+    """
+    Carga perezosa (y thread-safe) de los cuatro pipelines.
+
+    IAConfig.backend elige cómo se ejecutan en CPU:
+    - "pytorch": fp32, como los publica HuggingFace
+    - "int8": PyTorch con cuantización dinámica int8 de las capas Linear
+    - "onnx": exportados a ONNX Runtime con optimum (se guardan en onnx_dir
+      la primera vez); si optimum no está instalado se usa "pytorch"
+    """
+
     def __init__(self, cfg: IAConfig):
         self.cfg = cfg
-        self._sentiment = None
-        self._emotion = None
-        self._zeroshot = None
-        self._summary = None
+        self._pipelines: Dict[str, Pipeline] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, key: str, task: str, model_name: str, descripcion: str) -> Pipeline:
+        pipe = self._pipelines.get(key)
+        if pipe is None:
+            with self._lock:
+                pipe = self._pipelines.get(key)
+                if pipe is None:
+                    logger.info(f"Cargando modelo de {descripcion} ({self.cfg.backend})")
+                    pipe = self._build(task, model_name)
+                    self._pipelines[key] = pipe
+        return pipe
+
+    def _build(self, task: str, model_name: str) -> Pipeline:
+        if self.cfg.backend == "onnx":
+            try:
+                return self._build_onnx(task, model_name)
+            except ImportError:
+                logger.warning("optimum[onnxruntime] no está instalado: usando PyTorch fp32")
+
+        pipe = pipeline(task, model=model_name, device=-1, truncation=True)
+        if self.cfg.backend == "int8":
+            pipe.model = torch.quantization.quantize_dynamic(
+                pipe.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+        return pipe
+
+    def _build_onnx(self, task: str, model_name: str) -> Pipeline:
+        from pathlib import Path
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        model_cls = ORTModelForSeq2SeqLM if task == "summarization" else ORTModelForSequenceClassification
+        local_dir = Path(self.cfg.onnx_dir) / model_name.replace("/", "__")
+
+        if local_dir.exists():
+            model = model_cls.from_pretrained(local_dir)
+            tokenizer = AutoTokenizer.from_pretrained(local_dir)
+        else:
+            logger.info(f"Exportando {model_name} a ONNX en {local_dir}")
+            model = model_cls.from_pretrained(model_name, export=True)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model.save_pretrained(local_dir)
+            tokenizer.save_pretrained(local_dir)
+
+        return pipeline(task, model=model, tokenizer=tokenizer, truncation=True)
 
     def sentiment(self):
-        if self._sentiment is None:
-            logger.info("Cargando modelo de Sentiment Analysis")
-            self._sentiment = pipeline(
-                "sentiment-analysis",
-                model=self.cfg.sentiment_model,
-                device=-1,
-                truncation=True
-            )
-        return self._sentiment
+        return self._get("sentiment", "sentiment-analysis", self.cfg.sentiment_model, "Sentiment Analysis")
 
     def emotion(self):
-        if self._emotion is None:
-            logger.info("Cargando modelo de Emotion Detection")
-            self._emotion = pipeline(
-                "text-classification",
-                model=self.cfg.emotion_model,
-                device=-1,
-                truncation=True
-            )
-        return self._emotion
+        return self._get("emotion", "text-classification", self.cfg.emotion_model, "Emotion Detection")
 
     def zeroshot(self):
-        if self._zeroshot is None:
-            logger.info("Cargando modelo Zero-Shot")
-            self._zeroshot = pipeline(
-                "zero-shot-classification",
-                model=self.cfg.zeroshot_model,
-                device=-1,
-                truncation=True
-            )
-        return self._zeroshot
+        return self._get("zeroshot", "zero-shot-classification", self.cfg.zeroshot_model, "Zero-Shot")
 
     def summarizer(self):
-        if self._summary is None:
-            logger.info("Cargando modelo de Summarization")
-            self._summary = pipeline(
-                "summarization",
-                model=self.cfg.summarizer_model,
-                device=-1,
-                truncation=True
-            )
-        return self._summary
+        return self._get("summary", "summarization", self.cfg.summarizer_model, "Summarization")
 
 # ======================================================
 # ANALIZADOR PRINCIPAL
 # ======================================================
 class NLPAnalyzer:
-    def __init__(self, cfg: Optional[IAConfig] = None):
+    def __init__(self, cfg: Optional[IAConfig] = None, cache: Optional[AnalysisCache] = None):
         self.cfg = cfg or IAConfig()
         self.models = ModelRegistry(self.cfg)
+        self.cache = cache
+        self._hypothesis_ids: Optional[List[List[int]]] = None
 
     # --------------------------------------------------
     # EMOCIÓN
     # --------------------------------------------------
-    def _detect_emotion(self, text: str) -> Tuple[str, float]:
-        if not meaningful(text):
-            return DEFAULT_EMOTION, 0.0
-
+    # Cada detector devuelve (resultados, índices que usaron el valor por defecto
+    # porque el modelo falló); _analyze_texts no cachea esos textos
+    def _detect_emotions(self, texts: List[str]) -> Tuple[List[Tuple[str, float]], Set[int]]:
         try:
-            result = self.models.emotion()(trim(text, self.cfg.max_len_models))
-            label = result[0]["label"]
-            score = float(result[0]["score"])
-            return map_emotion(label), score
-        except Exception:
-            return DEFAULT_EMOTION, 0.0
+            results = self.models.emotion()(
+                [trim(t, self.cfg.max_len_models) for t in texts],
+                batch_size=self.cfg.batch_size
+            )
+            return [(map_emotion(r["label"]), float(r["score"])) for r in results], set()
+        except Exception as e:
+            logger.warning(f"Error en emotion detection: {e}")
+            return [(DEFAULT_EMOTION, 0.0) for _ in texts], set(range(len(texts)))
 
     # --------------------------------------------------
     # ESTRÉS
     # --------------------------------------------------
-    def _detect_stress(self, text: str):
-        try:
-            result = self.models.sentiment()(trim(text, self.cfg.max_len_models))[0]
-            label = result["label"].upper()
-            score = float(result["score"])
+    def _stress_from_sentiment(self, result: Dict[str, Any]):
+        label = result["label"].upper()
+        score = float(result["score"])
 
-            sentiment = "neutral"
-            if "NEG" in label:
-                sentiment = "negative"
-            elif "POS" in label:
-                sentiment = "positive"
+        sentiment = "neutral"
+        if "NEG" in label:
+            sentiment = "negative"
+        elif "POS" in label:
+            sentiment = "positive"
 
-            stress_level = self.cfg.stress_map.get(sentiment, "medio")
-            dist = {"positive": 0, "neutral": 0, "negative": 0}
-            dist[sentiment] = score
+        stress_level = self.cfg.stress_map.get(sentiment, "medio")
+        dist = {"positive": 0, "neutral": 0, "negative": 0}
+        dist[sentiment] = score
 
-            return stress_level, dist
-        except Exception:
-            return "medio", {"positive": 0, "neutral": 1, "negative": 0}
+        return stress_level, dist
+
+    def _detect_stress(self, texts: List[str]):
+        try:
+            results = self.models.sentiment()(
+                [trim(t, self.cfg.max_len_models) for t in texts],
+                batch_size=self.cfg.batch_size
+            )
+            return [self._stress_from_sentiment(r) for r in results], set()
+        except Exception as e:
+            logger.warning(f"Error en sentiment analysis: {e}")
+            return (
+                [("medio", {"positive": 0, "neutral": 1, "negative": 0}) for _ in texts],
+                set(range(len(texts)))
+            )
 
     # --------------------------------------------------
     # CATEGORÍAS
     # --------------------------------------------------
-    def _detect_categories(self, text: str) -> List[str]:
+    def _hypotheses(self, tokenizer) -> List[List[int]]:
+        # Las hipótesis ("This example is {categoría}.") son las mismas para todos
+        # los textos: se tokenizan una sola vez y se reutilizan en cada lote
+        if self._hypothesis_ids is None:
+            hypotheses = [self.cfg.hypothesis_template.format(c) for c in self.cfg.categorias]
+            self._hypothesis_ids = tokenizer(hypotheses, add_special_tokens=False)["input_ids"]
+        return self._hypothesis_ids
+
+    def _detect_categories(self, texts: List[str]) -> Tuple[List[List[str]], Set[int]]:
+        """
+        Zero-shot multi-etiqueta en lotes de pares (texto, hipótesis).
+
+        Equivale a pipeline(texto, categorias, multi_label=True), pero cada texto
+        se tokeniza una vez, las hipótesis vienen de caché y los pares de todos
+        los textos se agrupan (ordenados por longitud) en forwards de
+        zeroshot_batch_size.
+        """
         try:
-            result = self.models.zeroshot()(
-                trim(text, self.cfg.max_len_models),
-                self.cfg.categorias,
-                multi_label=True
-            )
-
-            return [
-                label for label, score in zip(result["labels"], result["scores"])
-                if score >= self.cfg.min_score_categoria
-            ]
-        except Exception:
-            return []
+            zeroshot = self.models.zeroshot()
+            tokenizer, model = zeroshot.tokenizer, zeroshot.model
+            hypotheses = self._hypotheses(tokenizer)
+            premises = tokenizer(
+                [trim(t, self.cfg.max_len_models) for t in texts],
+                add_special_tokens=False
+            )["input_ids"]
+
+            # Truncar solo el texto (como truncation="only_first" del pipeline)
+            max_len = min(tokenizer.model_max_length, 512)
+            n_special = tokenizer.num_special_tokens_to_add(pair=True)
+            use_token_types = "token_type_ids" in tokenizer.model_input_names
+
+            pairs = []
+            for i, premise in enumerate(premises):
+                for j, hypothesis in enumerate(hypotheses):
+                    cut = premise[:max(0, max_len - n_special - len(hypothesis))]
+                    features = {"input_ids": tokenizer.build_inputs_with_special_tokens(cut, hypothesis)}
+                    if use_token_types:
+                        features["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(cut, hypothesis)
+                    pairs.append((i, j, features))
+            pairs.sort(key=lambda pair: len(pair[2]["input_ids"]))
+
+            # Multi-etiqueta: softmax entre contradicción y entailment de cada par
+            entailment_id = zeroshot.entailment_id
+            contradiction_id = -1 if entailment_id == 0 else 0
+            scores = np.zeros((len(texts), len(hypotheses)))
+
+            with torch.inference_mode():
+                for start in range(0, len(pairs), self.cfg.zeroshot_batch_size):
+                    chunk = pairs[start:start + self.cfg.zeroshot_batch_size]
+                    batch = tokenizer.pad([features for _, _, features in chunk], return_tensors="pt")
+                    logits = model(**{k: v.to(model.device) for k, v in batch.items()}).logits
+                    probs = logits[:, [contradiction_id, entailment_id]].softmax(-1)[:, 1].cpu().numpy()
+                    for (i, j, _), prob in zip(chunk, probs):
+                        scores[i, j] = prob
+
+            categories = []
+            for row in scores:
+                order = np.argsort(-row, kind="stable")
+                categories.append([
+                    self.cfg.categorias[j] for j in order
+                    if row[j] >= self.cfg.min_score_categoria
+                ])
+            return categories, set()
+        except Exception as e:
+            logger.warning(f"Error en zero-shot classification: {e}")
+            return [[] for _ in texts], set(range(len(texts)))
 
     # --------------------------------------------------
     # RESUMEN
     # --------------------------------------------------
-    def _summarize(self, text: str) -> str:
-        if len(text) <= 140:
-            return text
+    def _summarize(self, texts: List[str]) -> Tuple[List[str], Set[int]]:
+        summaries = list(texts)
+        long_idx = [i for i, t in enumerate(texts) if len(t) > self.cfg.summary_min_chars]
+        if not long_idx:
+            return summaries, set()
 
         try:
-            result = self.models.summarizer()(
-                trim(text, self.cfg.max_len_summary),
+            results = self.models.summarizer()(
+                [trim(texts[i], self.cfg.max_len_summary) for i in long_idx],
+                batch_size=self.cfg.batch_size,
                 max_length=80,
                 min_length=30,
                 do_sample=False
             )
-            return result[0]["summary_text"]
-        except Exception:
-            return text[:160]
+            for i, result in zip(long_idx, results):
+                summaries[i] = result["summary_text"]
+        except Exception as e:
+            logger.warning(f"Error en summarization: {e}")
+            for i in long_idx:
+                summaries[i] = texts[i][:160]
+            return summaries, set(long_idx)
+
+        return summaries, set()
 
     # --------------------------------------------------
     # SUGERENCIAS INTELIGENTES (CORE)
@@ -268,33 +369,137 @@ class NLPAnalyzer:
 
         return "Mantener observación general."
 
+    # --------------------------------------------------
+    # PRECARGA
+    # --------------------------------------------------
+    def warmup(self) -> float:
+        """
+        Carga los cuatro modelos y ejecuta una inferencia de cada uno (sin caché),
+        para que la primera petición no pague la carga ni la inicialización.
+
+        Returns:
+            Segundos empleados
+        """
+        start = time.perf_counter()
+        try:
+            texto = (
+                "Me siento conforme con mi equipo, aunque la carga de trabajo de las "
+                "últimas semanas ha sido alta y necesitamos mejores herramientas para "
+                "coordinar las entregas con otras áreas."
+            )
+            self._analyze_texts([texto])
+            elapsed = time.perf_counter() - start
+            logger.info(f"Modelos precargados ({self.cfg.backend}) en {elapsed:.1f}s")
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            logger.warning(f"Error precargando modelos: {e}")
+        return elapsed
+
     # --------------------------------------------------
     # API PRINCIPAL
     # --------------------------------------------------
     def analyze_comment(self, text: str, meta: dict | None = None) -> Dict[str, Any]:
-        meta = meta or {}
-        clean_text = limpiarTextoBasico(text)
-
-        if not meaningful(clean_text):
-            return {
-                "emotion": {"label": DEFAULT_EMOTION, "score": 0.0},
-                "stress": {"level": "bajo", "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
-                "categories": [],
-                "summary": "",
-                "suggestion": "Comentario insuficiente para análisis.",
-                "meta": meta
+        return self.analyze_batch([text], [meta or {}])[0]
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        metas: Optional[List[dict]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Analiza varios comentarios ejecutando cada modelo una vez sobre todo el lote.
+
+        Los textos con resultado en caché (o repetidos dentro del lote) no pasan
+        por los modelos; el resto se ordena por longitud para que cada lote tenga
+        poco padding. Los resultados se devuelven en el orden original.
+        """
+        metas = metas if metas is not None else [{} for _ in texts]
+        if len(metas) != len(texts):
+            raise ValueError("metas debe tener un elemento por texto")
+
+        clean_texts = [limpiarTextoBasico(t) for t in texts]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+
+        for i, clean_text in enumerate(clean_texts):
+            if not meaningful(clean_text):
+                results[i] = {
+                    "emotion": {"label": DEFAULT_EMOTION, "score": 0.0},
+                    "stress": {"level": "bajo", "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
+                    "categories": [],
+                    "summary": "",
+                    "suggestion": "Comentario insuficiente para análisis.",
+                    "meta": metas[i]
+                }
+
+        valid = [i for i, r in enumerate(results) if r is None]
+        if not valid:
+            return results
+
+        # Textos repetidos (en el lote o ya vistos) se analizan una sola vez
+        cached = self.cache.get_many(clean_texts[i] for i in valid) if self.cache else {}
+        pending = sorted(
+            {clean_texts[i] for i in valid if clean_texts[i] not in cached},
+            key=len
+        )
+
+        if pending:
+            start = time.perf_counter()
+            analyzed, fallbacks = self._analyze_texts(pending)
+            if self.cache:
+                # Solo se cachean los textos en los que todos los modelos respondieron
+                self.cache.put_many({t: r for t, r in analyzed.items() if t not in fallbacks})
+            cached.update(analyzed)
+
+            if len(pending) > 1:
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Lote analizado: {len(pending)} comentarios en {elapsed:.1f}s "
+                    f"({len(pending) / elapsed:.1f}/s, {len(valid) - len(pending)} desde caché)"
+                )
+
+        for i in valid:
+            results[i] = {**copy.deepcopy(cached[clean_texts[i]]), "meta": metas[i]}
+
+        return results
+
+    def _analyze_texts(self, texts: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Ejecuta todos los modelos sobre textos únicos ya limpios (ordenados por longitud).
+
+        Returns:
+            (resultados por texto, textos en los que algún modelo falló y se usó su valor por defecto)
+        """
+        emotions, emotion_fallbacks = self._detect_emotions(texts)
+        stresses, stress_fallbacks = self._detect_stress(texts)
+        categories, category_fallbacks = self._detect_categories(texts)
+        summaries, summary_fallbacks = self._summarize(texts)
+        fallbacks = emotion_fallbacks | stress_fallbacks | category_fallbacks | summary_fallbacks
+
+        analyzed = {}
+        for k, text in enumerate(texts):
+            emotion, emo_score = emotions[k]
+            stress, dist = stresses[k]
+            analyzed[text] = {
+                "emotion": {"label": emotion, "score": emo_score},
+                "stress": {"level": stress, "sentiment_dist": dist},
+                "categories": [{"label": c} for c in categories[k]],
+                "summary": summaries[k],
+                "suggestion": self._generate_suggestion(stress, emotion, categories[k], text),
             }
+        return analyzed, {texts[k] for k in fallbacks}
 
-        emotion, emo_score = self._detect_emotion(clean_text)
-        stress, dist = self._detect_stress(clean_text)
-        categories = self._detect_categories(clean_text)
-        summary = self._summarize(clean_text)
-
-        return {
-            "emotion": {"label": emotion, "score": emo_score},
-            "stress": {"level": stress, "sentiment_dist": dist},
-            "categories": [{"label": c} for c in categories],
-            "summary": summary,
-            "suggestion": self._generate_suggestion(stress, emotion, categories, clean_text),
-            "meta": meta
-        }
+# ======================================================
+# INSTANCIA COMPARTIDA
+# ======================================================
+_shared_analyzer: Optional[NLPAnalyzer] = None
+_shared_lock = threading.Lock()
+
+def get_shared_analyzer() -> NLPAnalyzer:
+    """Un único NLPAnalyzer (y un único juego de modelos en memoria) para todos los endpoints."""
+    global _shared_analyzer
+    with _shared_lock:
+        if _shared_analyzer is None:
+            from backend.config.database import SessionLocal
+            cfg = IAConfig()
+            _shared_analyzer = NLPAnalyzer(cfg, cache=AnalysisCache(cfg, SessionLocal))
+        return _shared_analyzer
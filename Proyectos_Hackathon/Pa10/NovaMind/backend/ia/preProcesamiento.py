@@ -1,5 +1,7 @@
 # ia/preProcesamiento.py
 import re
+from collections import Counter
+
 
 def limpiarTextoBasico(texto: str) -> str:
     """
@@ -11,3 +13,40 @@ def limpiarTextoBasico(texto: str) -> str:
     t = texto.strip()
     t = re.sub(r"\s+", " ", t)
     return t
+
+
+# Palabras que no aportan al índice de términos (nube de palabras)
+STOPWORDS_ES = {
+    'de', 'la', 'el', 'en', 'y', 'a', 'los', 'del', 'se', 'las', 'por', 'un', 'para',
+    'con', 'no', 'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya',
+    'o', 'este', 'sí', 'porque', 'esta', 'entre', 'cuando', 'muy', 'sin', 'sobre',
+    'también', 'me', 'hasta', 'hay', 'donde', 'quien', 'desde', 'todo', 'nos', 'durante',
+    'todos', 'uno', 'les', 'ni', 'contra', 'otros', 'ese', 'eso', 'ante', 'ellos',
+    'e', 'esto', 'mí', 'antes', 'algunos', 'qué', 'unos', 'yo', 'otro', 'otras',
+    'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 'quienes', 'nada', 'muchos',
+    'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 'nosotros', 'mi',
+    'mis', 'tú', 'te', 'ti', 'tu', 'tus', 'ellas', 'nosotras', 'vosotros', 'vosotras',
+    'os', 'mío', 'mía', 'míos', 'mías', 'tuyo', 'tuya', 'tuyos', 'tuyas', 'suyo',
+    'suya', 'suyos', 'suyas', 'nuestro', 'nuestra', 'nuestros', 'nuestras', 'vuestro',
+    'vuestra', 'vuestros', 'vuestras', 'esos', 'esas',
+
+    # Conjugaciones de "estar"
+    'estoy', 'estás', 'está', 'estamos', 'estáis', 'están',
+    'esté', 'estés', 'estemos', 'estéis', 'estén',
+    'estaré', 'estarás', 'estará', 'estaremos', 'estaréis', 'estarán',
+    'estaría', 'estarías', 'estaríamos', 'estaríais', 'estarían',
+    'estaba', 'estabas', 'estábamos', 'estabais', 'estaban',
+    'estuve', 'estuviste', 'estuvo', 'estuvimos', 'estuvisteis', 'estuvieron'
+}
+
+PATRON_TERMINO = re.compile(r"[^\W\d_]{3,}")
+MAX_LEN_TERMINO = 64
+
+def extraerTerminos(texto: str) -> Counter:
+    """Frecuencia de términos (minúsculas, 3+ letras, sin stopwords) de un comentario."""
+    if not isinstance(texto, str):
+        return Counter()
+    return Counter(
+        t for t in PATRON_TERMINO.findall(texto.lower())
+        if t not in STOPWORDS_ES and len(t) <= MAX_LEN_TERMINO
+    )
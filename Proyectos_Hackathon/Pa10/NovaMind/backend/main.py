@@ -1,8 +1,10 @@
+import threading
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.config.settings import settings
-from backend.config.database import Base, engine
+from backend.config.database import Base, engine, SessionLocal
 from backend.core.coreModels import AnalisisComentario
 
 from backend.api.analizarComentario import router as analizarComentarioRouter
@@ -10,9 +12,13 @@ from backend.api.analizarLote import router as analizarLoteRouter
 from backend.api.manejarHistoricos import router as historicosRouter
 from backend.api.alertasAutomaticas import router as alertasRouter
 from backend.api.estadisticas import router as estadisticasRouter
+from backend.api.terminos import router as terminosRouter
 from backend.api.auth import router as authRouter
 from backend.api.agente import router as agenteRouter
 from backend.api.agente_estadisticas_simple import router_stats as statsRouter
+from backend.core.coreLotes import obtenerGestorLotes
+from backend.core.coreResumen import asegurarResumen
+from backend.ia.iaCore import get_shared_analyzer
 
 # Crear tablas al iniciar
 Base.metadata.create_all(bind=engine)
@@ -33,9 +39,31 @@ app.include_router(analizarLoteRouter)
 app.include_router(historicosRouter)
 app.include_router(alertasRouter)
 app.include_router(estadisticasRouter)
+app.include_router(terminosRouter)
 app.include_router(agenteRouter)
 app.include_router(statsRouter)
 
+@app.on_event("startup")
+def poblarRollups():
+    db = SessionLocal()
+    try:
+        asegurarResumen(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def precargarModelos():
+    # Cargar los modelos en segundo plano: la API arranca de inmediato y las
+    # primeras peticiones esperan a que termine la carga en lugar de repetirla
+    analyzer = get_shared_analyzer()
+    if analyzer.cfg.warmup_on_startup:
+        threading.Thread(target=analyzer.warmup, name="warmup-modelos", daemon=True).start()
+
+@app.on_event("shutdown")
+def cerrarLotes():
+    # Cancelar trabajos de lote en cola (los que están en curso terminan su bloque)
+    obtenerGestorLotes().cerrar()
+
 @app.get("/")
 def root():
     return {"name": settings.app_name, "status": "running"}
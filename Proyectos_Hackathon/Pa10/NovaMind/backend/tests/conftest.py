@@ -0,0 +1,75 @@
+"""
+Base SQLite en memoria para los tests (los modelos y las consultas soportan ambos motores).
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.config.database import Base
+import backend.core.coreModels  # noqa: F401  (registra las tablas en Base.metadata)
+
+
+@pytest.fixture
+def fabrica_sesiones():
+    """sessionmaker sobre una base nueva; una sola conexión compartida entre hilos."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        future=True
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(fabrica_sesiones):
+    sesion = fabrica_sesiones()
+    yield sesion
+    sesion.close()
+
+
+def _resultado(i: int) -> dict:
+    """Resultado de NLPAnalyzer (con meta) variado y determinista para el comentario i."""
+    departamentos = ["TI", "Ventas", "RRHH", ""]
+    equipos = ["Soporte", "Backend", "", "Campo"]
+    emociones = ["enojo", "alegría", "neutral", "tristeza", "agotamiento"]
+    niveles = ["alto", "medio", "bajo"]
+    temas = ["reuniones", "salario", "Herramientas", "horarios", "jefe"]
+    # Pesos distintos por categoría: el top-5 no depende del desempate
+    categorias = (
+        [{"label": "sobrecarga laboral"}] * (i % 2 == 0)
+        + [{"label": "liderazgo"}] * (i % 3 == 0)
+        + [{"label": "comunicación"}] * (i % 5 == 0)
+        + [{"label": "reconocimiento"}] * (i % 7 == 0)
+        + [{}] * (i % 11 == 0)                               # sin etiqueta: cuenta como ""
+        + ["texto suelto", 3] * (i % 4 == 1)                 # no son dict: no cuentan
+    )
+    if i % 13 == 0:
+        categorias = {"label": "no es lista"}
+    return {
+        "emotion": {"label": emociones[i % 5], "score": 0.5},
+        "stress": {
+            "level": niveles[i % 3],
+            "sentiment_dist": {"positive": (i % 4) / 4, "neutral": 0.25, "negative": (i % 3) / 3},
+        },
+        "categories": categorias,
+        "summary": "",
+        "suggestion": "",
+        "meta": {
+            "comentario_original": (
+                f"La carga de trabajo del equipo {i} es alta: {temas[i % 5]} y {temas[i % 3]}, "
+                f"{'mucho estrés' if i % 4 == 0 else 'buen ambiente'}"
+            ),
+            "departamento": departamentos[i % 4],
+            "equipo": equipos[(i // 4) % 4],
+            "fecha": "" if i % 17 == 0 else f"2024-{1 + i % 3:02d}-{1 + i % 5:02d}",
+        },
+    }
+
+
+@pytest.fixture
+def resultados():
+    return [_resultado(i) for i in range(300)]
@@ -0,0 +1,134 @@
+"""
+Tests de GestorLotes: estados de un trabajo (en cola, procesando, completado, fallido,
+cancelado al cerrar) y conteos. El analizador se sustituye: no hace falta torch.
+"""
+import threading
+import time
+
+import pytest
+
+import backend.core.coreLotes as coreLotes
+from backend.core.coreModels import AnalisisComentario
+
+
+class AnalizadorFalso:
+    """analyze_batch determinista; puede bloquearse hasta que el test lo libere."""
+
+    def __init__(self, falla: bool = False):
+        self.falla = falla
+        self.liberar = threading.Event()
+        self.liberar.set()
+        self.bloques = []
+
+    def analyze_batch(self, textos, metas):
+        self.liberar.wait(timeout=5)
+        if self.falla:
+            raise RuntimeError("modelo no disponible")
+        self.bloques.append(list(textos))
+        return [
+            {
+                "emotion": {"label": "neutral", "score": 0.5},
+                "stress": {"level": "medio", "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
+                "categories": [],
+                "summary": texto,
+                "suggestion": "",
+                "meta": meta,
+            }
+            for texto, meta in zip(textos, metas)
+        ]
+
+
+@pytest.fixture
+def gestor(monkeypatch, fabrica_sesiones):
+    monkeypatch.setattr(coreLotes, "SessionLocal", fabrica_sesiones)
+    gestor = coreLotes.GestorLotes(max_workers=1, bloque=2)
+    yield gestor
+    gestor.cerrar()
+
+
+def _esperar(gestor):
+    gestor._executor.shutdown(wait=True)
+
+
+FILAS = [
+    {"comentario": "Falta comunicación", "departamento": "TI", "fecha": "2024-05-01"},
+    {"comentario": "   "},
+    {"comentario": "Buen ambiente", "equipo": float("nan")},
+    {"comentario": None},
+    {"comentario": "Mucha carga de trabajo", "departamento": "Ventas"},
+]
+
+
+def test_job_goes_from_queue_to_completed(gestor, monkeypatch, fabrica_sesiones):
+    analizador = AnalizadorFalso()
+    analizador.liberar.clear()
+    monkeypatch.setattr(coreLotes, "get_shared_analyzer", lambda: analizador)
+
+    # Un primer trabajo ocupa el único worker: el segundo queda en cola
+    primero = gestor.encolar(FILAS[:1])
+    trabajo = gestor.encolar(FILAS)
+    assert trabajo.estado == coreLotes.EN_COLA
+    assert (trabajo.total, trabajo.omitidos) == (3, 2)
+    assert trabajo.to_dict()["progreso"] == 0.0
+    assert [t.id for t in gestor.listar()] == [trabajo.id, primero.id]
+
+    analizador.liberar.set()
+    _esperar(gestor)
+
+    estado = gestor.obtener(trabajo.id).to_dict()
+    assert estado["estado"] == coreLotes.COMPLETADO
+    assert (estado["procesados"], estado["guardados"], estado["progreso"]) == (3, 3, 1.0)
+    assert estado["iniciado"] and estado["terminado"] and estado["error"] is None
+    assert analizador.bloques[1:] == [
+        ["Falta comunicación", "Buen ambiente"], ["Mucha carga de trabajo"]
+    ]
+
+    db = fabrica_sesiones()
+    try:
+        filas = db.query(AnalisisComentario.comentario, AnalisisComentario.equipo).all()
+    finally:
+        db.close()
+    assert len(filas) == 4
+    assert ("Buen ambiente", "") in filas
+
+
+def test_failed_job_records_error(gestor, monkeypatch):
+    monkeypatch.setattr(coreLotes, "get_shared_analyzer", lambda: AnalizadorFalso(falla=True))
+
+    trabajo = gestor.encolar(FILAS)
+    _esperar(gestor)
+
+    assert trabajo.estado == coreLotes.FALLIDO
+    assert trabajo.error == "modelo no disponible"
+    assert (trabajo.procesados, trabajo.guardados) == (0, 0)
+    assert not trabajo.activo and trabajo.terminado is not None
+
+
+def test_unknown_job_is_none(gestor):
+    assert gestor.obtener("no-existe") is None
+
+
+def test_close_cancels_queued_jobs(gestor, monkeypatch):
+    analizador = AnalizadorFalso()
+    analizador.liberar.clear()
+    monkeypatch.setattr(coreLotes, "get_shared_analyzer", lambda: analizador)
+
+    primero = gestor.encolar(FILAS[:1])
+    en_cola = [gestor.encolar(FILAS), gestor.encolar(FILAS[2:])]
+    for _ in range(500):   # el único worker ya tomó el primero
+        if primero.estado == coreLotes.PROCESANDO:
+            break
+        time.sleep(0.01)
+    gestor.cerrar()
+
+    for trabajo in en_cola:
+        assert trabajo.estado == coreLotes.FALLIDO
+        assert trabajo.error.startswith("Cancelado")
+        assert trabajo.terminado is not None and not trabajo.activo
+        assert trabajo.procesados == 0
+
+    # El trabajo que ya se estaba procesando termina normalmente
+    analizador.liberar.set()
+    _esperar(gestor)
+    assert primero.estado == coreLotes.COMPLETADO
+    assert analizador.bloques == [["Falta comunicación"]]
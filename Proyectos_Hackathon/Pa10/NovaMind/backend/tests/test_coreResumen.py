@@ -0,0 +1,114 @@
+"""
+Tests de los rollups: acumularResumen (en cada inserción) y reconstruirResumen
+(INSERT ... SELECT sobre analisis_comentarios) producen las mismas tablas resumen_*,
+y /alertas/patrones/ los lee ordenando por la fecha interpretada.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+
+from backend.api.alertasAutomaticas import detectarPatrones
+from backend.core.coreResumen import asegurarResumen, diaFecha, reconstruirResumen
+from backend.core.coreServices import guardarAnalisis, guardarAnalisisLote
+
+TABLAS = {
+    "resumen_analisis": "fecha, departamento, equipo, stress_level, emotion_label",
+    "resumen_categorias": "fecha, departamento, equipo, categoria",
+    "resumen_terminos": "periodo, departamento, equipo, termino",
+}
+
+
+def _tablas(db):
+    return {
+        tabla: db.execute(text(f"SELECT * FROM {tabla} ORDER BY {orden}")).all()
+        for tabla, orden in TABLAS.items()
+    }
+
+
+def _iguales(a, b):
+    for tabla in TABLAS:
+        assert len(a[tabla]) == len(b[tabla]), tabla
+        for fila_a, fila_b in zip(a[tabla], b[tabla]):
+            assert tuple(fila_a) == pytest.approx(tuple(fila_b)), tabla
+
+
+def test_incremental_rollups_match_rebuild(db, resultados):
+    # Lotes de distinto tamaño y una inserción individual: los grupos se repiten entre lotes
+    guardarAnalisisLote(db, resultados[:120])
+    guardarAnalisisLote(db, resultados[120:299])
+    extra = dict(resultados[299], categories=[{"label": None}, "x", {"label": "liderazgo"}])
+    guardarAnalisis(db, extra)
+
+    incremental = _tablas(db)
+    assert all(incremental.values())
+
+    reconstruirResumen(db)
+    _iguales(incremental, _tablas(db))
+
+    # Total de comentarios y de categorías contables (solo dict dentro de listas)
+    total = db.execute(text("SELECT SUM(total) FROM resumen_analisis")).scalar()
+    assert total == 300
+    categorias = sum(
+        sum(isinstance(c, dict) for c in r["categories"])
+        for r in resultados[:299] + [extra] if isinstance(r["categories"], list)
+    )
+    assert db.execute(text("SELECT SUM(total) FROM resumen_categorias")).scalar() == categorias
+
+
+def test_ensure_rollups_only_rebuilds_when_empty(db, resultados):
+    assert asegurarResumen(db) is False  # sin comentarios
+
+    guardarAnalisisLote(db, resultados[:50])
+    esperado = _tablas(db)
+    assert asegurarResumen(db) is False  # ya poblado
+
+    # Base anterior a los rollups: comentarios sin resumen
+    for tabla in TABLAS:
+        db.execute(text(f"DELETE FROM {tabla}"))
+    db.commit()
+    assert asegurarResumen(db) is True
+    _iguales(esperado, _tablas(db))
+
+
+def _comentario(fecha, stress):
+    return {
+        "emotion": {"label": "neutral", "score": 0.5},
+        "stress": {"level": stress, "sentiment_dist": {"positive": 0, "neutral": 1, "negative": 0}},
+        "categories": [],
+        "summary": "",
+        "suggestion": "",
+        "meta": {"comentario_original": "comentario", "departamento": "", "equipo": "", "fecha": fecha},
+    }
+
+
+def test_patterns_use_most_recent_parsed_dates(db):
+    # Como texto, "2024-01-..." va después de "15/06/2024": la ventana tomaría enero
+    lote = (
+        [_comentario(f"2024-01-{d:02d}", "bajo") for d in range(1, 29) for _ in range(3)]
+        + [_comentario("15/06/2024", "alto") for _ in range(12)]
+        + [_comentario("2024-06-14T09:30:00", "alto") for _ in range(6)]
+        + [_comentario("14/06/2024", "alto") for _ in range(2)]   # mismo día en otro formato
+        + [_comentario("sin fecha", "alto") for _ in range(30)]   # no reconocida: fuera de la ventana
+    )
+    guardarAnalisisLote(db, lote)
+
+    tipos = [p["tipo"] for p in detectarPatrones(db=db)["patrones_detectados"]]
+    assert "tendencia_creciente" in tipos
+
+    # Con los días recientes de estrés bajo, la tendencia desaparece
+    guardarAnalisisLote(db, [_comentario("16.06.2024", "bajo") for _ in range(20)])
+    tipos = [p["tipo"] for p in detectarPatrones(db=db)["patrones_detectados"]]
+    assert "tendencia_creciente" not in tipos
+
+
+@pytest.mark.parametrize("fecha, dia", [
+    ("2024-05-01", date(2024, 5, 1)),
+    ("2024-05-01T10:00:00+00:00", date(2024, 5, 1)),
+    ("01/05/2024", date(2024, 5, 1)),
+    ("1-5-2024", date(2024, 5, 1)),
+    ("", None),
+    ("ayer", None),
+])
+def test_dia_fecha(fecha, dia):
+    assert diaFecha(fecha) == dia
@@ -0,0 +1,97 @@
+"""
+Tests de /estadisticas: mismo resultado agregando sobre los rollups (ESTADISTICAS_RESUMEN)
+que sobre analisis_comentarios, y contra el cálculo original en Python fila por fila.
+"""
+import pytest
+
+from backend.api import estadisticas
+from backend.core.coreServices import guardarAnalisisLote
+
+
+def _porFilas(resultados, departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None):
+    """Cálculo en Python (como antes de agregar en SQL), ignorando categorías que no son dict."""
+    filas = [
+        r for r in resultados
+        if (not departamento or r["meta"]["departamento"] == departamento)
+        and (not equipo or r["meta"]["equipo"] == equipo)
+        and (not fecha_inicio or r["meta"]["fecha"] >= fecha_inicio)
+        and (not fecha_fin or r["meta"]["fecha"] <= fecha_fin)
+    ]
+    stress, emociones, categorias = {"alto": 0, "medio": 0, "bajo": 0}, {}, {}
+    for r in filas:
+        stress[r["stress"]["level"]] += 1
+        emociones[r["emotion"]["label"]] = emociones.get(r["emotion"]["label"], 0) + 1
+        if isinstance(r["categories"], list):
+            for cat in r["categories"]:
+                if isinstance(cat, dict):
+                    label = cat.get("label") or ""
+                    categorias[label] = categorias.get(label, 0) + 1
+    top = sorted(categorias.items(), key=lambda x: x[1], reverse=True)[:5]
+    return len(filas), stress, emociones, [{"categoria": c, "count": n} for c, n in top]
+
+
+FILTROS = [
+    {},
+    {"departamento": "TI"},
+    {"departamento": "Ventas", "equipo": "Backend"},
+    {"fecha_inicio": "2024-02-01", "fecha_fin": "2024-02-28"},
+    {"departamento": "no-existe"},
+]
+
+
+@pytest.fixture
+def db_con_datos(db, resultados):
+    assert guardarAnalisisLote(db, resultados) == len(resultados)
+    return db
+
+
+def _estadisticas(db, resumen, monkeypatch, **filtros):
+    monkeypatch.setattr(estadisticas.settings, "estadisticas_resumen", resumen)
+    argumentos = dict(departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None)
+    return estadisticas.obtenerEstadisticas(**{**argumentos, **filtros}, db=db)
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_rollups_and_rows_give_same_statistics(db_con_datos, resultados, monkeypatch, filtros):
+    con_resumen = _estadisticas(db_con_datos, True, monkeypatch, **filtros)
+    sin_resumen = _estadisticas(db_con_datos, False, monkeypatch, **filtros)
+
+    assert con_resumen.pop("sentimiento_promedio") == pytest.approx(sin_resumen.pop("sentimiento_promedio"))
+    assert con_resumen == sin_resumen
+
+    total, stress, emociones, categorias = _porFilas(resultados, **filtros)
+    assert con_resumen["total"] == total
+    if total:
+        assert (con_resumen["stress"], con_resumen["emociones"]) == (stress, emociones)
+        assert con_resumen["categorias_principales"] == categorias
+
+
+def test_non_dict_categories_are_skipped_in_both_paths(db, monkeypatch):
+    resultado = {
+        "emotion": {"label": "neutral", "score": 0.5},
+        "stress": {"level": "medio", "sentiment_dist": {}},
+        "categories": ["texto suelto", {"label": "liderazgo"}, {}],
+        "meta": {"comentario_original": "Comentario de prueba", "fecha": "2024-01-01"},
+    }
+    guardarAnalisisLote(db, [resultado])
+
+    for resumen in (True, False):
+        categorias = _estadisticas(db, resumen, monkeypatch)["categorias_principales"]
+        assert sorted(categorias, key=lambda c: c["categoria"]) == [
+            {"categoria": "", "count": 1}, {"categoria": "liderazgo", "count": 1}
+        ]
+
+
+@pytest.mark.parametrize("resumen", [True, False])
+def test_department_and_team_breakdowns(db_con_datos, monkeypatch, resumen):
+    monkeypatch.setattr(estadisticas.settings, "estadisticas_resumen", resumen)
+    departamentos = estadisticas.estadisticasPorDepartamento(db=db_con_datos)
+    equipos = estadisticas.estadisticasPorEquipo(departamento=None, db=db_con_datos)
+
+    assert sum(d["total"] for d in departamentos.values()) == 300
+    assert set(departamentos) == {"TI", "Ventas", "RRHH", "Sin departamento"}
+    assert sum(e["total"] for e in equipos.values()) == 300
+
+    monkeypatch.setattr(estadisticas.settings, "estadisticas_resumen", not resumen)
+    assert estadisticas.estadisticasPorDepartamento(db=db_con_datos) == departamentos
+    assert estadisticas.estadisticasPorEquipo(departamento=None, db=db_con_datos) == equipos
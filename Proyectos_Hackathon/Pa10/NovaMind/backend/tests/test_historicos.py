@@ -0,0 +1,105 @@
+"""
+Tests de /historicos: paginación por cursor (keyset sobre id), proyección de campos y exportación.
+"""
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import manejarHistoricos
+from backend.config.database import get_db
+from backend.core.coreServices import guardarAnalisisLote
+
+
+@pytest.fixture
+def cliente(fabrica_sesiones, resultados, monkeypatch):
+    db = fabrica_sesiones()
+    guardarAnalisisLote(db, resultados)
+    db.close()
+
+    def sesion():
+        db = fabrica_sesiones()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(manejarHistoricos, "SessionLocal", fabrica_sesiones)
+    app = FastAPI()
+    app.include_router(manejarHistoricos.router)
+    app.dependency_overrides[get_db] = sesion
+    return TestClient(app)
+
+
+def _paginas(cliente, **params):
+    filas, cursor, paginas = [], None, 0
+    while True:
+        r = cliente.get("/historicos/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        filas += r.json()
+        paginas += 1
+        cursor = r.headers.get("X-Siguiente-Cursor")
+        if cursor is None:
+            return filas, paginas
+
+
+def test_cursor_walks_all_rows_once_newest_first(cliente):
+    filas, paginas = _paginas(cliente, limit=70, campos="id,departamento")
+
+    ids = [f["id"] for f in filas]
+    assert ids == sorted(range(1, 301), reverse=True)
+    assert paginas == 5  # 4 páginas completas + 1 parcial
+    assert set(filas[0]) == {"id", "departamento"}
+
+
+def test_cursor_with_filters_and_exact_last_page(cliente, resultados):
+    esperados = [i + 1 for i, r in enumerate(resultados) if r["meta"]["departamento"] == "TI"]
+    filas, paginas = _paginas(cliente, limit=25, departamento="TI", campos="id")
+
+    assert [f["id"] for f in filas] == esperados[::-1]
+    # 75 filas en páginas de 25: la última completa devuelve cursor y la siguiente viene vacía
+    assert (len(esperados), paginas) == (75, 4)
+
+
+def test_unknown_field_is_rejected(cliente):
+    r = cliente.get("/historicos/", params={"campos": "id,password"})
+    assert r.status_code == 400
+
+
+def test_text_endpoint_cursor(cliente):
+    vistos, cursor = [], None
+    while True:
+        r = cliente.get("/historicos/texto/", params={"limit": 128, **({"cursor": cursor} if cursor else {})}).json()
+        vistos += r["comentarios"]
+        cursor = r["siguiente_cursor"]
+        if cursor is None:
+            break
+    assert len(vistos) == 300
+
+
+@pytest.mark.parametrize("formato", ["ndjson", "csv"])
+def test_export_streams_all_filtered_rows(cliente, resultados, monkeypatch, formato):
+    monkeypatch.setattr(manejarHistoricos, "EXPORT_LOTE", 64)
+    r = cliente.get("/historicos/exportar/", params={
+        "formato": formato, "campos": "id,categories,stress_level", "stress_level": "alto"
+    })
+    assert r.status_code == 200
+
+    if formato == "ndjson":
+        filas = [json.loads(linea) for linea in r.text.splitlines()]
+    else:
+        filas = list(csv.DictReader(io.StringIO(r.text)))
+        for f in filas:
+            f["id"], f["categories"] = int(f["id"]), json.loads(f["categories"])
+
+    esperados = [i + 1 for i, res in enumerate(resultados) if res["stress"]["level"] == "alto"]
+    assert [f["id"] for f in filas] == esperados
+    assert filas[1]["categories"] == resultados[esperados[1] - 1]["categories"]
+    assert {f["stress_level"] for f in filas} == {"alto"}
+
+
+def test_export_rejects_unknown_format(cliente):
+    assert cliente.get("/historicos/exportar/", params={"formato": "xlsx"}).status_code == 400
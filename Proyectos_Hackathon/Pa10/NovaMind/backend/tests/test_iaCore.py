@@ -0,0 +1,292 @@
+"""
+Tests de NLPAnalyzer.analyze_batch: orden, deduplicación, equivalencia con analyze_comment
+y caché (solo de los análisis en los que todos los modelos respondieron).
+
+Los pipelines de HuggingFace se sustituyen por funciones deterministas que registran
+con qué textos se llamaron; ejecutar desde NovaMind/: python -m pytest -q backend/tests
+"""
+import math
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from backend.core.coreModels import CacheAnalisis
+from backend.ia.cacheAnalisis import AnalysisCache
+from backend.ia.configIA import IAConfig
+from backend.ia.iaCore import NLPAnalyzer
+
+
+class PipelinesFalsos:
+    """Sustituto de ModelRegistry: cada pipeline devuelve un resultado derivado del texto."""
+
+    def __init__(self):
+        self.llamadas = {"emotion": [], "sentiment": [], "summary": []}
+        self.caido = None   # nombre del pipeline que lanza excepción
+
+    def emotion(self):
+        def pipe(textos, batch_size):
+            self.llamadas["emotion"].append(list(textos))
+            if self.caido == "emotion":
+                raise RuntimeError("modelo caído")
+            return [{"label": "anger" if "jefe" in t else "joy", "score": len(t) / 1000} for t in textos]
+        return pipe
+
+    def sentiment(self):
+        def pipe(textos, batch_size):
+            self.llamadas["sentiment"].append(list(textos))
+            if self.caido == "sentiment":
+                raise RuntimeError("modelo caído")
+            return [{"label": "NEG" if "no" in t.split() else "POS", "score": 0.9} for t in textos]
+        return pipe
+
+    def summarizer(self):
+        def pipe(textos, batch_size, **kwargs):
+            self.llamadas["summary"].append(list(textos))
+            if self.caido == "summary":
+                raise RuntimeError("modelo caído")
+            return [{"summary_text": t[:20]} for t in textos]
+        return pipe
+
+
+def _analizador(cache=None):
+    analyzer = NLPAnalyzer(IAConfig(backend="pytorch"), cache=cache)
+    analyzer.models = PipelinesFalsos()
+    analyzer._detect_categories = lambda textos: ([["liderazgo"] if "jefe" in t else [] for t in textos], set())
+    return analyzer
+
+
+TEXTOS = [
+    "Mi jefe no escucha al equipo",
+    "ok",
+    "Me gusta el ambiente de trabajo",
+    "  Mi jefe   no escucha al equipo ",
+    "La carga de trabajo es muy alta y no tenemos tiempo para terminar las entregas; "
+    "llevamos semanas quedándonos tarde y el equipo está agotado sin ningún reconocimiento.",
+    "Me gusta el ambiente de trabajo",
+]
+
+
+def test_batch_matches_single_comment_analysis():
+    metas = [{"departamento": f"d{i}"} for i in range(len(TEXTOS))]
+
+    lote = _analizador().analyze_batch(TEXTOS, metas)
+    individuales = [_analizador().analyze_comment(t, m) for t, m in zip(TEXTOS, metas)]
+
+    assert lote == individuales
+    assert [r["meta"] for r in lote] == metas
+    assert lote[1]["suggestion"] == "Comentario insuficiente para análisis."
+
+
+def test_batch_runs_each_model_once_over_unique_texts():
+    analyzer = _analizador()
+    lote = analyzer.analyze_batch(TEXTOS)
+
+    # Un único forward por modelo, con los textos únicos ya limpios y ordenados por longitud
+    (emociones,) = analyzer.models.llamadas["emotion"]
+    assert len(analyzer.models.llamadas["sentiment"]) == 1
+    assert emociones == sorted(set(emociones), key=len)
+    assert len(emociones) == 3
+    assert len(analyzer.models.llamadas["summary"]) == 1
+
+    # Los duplicados reciben copias independientes del mismo resultado
+    assert lote[0] == lote[3]
+    lote[0]["categories"].append({"label": "otra"})
+    assert lote[3]["categories"] == [{"label": "liderazgo"}]
+
+
+def test_batch_rejects_mismatched_metas():
+    with pytest.raises(ValueError):
+        _analizador().analyze_batch(["uno", "dos"], [{}])
+
+
+@pytest.mark.parametrize("caido", ["emotion", "sentiment", "summary"])
+def test_fallback_results_are_not_cached(caido, fabrica_sesiones):
+    cfg = IAConfig(backend="pytorch")
+    cache = AnalysisCache(cfg, fabrica_sesiones)
+    analyzer = _analizador(cache)
+    analyzer.models.caido = caido
+
+    lote = analyzer.analyze_batch(TEXTOS)
+    assert len(lote) == len(TEXTOS)
+
+    # El resumen solo falla para los textos largos: los cortos sí se cachean
+    esperados = 2 if caido == "summary" else 0
+    assert cache.stats()["entradas_memoria"] == esperados
+    db = fabrica_sesiones()
+    try:
+        assert db.query(CacheAnalisis).count() == esperados
+    finally:
+        db.close()
+
+    # Con el modelo recuperado se vuelve a analizar y el resultado real queda en caché
+    analyzer.models.caido = None
+    analyzer.models.llamadas = {"emotion": [], "sentiment": [], "summary": []}
+    assert analyzer.analyze_batch(TEXTOS) == _analizador().analyze_batch(TEXTOS)
+    assert len(analyzer.models.llamadas["emotion"][0]) == 3 - esperados
+    assert cache.stats()["entradas_memoria"] == 3
+
+
+def test_categories_fallback_is_not_cached():
+    cache = AnalysisCache(IAConfig(backend="pytorch"))
+    analyzer = _analizador(cache)
+    analyzer._detect_categories = lambda textos: ([[] for _ in textos], set(range(len(textos))))
+
+    analyzer.analyze_batch(TEXTOS)
+    assert cache.stats()["entradas_memoria"] == 0
+
+
+# ------------------------------------------------------------------
+# Zero-shot por pares: tokenizador y modelo NLI diminutos
+# ------------------------------------------------------------------
+CLS, SEP, PAD = 1, 2, 0
+
+
+class TokenizadorFalso:
+    """Palabra → id (asignado al verlo), con el formato de pares de BERT: [CLS] a [SEP] b [SEP]."""
+
+    model_input_names = ["input_ids", "token_type_ids", "attention_mask"]
+
+    def __init__(self, model_max_length=512):
+        self.model_max_length = model_max_length
+        self.vocab = {}
+        self.llamadas = []
+        self.lotes = []
+
+    def __call__(self, textos, add_special_tokens=True):
+        assert not add_special_tokens
+        self.llamadas.append(list(textos))
+        return {"input_ids": [[self.vocab.setdefault(w, len(self.vocab) + 3) for w in t.split()] for t in textos]}
+
+    def palabras(self, ids):
+        inverso = {i: w for w, i in self.vocab.items()}
+        return [inverso[i] for i in ids]
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 3 if pair else 2
+
+    def build_inputs_with_special_tokens(self, a, b):
+        return [CLS] + a + [SEP] + b + [SEP]
+
+    def create_token_type_ids_from_sequences(self, a, b):
+        return [0] * (len(a) + 2) + [1] * (len(b) + 1)
+
+    def pad(self, features, return_tensors):
+        assert return_tensors == "pt"
+        self.lotes.append([f["input_ids"] for f in features])
+        largo = max(len(f["input_ids"]) for f in features)
+        relleno = lambda seq, valor: seq + [valor] * (largo - len(seq))
+        return {
+            "input_ids": torch.tensor([relleno(f["input_ids"], PAD) for f in features]),
+            "token_type_ids": torch.tensor([relleno(f["token_type_ids"], 0) for f in features]),
+            "attention_mask": torch.tensor([relleno([1] * len(f["input_ids"]), 0) for f in features]),
+        }
+
+
+class ModeloNLIFalso:
+    """
+    Logits [contradicción, neutral, entailment] de cada par: entailment = número de
+    veces que la categoría (última palabra de la hipótesis) aparece en el texto.
+    El logit neutral es alto para comprobar que multi-etiqueta lo ignora.
+    """
+
+    device = "cpu"
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.pares = []
+
+    def __call__(self, input_ids, token_type_ids, attention_mask):
+        logits = []
+        for ids, tipos, mascara in zip(input_ids.tolist(), token_type_ids.tolist(), attention_mask.tolist()):
+            n = sum(mascara)
+            sep = ids.index(SEP)
+            assert ids[0] == CLS and ids[n - 1] == SEP
+            assert tipos[:n] == [0] * (sep + 1) + [1] * (n - sep - 1)
+            texto = self.tokenizer.palabras(ids[1:sep])
+            hipotesis = self.tokenizer.palabras(ids[sep + 1:n - 1])
+            self.pares.append((texto, hipotesis))
+            logits.append([0.0, 5.0, _entailment(texto, hipotesis[-1])])
+        return type("Salida", (), {"logits": torch.tensor(logits)})()
+
+
+def _entailment(palabras, categoria):
+    return 2.0 * palabras.count(categoria) - 1.0
+
+
+class ZeroShotFalso:
+    def __init__(self, max_length=512):
+        self.tokenizer = TokenizadorFalso(max_length)
+        self.model = ModeloNLIFalso(self.tokenizer)
+        self.entailment_id = 2
+
+
+CATEGORIAS = ["salario", "jefe", "carga"]
+
+
+def _analizador_zeroshot(zeroshot, **cfg):
+    analyzer = NLPAnalyzer(IAConfig(backend="pytorch", categorias=CATEGORIAS, hypothesis_template="trata de {}",
+                                    min_score_categoria=0.5, **cfg))
+    analyzer.models = type("Modelos", (), {"zeroshot": lambda self: zeroshot})()
+    return analyzer
+
+
+def _categorias_esperadas(texto, min_score=0.5):
+    palabras = texto.split()
+    # softmax entre contradicción (logit 0) y entailment de cada par
+    scores = {c: 1 / (1 + math.exp(-_entailment(palabras, c))) for c in CATEGORIAS}
+    return [c for c in sorted(CATEGORIAS, key=lambda c: -scores[c]) if scores[c] >= min_score]
+
+
+def test_zero_shot_pairs_match_multi_label_pipeline():
+    zeroshot = ZeroShotFalso()
+    analyzer = _analizador_zeroshot(zeroshot, zeroshot_batch_size=4)
+    textos = ["el salario no alcanza", "mi jefe y el jefe de area", "carga salario carga jefe", "todo bien"]
+
+    categorias, fallidos = analyzer._detect_categories(textos)
+    assert fallidos == set()
+    assert categorias == [_categorias_esperadas(t) for t in textos]
+    assert categorias[2] == ["carga", "salario", "jefe"]   # más entailment, antes
+    assert categorias[3] == []
+
+    # Cada texto y cada hipótesis se tokenizan una vez; todos los pares llegan al modelo
+    assert zeroshot.tokenizer.llamadas == [["trata de salario", "trata de jefe", "trata de carga"], textos]
+    assert sorted(zeroshot.model.pares) == sorted(
+        (t.split(), ["trata", "de", c]) for t in textos for c in CATEGORIAS
+    )
+    # Lotes de zeroshot_batch_size pares, ordenados por longitud
+    lotes = zeroshot.tokenizer.lotes
+    assert [len(lote) for lote in lotes] == [4, 4, 4]
+    largos = [len(ids) for lote in lotes for ids in lote]
+    assert largos == sorted(largos)
+
+    # Las hipótesis quedan en caché entre llamadas
+    analyzer._detect_categories(["salario"])
+    assert zeroshot.tokenizer.llamadas[2:] == [["salario"]]
+
+
+def test_zero_shot_truncates_only_the_text():
+    zeroshot = ZeroShotFalso(max_length=10)
+    analyzer = _analizador_zeroshot(zeroshot)
+    texto = "uno dos tres cuatro cinco seis salario"
+
+    categorias, _ = analyzer._detect_categories([texto])
+    # 10 - 3 especiales - 3 de la hipótesis: quedan 4 palabras del texto; "salario" se pierde
+    assert {tuple(t) for t, _ in zeroshot.model.pares} == {("uno", "dos", "tres", "cuatro")}
+    assert sorted(h[-1] for _, h in zeroshot.model.pares) == sorted(CATEGORIAS)
+    assert categorias == [[]]
+
+
+class ModeloCaido:
+    device = "cpu"
+
+    def __call__(self, **kwargs):
+        raise RuntimeError("modelo caído")
+
+
+def test_zero_shot_failure_falls_back_to_no_categories():
+    zeroshot = ZeroShotFalso()
+    zeroshot.model = ModeloCaido()
+    analyzer = _analizador_zeroshot(zeroshot)
+    assert analyzer._detect_categories(["a", "b"]) == ([[], []], {0, 1})
@@ -0,0 +1,82 @@
+"""
+Tests de los backends de inferencia de ModelRegistry (pytorch / int8 / onnx).
+
+La paridad con modelos reales descarga los cuatro modelos de HuggingFace: solo se
+ejecuta con NOVAMIND_TEST_MODELOS=1 (y, para onnx, con optimum[onnxruntime] instalado).
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+import backend.ia.iaCore as iaCore
+from backend.ia.cacheAnalisis import huellaConfig
+from backend.ia.configIA import IAConfig
+
+
+class PipelineFalso:
+    def __init__(self, task, model):
+        self.task, self.model = task, model
+
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    creados = []
+
+    def pipeline(task, model, **kwargs):
+        creados.append(PipelineFalso(task, model))
+        return creados[-1]
+
+    monkeypatch.setattr(iaCore, "pipeline", pipeline)
+    return creados
+
+
+def test_onnx_without_optimum_falls_back_to_pytorch(pipelines, monkeypatch):
+    monkeypatch.setitem(sys.modules, "optimum", None)
+    monkeypatch.setitem(sys.modules, "optimum.onnxruntime", None)
+    registry = iaCore.ModelRegistry(IAConfig(backend="onnx"))
+
+    pipe = registry.emotion()
+    assert pipe.model == IAConfig().emotion_model
+    assert registry.emotion() is pipe  # carga perezosa: una sola vez
+    assert len(pipelines) == 1
+
+
+def test_int8_quantizes_linear_layers(pipelines, monkeypatch):
+    cuantizados = []
+
+    def quantize_dynamic(model, capas, dtype, inplace):
+        cuantizados.append((model, capas, dtype))
+        return f"int8:{model}"
+
+    monkeypatch.setattr(iaCore.torch.quantization, "quantize_dynamic", quantize_dynamic)
+    pipe = iaCore.ModelRegistry(IAConfig(backend="int8")).sentiment()
+
+    assert pipe.model == f"int8:{IAConfig().sentiment_model}"
+    assert cuantizados == [(IAConfig().sentiment_model, {iaCore.torch.nn.Linear}, iaCore.torch.qint8)]
+
+
+def test_backend_is_part_of_cache_fingerprint():
+    huellas = {huellaConfig(IAConfig(backend=b)) for b in ("pytorch", "int8", "onnx")}
+    assert len(huellas) == 3
+    with pytest.raises(ValueError):
+        IAConfig(backend="tensorrt")
+
+
+@pytest.mark.skipif(os.getenv("NOVAMIND_TEST_MODELOS") != "1", reason="descarga los modelos de HuggingFace")
+@pytest.mark.parametrize("backend", ["int8", "onnx"])
+def test_backend_parity_with_pytorch(backend):
+    if backend == "onnx":
+        pytest.importorskip("optimum.onnxruntime")
+    from benchmark_modelos import EJEMPLOS, paridad
+
+    base = iaCore.NLPAnalyzer(IAConfig(backend="pytorch")).analyze_batch(EJEMPLOS)
+    candidato = iaCore.NLPAnalyzer(IAConfig(backend=backend)).analyze_batch(EJEMPLOS)
+
+    p = paridad(base, candidato)
+    assert p["acuerdo_emocion"] >= 0.9
+    assert p["acuerdo_estres"] >= 0.9
+    assert p["jaccard_categorias"] >= 0.8
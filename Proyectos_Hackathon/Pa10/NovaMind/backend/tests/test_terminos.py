@@ -0,0 +1,60 @@
+"""
+Tests del índice de términos (resumen_terminos) y de /terminos frente al conteo directo.
+"""
+from collections import Counter
+
+import pytest
+
+from backend.api.terminos import obtenerTerminos
+from backend.core.coreResumen import periodoFecha
+from backend.core.coreServices import guardarAnalisisLote
+from backend.ia.preProcesamiento import extraerTerminos
+
+
+def test_extract_terms():
+    terminos = extraerTerminos("El jefe NO escucha; el jefe está en 3 reuniones_largas y ok")
+    assert terminos == Counter({"jefe": 2, "escucha": 1, "reuniones": 1, "largas": 1})
+    assert extraerTerminos(None) == Counter()
+
+
+def test_period_of_date():
+    assert periodoFecha("2024-03-15") == "2024-03"
+    assert periodoFecha("15/03/2024") == ""
+    assert periodoFecha("") == ""
+
+
+def _esperado(resultados, limite, departamento=None, fecha_inicio=None, fecha_fin=None):
+    conteo = Counter()
+    for r in resultados:
+        meta = r["meta"]
+        periodo = periodoFecha(meta["fecha"])
+        if departamento and meta["departamento"] != departamento:
+            continue
+        if (fecha_inicio and periodo < fecha_inicio[:7]) or (fecha_fin and periodo > fecha_fin[:7]):
+            continue
+        conteo.update(extraerTerminos(meta["comentario_original"]))
+    return sorted(conteo.items(), key=lambda x: (-x[1], x[0]))[:limite]
+
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"departamento": "Ventas"},
+    {"fecha_inicio": "2024-02-10", "fecha_fin": "2024-03-01"},
+])
+def test_terms_endpoint_matches_direct_count(db, resultados, filtros):
+    # En dos lotes: los términos repetidos se suman en el upsert
+    guardarAnalisisLote(db, resultados[:100])
+    guardarAnalisisLote(db, resultados[100:])
+
+    argumentos = dict(departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None, limite=8)
+    terminos = obtenerTerminos(**{**argumentos, **filtros}, db=db)["terminos"]
+
+    esperado = _esperado(resultados, 8, **filtros)
+    assert [(t["termino"], t["frecuencia"]) for t in terminos] == esperado
+    assert terminos[0]["peso"] == 1.0
+    assert terminos[-1]["peso"] == round(esperado[-1][1] / esperado[0][1], 4)
+
+
+def test_terms_endpoint_empty(db):
+    args = dict(departamento=None, equipo=None, fecha_inicio=None, fecha_fin=None, limite=10)
+    assert obtenerTerminos(**args, db=db) == {"terminos": []}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compara un backend de inferencia en CPU (int8 / onnx) contra PyTorch fp32.
+
+Uso (desde la carpeta NovaMind):
+    python benchmark_modelos.py --backend int8
+    python benchmark_modelos.py --backend onnx --csv comentarios.csv --n 300
+
+Reporta tiempo de carga, latencia por comentario (p50/p95), throughput con
+analyze_batch y paridad de resultados: acuerdo de emoción y estrés, Jaccard de
+categorías y diferencia de scores. Termina con código 1 si el acuerdo queda
+por debajo de --min-acuerdo.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from backend.ia.configIA import IAConfig, BACKENDS
+from backend.ia.iaCore import NLPAnalyzer
+
+EJEMPLOS = [
+    "Estoy muy contento con mi equipo, nos apoyamos en todo.",
+    "La carga de trabajo es excesiva y no doy abasto con las entregas.",
+    "Mi jefe no reconoce el esfuerzo que hacemos cada semana.",
+    "El ambiente laboral ha mejorado mucho desde el cambio de oficina.",
+    "No tengo claro cuáles son mis responsabilidades en el proyecto.",
+    "Me gustaría tener más oportunidades de formación y crecimiento.",
+    "Las reuniones son demasiado largas y poco productivas.",
+    "Siento que mi salario no corresponde con mis funciones.",
+    "La comunicación entre áreas es muy mala, nadie avisa de los cambios.",
+    "Estoy agotado, llevo meses haciendo horas extra sin descanso.",
+    "Valoro mucho la flexibilidad de horario que tenemos.",
+    "Las herramientas que usamos están obsoletas y fallan constantemente.",
+    "Hubo un conflicto con un compañero y nadie intervino para resolverlo.",
+    "Me siento motivado con los nuevos objetivos del trimestre, aunque el plazo "
+    "es ajustado y tendremos que coordinarnos mejor con el área de operaciones "
+    "para no repetir los retrasos del último lanzamiento.",
+    "No sé si voy a seguir en la empresa, la presión es constante y no hay apoyo "
+    "de la dirección cuando surgen problemas con los clientes más exigentes.",
+]
+
+
+def cargarTextos(csv_path, n):
+    if csv_path:
+        import pandas as pd
+        textos = pd.read_csv(csv_path)["comentario"].dropna().astype(str).tolist()
+    else:
+        textos = EJEMPLOS
+    # Repetir hasta n con una variación para que no sean idénticos
+    return [textos[i % len(textos)] + ("" if i < len(textos) else f" ({i})") for i in range(n)]
+
+
+def medir(backend, textos, n_latencia):
+    analyzer = NLPAnalyzer(IAConfig(backend=backend))
+
+    carga = analyzer.warmup()
+
+    latencias = []
+    for texto in textos[:n_latencia]:
+        inicio = time.perf_counter()
+        analyzer.analyze_comment(texto)
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    resultados = analyzer.analyze_batch(textos)
+    lote = time.perf_counter() - inicio
+
+    return {
+        "carga_s": carga,
+        "p50_ms": float(np.percentile(latencias, 50) * 1000),
+        "p95_ms": float(np.percentile(latencias, 95) * 1000),
+        "comentarios_s": len(textos) / lote,
+        "resultados": resultados,
+    }
+
+
+def paridad(base, candidato):
+    emocion, estres, jaccard, dif_score = [], [], [], []
+    for a, b in zip(base, candidato):
+        emocion.append(a["emotion"]["label"] == b["emotion"]["label"])
+        estres.append(a["stress"]["level"] == b["stress"]["level"])
+        dif_score.append(abs(a["emotion"]["score"] - b["emotion"]["score"]))
+
+        cat_a = {c["label"] for c in a["categories"]}
+        cat_b = {c["label"] for c in b["categories"]}
+        jaccard.append(len(cat_a & cat_b) / len(cat_a | cat_b) if cat_a | cat_b else 1.0)
+
+    return {
+        "acuerdo_emocion": float(np.mean(emocion)),
+        "acuerdo_estres": float(np.mean(estres)),
+        "jaccard_categorias": float(np.mean(jaccard)),
+        "dif_score_emocion_max": float(np.max(dif_score)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de inferencia en CPU")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "pytorch"], default="int8")
+    parser.add_argument("--csv", help="CSV con columna 'comentario' (por defecto, ejemplos internos)")
+    parser.add_argument("--n", type=int, default=200, help="comentarios para throughput y paridad")
+    parser.add_argument("--n-latencia", type=int, default=30, help="comentarios para la latencia individual")
+    parser.add_argument("--min-acuerdo", type=float, default=0.95)
+    args = parser.parse_args()
+
+    textos = cargarTextos(args.csv, args.n)
+
+    print(f"Benchmark pytorch vs {args.backend} ({len(textos)} comentarios)")
+    print("=" * 60)
+
+    medidas = {b: medir(b, textos, args.n_latencia) for b in ("pytorch", args.backend)}
+
+    print(f"{'':16}{'carga (s)':>11}{'p50 (ms)':>11}{'p95 (ms)':>11}{'coment/s':>11}")
+    for backend, m in medidas.items():
+        print(f"{backend:16}{m['carga_s']:>11.1f}{m['p50_ms']:>11.1f}{m['p95_ms']:>11.1f}{m['comentarios_s']:>11.1f}")
+
+    p = paridad(medidas["pytorch"]["resultados"], medidas[args.backend]["resultados"])
+    print("\nParidad")
+    for clave, valor in p.items():
+        print(f"   {clave:24}{valor:.4f}")
+
+    ok = min(p["acuerdo_emocion"], p["acuerdo_estres"]) >= args.min_acuerdo
+    print("\n" + ("OK" if ok else f"ACUERDO POR DEBAJO DE {args.min_acuerdo}"))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
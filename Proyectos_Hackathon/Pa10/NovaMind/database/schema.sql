@@ -29,5 +29,60 @@ CREATE TABLE IF NOT EXISTS analisis_comentarios (
     INDEX idx_departamento (departamento),
     INDEX idx_equipo (equipo),
     INDEX idx_stress_level (stress_level),
-    INDEX idx_fecha (fecha)
+    INDEX idx_fecha (fecha),
+    INDEX idx_dep_eq_fecha_stress (departamento, equipo, fecha, stress_level)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Caché de resultados de NLPAnalyzer: clave = sha256(config_hash + texto normalizado)
+CREATE TABLE IF NOT EXISTS cache_analisis (
+    clave CHAR(64) PRIMARY KEY,
+    config_hash CHAR(16) NOT NULL,
+    resultado JSON NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+
+    INDEX idx_config_hash (config_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Bases existentes:
+-- ALTER TABLE analisis_comentarios ADD INDEX idx_dep_eq_fecha_stress (departamento, equipo, fecha, stress_level);
+
+-- Rollups por fecha/departamento/equipo: se actualizan en cada inserción y se
+-- pueblan solos al arrancar si están vacíos; para recalcularlos a mano:
+--   python -m backend.core.coreResumen
+CREATE TABLE IF NOT EXISTS resumen_analisis (
+    fecha VARCHAR(20) NOT NULL,
+    departamento VARCHAR(80) NOT NULL,
+    equipo VARCHAR(80) NOT NULL,
+    stress_level VARCHAR(32) NOT NULL,
+    emotion_label VARCHAR(64) NOT NULL,
+
+    total INT NOT NULL DEFAULT 0,
+    sent_pos FLOAT NOT NULL DEFAULT 0.0,
+    sent_neu FLOAT NOT NULL DEFAULT 0.0,
+    sent_neg FLOAT NOT NULL DEFAULT 0.0,
+
+    PRIMARY KEY (fecha, departamento, equipo, stress_level, emotion_label)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS resumen_categorias (
+    fecha VARCHAR(20) NOT NULL,
+    departamento VARCHAR(80) NOT NULL,
+    equipo VARCHAR(80) NOT NULL,
+    categoria VARCHAR(100) NOT NULL,
+
+    total INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (fecha, departamento, equipo, categoria)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Índice de términos para la nube de palabras (periodo = YYYY-MM de la fecha)
+CREATE TABLE IF NOT EXISTS resumen_terminos (
+    periodo VARCHAR(7) NOT NULL,
+    departamento VARCHAR(80) NOT NULL,
+    equipo VARCHAR(80) NOT NULL,
+    termino VARCHAR(64) NOT NULL,
+
+    total INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (periodo, departamento, equipo, termino)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -1,13 +1,14 @@
 import streamlit as st
 import pandas as pd
 import sys
+import time
 from pathlib import Path
 
 frontend_path = Path(__file__).parent.parent
 if str(frontend_path) not in sys.path:
     sys.path.insert(0, str(frontend_path))
 
-from utils.callBackend import analizarLoteCSV
+from utils.callBackend import analizarLoteCSV, obtenerEstadoLote
 
 def mostrarPaginaCSV():
     st.title("Anilisis Masivo desde CSV")
@@ -35,14 +36,30 @@ def mostrarPaginaCSV():
 
             if st.button("Procesar CSV completo", use_container_width=True):
                 try:
-                    datos = df.to_dict('records')
+                    datos = df.astype(object).where(df.notna(), None).to_dict('records')
 
-                    with st.spinner(f"Analizando {len(datos)} comentarios..."):
-                        resultado = analizarLoteCSV(datos)
+                    trabajo = analizarLoteCSV(datos)
+                    barra = st.progress(0.0, text=f"Analizando {trabajo.get('total', 0)} comentarios...")
 
+                    # Consultar el estado del trabajo en lugar de esperar la respuesta completa
+                    while trabajo.get("estado") in ("en_cola", "procesando"):
+                        time.sleep(1)
+                        trabajo = obtenerEstadoLote(trabajo["job_id"])
+                        barra.progress(
+                            trabajo.get("progreso", 0.0),
+                            text=f"Analizando {trabajo.get('procesados', 0)}/{trabajo.get('total', 0)} comentarios..."
+                        )
+
+                    if trabajo.get("estado") == "fallido":
+                        st.error(f"El procesamiento falló: {trabajo.get('error')}")
+                        return
+
+                    barra.progress(1.0, text="Procesamiento completado")
                     st.success(f"Procesamiento completado")
-                    st.metric("Comentarios procesados", resultado.get("procesados", 0))
-                    st.metric("Comentarios guardados", resultado.get("guardados", 0))
+                    st.metric("Comentarios procesados", trabajo.get("procesados", 0))
+                    st.metric("Comentarios guardados", trabajo.get("guardados", 0))
+                    if trabajo.get("omitidos"):
+                        st.caption(f"{trabajo['omitidos']} filas sin comentario fueron omitidas")
 
                     st.info("Los resultados han sido guardados en la base de datos. Consulta el Dashboard para visualizarlos.")
 
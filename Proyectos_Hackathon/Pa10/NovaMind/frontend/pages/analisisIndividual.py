@@ -9,7 +9,7 @@ if str(frontend_path) not in sys.path:
 
 from utils.callBackend import (
     obtenerHistoricos, obtenerEstadisticas, obtenerEstadisticasDepartamentos,
-    obtenerTendencias, obtenerTextoComentarios, obtenerDepartamentos
+    obtenerTendencias, obtenerTerminos, obtenerDepartamentos
 )
 from utils.formatHelper import (
     crearGraficoBarras, crearGraficoPie, crearGraficoLinea,
@@ -166,10 +166,10 @@ def mostrarDashboard():
     st.subheader("WordCloud de Comentarios")
 
     try:
-        textos = obtenerTextoComentarios(limit=500)
+        terminos = obtenerTerminos(limite=100)
 
-        if textos:
-            mostrarWordCloud(textos, titulo="Palabras Mas Frecuentes en Comentarios")
+        if terminos:
+            mostrarWordCloud(terminos, titulo="Palabras Mas Frecuentes en Comentarios")
         else:
             st.info("No hay comentarios para generar WordCloud")
 
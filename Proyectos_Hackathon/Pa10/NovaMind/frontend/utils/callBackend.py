@@ -14,9 +14,16 @@ def analizarComentarioIndividual(comentario: str, meta: Optional[Dict] = None) -
     return response.json()
 
 def analizarLoteCSV(datos: List[Dict[str, Any]]) -> Dict[str, Any]:
-    url = f"{BASE_URL}/analizar-lote/"
+    """Encola el análisis del lote; devuelve el trabajo (job_id, estado, total)."""
+    url = f"{BASE_URL}/analizar/lote"
     payload = {"datos": datos}
-    response = requests.post(url, json=payload, timeout=300)
+    response = requests.post(url, json=payload, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+def obtenerEstadoLote(job_id: str) -> Dict[str, Any]:
+    url = f"{BASE_URL}/analizar/lote/{job_id}"
+    response = requests.get(url, timeout=10)
     response.raise_for_status()
     return response.json()
 
@@ -124,6 +131,22 @@ def obtenerTextoComentarios(departamento: Optional[str] = None, limit: int = 500
     response.raise_for_status()
     return response.json().get("comentarios", [])
 
+def obtenerTerminos(
+    departamento: Optional[str] = None,
+    equipo: Optional[str] = None,
+    limite: int = 100
+) -> Dict[str, int]:
+    url = f"{BASE_URL}/terminos/"
+    params = {"limite": limite}
+    if departamento:
+        params["departamento"] = departamento
+    if equipo:
+        params["equipo"] = equipo
+
+    response = requests.get(url, params=params, timeout=30)
+    response.raise_for_status()
+    return {t["termino"]: t["frecuencia"] for t in response.json().get("terminos", [])}
+
 def obtenerDepartamentos() -> List[str]:
     url = f"{BASE_URL}/historicos/departamentos/"
     response = requests.get(url, timeout=30)
@@ -3,13 +3,15 @@ API router para pronósticos y predicciones de riesgo a 7 días.
 """
 
 import logging
-import subprocess
 from typing import Optional, List
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query
 
-from core.database.raindrop_db import get_forecast_by_station, get_all_forecasts
+from core.database.raindrop_db import get_forecast_by_station, get_all_forecasts, get_forecast_last_retrievals
+from core.ml.prediction_cache import get_prediction_cache, model_version
+from core.pipelines.jobs import get_job_manager
 from services import Predictor
+from pathlib import Path
 from config import STATIONS
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
@@ -20,61 +22,62 @@ logger = logging.getLogger(__name__)
 # Instancia global del modelo ML (se carga una sola vez)
 _risk_predictor_instance = None
 
-# Caché simple para almacenar forecasts procesados (5 minutos de TTL)
-_forecast_cache = {
-    "data": None,
-    "timestamp": 0,
-    "ttl": 300  # 5 minutos
-}
+RISK_MODEL_PATH = Path(__file__).parent.parent / "ml_models" / "risk_model.joblib"
 
 def get_risk_predictor():
     """Obtiene una instancia singleton del RiskPredictor."""
     global _risk_predictor_instance
     if _risk_predictor_instance is None:
         from core.ml.risk_predictor import RiskPredictor
-        from pathlib import Path
-        model_path = Path(__file__).parent.parent / "ml_models" / "risk_model.joblib"
-        if model_path.exists():
-            _risk_predictor_instance = RiskPredictor(model_path=model_path)
-            logger.info(f"✅ Modelo ML cargado una vez (singleton): {model_path}")
+        if RISK_MODEL_PATH.exists():
+            _risk_predictor_instance = RiskPredictor(model_path=RISK_MODEL_PATH)
+            logger.info(f"✅ Modelo ML cargado una vez (singleton): {RISK_MODEL_PATH}")
         else:
             _risk_predictor_instance = RiskPredictor()
             logger.warning("⚠️ Modelo ML no encontrado, usando predictor sin modelo")
     return _risk_predictor_instance
 
-def get_cached_forecasts():
-    """Obtiene forecasts del caché si aún es válido."""
-    current_time = time.time()
-    if _forecast_cache["data"] and (current_time - _forecast_cache["timestamp"]) < _forecast_cache["ttl"]:
+def _forecast_cache_key(days: int) -> tuple:
+    """
+    Clave de caché del listado de forecasts: última descarga vigente, fecha actual
+    (el listado empieza en hoy) y versión del modelo.
+    Cambia con cada ingesta de pronósticos, aunque la haga otro proceso.
+    """
+    last_retrievals = get_forecast_last_retrievals()
+    latest = max(last_retrievals.values()) if last_retrievals else None
+    observed_at = (latest, datetime.now().date().isoformat(), days)
+    return observed_at, model_version(RISK_MODEL_PATH)
+
+def get_cached_forecasts(days: int):
+    """Obtiene forecasts de la caché de predicciones si siguen vigentes."""
+    observed_at, version = _forecast_cache_key(days)
+    data = get_prediction_cache().get("forecast", None, observed_at, version)
+    if data is not None:
         logger.info("⚡ Usando forecasts desde caché")
-        return _forecast_cache["data"]
-    return None
+    return data
 
-def set_cached_forecasts(data):
-    """Almacena forecasts en el caché."""
-    _forecast_cache["data"] = data
-    _forecast_cache["timestamp"] = time.time()
-    logger.info("💾 Forecasts almacenados en caché (válido por 5 min)")
+def set_cached_forecasts(days: int, data):
+    """Almacena forecasts en la caché de predicciones (se invalida al ingerir nuevos pronósticos)."""
+    observed_at, version = _forecast_cache_key(days)
+    get_prediction_cache().set("forecast", None, observed_at, version, data)
+    logger.info("💾 Forecasts almacenados en caché")
 
 
-def run_forecast_pipeline_background():
+def run_forecast_pipeline_background() -> Optional[str]:
     """
-    Ejecuta el pipeline de forecast en segundo plano si es necesario.
+    Encola el pipeline de forecast en el pool de jobs del proceso.
+    Si ya hay uno en cola o corriendo se reutiliza (no se lanzan ejecuciones duplicadas).
+    
+    Returns:
+        ID del job, o None si no se pudo encolar
     """
     try:
-        logger.info("Ejecutando pipeline de forecast en segundo plano...")
-        result = subprocess.run(
-            ["python", "-m", "core.pipelines.etl.meteosource.forecast_pipeline"],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutos máximo
-        )
-        if result.returncode == 0:
-            logger.info("Pipeline de forecast completado exitosamente")
-        else:
-            logger.error(f"Pipeline de forecast falló: {result.stderr}")
+        job = get_job_manager().submit("forecast")
+        logger.info(f"Pipeline de forecast en segundo plano (job {job.id})")
+        return job.id
     except Exception as e:
-        logger.error(f"Error ejecutando pipeline de forecast: {e}")
+        logger.error(f"Error encolando pipeline de forecast: {e}")
+        return None
 
 
 def get_risk_from_forecast_data(forecast_data: dict) -> dict:
@@ -165,7 +168,6 @@ def calculate_risk_from_forecast(forecast_data: dict) -> dict:
 
 @router.get("/forecast/summary")
 async def get_forecast_summary(
-    background_tasks: BackgroundTasks,
     days: int = Query(default=7, ge=1, le=7)
 ):
     """
@@ -180,12 +182,13 @@ async def get_forecast_summary(
         
         if not all_forecasts:
             # Ejecutar pipeline en segundo plano
-            background_tasks.add_task(run_forecast_pipeline_background)
+            job_id = run_forecast_pipeline_background()
             return {
                 "forecast_days": 0,
                 "total_stations": 0,
                 "daily_summary": [],
-                "message": "Generando pronósticos en segundo plano..."
+                "message": "Generando pronósticos en segundo plano...",
+                "job_id": job_id,
             }
         
         # Crear resumen por día
@@ -234,7 +237,6 @@ async def get_forecast_summary(
 @router.get("/forecast/{station_id}")
 async def get_station_forecast(
     station_id: int,
-    background_tasks: BackgroundTasks,
     days: int = Query(default=7, ge=1, le=7, description="Número de días (1-7)")
 ):
     """
@@ -259,10 +261,11 @@ async def get_station_forecast(
         
         if not forecast_data:
             # Ejecutar pipeline en segundo plano y devolver mensaje
-            background_tasks.add_task(run_forecast_pipeline_background)
+            job_id = run_forecast_pipeline_background()
             raise HTTPException(
                 status_code=202,
-                detail="No hay pronósticos disponibles. Generando pronósticos en segundo plano. Intenta de nuevo en unos momentos."
+                detail="No hay pronósticos disponibles. Generando pronósticos en segundo plano. Intenta de nuevo en unos momentos.",
+                headers={"X-Pipeline-Job-Id": job_id} if job_id else None
             )
         
         # Leer riesgos pre-calculados (ya no usar modelo ML en tiempo real)
@@ -302,7 +305,6 @@ async def get_station_forecast(
 
 @router.get("/forecast")
 async def get_all_stations_forecast(
-    background_tasks: BackgroundTasks,
     days: int = Query(default=7, ge=1, le=7, description="Número de días (1-7)")
 ):
     """
@@ -320,7 +322,7 @@ async def get_all_stations_forecast(
         start_time = time.time()
         
         # Intentar obtener del caché primero
-        cached_data = get_cached_forecasts()
+        cached_data = get_cached_forecasts(days)
         if cached_data:
             elapsed = time.time() - start_time
             logger.info(f"⚡ Forecast servido desde caché en {elapsed:.2f}s")
@@ -333,10 +335,11 @@ async def get_all_stations_forecast(
         
         if not all_forecasts:
             # Ejecutar pipeline en segundo plano y devolver mensaje
-            background_tasks.add_task(run_forecast_pipeline_background)
+            job_id = run_forecast_pipeline_background()
             raise HTTPException(
                 status_code=202,
-                detail="No hay pronósticos disponibles. Generando pronósticos en segundo plano. Intenta de nuevo en unos momentos."
+                detail="No hay pronósticos disponibles. Generando pronósticos en segundo plano. Intenta de nuevo en unos momentos.",
+                headers={"X-Pipeline-Job-Id": job_id} if job_id else None
             )
         
         # Procesar estaciones en paralelo con ThreadPoolExecutor
@@ -395,7 +398,7 @@ async def get_all_stations_forecast(
                     logger.error(f"Error procesando estación {station.get('name')}: {e}")
         
         # Guardar en caché antes de devolver
-        set_cached_forecasts(stations_forecast)
+        set_cached_forecasts(days, stations_forecast)
         
         elapsed = time.time() - start_time
         logger.info(f"✅ Forecast procesado y cacheado en {elapsed:.2f}s ({len(stations_forecast)} estaciones)")
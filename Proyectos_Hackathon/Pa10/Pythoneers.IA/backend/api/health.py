@@ -26,3 +26,10 @@ async def readiness():
         "ready": True,
         "message": "Backend operacional"
     }
+
+
+@router.get("/cache")
+async def cache_stats():
+    """Métricas de la caché de predicciones (aciertos, fallos, expulsiones)."""
+    from core.ml.prediction_cache import get_prediction_cache
+    return get_prediction_cache().stats()
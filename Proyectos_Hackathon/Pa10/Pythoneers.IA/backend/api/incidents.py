@@ -68,30 +68,12 @@ async def create_incident_report(report: IncidentReportCreate):
         
         logger.info(f"Reporte creado: ID={report_id}, Tipo={report.incident_type}, Severidad={report.severity}")
         
-        # Trigger automático de re-entrenamiento en background
+        # Trigger automático de re-entrenamiento en el pool de jobs
+        # (solo entrena con 10+ incidentes; reportes seguidos comparten el mismo job)
         try:
-            from core.ml.incident_correlation import get_incident_training_data
-            import threading
-            
-            def retrain_model():
-                """Re-entrena el modelo con el nuevo incidente."""
-                try:
-                    # Verificar que hay suficientes incidentes (mínimo 10)
-                    X, y_flood, y_drought = get_incident_training_data()
-                    if len(X) >= 10:
-                        logger.info(f"🔄 Re-entrenando modelo con {len(X)} incidentes...")
-                        from core.ml import train_model_from_history
-                        train_model_from_history(days_back=7)
-                        logger.info("✅ Modelo re-entrenado exitosamente")
-                    else:
-                        logger.info(f"⏳ Esperando más incidentes para re-entrenamiento ({len(X)}/10)")
-                except Exception as e:
-                    logger.warning(f"⚠️ No se pudo re-entrenar modelo: {e}")
-            
-            # Ejecutar en thread separado para no bloquear la respuesta
-            thread = threading.Thread(target=retrain_model, daemon=True, name="ModelRetraining")
-            thread.start()
-            
+            from core.pipelines.jobs import get_job_manager
+            job = get_job_manager().submit("training", days_back=7, min_incidents=10)
+            logger.info(f"🔄 Re-entrenamiento encolado (job {job.id})")
         except Exception as e:
             logger.warning(f"⚠️ No se pudo iniciar re-entrenamiento automático: {e}")
         
@@ -210,17 +192,11 @@ async def update_incident_report(
 async def delete_incident_report(incident_id: int):
     """Elimina un reporte de incidencia."""
     try:
-        from core.database.raindrop_db import DATABASE_PATH
-        import sqlite3
+        from core.database.raindrop_db import get_connection
         
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM incident_reports WHERE id = ?", (incident_id,))
-        deleted = cursor.rowcount > 0
-        
-        conn.commit()
-        conn.close()
+        with get_connection() as conn:
+            cursor = conn.execute("DELETE FROM incident_reports WHERE id = ?", (incident_id,))
+            deleted = cursor.rowcount > 0
         
         if not deleted:
             raise HTTPException(
@@ -1,15 +1,20 @@
 """
-API Router para ejecutar pipelines de ETL
+API Router para ejecutar pipelines de ETL.
+
+Los pipelines corren dentro del proceso como jobs (core.pipelines.jobs): cada
+disparo devuelve un job_id con progreso consultable y cancelable, y los eventos
+de los jobs se reenvían a los clientes WebSocket.
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import StreamingResponse
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 import asyncio
 import logging
 import json
 from datetime import datetime
-from pathlib import Path
+
+from core.pipelines.jobs import get_job_manager, PipelineJob
 
 router = APIRouter(prefix="/api/pipelines", tags=["pipelines"])
 
@@ -44,20 +49,69 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-# Mapeo de pipelines disponibles
+# Mapeo de pipelines disponibles (las funciones que los ejecutan están en core.pipelines.jobs)
 AVAILABLE_PIPELINES = {
     "meteosource": {
         "name": "Meteosource Real-Time",
         "description": "Obtiene datos climáticos en tiempo real de las +250 estaciones usando Meteosource API",
-        "command": ["python", "-m", "core.pipelines.etl.meteosource.meteosource_pipeline"],
+    },
+    "forecast": {
+        "name": "Pronósticos Meteosource",
+        "description": "Descarga pronósticos de hoy y mañana y pre-calcula los riesgos de inundación y sequía",
+    },
+    "training": {
+        "name": "Entrenamiento del Modelo",
+        "description": "Re-entrena los modelos de riesgo con el histórico de la base de datos",
     },
     "generate_dummy": {
         "name": "Generar Datos Dummy",
         "description": "Genera datos climáticos sintéticos para entrenamiento del modelo ML (5000+ registros)",
-        "command": ["python", "-m", "core.pipelines.etl.generate_dummy_data"],
     },
 }
 
+# Eventos de jobs que se reenvían por WebSocket (los demás solo se consultan por /jobs)
+BROADCAST_EVENTS = {"pipeline_started", "pipeline_log", "pipeline_completed"}
+
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _forward_job_event(event: str, job: PipelineJob, extra: Dict[str, Any]):
+    """Listener del pool de jobs (corre en el hilo del worker): reenvía al event loop de la API."""
+    if event not in BROADCAST_EVENTS or _event_loop is None or _event_loop.is_closed():
+        return
+    
+    message = {
+        "type": event,
+        "pipeline": job.pipeline,
+        "job_id": job.id,
+        "progress": round(job.progress, 4),
+        "timestamp": datetime.now().isoformat(),
+    }
+    if event == "pipeline_log":
+        message["message"] = extra.get("message", "")
+        message["level"] = extra.get("level", "info")
+    elif event == "pipeline_completed":
+        message["status"] = "success" if job.status == "succeeded" else "error"
+        message["job_status"] = job.status
+        if job.status != "succeeded":
+            message["error"] = job.error or job.message
+    
+    asyncio.run_coroutine_threadsafe(manager.broadcast(message), _event_loop)
+
+
+def _ensure_job_events():
+    """Registra (una vez) el reenvío de eventos de jobs al event loop actual."""
+    global _event_loop
+    _event_loop = asyncio.get_running_loop()
+    get_job_manager().add_listener(_forward_job_event)
+
+
+def _get_job_or_404(job_id: str) -> PipelineJob:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' no encontrado")
+    return job
+
 
 @router.get("/available")
 async def get_available_pipelines():
@@ -77,8 +131,9 @@ async def get_available_pipelines():
 @router.post("/run/{pipeline_name}")
 async def run_pipeline(pipeline_name: str, use_random: bool = True):
     """
-    Ejecutar un pipeline específico.
-    El progreso se envía por WebSocket.
+    Ejecutar un pipeline específico en el pool de jobs.
+    Si ya hay una ejecución igual en curso se devuelve su job en lugar de lanzar otra.
+    El progreso se envía por WebSocket y se puede consultar en /jobs/{job_id}.
     
     Args:
         pipeline_name: Nombre del pipeline a ejecutar
@@ -90,37 +145,13 @@ async def run_pipeline(pipeline_name: str, use_random: bool = True):
             detail=f"Pipeline '{pipeline_name}' no encontrado"
         )
     
-    pipeline_config = AVAILABLE_PIPELINES[pipeline_name].copy()
-    
-    # Si es generate_dummy, agregar parámetro use_random al comando
-    if pipeline_name == "generate_dummy":
-        pipeline_config["use_random"] = use_random
-    
-    # Enviar notificación de inicio
-    await manager.broadcast({
-        "type": "pipeline_started",
-        "pipeline": pipeline_name,
-        "timestamp": datetime.now().isoformat(),
-    })
+    params = {"use_random": use_random} if pipeline_name == "generate_dummy" else {}
     
     try:
-        # Verificar si es una secuencia de pipelines
-        if pipeline_name == "all" and "sequence" in pipeline_config:
-            # Ejecutar secuencia en background
-            asyncio.create_task(
-                execute_pipeline_sequence(pipeline_name, pipeline_config["sequence"])
-            )
-        else:
-            # Ejecutar pipeline individual en background
-            asyncio.create_task(
-                execute_pipeline_background(pipeline_name, pipeline_config)
-            )
-        
-        return {
-            "status": "started",
-            "pipeline": pipeline_name,
-            "message": f"Pipeline '{pipeline_config['name']}' iniciado",
-        }
+        _ensure_job_events()
+        job_manager = get_job_manager()
+        active_before = {job.id for job in job_manager.list_jobs(pipeline_name, active_only=True)}
+        job = job_manager.submit(pipeline_name, **params)
     except Exception as e:
         logger.error(f"Error ejecutando pipeline: {e}")
         await manager.broadcast({
@@ -130,183 +161,54 @@ async def run_pipeline(pipeline_name: str, use_random: bool = True):
             "timestamp": datetime.now().isoformat(),
         })
         raise HTTPException(status_code=500, detail=str(e))
+    
+    already_running = job.id in active_before
+    return {
+        "status": "already_running" if already_running else "started",
+        "pipeline": pipeline_name,
+        "job_id": job.id,
+        "message": (
+            f"Pipeline '{AVAILABLE_PIPELINES[pipeline_name]['name']}' ya está en ejecución"
+            if already_running else
+            f"Pipeline '{AVAILABLE_PIPELINES[pipeline_name]['name']}' iniciado"
+        ),
+    }
 
 
-async def execute_pipeline_sequence(sequence_name: str, pipeline_ids: List[str]):
+@router.get("/jobs")
+async def list_pipeline_jobs(pipeline: Optional[str] = None, active: bool = False):
     """
-    Ejecutar múltiples pipelines en secuencia
-    """
-    total = len(pipeline_ids)
+    Lista los jobs de pipelines (más recientes primero).
     
-    try:
-        for idx, pipeline_id in enumerate(pipeline_ids, 1):
-            if pipeline_id not in AVAILABLE_PIPELINES:
-                logger.error(f"Pipeline {pipeline_id} no encontrado en secuencia")
-                continue
-            
-            pipeline_config = AVAILABLE_PIPELINES[pipeline_id]
-            
-            # Notificar inicio del pipeline individual
-            await manager.broadcast({
-                "type": "pipeline_log",
-                "pipeline": sequence_name,
-                "message": f"[{idx}/{total}] Iniciando {pipeline_config['name']}...",
-                "level": "info",
-                "timestamp": datetime.now().isoformat(),
-            })
-            
-            # Ejecutar pipeline y esperar a que termine
-            success = await execute_single_pipeline(pipeline_id, pipeline_config, sequence_name)
-            
-            if not success:
-                # Si falla, detener la secuencia
-                await manager.broadcast({
-                    "type": "pipeline_completed",
-                    "pipeline": sequence_name,
-                    "status": "error",
-                    "error": f"La secuencia falló en: {pipeline_config['name']}",
-                    "timestamp": datetime.now().isoformat(),
-                })
-                return
-            
-            # Notificar completado del pipeline individual
-            await manager.broadcast({
-                "type": "pipeline_log",
-                "pipeline": sequence_name,
-                "message": f"[{idx}/{total}]  {pipeline_config['name']} completado",
-                "level": "info",
-                "timestamp": datetime.now().isoformat(),
-            })
-        
-        # Todos completados exitosamente
-        await manager.broadcast({
-            "type": "pipeline_completed",
-            "pipeline": sequence_name,
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-        })
-        
-    except Exception as e:
-        logger.error(f"Error en secuencia {sequence_name}: {e}", exc_info=True)
-        await manager.broadcast({
-            "type": "pipeline_completed",
-            "pipeline": sequence_name,
-            "status": "error",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat(),
-        })
+    Args:
+        pipeline: Filtrar por nombre de pipeline
+        active: Solo jobs en cola o en ejecución
+    """
+    jobs = get_job_manager().list_jobs(pipeline, active_only=active)
+    return {"jobs": [job.to_dict() for job in jobs]}
 
 
-async def execute_single_pipeline(pipeline_id: str, pipeline_config: Dict, parent_name: str = None) -> bool:
+@router.get("/jobs/{job_id}")
+async def get_pipeline_job(job_id: str, logs: bool = False):
     """
-    Ejecutar un pipeline individual y retornar si fue exitoso
-    """
-    try:
-        # Para generate_dummy, ejecutar directamente como función para compartir estado
-        if pipeline_id == "generate_dummy":
-            from core.pipelines.etl.generate_dummy_data import generate_dummy_weather_data
-            
-            use_random = pipeline_config.get("use_random", True)
-            logger.info(f"Ejecutando generate_dummy directamente (use_random={use_random})")
-            
-            # Ejecutar en thread pool para no bloquear el loop asyncio
-            loop = asyncio.get_event_loop()
-            try:
-                await loop.run_in_executor(
-                    None,
-                    generate_dummy_weather_data,
-                    365,  # days_back
-                    None,  # stations_to_use (None = todas)
-                    use_random,
-                    24  # records_per_day
-                )
-                return True
-            except Exception as e:
-                logger.error(f"Error en generate_dummy: {e}", exc_info=True)
-                return False
-        
-        # Para otros pipelines, continuar con subprocess
-        backend_path = Path(__file__).parent.parent
-        
-        logger.info(f"Ejecutando pipeline: {pipeline_id}")
-        
-        # Construir comando base
-        cmd = pipeline_config["command"].copy()
-        
-        # Crear proceso
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=str(backend_path),
-        )
-        
-        # Leer stdout y stderr en paralelo
-        async def read_stream(stream, is_error=False):
-            while True:
-                line = await stream.readline()
-                if not line:
-                    break
-                
-                log_line = line.decode().strip()
-                if log_line:
-                    logger.info(f"[{pipeline_id}] {log_line}")
-                    
-                    # Detectar nivel real del log (INFO, ERROR, WARNING)
-                    # Los logs de Python pueden venir por stderr incluso si son INFO
-                    detected_level = "info"
-                    if "ERROR" in log_line.upper() or "EXCEPTION" in log_line.upper():
-                        detected_level = "error"
-                    elif "WARNING" in log_line.upper():
-                        detected_level = "warning"
-                    
-                    await manager.broadcast({
-                        "type": "pipeline_log",
-                        "pipeline": parent_name or pipeline_id,
-                        "message": log_line,  # Sin espacios adicionales
-                        "level": detected_level,
-                        "timestamp": datetime.now().isoformat(),
-                    })
-        
-        # Leer ambos streams en paralelo
-        await asyncio.gather(
-            read_stream(process.stdout, False),
-            read_stream(process.stderr, True)
-        )
-        
-        # Esperar a que termine el proceso
-        await process.wait()
-        
-        return process.returncode == 0
+    Estado y progreso de un job.
     
-    except Exception as e:
-        logger.error(f"Error en pipeline {pipeline_id}: {e}", exc_info=True)
-        return False
+    Args:
+        job_id: ID devuelto por /run
+        logs: Incluir las últimas líneas de log del job
+    """
+    return _get_job_or_404(job_id).to_dict(include_logs=logs)
 
 
-async def execute_pipeline_background(pipeline_name: str, pipeline_config: Dict):
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_pipeline_job(job_id: str):
     """
-    Ejecutar pipeline en background y enviar logs por WebSocket
+    Cancela un job. Si está en cola no llega a ejecutarse; si está corriendo
+    se detiene en el siguiente punto de control del pipeline.
     """
-    success = await execute_single_pipeline(pipeline_name, pipeline_config)
-    
-    if success:
-        logger.info(f"Pipeline {pipeline_name} completado exitosamente")
-        await manager.broadcast({
-            "type": "pipeline_completed",
-            "pipeline": pipeline_name,
-            "status": "success",
-            "timestamp": datetime.now().isoformat(),
-        })
-    else:
-        logger.error(f"Pipeline {pipeline_name} falló")
-        await manager.broadcast({
-            "type": "pipeline_completed",
-            "pipeline": pipeline_name,
-            "status": "error",
-            "error": "El pipeline finalizó con errores",
-            "timestamp": datetime.now().isoformat(),
-        })
+    _get_job_or_404(job_id)
+    job = get_job_manager().cancel(job_id)
+    return job.to_dict()
 
 
 @router.get("/progress/generate_dummy")
@@ -392,6 +294,7 @@ async def websocket_logs(websocket: WebSocket):
     WebSocket para recibir logs de pipelines en tiempo real
     """
     await manager.connect(websocket)
+    _ensure_job_events()
     logger.info("Cliente WebSocket conectado")
     
     try:
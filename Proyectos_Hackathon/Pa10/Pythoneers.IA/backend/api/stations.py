@@ -2,20 +2,23 @@
 API router para endpoints de estaciones respaldados por los servicios
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import logging
-from typing import Optional, List
+from typing import Literal, Optional, List, Tuple
 
+import numpy as np
 import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
 from services import Predictor, RiskCalculator
-from core.ml.risk_predictor import RiskPredictor
+from core.ml.risk_predictor import RiskPredictor, build_feature_frame
+from core.ml.prediction_cache import get_prediction_cache, model_version
 from config import STATIONS, DATA_CLEAN_PATH
 from pathlib import Path
 from core.database.raindrop_db import (
     get_all_stations_latest, 
     get_latest_data_by_station,
+    get_weather_history,
     upsert_alert,
     remove_alert,
     get_station_alert,
@@ -25,17 +28,26 @@ from core.database.raindrop_db import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Instancia singleton del modelo ML
+RISK_MODEL_PATH = Path(__file__).parent.parent / "ml_models" / "risk_model.joblib"
+
+# Resolución automática del histórico según los días pedidos
+HISTORY_HOURLY_MAX_DAYS = 7
+HISTORY_DAILY_MAX_DAYS = 180
+HISTORY_VARIABLES = {"temperature", "humidity", "rainfall", "wind_speed", "pressure"}
+
+# Instancia singleton del modelo ML (se recarga si el archivo cambia tras un reentrenamiento)
 _risk_predictor_instance = None
+_risk_predictor_version = None
 
 def get_risk_predictor():
     """Obtiene una instancia singleton del RiskPredictor."""
-    global _risk_predictor_instance
-    if _risk_predictor_instance is None:
-        model_path = Path(__file__).parent.parent / "ml_models" / "risk_model.joblib"
-        if model_path.exists():
-            _risk_predictor_instance = RiskPredictor(model_path=model_path)
-            logger.info(f"✅ Modelo ML cargado (singleton): {model_path}")
+    global _risk_predictor_instance, _risk_predictor_version
+    version = model_version(RISK_MODEL_PATH)
+    if version != _risk_predictor_version:
+        _risk_predictor_version = version
+        if RISK_MODEL_PATH.exists():
+            _risk_predictor_instance = RiskPredictor(model_path=RISK_MODEL_PATH)
+            logger.info(f"✅ Modelo ML cargado (singleton): {RISK_MODEL_PATH}")
         else:
             _risk_predictor_instance = None
             logger.warning("⚠️ Modelo ML no encontrado, usando cálculo simple")
@@ -87,6 +99,78 @@ def _get_current_conditions(station_id: int) -> dict:
         }
 
 
+def _simple_risk_probabilities(rainfall: np.ndarray, humidity: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cálculo simple (sin modelo) de probabilidades de inundación y sequía, vectorizado."""
+    flood_prob = np.minimum(0.95, (rainfall / 50.0) * 0.6 + (humidity / 100.0) * 0.4)
+    drought_prob = np.minimum(0.95, (1 - rainfall / 50.0) * 0.6 + (1 - humidity / 100.0) * 0.4)
+    return flood_prob, drought_prob
+
+
+def _compute_station_risks(stations_data: List[dict]) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """
+    Calcula las probabilidades de riesgo de las estaciones dadas en lote.
+    Usa una sola llamada al modelo ML por target; si el modelo no está
+    disponible, aplica el cálculo simple sobre toda la tabla.
+    
+    Returns:
+        Tuple (flood_prob, drought_prob, from_model); from_model es False si se
+        usó el cálculo simple
+    """
+    frame = pd.DataFrame(stations_data)
+    try:
+        ml_predictor = get_risk_predictor()
+        if not ml_predictor:
+            raise ValueError("Modelo no disponible")
+        
+        predictions = ml_predictor.predict_batch(build_feature_frame(frame))
+        return predictions['flood_risk'], predictions['drought_risk'], True
+    except Exception as e:
+        # Fallback: cálculo simple si el modelo no está disponible
+        logger.warning(f"Usando cálculo simple para {len(stations_data)} estaciones: {e}")
+        conditions = frame.reindex(columns=["precipitation_total", "humidity"])
+        conditions = conditions.apply(pd.to_numeric, errors="coerce").fillna(0.0)
+        flood_prob, drought_prob = _simple_risk_probabilities(
+            conditions["precipitation_total"].to_numpy(), conditions["humidity"].to_numpy()
+        )
+        return flood_prob, drought_prob, False
+
+
+def _predict_station_risks(stations_data: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Probabilidades de riesgo de todas las estaciones, usando la caché de predicciones.
+    
+    Cada estación se busca por (station_id, timestamp de su última observación,
+    versión del modelo); solo las que fallan en caché se calculan, en un único lote.
+    Solo se guardan en caché las predicciones del modelo: el cálculo simple de
+    respaldo se repite hasta que el modelo vuelva a estar disponible.
+    
+    Args:
+        stations_data: Últimas observaciones por estación
+    
+    Returns:
+        Tuple (flood_prob, drought_prob) alineados con stations_data
+    """
+    cache = get_prediction_cache()
+    version = model_version(RISK_MODEL_PATH)
+    keys = [(s.get("station_id"), s.get("timestamp")) for s in stations_data]
+    
+    cached = cache.get_many("station_risk", keys, version)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    
+    if missing:
+        flood_new, drought_new, from_model = _compute_station_risks([stations_data[i] for i in missing])
+        computed = {
+            keys[i]: (float(flood), float(drought))
+            for i, flood, drought in zip(missing, flood_new, drought_new)
+        }
+        if from_model:
+            cache.set_many("station_risk", computed, version)
+        cached.update(computed)
+    
+    risks = np.array([cached[key] for key in keys], dtype=float).reshape(-1, 2)
+    return risks[:, 0], risks[:, 1]
+
+
 def _manage_alert(station_id: int, station_name: str, alert_type: str, 
                   probability: float, risk_level: str) -> None:
     """
@@ -157,6 +241,12 @@ async def list_all_stations():
         # Crear mapa de datos por estación
         station_data_map = {s["station_id"]: s for s in all_stations_data}
         
+        # Calcular riesgos de todas las estaciones con una sola llamada al modelo por target
+        flood_array, drought_array = _predict_station_risks(all_stations_data)
+        station_ids = [s["station_id"] for s in all_stations_data]
+        flood_probs = dict(zip(station_ids, flood_array))
+        drought_probs = dict(zip(station_ids, drought_array))
+        
         # Cargar TODAS las alertas de una vez (evita 500+ consultas individuales)
         all_alerts = get_all_alerts_by_station()
         
@@ -191,38 +281,11 @@ async def list_all_stations():
                 })
                 continue
             
-            # Calcular probabilidades usando el modelo ML entrenado
-            try:
-                ml_predictor = get_risk_predictor()
-                if ml_predictor:
-                    # Preparar features para el modelo
-                    features = {
-                        'temperature': float(station_data.get('temperature') or 25.0),
-                        'humidity': float(station_data.get('humidity') or 70.0),
-                        'precipitation_total': float(station_data.get('precipitation_total') or 0.0),
-                        'wind_speed': float(station_data.get('wind_speed') or 0.0),
-                        'pressure': float(station_data.get('pressure') or 1013.0),
-                        # Cambios estimados vs promedios típicos de Panamá
-                        'temp_change': float(station_data.get('temperature') or 25.0) - 27.0,
-                        'humidity_change': float(station_data.get('humidity') or 70.0) - 75.0,
-                        'precip_change': float(station_data.get('precipitation_total') or 0.0) - 5.0,
-                        'wind_change': float(station_data.get('wind_speed') or 0.0) - 10.0,
-                        'pressure_change': float(station_data.get('pressure') or 1013.0) - 1013.0
-                    }
-                    
-                    # Usar modelo ML para predicción
-                    predictions = ml_predictor.predict(features)
-                    flood_prob = predictions['flood_risk']
-                    drought_prob = predictions['drought_risk']
-                else:
-                    raise ValueError("Modelo no disponible")
-            except Exception as e:
-                # Fallback: cálculo simple si el modelo no está disponible
-                logger.warning(f"Usando cálculo simple para estación {station_id}: {e}")
-                rainfall = float(station_data.get("precipitation_total") or 0.0)
-                humidity = float(station_data.get("humidity") or 0.0)
-                flood_prob = min(0.95, (rainfall / 50.0) * 0.6 + (humidity / 100.0) * 0.4)
-                drought_prob = min(0.95, (1 - rainfall / 50.0) * 0.6 + (1 - humidity / 100.0) * 0.4)
+            # Probabilidades precalculadas en lote para todas las estaciones
+            flood_prob = float(flood_probs[station_id])
+            drought_prob = float(drought_probs[station_id])
+            rainfall = float(station_data.get("precipitation_total") or 0.0)
+            humidity = float(station_data.get("humidity") or 0.0)
             
             # Determinar niveles categóricos
             flood_level = predictor._get_risk_level(flood_prob)
@@ -349,49 +412,89 @@ async def get_station(station_id: int):
         raise HTTPException(status_code=500, detail="Error al procesar datos de la estación")
 
 
+def _history_point(row: dict, resolution: str) -> dict:
+    """Convierte una fila horaria o de rollup al formato de la respuesta de histórico."""
+    def value(key):
+        return round(float(row[key]), 2) if row.get(key) is not None else None
+    
+    if resolution == "hourly":
+        return {
+            "date": row["date"],
+            "timestamp": row["timestamp"],
+            "temperature": value("temperature"),
+            "humidity": value("humidity"),
+            "rainfall": value("precipitation_total"),
+            "wind_speed": value("wind_speed"),
+            "pressure": value("pressure"),
+        }
+    
+    return {
+        "date": row.get("date") or row.get("week_start"),
+        "observations": row["obs_count"],
+        "temperature": value("temperature_avg"),
+        "temperature_min": value("temperature_min"),
+        "temperature_max": value("temperature_max"),
+        "humidity": value("humidity_avg"),
+        "rainfall": value("precipitation_total"),
+        "rainfall_max": value("precipitation_max"),
+        "wind_speed": value("wind_speed_avg"),
+        "wind_speed_max": value("wind_speed_max"),
+        "pressure": value("pressure_avg"),
+    }
+
+
 @router.get("/{station_id}/history")
-async def get_station_history(station_id: int, days: int = 30, variable: Optional[str] = None):
-    """Histórico simple por estación (últimos `days`)."""
+async def get_station_history(
+    station_id: int,
+    days: int = Query(30, ge=1, le=3650),
+    variable: Optional[str] = None,
+    resolution: Literal["auto", "hourly", "daily", "weekly"] = "auto"
+):
+    """
+    Histórico por estación (últimos `days`).
+    
+    Con resolution=auto se elige según el rango: lecturas horarias hasta
+    HISTORY_HOURLY_MAX_DAYS, rollups diarios hasta HISTORY_DAILY_MAX_DAYS y
+    semanales para rangos mayores (varios años se sirven con pocas filas).
+    
+    Args:
+        station_id: ID de la estación
+        days: Días hacia atrás
+        variable: Devolver solo una variable (temperature, humidity, rainfall, wind_speed, pressure)
+        resolution: auto, hourly, daily o weekly
+    """
     try:
         station_info = _get_station_info(station_id)
         if not station_info:
             raise HTTPException(status_code=404, detail=f"Estación {station_id} no encontrada")
-
-        file_path = DATA_CLEAN_PATH / "master_dataset_final.csv"
-        if not file_path.exists():
-            return {"station_id": station_id, "station_name": station_info.get("name"), "days": days, "data": []}
-
-        df = pd.read_csv(file_path)
-
-        date_col = "FECHA" if "FECHA" in df.columns else "date" if "date" in df.columns else None
-        if date_col:
-            df[date_col] = pd.to_datetime(df[date_col])
-
-        station_col = "station_id" if "station_id" in df.columns else "ESTACION" if "ESTACION" in df.columns else None
-        if station_col:
-            df = df[df[station_col] == station_id]
-
-        if df.empty:
-            return {"station_id": station_id, "station_name": station_info.get("name"), "days": days, "data": []}
-
-        if date_col:
-            cutoff = pd.Timestamp.now() - pd.Timedelta(days=days)
-            df = df[df[date_col] >= cutoff]
-
-        history = []
-        for _, row in df.iterrows():
-            history.append({
-                "date": row[date_col].strftime("%Y-%m-%d") if date_col else None,
-                "temperature": float(row.get("TEMP", 0)),
-                "humidity": float(row.get("HUMEDAD", 0)),
-                "rainfall": float(row.get("LLUVIA", 0)),
-                "wind_speed": float(row.get("VIENTO", 0)),
-            })
-
+        
+        if variable and variable not in HISTORY_VARIABLES:
+            raise HTTPException(status_code=400, detail=f"Variable '{variable}' no soportada")
+        
+        if resolution == "auto":
+            if days <= HISTORY_HOURLY_MAX_DAYS:
+                resolution = "hourly"
+            elif days <= HISTORY_DAILY_MAX_DAYS:
+                resolution = "daily"
+            else:
+                resolution = "weekly"
+        
+        end_date = datetime.now(timezone.utc).date()
+        start_date = end_date - timedelta(days=days)
+        rows = get_weather_history(station_id, start_date.isoformat(), end_date.isoformat(), resolution)
+        history = [_history_point(row, resolution) for row in rows]
+        
+        if variable:
+            history = [
+                {key: point[key] for key in point if key in ("date", "timestamp", "observations") or key.startswith(variable)}
+                for point in history
+            ]
+        
         return {
             "station_id": station_id,
             "station_name": station_info.get("name"),
             "days": days,
+            "resolution": resolution,
             "data": history,
         }
     except HTTPException:
@@ -403,7 +506,14 @@ async def get_station_history(station_id: int, days: int = 30, variable: Optiona
 
 @router.get("/alerts")
 async def get_all_alerts():
-    """Obtiene todas las alertas activas de todas las estaciones basadas en datos reales de Meteosource."""
+    """
+    Obtiene todas las alertas activas de todas las estaciones basadas en datos reales de Meteosource.
+
+    Las probabilidades salen del modelo ML (RiskPredictor), igual que en /stations,
+    de modo que ambos endpoints coinciden en qué estaciones están en alerta. Antes
+    este endpoint usaba siempre la fórmula simple de lluvia y humedad, que ahora solo
+    se aplica si el modelo no está disponible (_compute_station_risks).
+    """
     try:
         # Obtener último dato de cada estación
         all_stations_data = get_all_stations_latest()
@@ -419,20 +529,18 @@ async def get_all_alerts():
         predictor = Predictor()
         all_alerts = []
         
-        for station_data in all_stations_data:
+        # Calcular riesgos de todas las estaciones en lote
+        flood_probs, drought_probs = _predict_station_risks(all_stations_data)
+        
+        for station_data, flood_prob, drought_prob in zip(all_stations_data, flood_probs, drought_probs):
             station_id = station_data.get("station_id")
+            flood_prob = float(flood_prob)
+            drought_prob = float(drought_prob)
             
             # Condiciones actuales reales - validar None
             rainfall = float(station_data.get("precipitation_total") or 0.0)
             humidity = float(station_data.get("humidity") or 0.0)
             
-            # Calcular probabilidades basadas en condiciones
-            # Riesgo de inundación: aumenta con lluvia y humedad alta
-            flood_prob = min(0.95, (rainfall / 50.0) * 0.6 + (humidity / 100.0) * 0.4)
-            
-            # Riesgo de sequía: aumenta con poca lluvia y baja humedad  
-            drought_prob = min(0.95, (1 - rainfall / 50.0) * 0.6 + (1 - humidity / 100.0) * 0.4)
-            
             # Generar alerta de inundación si probabilidad >= 50%
             if flood_prob >= 0.5:
                 level = predictor._get_risk_level(flood_prob)
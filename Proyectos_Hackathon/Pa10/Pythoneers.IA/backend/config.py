@@ -30,7 +30,7 @@ FEATURE_IMPORTANCES = "feature_importances.json"
 # Data file names
 MASTER_DATASET = "master_dataset_final.csv"
 STATION_RISK_CACHE = "station_risk_cache.json"
-PREDICTIONS_CACHE = "predictions_cache.json"
+PREDICTIONS_CACHE = "predictions_cache.pkl"  # Caché de predicciones compartida (core/ml/prediction_cache.py)
 LATEST_IMHPA = "latest_imhpa_data.csv"
 
 # Scheduler configuration
@@ -58,6 +58,11 @@ RISK_LEVELS = {
     "RED": (0.8, 1.0),        # High risk
 }
 
+# Anomaly scoring (z-score)
+ANOMALY_Z_THRESHOLD = 2.0
+ANOMALY_MIN_SAMPLES = 3          # readings per station before scoring
+ANOMALY_VARIABLES = ["precipitation_total", "temperature"]  # scored on each hourly ingest
+
 # Feature columns
 FEATURE_COLUMNS = ["TEMP", "HUMEDAD", "LLUVIA", "VIENTO", "elevation_m"]
 LABEL_COLUMNS = {
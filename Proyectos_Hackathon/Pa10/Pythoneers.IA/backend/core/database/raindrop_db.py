@@ -5,29 +5,228 @@ Implementa:
 - Schema relacional con deduplicación por hora
 - Solo se mantiene el último registro de cada hora por estación
 - Agrupación por día y hora
+- Conexiones compartidas por hilo (WAL) para handlers y jobs del scheduler
+- Almacenamiento por niveles: tabla caliente, particiones mensuales y rollups diario/semanal
 """
 
+import json
+import math
+import os
 import sqlite3
-from datetime import datetime, timezone, timedelta
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import date as date_type, datetime, timezone, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple, Callable, Set
 import logging
 
+import pandas as pd
+
 logger = logging.getLogger(__name__)
 
 # Path a la base de datos
 DATABASE_PATH = Path(__file__).parent.parent / "database" / "raindrop.db"
 DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
 
+# Columnas de weather_hourly en el orden usado por las inserciones
+WEATHER_HOURLY_COLUMNS = [
+    "station_id", "station_name", "region", "latitude", "longitude", "elevation",
+    "date", "hour", "timestamp",
+    "temperature", "feels_like", "humidity",
+    "wind_speed", "wind_direction", "wind_angle",
+    "precipitation_total", "precipitation_type",
+    "pressure", "cloud_cover", "summary", "icon",
+    "created_at", "updated_at",
+]
 
-def init_database():
-    """Inicializa el schema de la base de datos."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+# Columnas que se sobrescriben cuando ya existe la lectura de esa estación/hora
+WEATHER_HOURLY_UPDATE_COLUMNS = [
+    "timestamp", "temperature", "feels_like", "humidity",
+    "wind_speed", "wind_direction", "wind_angle",
+    "precipitation_total", "precipitation_type",
+    "pressure", "cloud_cover", "summary", "icon",
+    "updated_at",
+]
+
+# Almacenamiento por niveles de las lecturas horarias:
+# - weather_hourly: ventana caliente (lecturas recientes)
+# - weather_hourly_pYYYYMM: una tabla por mes con las lecturas archivadas
+# - weather_daily / weather_weekly: agregados mantenidos en cada ingesta
+# Las fechas anteriores a storage_meta.hot_start_date viven solo en las particiones;
+# station_latest apunta a la partición si la estación no tiene lecturas recientes.
+WEATHER_HOT_DAYS = int(os.getenv("WEATHER_HOT_DAYS", "90"))
+PARTITION_PREFIX = "weather_hourly_p"
+
+# Agregados de los rollups (misma definición para el diario y el semanal)
+ROLLUP_AGGREGATES = {
+    "obs_count": "COUNT(*)",
+    "temperature_avg": "AVG(temperature)",
+    "temperature_min": "MIN(temperature)",
+    "temperature_max": "MAX(temperature)",
+    "humidity_avg": "AVG(humidity)",
+    "precipitation_total": "SUM(precipitation_total)",
+    "precipitation_max": "MAX(precipitation_total)",
+    "wind_speed_avg": "AVG(wind_speed)",
+    "wind_speed_max": "MAX(wind_speed)",
+    "pressure_avg": "AVG(pressure)",
+}
+ROLLUP_SOURCE_COLUMNS = ["station_id", "date", "temperature", "humidity", "precipitation_total", "wind_speed", "pressure"]
+
+# Lunes de la semana de una fecha YYYY-MM-DD (inicio de semana de weather_weekly)
+WEEK_START_SQL = "date({}, '-6 days', 'weekday 1')"
+
+# Tamaño de la caché de sentencias preparadas por conexión
+STATEMENT_CACHE_SIZE = 256
+
+# Espera máxima (segundos) cuando la base está bloqueada por otra escritura
+BUSY_TIMEOUT_SECONDS = 30
+
+# Conexiones abiertas por hilo: {(ruta, solo_lectura): conexión}
+# y profundidad de get_connection() anidados por conexión de escritura
+_thread_state = threading.local()
+_connections_lock = threading.Lock()
+_open_connections: List[Tuple[weakref.ref, sqlite3.Connection]] = []
+
+# Callbacks notificados tras cada ingesta: callback(tabla, station_ids)
+_ingest_listeners: List[Callable[[str, Set[int]], None]] = []
+
+
+def add_ingest_listener(callback: Callable[[str, Set[int]], None]) -> None:
+    """Registra un callback que se llama tras confirmar una ingesta (p.ej. para invalidar cachés)."""
+    if callback not in _ingest_listeners:
+        _ingest_listeners.append(callback)
+
+
+def _notify_ingest(table: str, station_ids: Set[int]) -> None:
+    for callback in list(_ingest_listeners):
+        try:
+            callback(table, station_ids)
+        except Exception as e:
+            logger.warning(f" Error notificando ingesta de {table}: {e}")
+
+
+def _open_connection(read_only: bool) -> sqlite3.Connection:
+    """Abre y configura una conexión nueva (WAL, synchronous=NORMAL, caché de sentencias)."""
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=BUSY_TIMEOUT_SECONDS,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # solo la usa su hilo; se cierra desde otro al apagar
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+def _close_dead_thread_connections() -> None:
+    """Cierra las conexiones de hilos que ya terminaron (p.ej. threads de pipelines)."""
+    with _connections_lock:
+        alive = []
+        for thread_ref, conn in _open_connections:
+            if thread_ref() is not None and thread_ref().is_alive():
+                alive.append((thread_ref, conn))
+            else:
+                conn.close()
+        _open_connections[:] = alive
+
+
+def _is_open(conn: sqlite3.Connection) -> bool:
+    """False si la conexión ya se cerró (p.ej. close_all_connections desde otro hilo)."""
+    try:
+        conn.total_changes
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+
+def _get_thread_connection(read_only: bool) -> sqlite3.Connection:
+    """
+    Obtiene la conexión del hilo actual, creándola la primera vez.
+    
+    Cada hilo (event loop de FastAPI, workers de APScheduler, threads de pipelines)
+    reutiliza su propia conexión de escritura y su conexión de solo lectura, por lo
+    que no hay coste de conexión por llamada ni conexiones compartidas entre hilos.
+    Si la conexión guardada se cerró desde otro hilo, se abre una nueva.
+    """
+    connections = getattr(_thread_state, "connections", None)
+    if connections is None:
+        connections = _thread_state.connections = {}
+    
+    key = (str(DATABASE_PATH), read_only)
+    conn = connections.get(key)
+    if conn is not None and not _is_open(conn):
+        del connections[key]
+        _transaction_depths().pop(id(conn), None)
+        conn = None
+    if conn is None:
+        _close_dead_thread_connections()
+        conn = connections[key] = _open_connection(read_only)
+        with _connections_lock:
+            _open_connections.append((weakref.ref(threading.current_thread()), conn))
+    return conn
+
+
+def _transaction_depths() -> Dict[int, int]:
+    depths = getattr(_thread_state, "depths", None)
+    if depths is None:
+        depths = _thread_state.depths = {}
+    return depths
+
+
+@contextmanager
+def get_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Conexión de escritura del hilo actual.
     
-    # Tabla principal de datos climáticos con índice único por estación+fecha+hora
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS weather_hourly (
+    Solo el get_connection() más externo del hilo confirma la transacción al salir
+    o la revierte si hubo una excepción: los anidados (funciones que se llaman
+    entre sí) forman parte de la misma transacción.
+    """
+    conn = _get_thread_connection(read_only=False)
+    depths = _transaction_depths()
+    depth = depths.get(id(conn), 0)
+    depths[id(conn)] = depth + 1
+    try:
+        yield conn
+        if depth == 0:
+            conn.commit()
+    except Exception:
+        if depth == 0:
+            conn.rollback()
+        raise
+    finally:
+        if depth == 0:
+            depths.pop(id(conn), None)
+        else:
+            depths[id(conn)] = depth
+
+
+@contextmanager
+def get_read_connection() -> Iterator[sqlite3.Connection]:
+    """Conexión de solo lectura del hilo actual (los lectores no bloquean al escritor en WAL)."""
+    yield _get_thread_connection(read_only=True)
+
+
+def close_all_connections() -> None:
+    """Cierra todas las conexiones abiertas (al apagar la aplicación)."""
+    with _connections_lock:
+        for _, conn in _open_connections:
+            conn.close()
+        _open_connections.clear()
+    _thread_state.connections = {}
+    _thread_state.depths = {}
+
+
+def _create_weather_hourly_table(cursor: sqlite3.Cursor, table: str) -> None:
+    """Crea una tabla con el schema de weather_hourly (tabla caliente o partición mensual)."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             station_id INTEGER NOT NULL,
             station_name TEXT NOT NULL,
@@ -63,232 +262,574 @@ def init_database():
             UNIQUE(station_id, date, hour)
         )
     """)
+
+
+def init_database():
+    """Inicializa el schema de la base de datos."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    # Índices para optimizar consultas
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_station_date_hour 
-        ON weather_hourly(station_id, date, hour)
-    """)
+        # Tabla principal de datos climáticos con índice único por estación+fecha+hora
+        _create_weather_hourly_table(cursor, "weather_hourly")
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_date_hour 
-        ON weather_hourly(date, hour)
-    """)
+        # Índices para optimizar consultas
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_station_date_hour 
+            ON weather_hourly(station_id, date, hour)
+        """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_station_id 
-        ON weather_hourly(station_id)
-    """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_date_hour 
+            ON weather_hourly(date, hour)
+        """)
     
-    # Tabla de estaciones (si no existe)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stations (
-            id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            region TEXT NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL,
-            elevation INTEGER NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_station_id 
+            ON weather_hourly(station_id)
+        """)
     
-    # Tabla de reportes de incidencias/anomalías
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS incident_reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            incident_type TEXT NOT NULL,  -- 'flood' o 'drought'
-            description TEXT NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL,
-            severity TEXT DEFAULT 'medium',  -- 'low', 'medium', 'high'
-            status TEXT DEFAULT 'active',  -- 'active', 'resolved', 'dismissed'
-            reported_by TEXT,  -- Usuario/fuente del reporte
-            reported_at TEXT NOT NULL,
-            resolved_at TEXT,
-            notes TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+        # Tabla de estaciones (si no existe)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stations (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                region TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                elevation INTEGER NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
     
-    # Índices para reportes
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_incident_status 
-        ON incident_reports(status)
-    """)
+        # Tabla de reportes de incidencias/anomalías
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS incident_reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                incident_type TEXT NOT NULL,  -- 'flood' o 'drought'
+                description TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                severity TEXT DEFAULT 'medium',  -- 'low', 'medium', 'high'
+                status TEXT DEFAULT 'active',  -- 'active', 'resolved', 'dismissed'
+                reported_by TEXT,  -- Usuario/fuente del reporte
+                reported_at TEXT NOT NULL,
+                resolved_at TEXT,
+                notes TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
     
-    # Tabla de pronósticos (forecast de 7 días)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS weather_forecast (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station_id INTEGER NOT NULL,
-            station_name TEXT NOT NULL,
-            region TEXT NOT NULL,
-            latitude REAL NOT NULL,
-            longitude REAL NOT NULL,
-            elevation INTEGER NOT NULL,
+        # Índices para reportes
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_incident_status 
+            ON incident_reports(status)
+        """)
+    
+        # Tabla de pronósticos (forecast de 7 días)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS weather_forecast (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                station_id INTEGER NOT NULL,
+                station_name TEXT NOT NULL,
+                region TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                elevation INTEGER NOT NULL,
             
-            -- Fecha del pronóstico
-            forecast_date TEXT NOT NULL,  -- YYYY-MM-DD
+                -- Fecha del pronóstico
+                forecast_date TEXT NOT NULL,  -- YYYY-MM-DD
             
-            -- Datos climáticos
-            temp_max REAL,
-            temp_min REAL,
-            temp_avg REAL,
-            humidity REAL,
-            wind_speed_max REAL,
-            wind_direction TEXT,
-            wind_angle INTEGER,
-            precipitation_total REAL,
-            precipitation_probability REAL,
-            pressure REAL,
-            cloud_cover INTEGER,
-            summary TEXT,
-            icon TEXT,
+                -- Datos climáticos
+                temp_max REAL,
+                temp_min REAL,
+                temp_avg REAL,
+                humidity REAL,
+                wind_speed_max REAL,
+                wind_direction TEXT,
+                wind_angle INTEGER,
+                precipitation_total REAL,
+                precipitation_probability REAL,
+                pressure REAL,
+                cloud_cover INTEGER,
+                summary TEXT,
+                icon TEXT,
             
-            -- Riesgos pre-calculados (para carga rápida)
-            flood_probability REAL DEFAULT 0.0,
-            flood_level TEXT DEFAULT 'GREEN',
-            flood_alert INTEGER DEFAULT 0,
-            drought_probability REAL DEFAULT 0.0,
-            drought_level TEXT DEFAULT 'GREEN',
-            drought_alert INTEGER DEFAULT 0,
+                -- Riesgos pre-calculados (para carga rápida)
+                flood_probability REAL DEFAULT 0.0,
+                flood_level TEXT DEFAULT 'GREEN',
+                flood_alert INTEGER DEFAULT 0,
+                drought_probability REAL DEFAULT 0.0,
+                drought_level TEXT DEFAULT 'GREEN',
+                drought_alert INTEGER DEFAULT 0,
             
-            -- Metadata
-            retrieved_at TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                -- Metadata
+                retrieved_at TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
             
-            -- Constraint único: un pronóstico por estación por día
-            UNIQUE(station_id, forecast_date)
-        )
-    """)
+                -- Constraint único: un pronóstico por estación por día
+                UNIQUE(station_id, forecast_date)
+            )
+        """)
     
-    # Índices para forecasts
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_forecast_station_date 
-        ON weather_forecast(station_id, forecast_date)
-    """)
+        # Índices para forecasts
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_forecast_station_date 
+            ON weather_forecast(station_id, forecast_date)
+        """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_forecast_date 
-        ON weather_forecast(forecast_date)
-    """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_forecast_date 
+            ON weather_forecast(forecast_date)
+        """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_incident_type 
-        ON incident_reports(incident_type)
-    """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_incident_type 
+            ON incident_reports(incident_type)
+        """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_incident_reported_at 
-        ON incident_reports(reported_at DESC)
-    """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_incident_reported_at 
+            ON incident_reports(reported_at DESC)
+        """)
     
-    # Tabla de alertas activas (generadas automáticamente)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS active_alerts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            station_id INTEGER NOT NULL,
-            station_name TEXT NOT NULL,
-            alert_type TEXT NOT NULL,  -- 'flood' o 'drought'
-            risk_level TEXT NOT NULL,  -- 'YELLOW', 'RED'
-            probability REAL NOT NULL,  -- 0.0 - 1.0
-            triggered_at TEXT NOT NULL,  -- Timestamp cuando se generó la alerta
-            updated_at TEXT NOT NULL,  -- Última actualización
+        # Tabla de alertas activas (generadas automáticamente)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS active_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                station_id INTEGER NOT NULL,
+                station_name TEXT NOT NULL,
+                alert_type TEXT NOT NULL,  -- 'flood' o 'drought'
+                risk_level TEXT NOT NULL,  -- 'YELLOW', 'RED'
+                probability REAL NOT NULL,  -- 0.0 - 1.0
+                triggered_at TEXT NOT NULL,  -- Timestamp cuando se generó la alerta
+                updated_at TEXT NOT NULL,  -- Última actualización
             
-            -- Constraint único: una alerta por estación por tipo
-            UNIQUE(station_id, alert_type)
-        )
-    """)
+                -- Constraint único: una alerta por estación por tipo
+                UNIQUE(station_id, alert_type)
+            )
+        """)
     
-    # Índices para alertas
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_alert_station 
-        ON active_alerts(station_id)
-    """)
+        # Índices para alertas
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alert_station 
+            ON active_alerts(station_id)
+        """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_alert_type 
-        ON active_alerts(alert_type)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alert_type 
+            ON active_alerts(alert_type)
+        """)
+    
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_alert_triggered 
+            ON active_alerts(triggered_at DESC)
+        """)
+    
+        # Puntero al último registro de cada estación (mantenido en cada ingesta)
+        # valid_humidity = 1: último registro con humedad > 0; 0: último registro sin filtro
+        # source_table: weather_hourly o la partición donde quedó el registro tras archivar
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS station_latest (
+                station_id INTEGER NOT NULL,
+                valid_humidity INTEGER NOT NULL,
+                weather_id INTEGER NOT NULL,
+                source_table TEXT NOT NULL DEFAULT 'weather_hourly',
+                PRIMARY KEY (station_id, valid_humidity)
+            )
+        """)
+        
+        # Bases anteriores a source_table: los punteros se reconstruyen a continuación
+        cursor.execute("PRAGMA table_info(station_latest)")
+        if "source_table" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("DELETE FROM station_latest")
+            cursor.execute(
+                "ALTER TABLE station_latest ADD COLUMN source_table TEXT NOT NULL DEFAULT 'weather_hourly'"
+            )
+        
+        # Reconstruir punteros por si otros scripts modificaron weather_hourly
+        _refresh_station_latest(cursor)
+        
+        # Metadatos del almacenamiento por niveles (hot_start_date, rollups_built)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS storage_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        
+        # Rollups por estación y día / semana (lunes), actualizados en cada ingesta
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS weather_daily (
+                station_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                obs_count INTEGER NOT NULL,
+                temperature_avg REAL,
+                temperature_min REAL,
+                temperature_max REAL,
+                humidity_avg REAL,
+                precipitation_total REAL,
+                precipitation_max REAL,
+                wind_speed_avg REAL,
+                wind_speed_max REAL,
+                pressure_avg REAL,
+                PRIMARY KEY (station_id, date)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS weather_weekly (
+                station_id INTEGER NOT NULL,
+                week_start TEXT NOT NULL,     -- Lunes de la semana: YYYY-MM-DD
+                obs_count INTEGER NOT NULL,
+                temperature_avg REAL,
+                temperature_min REAL,
+                temperature_max REAL,
+                humidity_avg REAL,
+                precipitation_total REAL,
+                precipitation_max REAL,
+                wind_speed_avg REAL,
+                wind_speed_max REAL,
+                pressure_avg REAL,
+                PRIMARY KEY (station_id, week_start)
+            )
+        """)
+        
+        # Estado de puntuación de anomalías por estación y variable (Welford: n, media, M2)
+        # last_date/last_hour marcan la última lectura ya incorporada al estado
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS anomaly_state (
+                station_id INTEGER NOT NULL,
+                variable TEXT NOT NULL,
+                n INTEGER NOT NULL,
+                mean REAL NOT NULL,
+                m2 REAL NOT NULL,
+                last_date TEXT NOT NULL,
+                last_hour INTEGER NOT NULL,
+                last_value REAL,
+                last_z REAL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (station_id, variable)
+            )
+        """)
+        
+        # Bases creadas antes de los rollups: calcularlos una vez desde las lecturas horarias
+        if _get_meta(cursor, "rollups_built") is None:
+            _rebuild_rollups(cursor)
+    
+    logger.info(f" Base de datos inicializada: {DATABASE_PATH}")
+
+
+def _get_meta(cursor: sqlite3.Cursor, key: str) -> Optional[str]:
+    cursor.execute("SELECT value FROM storage_meta WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(cursor: sqlite3.Cursor, key: str, value: str) -> None:
+    cursor.execute("INSERT OR REPLACE INTO storage_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    """Primer día del mes 'YYYY-MM' y primer día del mes siguiente."""
+    year, mon = int(month[:4]), int(month[5:7])
+    next_month = f"{year + 1}-01" if mon == 12 else f"{year}-{mon + 1:02d}"
+    return f"{month}-01", f"{next_month}-01"
+
+
+def _ensure_partition(cursor: sqlite3.Cursor, month: str) -> str:
+    """Crea (si no existe) la partición del mes 'YYYY-MM' y devuelve su nombre."""
+    table = f"{PARTITION_PREFIX}{month.replace('-', '')}"
+    _create_weather_hourly_table(cursor, table)
+    return table
+
+
+def _partition_tables(cursor: sqlite3.Cursor) -> List[str]:
+    """Particiones mensuales existentes, en orden cronológico."""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+        (f"{PARTITION_PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]",)
+    )
+    return [name for (name,) in cursor.fetchall()]
+
+
+def _hourly_tables(
+    cursor: sqlite3.Cursor,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> List[str]:
+    """
+    Tablas horarias que pueden contener fechas del rango (poda de particiones).
+    
+    Args:
+        cursor: Cursor de una conexión
+        start_date: Fecha inicio YYYY-MM-DD (default: sin límite)
+        end_date: Fecha fin YYYY-MM-DD (default: sin límite)
+    
+    Returns:
+        Particiones en orden cronológico seguidas de weather_hourly (si aplica)
+    """
+    tables = []
+    for name in _partition_tables(cursor):
+        month = f"{name[-6:-2]}-{name[-2:]}"
+        if (start_date is None or month >= start_date[:7]) and (end_date is None or month <= end_date[:7]):
+            tables.append(name)
+    
+    hot_start = _get_meta(cursor, "hot_start_date")
+    if hot_start is None or end_date is None or end_date >= hot_start:
+        tables.append("weather_hourly")
+    return tables
+
+
+def _union_hourly(tables: List[str], select: str, where: str = "") -> str:
+    """SELECT ... UNION ALL ... sobre varias tablas horarias (los parámetros se repiten por tabla)."""
+    return "\nUNION ALL\n".join(f"SELECT {select} FROM {table} {where}" for table in tables)
+
+
+def _refresh_rollups(cursor: sqlite3.Cursor) -> None:
+    """
+    Recalcula weather_daily y weather_weekly para las (estación, día) y (estación, semana)
+    presentes en weather_hourly_staging.
+    
+    Solo lee las lecturas de esos días y semanas a través del índice único de cada
+    tabla horaria, así que el coste es proporcional a lo ingerido, no al histórico.
+    """
+    cursor.execute("SELECT MIN(date), MAX(date) FROM weather_hourly_staging")
+    min_date, max_date = cursor.fetchone()
+    if min_date is None:
+        return
+    
+    # Las semanas afectadas pueden empezar hasta 6 días antes y terminar 6 días después
+    tables = _hourly_tables(
+        cursor,
+        (date_type.fromisoformat(min_date) - timedelta(days=6)).isoformat(),
+        (date_type.fromisoformat(max_date) + timedelta(days=6)).isoformat()
+    )
+    rollup_columns = ", ".join(ROLLUP_AGGREGATES)
+    aggregates = ", ".join(f"{expr} AS {name}" for name, expr in ROLLUP_AGGREGATES.items())
+    source = ", ".join(f"h.{col}" for col in ROLLUP_SOURCE_COLUMNS)
+    
+    daily_source = "\nUNION ALL\n".join(
+        f"SELECT {source} FROM days k INNER JOIN {table} h "
+        f"ON h.station_id = k.station_id AND h.date = k.date"
+        for table in tables
+    )
+    cursor.execute(f"""
+        WITH days AS (SELECT DISTINCT station_id, date FROM weather_hourly_staging)
+        INSERT OR REPLACE INTO weather_daily (station_id, date, {rollup_columns})
+        SELECT station_id, date, {aggregates}
+        FROM ({daily_source})
+        GROUP BY station_id, date
     """)
     
-    cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_alert_triggered 
-        ON active_alerts(triggered_at DESC)
+    weekly_source = "\nUNION ALL\n".join(
+        f"SELECT k.week_start, {source} FROM weeks k INNER JOIN {table} h "
+        f"ON h.station_id = k.station_id AND h.date BETWEEN k.week_start AND date(k.week_start, '+6 days')"
+        for table in tables
+    )
+    cursor.execute(f"""
+        WITH weeks AS (
+            SELECT DISTINCT station_id, {WEEK_START_SQL.format('date')} AS week_start
+            FROM weather_hourly_staging
+        )
+        INSERT OR REPLACE INTO weather_weekly (station_id, week_start, {rollup_columns})
+        SELECT station_id, week_start, {aggregates}
+        FROM ({weekly_source})
+        GROUP BY station_id, week_start
+    """)
+
+
+def _rebuild_rollups(cursor: sqlite3.Cursor) -> int:
+    """Recalcula desde cero los rollups diario y semanal a partir de todas las tablas horarias."""
+    rollup_columns = ", ".join(ROLLUP_AGGREGATES)
+    aggregates = ", ".join(f"{expr} AS {name}" for name, expr in ROLLUP_AGGREGATES.items())
+    source = _union_hourly(_hourly_tables(cursor), ", ".join(ROLLUP_SOURCE_COLUMNS))
+    
+    cursor.execute("DELETE FROM weather_daily")
+    cursor.execute("DELETE FROM weather_weekly")
+    cursor.execute(f"""
+        INSERT INTO weather_daily (station_id, date, {rollup_columns})
+        SELECT station_id, date, {aggregates}
+        FROM ({source})
+        GROUP BY station_id, date
     """)
+    days = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO weather_weekly (station_id, week_start, {rollup_columns})
+        SELECT station_id, {WEEK_START_SQL.format('date')} AS week_start, {aggregates}
+        FROM ({source})
+        GROUP BY station_id, week_start
+    """)
+    _set_meta(cursor, "rollups_built", datetime.now(timezone.utc).isoformat())
+    return days
+
+
+def rebuild_weather_rollups() -> int:
+    """
+    Reconstruye weather_daily y weather_weekly (p.ej. tras borrar lecturas con scripts externos).
+    
+    Returns:
+        Número de filas diarias generadas
+    """
+    with get_connection() as conn:
+        days = _rebuild_rollups(conn.cursor())
+    logger.info(f" Rollups reconstruidos: {days} días-estación")
+    return days
+
+
+def _refresh_station_latest(cursor: sqlite3.Cursor, stations_sql: Optional[str] = None) -> None:
+    """
+    Recalcula los punteros de station_latest para un conjunto de estaciones.
     
-    conn.commit()
-    conn.close()
+    Cada puntero se obtiene recorriendo hacia atrás el índice (station_id, date, hour),
+    así que el coste es proporcional al número de estaciones, no al histórico.
+    Los punteros que la ventana caliente no resuelve (estaciones sin lecturas recientes)
+    apuntan al último registro archivado (_refresh_archived_latest).
     
-    logger.info(f" Base de datos inicializada: {DATABASE_PATH}")
+    Args:
+        cursor: Cursor de una conexión de escritura
+        stations_sql: SELECT que devuelve los station_id a recalcular (default: todas)
+    """
+    archived_sql = stations_sql
+    # Por defecto: skip-scan del índice por estación (una búsqueda por estación)
+    stations_sql = stations_sql or """
+        WITH RECURSIVE ids(station_id) AS (
+            SELECT MIN(station_id) FROM weather_hourly
+            UNION ALL
+            SELECT (SELECT MIN(station_id) FROM weather_hourly WHERE station_id > ids.station_id)
+            FROM ids WHERE ids.station_id IS NOT NULL
+        )
+        SELECT station_id FROM ids WHERE station_id IS NOT NULL
+    """
+    
+    cursor.execute(f"DELETE FROM station_latest WHERE station_id IN ({stations_sql})")
+    cursor.execute(f"""
+        INSERT INTO station_latest (station_id, valid_humidity, weather_id)
+        SELECT station_id, valid_humidity, weather_id FROM (
+            SELECT s.station_id, 0 AS valid_humidity, (
+                SELECT w.id FROM weather_hourly w
+                WHERE w.station_id = s.station_id
+                ORDER BY w.date DESC, w.hour DESC LIMIT 1
+            ) AS weather_id
+            FROM ({stations_sql}) s
+            UNION ALL
+            SELECT s.station_id, 1 AS valid_humidity, (
+                SELECT w.id FROM weather_hourly w
+                WHERE w.station_id = s.station_id AND w.humidity IS NOT NULL AND w.humidity > 0
+                ORDER BY w.date DESC, w.hour DESC LIMIT 1
+            ) AS weather_id
+            FROM ({stations_sql}) s
+        )
+        WHERE weather_id IS NOT NULL
+    """)
+    _refresh_archived_latest(cursor, archived_sql)
 
 
-def insert_or_update_weather_data(weather_data: List[Dict]) -> int:
+def _refresh_archived_latest(cursor: sqlite3.Cursor, stations_sql: Optional[str] = None) -> None:
     """
-    Inserta o actualiza datos climáticos.
+    Completa los punteros de station_latest que faltan con el último registro archivado.
     
-    Si ya existe un registro para la misma estación, fecha y hora,
-    lo reemplaza con los datos más recientes.
+    Recorre las particiones de la más reciente a la más antigua; cada (estación, filtro)
+    toma el registro de la primera partición que lo tenga (INSERT OR IGNORE).
     
     Args:
-        weather_data: Lista de diccionarios con datos climáticos
-        
-    Returns:
-        Número de registros insertados/actualizados
+        cursor: Cursor de una conexión de escritura
+        stations_sql: SELECT que devuelve los station_id a completar (default: todas)
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    for table in reversed(_partition_tables(cursor)):
+        stations = f"SELECT DISTINCT station_id FROM {table}"
+        if stations_sql:
+            stations += f" WHERE station_id IN ({stations_sql})"
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO station_latest (station_id, valid_humidity, weather_id, source_table)
+            SELECT station_id, valid_humidity, weather_id, '{table}' FROM (
+                SELECT s.station_id, 0 AS valid_humidity, (
+                    SELECT w.id FROM {table} w
+                    WHERE w.station_id = s.station_id
+                    ORDER BY w.date DESC, w.hour DESC LIMIT 1
+                ) AS weather_id
+                FROM ({stations}) s
+                UNION ALL
+                SELECT s.station_id, 1 AS valid_humidity, (
+                    SELECT w.id FROM {table} w
+                    WHERE w.station_id = s.station_id AND w.humidity IS NOT NULL AND w.humidity > 0
+                    ORDER BY w.date DESC, w.hour DESC LIMIT 1
+                ) AS weather_id
+                FROM ({stations}) s
+            )
+            WHERE weather_id IS NOT NULL
+        """)
+
+
+def _latest_rows(cursor: sqlite3.Cursor, select: str, valid_humidity: int) -> List[sqlite3.Row]:
+    """
+    Registros apuntados por station_latest, resolviendo cada puntero en su tabla
+    (weather_hourly o la partición archivada), ordenados por estación.
+    """
+    cursor.execute("SELECT DISTINCT source_table FROM station_latest WHERE valid_humidity = ?", (valid_humidity,))
+    tables = [row[0] for row in cursor.fetchall()]
+    if not tables:
+        return []
+    
+    union = "\nUNION ALL\n".join(
+        f"""SELECT {select} FROM station_latest l
+            INNER JOIN {table} w ON w.id = l.weather_id
+            WHERE l.valid_humidity = ? AND l.source_table = '{table}'"""
+        for table in tables
+    )
+    cursor.execute(f"SELECT * FROM ({union}) ORDER BY station_id", (valid_humidity,) * len(tables))
+    return cursor.fetchall()
+
+
+def refresh_station_latest() -> None:
+    """Reconstruye station_latest para todas las estaciones (tras borrados masivos)."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM station_latest")
+        _refresh_station_latest(cursor)
+
+
+def _required_number(data: Dict, key: str) -> float:
+    """Valor numérico finito de una columna obligatoria (KeyError/TypeError/ValueError si falta)"""
+    value = float(data[key])
+    if not math.isfinite(value):
+        raise ValueError(f"{key} no es finito: {value}")
+    return value
+
+
+def _prepare_weather_rows(weather_data: List[Dict], now: str) -> tuple:
+    """
+    Convierte los registros de entrada en tuplas listas para insertar.
+    
+    Descarta los registros sin timestamp válido o sin las columnas obligatorias
+    (station_id, latitude, longitude, elevation).
     
-    inserted = 0
-    updated = 0
+    Returns:
+        Tuple (rows, skipped) con las tuplas válidas y el número de registros descartados
+    """
+    rows = []
+    skipped = 0
     
     for data in weather_data:
         try:
             # Parsear timestamp y extraer fecha y hora
             timestamp = datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00'))
-            date_str = timestamp.strftime('%Y-%m-%d')
-            hour = timestamp.hour
             
-            now = datetime.now(timezone.utc).isoformat()
+            # Columnas NOT NULL: un registro sin ellas abortaría la transacción completa
+            station_id = int(data['station_id'])
+            latitude, longitude, elevation = (_required_number(data, key)
+                                              for key in ('latitude', 'longitude', 'elevation'))
             
-            # Usar INSERT OR REPLACE para deduplicación automática
-            cursor.execute("""
-                INSERT INTO weather_hourly (
-                    station_id, station_name, region, latitude, longitude, elevation,
-                    date, hour, timestamp,
-                    temperature, feels_like, humidity,
-                    wind_speed, wind_direction, wind_angle,
-                    precipitation_total, precipitation_type,
-                    pressure, cloud_cover, summary, icon,
-                    created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(station_id, date, hour) 
-                DO UPDATE SET
-                    timestamp = excluded.timestamp,
-                    temperature = excluded.temperature,
-                    feels_like = excluded.feels_like,
-                    humidity = excluded.humidity,
-                    wind_speed = excluded.wind_speed,
-                    wind_direction = excluded.wind_direction,
-                    wind_angle = excluded.wind_angle,
-                    precipitation_total = excluded.precipitation_total,
-                    precipitation_type = excluded.precipitation_type,
-                    pressure = excluded.pressure,
-                    cloud_cover = excluded.cloud_cover,
-                    summary = excluded.summary,
-                    icon = excluded.icon,
-                    updated_at = excluded.updated_at
-            """, (
-                data['station_id'], 
-                data.get('station_name', f"Estación {data['station_id']}"), 
-                data.get('region', 'Panama'),
-                data.get('latitude'), 
-                data.get('longitude'), 
-                data.get('elevation'),
-                date_str, hour, data['timestamp'],
+            rows.append((
+                station_id,
+                data.get('station_name') or f"Estación {station_id}",
+                data.get('region') or 'Panama',
+                latitude,
+                longitude,
+                elevation,
+                timestamp.strftime('%Y-%m-%d'), timestamp.hour, data['timestamp'],
                 data.get('temperature'), data.get('feels_like'), data.get('humidity'),
                 data.get('wind_speed'), data.get('wind_direction'), data.get('wind_angle'),
                 data.get('precipitation_total'), data.get('precipitation_type'),
@@ -296,23 +837,136 @@ def insert_or_update_weather_data(weather_data: List[Dict]) -> int:
                 data.get('summary'), data.get('icon'),
                 now, now
             ))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            skipped += 1
+    
+    return rows, skipped
+
+
+def _upsert_from_staging(cursor: sqlite3.Cursor, table: str, condition: str, params: tuple) -> Tuple[int, int]:
+    """
+    Aplica las filas de weather_hourly_staging que cumplen `condition` sobre una tabla horaria.
+    
+    Returns:
+        Tuple (claves distintas aplicadas, claves que ya existían)
+    """
+    columns = ", ".join(WEATHER_HOURLY_COLUMNS)
+    updates = ",\n                ".join(f"{col} = excluded.{col}" for col in WEATHER_HOURLY_UPDATE_COLUMNS)
+    
+    # Conteo exacto antes de aplicar: claves nuevas vs. existentes
+    cursor.execute(f"""
+        SELECT
+            COUNT(*),
+            SUM(EXISTS (
+                SELECT 1 FROM {table} w
+                WHERE w.station_id = k.station_id AND w.date = k.date AND w.hour = k.hour
+            ))
+        FROM (SELECT DISTINCT station_id, date, hour FROM weather_hourly_staging WHERE {condition}) k
+    """, params)
+    total_keys, existing_keys = cursor.fetchone()
+    
+    # El WHERE evita además la ambigüedad de ON CONFLICT con INSERT ... SELECT
+    cursor.execute(f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM weather_hourly_staging WHERE {condition} ORDER BY rowid
+        ON CONFLICT(station_id, date, hour) DO UPDATE SET
+        {updates}
+    """, params)
+    
+    return total_keys, existing_keys or 0
+
+
+def bulk_upsert_weather_data(weather_data: List[Dict], chunk_size: int = 50_000) -> Dict[str, int]:
+    """
+    Inserta o actualiza datos climáticos en bloque.
+    
+    Prepara todas las tuplas por adelantado, las carga con executemany en una
+    tabla temporal de staging y aplica un único INSERT ... ON CONFLICT por bloque
+    y tabla destino, todo dentro de una transacción. Las lecturas anteriores a la
+    ventana caliente van directamente a su partición mensual, y los rollups diario
+    y semanal de los días afectados se recalculan en la misma transacción.
+    
+    Args:
+        weather_data: Lista de diccionarios con datos climáticos
+        chunk_size: Registros por bloque de staging
+        
+    Returns:
+        Dict con conteos de registros insertados, actualizados y descartados
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    rows, skipped = _prepare_weather_rows(weather_data, now)
+    
+    if skipped:
+        logger.warning(f" {skipped} registros descartados por timestamp, station_id o coordenadas inválidos")
+    
+    result = {"inserted": 0, "updated": 0, "skipped": skipped}
+    if not rows:
+        return result
+    
+    columns = ", ".join(WEATHER_HOURLY_COLUMNS)
+    placeholders = ", ".join("?" for _ in WEATHER_HOURLY_COLUMNS)
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS weather_hourly_staging AS
+            SELECT * FROM weather_hourly WHERE 0
+        """)
+        hot_start = _get_meta(cursor, "hot_start_date")
+        
+        for start in range(0, len(rows), chunk_size):
+            cursor.execute("DELETE FROM weather_hourly_staging")
+            cursor.executemany(
+                f"INSERT INTO weather_hourly_staging ({columns}) VALUES ({placeholders})",
+                rows[start:start + chunk_size]
+            )
             
-            if cursor.rowcount > 0:
-                # Si rowcount es 1, fue INSERT, si es 2 fue UPDATE (SQLite behavior)
-                if cursor.lastrowid > 0:
-                    inserted += 1
-                else:
-                    updated += 1
-                    
-        except Exception as e:
-            logger.error(f"Error insertando datos de estación {data.get('station_id')}: {e}")
-            continue
+            # Destinos: la tabla caliente y, si ya se archivó, la partición de cada mes antiguo
+            targets = [("weather_hourly", "date >= ?" if hot_start else "true", (hot_start,) if hot_start else ())]
+            if hot_start:
+                cursor.execute(
+                    "SELECT DISTINCT substr(date, 1, 7) FROM weather_hourly_staging WHERE date < ?",
+                    (hot_start,)
+                )
+                for (month,) in cursor.fetchall():
+                    targets.append((
+                        _ensure_partition(cursor, month),
+                        "date < ? AND substr(date, 1, 7) = ?",
+                        (hot_start, month)
+                    ))
+            
+            for table, condition, params in targets:
+                total_keys, existing_keys = _upsert_from_staging(cursor, table, condition, params)
+                result["inserted"] += total_keys - existing_keys
+                result["updated"] += existing_keys
+            
+            # Actualizar el último registro solo de las estaciones afectadas
+            _refresh_station_latest(cursor, "SELECT DISTINCT station_id FROM weather_hourly_staging")
+            _refresh_rollups(cursor)
+        
+        cursor.execute("DELETE FROM weather_hourly_staging")
     
-    conn.commit()
-    conn.close()
+    _notify_ingest("weather_hourly", {row[0] for row in rows})
+    return result
+
+
+def insert_or_update_weather_data(weather_data: List[Dict]) -> int:
+    """
+    Inserta o actualiza datos climáticos.
     
-    logger.info(f" Datos guardados: {inserted} nuevos, {updated} actualizados")
-    return inserted + updated
+    Si ya existe un registro para la misma estación, fecha y hora,
+    lo reemplaza con los datos más recientes.
+    
+    Args:
+        weather_data: Lista de diccionarios con datos climáticos
+        
+    Returns:
+        Número de registros insertados/actualizados
+    """
+    result = bulk_upsert_weather_data(weather_data)
+    
+    logger.info(f" Datos guardados: {result['inserted']} nuevos, {result['updated']} actualizados")
+    return result["inserted"] + result["updated"]
 
 
 def get_latest_data_by_station(station_id: int, limit: int = 24) -> List[Dict]:
@@ -326,19 +980,21 @@ def get_latest_data_by_station(station_id: int, limit: int = 24) -> List[Dict]:
     Returns:
         Lista de registros ordenados por fecha y hora descendente
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT * FROM weather_hourly
-        WHERE station_id = ?
-        ORDER BY date DESC, hour DESC
-        LIMIT ?
-    """, (station_id, limit))
-    
-    rows = cursor.fetchall()
-    conn.close()
+    rows = []
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Tabla caliente primero y luego particiones de la más reciente a la más antigua
+        for table in reversed(_hourly_tables(cursor)):
+            cursor.execute(f"""
+                SELECT * FROM {table}
+                WHERE station_id = ?
+                ORDER BY date DESC, hour DESC
+                LIMIT ?
+            """, (station_id, limit - len(rows)))
+            rows.extend(cursor.fetchall())
+            if len(rows) >= limit:
+                break
     
     return [dict(row) for row in rows]
 
@@ -355,30 +1011,116 @@ def get_data_by_date_range(start_date: str, end_date: str, station_id: Optional[
     Returns:
         Lista de registros en el rango
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    if station_id:
-        cursor.execute("""
-            SELECT * FROM weather_hourly
-            WHERE date BETWEEN ? AND ?
-            AND station_id = ?
-            ORDER BY date, hour
-        """, (start_date, end_date, station_id))
-    else:
-        cursor.execute("""
-            SELECT * FROM weather_hourly
-            WHERE date BETWEEN ? AND ?
-            ORDER BY station_id, date, hour
-        """, (start_date, end_date))
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        tables = _hourly_tables(cursor, start_date, end_date)
+    
+        if station_id:
+            cursor.execute(
+                _union_hourly(tables, "*", "WHERE date BETWEEN ? AND ? AND station_id = ?") + " ORDER BY date, hour",
+                (start_date, end_date, station_id) * len(tables)
+            )
+        else:
+            cursor.execute(
+                _union_hourly(tables, "*", "WHERE date BETWEEN ? AND ?") + " ORDER BY station_id, date, hour",
+                (start_date, end_date) * len(tables)
+            )
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     return [dict(row) for row in rows]
 
 
+def iter_weather_frames(
+    start_date: str,
+    end_date: str,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 200_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee weather_hourly en un rango de fechas como DataFrames columnares por bloques.
+    
+    Una sola consulta para todas las estaciones (tabla caliente más las particiones
+    mensuales del rango), ordenada por estación, fecha y hora, leída en bloques de
+    `chunk_size` filas para acotar la memoria.
+    
+    Args:
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        columns: Columnas a leer (default: todas)
+        chunk_size: Filas por bloque
+        
+    Yields:
+        DataFrames con las filas de cada bloque
+    """
+    select = ", ".join(columns) if columns else "*"
+    
+    with get_read_connection() as conn:
+        tables = _hourly_tables(conn.cursor(), start_date, end_date)
+        yield from pd.read_sql_query(
+            _union_hourly(tables, select, "WHERE date BETWEEN ? AND ?") + " ORDER BY station_id, date, hour",
+            conn,
+            params=(start_date, end_date) * len(tables),
+            chunksize=chunk_size
+        )
+
+
+def get_weather_at_hours(
+    slots: List[Tuple[int, str, int]],
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Obtiene las lecturas de muchas (estación, fecha, hora) en una sola consulta.
+    
+    Los slots se pasan como un único parámetro JSON expandido con json_each y se
+    cruzan con cada tabla horaria del rango por su índice único (station_id, date, hour).
+    
+    Args:
+        slots: Lista de (station_id, date YYYY-MM-DD, hour)
+        columns: Columnas de weather_hourly a devolver (default: todas)
+    
+    Returns:
+        DataFrame con station_id, date, hour y las columnas pedidas
+    """
+    select = ", ".join(f"h.{col}" for col in columns) if columns else "h.*"
+    keys = ["station_id", "date", "hour"]
+    
+    if not slots:
+        return pd.DataFrame(columns=keys + (columns or []))
+    
+    payload = json.dumps([[int(station_id), str(date), int(hour)] for station_id, date, hour in slots])
+    dates = [str(date) for _, date, _ in slots]
+    
+    with get_read_connection() as conn:
+        tables = _hourly_tables(conn.cursor(), min(dates), max(dates))
+        joins = "\nUNION ALL\n".join(
+            f"""
+            SELECT s.station_id AS slot_station_id, s.date AS slot_date, s.hour AS slot_hour, {select}
+            FROM slots s
+            INNER JOIN {table} h
+                ON h.station_id = s.station_id AND h.date = s.date AND h.hour = s.hour
+            """
+            for table in tables
+        )
+        df = pd.read_sql_query(
+            f"""
+            WITH slots AS (
+                SELECT DISTINCT
+                    json_extract(value, '$[0]') AS station_id,
+                    json_extract(value, '$[1]') AS date,
+                    json_extract(value, '$[2]') AS hour
+                FROM json_each(?)
+            )
+            {joins}
+            """,
+            conn,
+            params=(payload,)
+        )
+    
+    df = df.drop(columns=[col for col in keys if col in df.columns])
+    return df.rename(columns={f"slot_{col}": col for col in keys})
+
+
 def get_all_stations() -> List[Dict]:
     """
     Obtiene todas las estaciones desde la tabla stations.
@@ -386,24 +1128,22 @@ def get_all_stations() -> List[Dict]:
     Returns:
         Lista de diccionarios con información de todas las estaciones
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            id,
-            name,
-            region,
-            latitude as lat,
-            longitude as lon,
-            elevation
-        FROM stations
-        ORDER BY id
-    """)
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    rows = cursor.fetchall()
-    conn.close()
+        cursor.execute("""
+            SELECT 
+                id,
+                name,
+                region,
+                latitude as lat,
+                longitude as lon,
+                elevation
+            FROM stations
+            ORDER BY id
+        """)
+    
+        rows = cursor.fetchall()
     
     stations = []
     for row in rows:
@@ -423,71 +1163,270 @@ def get_all_stations_latest() -> List[Dict]:
     """
     Obtiene el último registro de cada estación con datos válidos de humedad.
     Prioriza datos con humedad > 0 para usar datos generados en lugar de Meteosource incompletos.
+    Lee los punteros de station_latest, por lo que no recorre el histórico.
+    Las estaciones sin lecturas en la ventana caliente devuelven su último registro archivado.
     
     Returns:
         Lista con el último dato válido de cada estación
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Primero intentar obtener datos con humedad válida (datos dummy generados)
-    cursor.execute("""
-        SELECT w1.* FROM weather_hourly w1
-        INNER JOIN (
-            SELECT station_id, MAX(date || ' ' || printf('%02d', hour)) as max_datetime
-            FROM weather_hourly
-            WHERE humidity IS NOT NULL AND humidity > 0
-            GROUP BY station_id
-        ) w2 ON w1.station_id = w2.station_id 
-        AND (w1.date || ' ' || printf('%02d', w1.hour)) = w2.max_datetime
-        ORDER BY w1.station_id
-    """)
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    rows = cursor.fetchall()
+        # Primero intentar obtener datos con humedad válida (datos dummy generados)
+        rows = _latest_rows(cursor, "w.*", valid_humidity=1)
+        
+        # Si no hay datos con humedad, caer al último registro sin filtro
+        if not rows:
+            rows = _latest_rows(cursor, "w.*", valid_humidity=0)
     
-    # Si no hay datos con humedad, caer al último registro sin filtro
-    if not rows:
+    return [dict(row) for row in rows]
+
+
+def get_station_last_observations() -> Dict[int, str]:
+    """
+    Obtiene el timestamp de la última lectura de cada estación.
+    
+    Returns:
+        Diccionario {station_id: timestamp ISO}
+    """
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        rows = _latest_rows(cursor, "w.station_id, w.timestamp", valid_humidity=0)
+    
+    return {row["station_id"]: row["timestamp"] for row in rows}
+
+
+def get_forecast_last_retrievals() -> Dict[int, str]:
+    """
+    Obtiene la fecha de la última descarga de pronóstico vigente (hoy en adelante) por estación.
+    
+    Returns:
+        Diccionario {station_id: retrieved_at ISO}
+    """
+    from datetime import date as date_module
+    today = date_module.today().isoformat()
+    
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT w1.* FROM weather_hourly w1
-            INNER JOIN (
-                SELECT station_id, MAX(date || ' ' || printf('%02d', hour)) as max_datetime
-                FROM weather_hourly
-                GROUP BY station_id
-            ) w2 ON w1.station_id = w2.station_id 
-            AND (w1.date || ' ' || printf('%02d', w1.hour)) = w2.max_datetime
-            ORDER BY w1.station_id
-        """)
+            SELECT station_id, MAX(retrieved_at) AS retrieved_at
+            FROM weather_forecast
+            WHERE forecast_date >= ?
+            GROUP BY station_id
+        """, (today,))
         rows = cursor.fetchall()
     
-    conn.close()
+    return {row["station_id"]: row["retrieved_at"] for row in rows}
+
+
+def archive_weather_data(hot_days: int = WEATHER_HOT_DAYS) -> int:
+    """
+    Mueve las lecturas anteriores a la ventana caliente a sus particiones mensuales.
     
-    return [dict(row) for row in rows]
+    Los datos no se borran: siguen disponibles para entrenamiento e histórico
+    (las lecturas se unen por rango de fechas) y los rollups no cambian.
+    
+    Args:
+        hot_days: Días que se mantienen en weather_hourly
+    
+    Returns:
+        Número de lecturas archivadas
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=hot_days)).strftime('%Y-%m-%d')
+    columns = ", ".join(WEATHER_HOURLY_COLUMNS)
+    updates = ", ".join(f"{col} = excluded.{col}" for col in WEATHER_HOURLY_UPDATE_COLUMNS)
+    moved = 0
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        hot_start = _get_meta(cursor, "hot_start_date")
+        if hot_start is not None and cutoff <= hot_start:
+            return 0
+        
+        cursor.execute("SELECT DISTINCT substr(date, 1, 7) FROM weather_hourly WHERE date < ?", (cutoff,))
+        months = [row[0] for row in cursor.fetchall()]
+        
+        for month in months:
+            table = _ensure_partition(cursor, month)
+            first_day, next_month = _month_bounds(month)
+            bounds = (first_day, min(next_month, cutoff))
+            
+            cursor.execute(f"""
+                INSERT INTO {table} ({columns})
+                SELECT {columns} FROM weather_hourly
+                WHERE date >= ? AND date < ? ORDER BY id
+                ON CONFLICT(station_id, date, hour) DO UPDATE SET {updates}
+            """, bounds)
+            cursor.execute("DELETE FROM weather_hourly WHERE date >= ? AND date < ?", bounds)
+            moved += cursor.rowcount
+            logger.info(f" Partición {table}: {cursor.rowcount} lecturas archivadas")
+        
+        _set_meta(cursor, "hot_start_date", cutoff)
+        
+        if moved:
+            cursor.execute("DELETE FROM station_latest")
+            _refresh_station_latest(cursor)
+    
+    logger.info(f" Archivado completado: {moved} lecturas anteriores a {cutoff} en {len(months)} particiones")
+    return moved
 
 
 def cleanup_old_data(days_to_keep: int = 30):
     """
-    Limpia datos antiguos para mantener solo los últimos N días.
+    Mantiene en weather_hourly solo los últimos N días.
+    Las lecturas antiguas se archivan en particiones mensuales en lugar de borrarse.
+    
+    Args:
+        days_to_keep: Número de días a mantener en la tabla caliente (default: 30)
+    """
+    return archive_weather_data(hot_days=days_to_keep)
+
+
+def get_weather_history(
+    station_id: int,
+    start_date: str,
+    end_date: str,
+    resolution: str = "daily"
+) -> List[Dict]:
+    """
+    Histórico de una estación en la resolución pedida.
+    
+    Args:
+        station_id: ID de la estación
+        start_date: Fecha inicio (YYYY-MM-DD)
+        end_date: Fecha fin (YYYY-MM-DD)
+        resolution: 'hourly' (tablas horarias del rango), 'daily' o 'weekly' (rollups)
+        
+    Returns:
+        Lista de registros ordenados cronológicamente
+    """
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        
+        if resolution == "hourly":
+            tables = _hourly_tables(cursor, start_date, end_date)
+            cursor.execute(
+                _union_hourly(
+                    tables,
+                    "timestamp, date, hour, temperature, humidity, precipitation_total, wind_speed, pressure",
+                    "WHERE station_id = ? AND date BETWEEN ? AND ?"
+                ) + " ORDER BY date, hour",
+                (station_id, start_date, end_date) * len(tables)
+            )
+        elif resolution == "daily":
+            cursor.execute("""
+                SELECT * FROM weather_daily
+                WHERE station_id = ? AND date BETWEEN ? AND ?
+                ORDER BY date
+            """, (station_id, start_date, end_date))
+        elif resolution == "weekly":
+            # Incluir la semana que contiene start_date
+            start = date_type.fromisoformat(start_date)
+            week_start = (start - timedelta(days=start.weekday())).isoformat()
+            cursor.execute("""
+                SELECT * FROM weather_weekly
+                WHERE station_id = ? AND week_start BETWEEN ? AND ?
+                ORDER BY week_start
+            """, (station_id, week_start, end_date))
+        else:
+            raise ValueError(f"Resolución no soportada: {resolution}")
+        
+        rows = cursor.fetchall()
+    
+    return [dict(row) for row in rows]
+
+
+def get_unscored_readings(variable: str, station_ids: Optional[Set[int]] = None) -> pd.DataFrame:
+    """
+    Lecturas de la ventana caliente posteriores al estado de anomalías de cada estación.
+    
+    Para estaciones con estado, cada búsqueda es un rango del índice (station_id, date, hour)
+    a partir de (last_date, last_hour), así que una ingesta horaria lee una fila por estación.
+    Las estaciones sin estado devuelven toda su ventana caliente (arranque).
+    
+    Args:
+        variable: Columna de weather_hourly a puntuar
+        station_ids: Restringir a estas estaciones (default: todas)
+    
+    Returns:
+        DataFrame con station_id, date, hour, timestamp y value, en orden cronológico por estación
+    """
+    if variable not in ROLLUP_SOURCE_COLUMNS[2:]:
+        raise ValueError(f"Variable no soportada: {variable}")
+    
+    params: list = [variable]
+    station_filter = ""
+    if station_ids is not None:
+        if not station_ids:
+            return pd.DataFrame(columns=["station_id", "date", "hour", "timestamp", "value"])
+        station_filter = f"AND w.station_id IN ({','.join('?' * len(station_ids))})"
+        params.extend(sorted(station_ids))
+    
+    with get_read_connection() as conn:
+        return pd.read_sql_query(f"""
+            SELECT w.station_id, w.date, w.hour, w.timestamp, w.{variable} AS value
+            FROM weather_hourly w
+            LEFT JOIN anomaly_state s ON s.station_id = w.station_id AND s.variable = ?
+            WHERE w.{variable} IS NOT NULL {station_filter}
+              AND (s.station_id IS NULL OR w.date > s.last_date
+                   OR (w.date = s.last_date AND w.hour > s.last_hour))
+            ORDER BY w.station_id, w.date, w.hour
+        """, conn, params=params)
+
+
+def get_anomaly_state(variable: str, station_ids: Optional[Set[int]] = None) -> Dict[int, Dict]:
+    """
+    Estado de anomalías (n, mean, m2, última lectura y su z-score) por estación.
     
     Args:
-        days_to_keep: Número de días a mantener (default: 30)
+        variable: Variable puntuada
+        station_ids: Restringir a estas estaciones (default: todas)
+    
+    Returns:
+        Diccionario {station_id: estado}
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    query = "SELECT * FROM anomaly_state WHERE variable = ?"
+    params: list = [variable]
+    if station_ids is not None:
+        query += f" AND station_id IN ({','.join('?' * len(station_ids)) or 'NULL'})"
+        params.extend(sorted(station_ids))
     
-    cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days_to_keep)).strftime('%Y-%m-%d')
+    with get_read_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
     
-    cursor.execute("""
-        DELETE FROM weather_hourly
-        WHERE date < ?
-    """, (cutoff_date,))
+    return {row["station_id"]: dict(row) for row in rows}
+
+
+def save_anomaly_state(variable: str, states: List[Dict]) -> None:
+    """
+    Guarda el estado de anomalías actualizado (un upsert por estación).
     
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    Args:
+        variable: Variable puntuada
+        states: Diccionarios con station_id, n, mean, m2, last_date, last_hour, last_value y last_z
+    """
+    if not states:
+        return
     
-    logger.info(f" Limpieza completada: {deleted} registros antiguos eliminados")
-    return deleted
+    now = datetime.now(timezone.utc).isoformat()
+    with get_connection() as conn:
+        conn.executemany("""
+            INSERT INTO anomaly_state (
+                station_id, variable, n, mean, m2, last_date, last_hour, last_value, last_z, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(station_id, variable) DO UPDATE SET
+                n = excluded.n, mean = excluded.mean, m2 = excluded.m2,
+                last_date = excluded.last_date, last_hour = excluded.last_hour,
+                last_value = excluded.last_value, last_z = excluded.last_z,
+                updated_at = excluded.updated_at
+        """, [
+            (
+                int(s["station_id"]), variable, int(s["n"]), float(s["mean"]), float(s["m2"]),
+                s["last_date"], int(s["last_hour"]), s.get("last_value"), s.get("last_z"), now
+            )
+            for s in states
+        ])
 
 
 def insert_incident_report(incident_data: Dict) -> int:
@@ -506,31 +1445,29 @@ def insert_incident_report(incident_data: Dict) -> int:
     Returns:
         ID del reporte insertado
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    now = datetime.now(timezone.utc).isoformat()
+        now = datetime.now(timezone.utc).isoformat()
     
-    cursor.execute("""
-        INSERT INTO incident_reports (
-            incident_type, description, latitude, longitude,
-            severity, reported_by, reported_at, status, created_at, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?, ?)
-    """, (
-        incident_data['incident_type'],
-        incident_data['description'],
-        incident_data['latitude'],
-        incident_data['longitude'],
-        incident_data.get('severity', 'medium'),
-        incident_data.get('reported_by', 'anonymous'),
-        now,
-        now,
-        now
-    ))
-    
-    report_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+        cursor.execute("""
+            INSERT INTO incident_reports (
+                incident_type, description, latitude, longitude,
+                severity, reported_by, reported_at, status, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, 'active', ?, ?)
+        """, (
+            incident_data['incident_type'],
+            incident_data['description'],
+            incident_data['latitude'],
+            incident_data['longitude'],
+            incident_data.get('severity', 'medium'),
+            incident_data.get('reported_by', 'anonymous'),
+            now,
+            now,
+            now
+        ))
+    
+        report_id = cursor.lastrowid
     
     logger.info(f" Reporte de incidencia creado: ID={report_id}, Tipo={incident_data['incident_type']}")
     return report_id
@@ -546,19 +1483,17 @@ def get_active_incident_reports(limit: int = 50) -> List[Dict]:
     Returns:
         Lista de reportes activos ordenados por fecha
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT * FROM incident_reports
-        WHERE status = 'active'
-        ORDER BY reported_at DESC
-        LIMIT ?
-    """, (limit,))
+        cursor.execute("""
+            SELECT * FROM incident_reports
+            WHERE status = 'active'
+            ORDER BY reported_at DESC
+            LIMIT ?
+        """, (limit,))
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     return [dict(row) for row in rows]
 
@@ -574,26 +1509,24 @@ def get_all_incident_reports(status: Optional[str] = None, limit: int = 100) ->
     Returns:
         Lista de reportes
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    if status:
-        cursor.execute("""
-            SELECT * FROM incident_reports
-            WHERE status = ?
-            ORDER BY reported_at DESC
-            LIMIT ?
-        """, (status, limit))
-    else:
-        cursor.execute("""
-            SELECT * FROM incident_reports
-            ORDER BY reported_at DESC
-            LIMIT ?
-        """, (limit,))
+        if status:
+            cursor.execute("""
+                SELECT * FROM incident_reports
+                WHERE status = ?
+                ORDER BY reported_at DESC
+                LIMIT ?
+            """, (status, limit))
+        else:
+            cursor.execute("""
+                SELECT * FROM incident_reports
+                ORDER BY reported_at DESC
+                LIMIT ?
+            """, (limit,))
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     return [dict(row) for row in rows]
 
@@ -610,27 +1543,25 @@ def update_incident_status(incident_id: int, status: str, notes: Optional[str] =
     Returns:
         True si se actualizó correctamente
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    now = datetime.now(timezone.utc).isoformat()
+        now = datetime.now(timezone.utc).isoformat()
     
-    if status == 'resolved':
-        cursor.execute("""
-            UPDATE incident_reports
-            SET status = ?, resolved_at = ?, notes = ?, updated_at = ?
-            WHERE id = ?
-        """, (status, now, notes, now, incident_id))
-    else:
-        cursor.execute("""
-            UPDATE incident_reports
-            SET status = ?, notes = ?, updated_at = ?
-            WHERE id = ?
-        """, (status, notes, now, incident_id))
+        if status == 'resolved':
+            cursor.execute("""
+                UPDATE incident_reports
+                SET status = ?, resolved_at = ?, notes = ?, updated_at = ?
+                WHERE id = ?
+            """, (status, now, notes, now, incident_id))
+        else:
+            cursor.execute("""
+                UPDATE incident_reports
+                SET status = ?, notes = ?, updated_at = ?
+                WHERE id = ?
+            """, (status, notes, now, incident_id))
     
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+        updated = cursor.rowcount > 0
     
     if updated:
         logger.info(f" Reporte {incident_id} actualizado a estado: {status}")
@@ -648,91 +1579,89 @@ def insert_or_update_forecast_data(forecast_data: List[Dict]) -> int:
     Returns:
         Número de registros procesados
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    inserted = 0
-    updated = 0
-    
-    for record in forecast_data:
-        try:
-            # Insertar o actualizar
-            cursor.execute("""
-                INSERT INTO weather_forecast (
-                    station_id, station_name, region, latitude, longitude, elevation,
-                    forecast_date, temp_max, temp_min, temp_avg, humidity,
-                    wind_speed_max, wind_direction, wind_angle,
-                    precipitation_total, precipitation_probability,
-                    pressure, cloud_cover, summary, icon,
-                    flood_probability, flood_level, flood_alert,
-                    drought_probability, drought_level, drought_alert,
-                    retrieved_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(station_id, forecast_date) DO UPDATE SET
-                    temp_max = excluded.temp_max,
-                    temp_min = excluded.temp_min,
-                    temp_avg = excluded.temp_avg,
-                    humidity = excluded.humidity,
-                    wind_speed_max = excluded.wind_speed_max,
-                    wind_direction = excluded.wind_direction,
-                    wind_angle = excluded.wind_angle,
-                    precipitation_total = excluded.precipitation_total,
-                    precipitation_probability = excluded.precipitation_probability,
-                    pressure = excluded.pressure,
-                    cloud_cover = excluded.cloud_cover,
-                    summary = excluded.summary,
-                    icon = excluded.icon,
-                    flood_probability = excluded.flood_probability,
-                    flood_level = excluded.flood_level,
-                    flood_alert = excluded.flood_alert,
-                    drought_probability = excluded.drought_probability,
-                    drought_level = excluded.drought_level,
-                    drought_alert = excluded.drought_alert,
-                    retrieved_at = excluded.retrieved_at,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (
-                record.get("station_id"),
-                record.get("station_name"),
-                record.get("region"),
-                record.get("latitude"),
-                record.get("longitude"),
-                record.get("elevation"),
-                record.get("forecast_date"),
-                record.get("temp_max"),
-                record.get("temp_min"),
-                record.get("temp_avg"),
-                record.get("humidity"),
-                record.get("wind_speed_max"),
-                record.get("wind_direction"),
-                record.get("wind_angle"),
-                record.get("precipitation_total"),
-                record.get("precipitation_probability"),
-                record.get("pressure"),
-                record.get("cloud_cover"),
-                record.get("summary"),
-                record.get("icon"),
-                record.get("flood_probability", 0.0),
-                record.get("flood_level", "GREEN"),
-                1 if record.get("flood_alert", False) else 0,
-                record.get("drought_probability", 0.0),
-                record.get("drought_level", "GREEN"),
-                1 if record.get("drought_alert", False) else 0,
-                record.get("retrieved_at"),
-            ))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+    
+        inserted = 0
+        updated = 0
+    
+        for record in forecast_data:
+            try:
+                # Insertar o actualizar
+                cursor.execute("""
+                    INSERT INTO weather_forecast (
+                        station_id, station_name, region, latitude, longitude, elevation,
+                        forecast_date, temp_max, temp_min, temp_avg, humidity,
+                        wind_speed_max, wind_direction, wind_angle,
+                        precipitation_total, precipitation_probability,
+                        pressure, cloud_cover, summary, icon,
+                        flood_probability, flood_level, flood_alert,
+                        drought_probability, drought_level, drought_alert,
+                        retrieved_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(station_id, forecast_date) DO UPDATE SET
+                        temp_max = excluded.temp_max,
+                        temp_min = excluded.temp_min,
+                        temp_avg = excluded.temp_avg,
+                        humidity = excluded.humidity,
+                        wind_speed_max = excluded.wind_speed_max,
+                        wind_direction = excluded.wind_direction,
+                        wind_angle = excluded.wind_angle,
+                        precipitation_total = excluded.precipitation_total,
+                        precipitation_probability = excluded.precipitation_probability,
+                        pressure = excluded.pressure,
+                        cloud_cover = excluded.cloud_cover,
+                        summary = excluded.summary,
+                        icon = excluded.icon,
+                        flood_probability = excluded.flood_probability,
+                        flood_level = excluded.flood_level,
+                        flood_alert = excluded.flood_alert,
+                        drought_probability = excluded.drought_probability,
+                        drought_level = excluded.drought_level,
+                        drought_alert = excluded.drought_alert,
+                        retrieved_at = excluded.retrieved_at,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (
+                    record.get("station_id"),
+                    record.get("station_name"),
+                    record.get("region"),
+                    record.get("latitude"),
+                    record.get("longitude"),
+                    record.get("elevation"),
+                    record.get("forecast_date"),
+                    record.get("temp_max"),
+                    record.get("temp_min"),
+                    record.get("temp_avg"),
+                    record.get("humidity"),
+                    record.get("wind_speed_max"),
+                    record.get("wind_direction"),
+                    record.get("wind_angle"),
+                    record.get("precipitation_total"),
+                    record.get("precipitation_probability"),
+                    record.get("pressure"),
+                    record.get("cloud_cover"),
+                    record.get("summary"),
+                    record.get("icon"),
+                    record.get("flood_probability", 0.0),
+                    record.get("flood_level", "GREEN"),
+                    1 if record.get("flood_alert", False) else 0,
+                    record.get("drought_probability", 0.0),
+                    record.get("drought_level", "GREEN"),
+                    1 if record.get("drought_alert", False) else 0,
+                    record.get("retrieved_at"),
+                ))
             
-            if cursor.rowcount == 1:
-                inserted += 1
-            else:
-                updated += 1
+                if cursor.rowcount == 1:
+                    inserted += 1
+                else:
+                    updated += 1
                 
-        except Exception as e:
-            logger.error(f" Error insertando forecast: {e}")
-            continue
-    
-    conn.commit()
-    conn.close()
+            except Exception as e:
+                logger.error(f" Error insertando forecast: {e}")
+                continue
     
     logger.info(f" Pronósticos guardados: {inserted} nuevos, {updated} actualizados")
+    _notify_ingest("weather_forecast", {record.get("station_id") for record in forecast_data})
     return inserted + updated
 
 
@@ -752,42 +1681,39 @@ def get_forecast_by_station(station_id: int, days: int = 7) -> List[Dict]:
     from datetime import date as date_module
     today = date_module.today().isoformat()
     
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Primero intentar obtener datos de hoy en adelante
-    cursor.execute("""
-        SELECT * FROM weather_forecast
-        WHERE station_id = ?
-        AND forecast_date >= ?
-        ORDER BY forecast_date ASC
-        LIMIT ?
-    """, (station_id, today, days))
-    
-    rows = cursor.fetchall()
-    
-    # Verificar si los datos tienen riesgos calculados
-    has_valid_risks = False
-    if rows:
-        for row in rows:
-            if row['flood_probability'] > 0.0 or row['drought_probability'] > 0.0:
-                has_valid_risks = True
-                break
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    # Si no hay datos o no tienen riesgos calculados, usar los datos más recientes con riesgos
-    if not rows or not has_valid_risks:
-        logger.warning(f"⚠️ No hay datos de forecast válidos para estación {station_id}, usando datos más recientes con riesgos calculados")
+        # Primero intentar obtener datos de hoy en adelante
         cursor.execute("""
             SELECT * FROM weather_forecast
             WHERE station_id = ?
-            AND (flood_probability > 0.0 OR drought_probability > 0.0)
-            ORDER BY forecast_date DESC
+            AND forecast_date >= ?
+            ORDER BY forecast_date ASC
             LIMIT ?
-        """, (station_id, days))
+        """, (station_id, today, days))
+    
         rows = cursor.fetchall()
     
-    conn.close()
+        # Verificar si los datos tienen riesgos calculados
+        has_valid_risks = False
+        if rows:
+            for row in rows:
+                if row['flood_probability'] > 0.0 or row['drought_probability'] > 0.0:
+                    has_valid_risks = True
+                    break
+    
+        # Si no hay datos o no tienen riesgos calculados, usar los datos más recientes con riesgos
+        if not rows or not has_valid_risks:
+            logger.warning(f"⚠️ No hay datos de forecast válidos para estación {station_id}, usando datos más recientes con riesgos calculados")
+            cursor.execute("""
+                SELECT * FROM weather_forecast
+                WHERE station_id = ?
+                AND (flood_probability > 0.0 OR drought_probability > 0.0)
+                ORDER BY forecast_date DESC
+                LIMIT ?
+            """, (station_id, days))
+            rows = cursor.fetchall()
     
     return [dict(row) for row in rows]
 
@@ -807,38 +1733,35 @@ def get_all_forecasts(days: int = 7) -> Dict[int, List[Dict]]:
     from datetime import date as date_module
     today = date_module.today().isoformat()
     
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Primero intentar obtener datos de hoy en adelante
-    cursor.execute("""
-        SELECT * FROM weather_forecast
-        WHERE forecast_date >= ?
-        ORDER BY station_id, forecast_date ASC
-    """, (today,))
-    
-    rows = cursor.fetchall()
-    
-    # Verificar si los datos tienen riesgos calculados (probabilidades > 0)
-    has_valid_risks = False
-    if rows:
-        for row in rows:
-            if row['flood_probability'] > 0.0 or row['drought_probability'] > 0.0:
-                has_valid_risks = True
-                break
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    # Si no hay datos o no tienen riesgos calculados, usar los datos más recientes con riesgos
-    if not rows or not has_valid_risks:
-        logger.warning("⚠️ No hay datos de forecast válidos para hoy, usando datos más recientes con riesgos calculados")
+        # Primero intentar obtener datos de hoy en adelante
         cursor.execute("""
             SELECT * FROM weather_forecast
-            WHERE flood_probability > 0.0 OR drought_probability > 0.0
-            ORDER BY forecast_date DESC, station_id
-        """)
+            WHERE forecast_date >= ?
+            ORDER BY station_id, forecast_date ASC
+        """, (today,))
+    
         rows = cursor.fetchall()
     
-    conn.close()
+        # Verificar si los datos tienen riesgos calculados (probabilidades > 0)
+        has_valid_risks = False
+        if rows:
+            for row in rows:
+                if row['flood_probability'] > 0.0 or row['drought_probability'] > 0.0:
+                    has_valid_risks = True
+                    break
+    
+        # Si no hay datos o no tienen riesgos calculados, usar los datos más recientes con riesgos
+        if not rows or not has_valid_risks:
+            logger.warning("⚠️ No hay datos de forecast válidos para hoy, usando datos más recientes con riesgos calculados")
+            cursor.execute("""
+                SELECT * FROM weather_forecast
+                WHERE flood_probability > 0.0 OR drought_probability > 0.0
+                ORDER BY forecast_date DESC, station_id
+            """)
+            rows = cursor.fetchall()
     
     # Agrupar por estación
     forecasts_by_station = {}
@@ -867,35 +1790,33 @@ def upsert_alert(station_id: int, station_name: str, alert_type: str,
         risk_level: Nivel de riesgo ('YELLOW' o 'RED')
         probability: Probabilidad del riesgo (0.0 - 1.0)
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    now = datetime.now(timezone.utc).isoformat()
-    
-    # Verificar si ya existe una alerta para esta estación y tipo
-    cursor.execute("""
-        SELECT id, triggered_at FROM active_alerts
-        WHERE station_id = ? AND alert_type = ?
-    """, (station_id, alert_type))
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        now = datetime.now(timezone.utc).isoformat()
     
-    existing = cursor.fetchone()
-    
-    if existing:
-        # Actualizar alerta existente (mantener triggered_at original)
+        # Verificar si ya existe una alerta para esta estación y tipo
         cursor.execute("""
-            UPDATE active_alerts
-            SET risk_level = ?, probability = ?, updated_at = ?, station_name = ?
+            SELECT id, triggered_at FROM active_alerts
             WHERE station_id = ? AND alert_type = ?
-        """, (risk_level, probability, now, station_name, station_id, alert_type))
-    else:
-        # Crear nueva alerta
-        cursor.execute("""
-            INSERT INTO active_alerts 
-            (station_id, station_name, alert_type, risk_level, probability, triggered_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (station_id, station_name, alert_type, risk_level, probability, now, now))
+        """, (station_id, alert_type))
+    
+        existing = cursor.fetchone()
+    
+        if existing:
+            # Actualizar alerta existente (mantener triggered_at original)
+            cursor.execute("""
+                UPDATE active_alerts
+                SET risk_level = ?, probability = ?, updated_at = ?, station_name = ?
+                WHERE station_id = ? AND alert_type = ?
+            """, (risk_level, probability, now, station_name, station_id, alert_type))
+        else:
+            # Crear nueva alerta
+            cursor.execute("""
+                INSERT INTO active_alerts 
+                (station_id, station_name, alert_type, risk_level, probability, triggered_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (station_id, station_name, alert_type, risk_level, probability, now, now))
     
-    conn.commit()
-    conn.close()
 
 
 def remove_alert(station_id: int, alert_type: str) -> None:
@@ -906,16 +1827,14 @@ def remove_alert(station_id: int, alert_type: str) -> None:
         station_id: ID de la estación
         alert_type: Tipo de alerta ('flood' o 'drought')
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        DELETE FROM active_alerts
-        WHERE station_id = ? AND alert_type = ?
-    """, (station_id, alert_type))
+        cursor.execute("""
+            DELETE FROM active_alerts
+            WHERE station_id = ? AND alert_type = ?
+        """, (station_id, alert_type))
     
-    conn.commit()
-    conn.close()
 
 
 def get_active_alerts(alert_type: Optional[str] = None) -> List[Dict]:
@@ -928,24 +1847,22 @@ def get_active_alerts(alert_type: Optional[str] = None) -> List[Dict]:
     Returns:
         Lista de alertas activas
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    if alert_type:
-        cursor.execute("""
-            SELECT * FROM active_alerts
-            WHERE alert_type = ?
-            ORDER BY probability DESC, triggered_at DESC
-        """, (alert_type,))
-    else:
-        cursor.execute("""
-            SELECT * FROM active_alerts
-            ORDER BY probability DESC, triggered_at DESC
-        """)
+        if alert_type:
+            cursor.execute("""
+                SELECT * FROM active_alerts
+                WHERE alert_type = ?
+                ORDER BY probability DESC, triggered_at DESC
+            """, (alert_type,))
+        else:
+            cursor.execute("""
+                SELECT * FROM active_alerts
+                ORDER BY probability DESC, triggered_at DESC
+            """)
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     return [dict(row) for row in rows]
 
@@ -961,17 +1878,15 @@ def get_station_alert(station_id: int, alert_type: str) -> Optional[Dict]:
     Returns:
         Alerta si existe, None si no
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT * FROM active_alerts
-        WHERE station_id = ? AND alert_type = ?
-    """, (station_id, alert_type))
+        cursor.execute("""
+            SELECT * FROM active_alerts
+            WHERE station_id = ? AND alert_type = ?
+        """, (station_id, alert_type))
     
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
     
     return dict(row) if row else None
 
@@ -983,16 +1898,14 @@ def get_all_alerts_by_station() -> Dict[int, Dict[str, Dict]]:
     Returns:
         Dict con estructura: {station_id: {'flood': {...}, 'drought': {...}}}
     """
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT * FROM active_alerts
-    """)
+        cursor.execute("""
+            SELECT * FROM active_alerts
+        """)
     
-    rows = cursor.fetchall()
-    conn.close()
+        rows = cursor.fetchall()
     
     # Agrupar por estación
     alerts_map = {}
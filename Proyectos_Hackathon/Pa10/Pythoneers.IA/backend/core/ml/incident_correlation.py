@@ -4,11 +4,12 @@ Permite usar reportes reales de usuarios para entrenar el modelo ML.
 """
 
 import logging
-from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
+import numpy as np
 import pandas as pd
 
-from core.database.raindrop_db import get_all_incident_reports, get_data_by_date_range
+from core.database.raindrop_db import get_all_incident_reports, get_weather_at_hours
+from core.utils.spatial_index import get_station_index
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,9 @@ def get_incident_training_data() -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
     Correlaciona cada incidente con MÚLTIPLES estaciones cercanas (radio 50km).
     El impacto disminuye con la distancia (decaimiento gaussiano).
     
+    Las estaciones cercanas se buscan en lote sobre el índice espacial y las lecturas
+    de todas las ventanas (+/- 1 hora) se obtienen con una sola consulta.
+    
     Returns:
         Tuple con (features_df, flood_labels, drought_labels)
     """
@@ -34,96 +38,104 @@ def get_incident_training_data() -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
     
     logger.info(f"📍 Encontrados {len(incidents)} incidentes reportados")
     
-    # Importar función para encontrar estaciones cercanas
     from config import STATIONS
     
-    training_samples = []
-    total_correlations = 0
-    
-    for incident in incidents:
-        try:
-            # Encontrar TODAS las estaciones dentro del radio de influencia (50km)
-            nearby_stations = find_nearby_stations(
-                incident['latitude'],
-                incident['longitude'],
-                STATIONS,
-                max_distance_km=50
-            )
-            
-            if not nearby_stations:
-                logger.debug(f"Incidente {incident['id']} muy lejos de todas las estaciones (>50km)")
-                continue
-            
-            # Obtener datos meteorológicos del momento del reporte
-            # Usamos ventana de +/- 1 hora para capturar condiciones
-            reported_at = datetime.fromisoformat(incident['reported_at'].replace('Z', '+00:00'))
-            start_time = reported_at - timedelta(hours=1)
-            end_time = reported_at + timedelta(hours=1)
-            
-            # Convertir severidad base a valor numérico
-            severity_map = {'low': 0.3, 'medium': 0.6, 'high': 0.9}
-            base_severity = severity_map.get(incident.get('severity', 'medium'), 0.6)
-            
-            # Crear una muestra para CADA estación cercana con impacto proporcional
-            for station_id, distance in nearby_stations:
-                # Calcular factor de decaimiento basado en distancia
-                # Fórmula gaussiana: impact = base_severity * exp(-(distance/20)^2)
-                # Esto da: 0km=100%, 10km=78%, 20km=37%, 30km=11%, 40km=2%, 50km=0.3%
-                import math
-                distance_factor = math.exp(-(distance / 20) ** 2)
-                adjusted_severity = base_severity * distance_factor
-                
-                # Obtener datos meteorológicos de esta estación
-                weather_data = get_data_by_date_range(
-                    station_id=station_id,
-                    start_date=start_time.isoformat(),
-                    end_date=end_time.isoformat()
-                )
-                
-                if not weather_data:
-                    logger.debug(f"No hay datos para estación {station_id} en incidente {incident['id']}")
-                    continue
-                
-                # Usar el dato más cercano al momento del reporte
-                weather_record = weather_data[0]
-                
-                # Crear etiquetas: solo el tipo de incidente reportado tiene valor
-                flood_label = adjusted_severity if incident['incident_type'] == 'flood' else 0.0
-                drought_label = adjusted_severity if incident['incident_type'] == 'drought' else 0.0
-                
-                # Extraer features meteorológicas
-                sample = {
-                    'temperature': float(weather_record.get('temperature', 0)),
-                    'humidity': float(weather_record.get('humidity', 0)),
-                    'precipitation_total': float(weather_record.get('precipitation_total', 0)),
-                    'wind_speed': float(weather_record.get('wind_speed', 0)),
-                    'pressure': float(weather_record.get('pressure', 1013)),
-                    'temp_change': 0.0,  # No tenemos histórico aquí
-                    'humidity_change': 0.0,
-                    'precip_change': 0.0,
-                    'wind_change': 0.0,
-                    'pressure_change': 0.0,
-                    'flood_risk': flood_label,
-                    'drought_risk': drought_label,
-                    'incident_id': incident['id'],
-                    'station_id': station_id,
-                    'distance_km': distance,
-                    'impact_factor': distance_factor
-                }
-                
-                training_samples.append(sample)
-                total_correlations += 1
-            
-        except Exception as e:
-            logger.warning(f"Error procesando incidente {incident.get('id')}: {e}")
-            continue
-    
-    if not training_samples:
+    incidents_df = pd.DataFrame(incidents)
+    
+    # Momento del reporte en UTC (las lecturas horarias se agrupan por fecha/hora UTC)
+    incidents_df['reported_at'] = pd.to_datetime(
+        incidents_df['reported_at'].astype(str).str.replace('Z', '+00:00'),
+        errors='coerce', utc=True, format='ISO8601'
+    )
+    incidents_df = incidents_df.dropna(subset=['reported_at', 'latitude', 'longitude'])
+    
+    # Encontrar TODAS las estaciones dentro del radio de influencia (50km), en lote
+    index = get_station_index(STATIONS)
+    nearby = index.query_radius(
+        incidents_df['latitude'].to_numpy(),
+        incidents_df['longitude'].to_numpy(),
+        max_distance_km=50
+    )
+    
+    pairs = pd.DataFrame(
+        [
+            (row, station_id, distance)
+            for row, stations_near in enumerate(nearby)
+            for station_id, distance in stations_near
+        ],
+        columns=['row', 'station_id', 'distance_km']
+    )
+    
+    if pairs.empty:
+        logger.warning("⚠️ No se pudieron correlacionar incidentes con datos meteorológicos")
+        return pd.DataFrame(), pd.Series(dtype=float), pd.Series(dtype=float)
+    
+    incident_cols = incidents_df[['id', 'incident_type', 'severity', 'reported_at']].reset_index(drop=True)
+    pairs = pairs.join(incident_cols, on='row')
+    
+    # Ventana de +/- 1 hora: las horas que cubre, ordenadas por cercanía al reporte
+    base_hour = pairs['reported_at'].dt.floor('h')
+    windows = []
+    for offset in (-1, 0, 1):
+        slot = base_hour + pd.Timedelta(hours=offset)
+        windows.append(pairs.assign(
+            slot_date=slot.dt.strftime('%Y-%m-%d'),
+            slot_hour=slot.dt.hour,
+            slot_gap=(slot - pairs['reported_at']).abs()
+        ))
+    windows = pd.concat(windows, ignore_index=True)
+    
+    # Obtener datos meteorológicos de todas las ventanas en una sola consulta
+    feature_cols = ['temperature', 'humidity', 'precipitation_total', 'wind_speed', 'pressure']
+    slots = windows[['station_id', 'slot_date', 'slot_hour']].drop_duplicates()
+    weather = get_weather_at_hours(list(slots.itertuples(index=False, name=None)), columns=feature_cols)
+    
+    # Usar el dato más cercano al momento del reporte
+    matched = windows.merge(
+        weather,
+        left_on=['station_id', 'slot_date', 'slot_hour'],
+        right_on=['station_id', 'date', 'hour']
+    )
+    matched = (
+        matched.sort_values(['row', 'distance_km', 'slot_gap'])
+        .drop_duplicates(subset=['row', 'station_id'])
+        .reset_index(drop=True)
+    )
+    
+    if matched.empty:
         logger.warning("⚠️ No se pudieron correlacionar incidentes con datos meteorológicos")
         return pd.DataFrame(), pd.Series(dtype=float), pd.Series(dtype=float)
     
-    # Convertir a DataFrame
-    df = pd.DataFrame(training_samples)
+    # Convertir severidad base a valor numérico
+    severity_map = {'low': 0.3, 'medium': 0.6, 'high': 0.9}
+    base_severity = matched['severity'].map(severity_map).fillna(0.6)
+    
+    # Factor de decaimiento basado en distancia
+    # Fórmula gaussiana: impact = base_severity * exp(-(distance/20)^2)
+    # Esto da: 0km=100%, 10km=78%, 20km=37%, 30km=11%, 40km=2%, 50km=0.3%
+    distance_factor = np.exp(-(matched['distance_km'] / 20) ** 2)
+    adjusted_severity = base_severity * distance_factor
+    
+    # Crear etiquetas: solo el tipo de incidente reportado tiene valor
+    df = pd.DataFrame({
+        'temperature': matched['temperature'].fillna(0).astype(float),
+        'humidity': matched['humidity'].fillna(0).astype(float),
+        'precipitation_total': matched['precipitation_total'].fillna(0).astype(float),
+        'wind_speed': matched['wind_speed'].fillna(0).astype(float),
+        'pressure': matched['pressure'].fillna(1013).astype(float),
+        'temp_change': 0.0,  # No tenemos histórico aquí
+        'humidity_change': 0.0,
+        'precip_change': 0.0,
+        'wind_change': 0.0,
+        'pressure_change': 0.0,
+        'flood_risk': adjusted_severity.where(matched['incident_type'] == 'flood', 0.0),
+        'drought_risk': adjusted_severity.where(matched['incident_type'] == 'drought', 0.0),
+        'incident_id': matched['id'],
+        'station_id': matched['station_id'],
+        'distance_km': matched['distance_km'],
+        'impact_factor': distance_factor
+    })
+    total_correlations = len(df)
     
     logger.info(f"✅ Generadas {len(df)} muestras de entrenamiento desde {len(incidents)} incidentes")
     logger.info(f"   - Total correlaciones: {total_correlations} (múltiples estaciones por incidente)")
@@ -175,6 +187,7 @@ def find_nearby_stations(
 ) -> List[Tuple[int, float]]:
     """
     Encuentra TODAS las estaciones dentro de un radio de distancia.
+    Para muchos puntos a la vez usar get_station_index(stations).query_radius.
     
     Args:
         lat: Latitud del punto
@@ -185,22 +198,13 @@ def find_nearby_stations(
     Returns:
         Lista de tuplas (station_id, distance_km) ordenadas por distancia
     """
-    nearby = []
-    
-    for station in stations:
-        distance = haversine_distance(lat, lon, station['lat'], station['lon'])
-        if distance <= max_distance_km:
-            nearby.append((station['id'], distance))
-    
-    # Ordenar por distancia (más cercana primero)
-    nearby.sort(key=lambda x: x[1])
-    
-    return nearby
+    return get_station_index(stations).query_radius([lat], [lon], max_distance_km)[0]
 
 
 def find_closest_station(lat: float, lon: float, stations: List[Dict]) -> Tuple[int, float]:
     """
     Encuentra la estación más cercana a unas coordenadas.
+    Para muchos puntos a la vez usar get_station_index(stations).query_nearest.
     
     Args:
         lat: Latitud del punto
@@ -210,16 +214,12 @@ def find_closest_station(lat: float, lon: float, stations: List[Dict]) -> Tuple[
     Returns:
         Tuple (station_id, distance_km)
     """
-    closest_station_id = None
-    min_distance = float('inf')
+    station_ids, distances = get_station_index(stations).query_nearest([lat], [lon], k=1)
     
-    for station in stations:
-        distance = haversine_distance(lat, lon, station['lat'], station['lon'])
-        if distance < min_distance:
-            min_distance = distance
-            closest_station_id = station['id']
+    if station_ids.size == 0:
+        return None, float('inf')
     
-    return closest_station_id, min_distance
+    return int(station_ids[0, 0]), float(distances[0, 0])
 
 
 def get_combined_training_data(use_incidents: bool = True) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
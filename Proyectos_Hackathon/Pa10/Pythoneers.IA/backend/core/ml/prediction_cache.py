@@ -0,0 +1,275 @@
+"""
+Caché de predicciones compartida por los endpoints de la API.
+
+Cada entrada se indexa por (tipo, estación, timestamp de la observación, versión del modelo):
+- Una ingesta nueva invalida las entradas de las estaciones afectadas
+  (listener registrado en raindrop_db)
+- Un reentrenamiento cambia la versión del modelo y descarta las entradas anteriores
+- Memoria acotada con expulsión LRU y contadores de aciertos/fallos
+- Persistencia opcional en disco para sobrevivir reinicios del worker
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from config import DATA_CACHE_PATH, PREDICTIONS_CACHE
+
+logger = logging.getLogger(__name__)
+
+# Configuración (sobrescribible por variables de entorno)
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "4096"))
+PREDICTION_CACHE_PERSIST = os.getenv("PREDICTION_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+
+# Segundos mínimos entre escrituras a disco (además de la escritura al apagar)
+PERSIST_INTERVAL_SECONDS = 30
+
+# Tipos de entrada que dependen de cada tabla (se invalidan al ingerir en ella)
+INGEST_DEPENDENCIES = {
+    "weather_hourly": {"station_risk"},
+    "weather_forecast": {"forecast"},
+}
+
+# Clave: (tipo, station_id, observed_at, model_version)
+CacheKey = Tuple[str, Hashable, Hashable, str]
+
+
+def model_version(*paths: Path) -> str:
+    """
+    Versión de un modelo a partir de sus archivos (mtime + tamaño).
+    Cambia en cada reentrenamiento, también si lo hizo otro proceso.
+    
+    Returns:
+        Cadena de versión, o 'none' si no hay archivos de modelo
+    """
+    parts = []
+    for path in paths:
+        try:
+            stat = Path(path).stat()
+            parts.append(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+        except OSError:
+            parts.append("none")
+    return "|".join(parts) or "none"
+
+
+class PredictionCache:
+    """Caché LRU thread-safe de predicciones con invalidación por ingesta y por versión de modelo."""
+    
+    def __init__(self, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES, persist_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.persist_path = Path(persist_path) if persist_path else None
+        
+        self._entries: "OrderedDict[CacheKey, Any]" = OrderedDict()
+        self._versions: Dict[str, str] = {}  # última versión de modelo vista por tipo
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_save = 0.0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        
+        if self.persist_path:
+            self._load()
+    
+    def get(self, kind: str, station_id: Hashable, observed_at: Hashable, version: str) -> Optional[Any]:
+        """Devuelve el valor cacheado o None si no existe (cuenta acierto/fallo)."""
+        key = (kind, station_id, observed_at, version)
+        with self._lock:
+            self._check_version(kind, version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+    
+    def set(self, kind: str, station_id: Hashable, observed_at: Hashable, version: str, value: Any) -> None:
+        """Guarda un valor, expulsando las entradas menos usadas si se supera el límite."""
+        self.set_many(kind, {(station_id, observed_at): value}, version)
+    
+    def get_many(
+        self,
+        kind: str,
+        keys: Iterable[Tuple[Hashable, Hashable]],
+        version: str
+    ) -> Dict[Tuple[Hashable, Hashable], Any]:
+        """
+        Busca varias entradas de un mismo tipo y versión.
+        
+        Args:
+            kind: Tipo de predicción
+            keys: Pares (station_id, observed_at)
+            version: Versión del modelo
+        
+        Returns:
+            Diccionario {(station_id, observed_at): valor} solo con los aciertos
+        """
+        found = {}
+        with self._lock:
+            self._check_version(kind, version)
+            for station_id, observed_at in keys:
+                key = (kind, station_id, observed_at, version)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[(station_id, observed_at)] = self._entries[key]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+    
+    def set_many(self, kind: str, values: Dict[Tuple[Hashable, Hashable], Any], version: str) -> None:
+        """Guarda varias entradas de un mismo tipo y versión."""
+        with self._lock:
+            self._check_version(kind, version)
+            for (station_id, observed_at), value in values.items():
+                key = (kind, station_id, observed_at, version)
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            
+            self._dirty = True
+        self._maybe_save()
+    
+    def _check_version(self, kind: str, version: str) -> None:
+        """Si cambió la versión del modelo para este tipo, descarta las entradas anteriores."""
+        previous = self._versions.get(kind)
+        if previous != version:
+            if previous is not None:
+                removed = self._remove(lambda key: key[0] == kind and key[3] != version)
+                if removed:
+                    logger.info(f" Caché de predicciones: {removed} entradas '{kind}' descartadas por nuevo modelo")
+            self._versions[kind] = version
+    
+    def _remove(self, predicate) -> int:
+        stale = [key for key in self._entries if predicate(key)]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self.invalidations += len(stale)
+            self._dirty = True
+        return len(stale)
+    
+    def invalidate(self, kinds: Optional[Iterable[str]] = None, station_ids: Optional[Iterable[Hashable]] = None) -> int:
+        """
+        Elimina entradas por tipo y/o estación.
+        Las entradas agregadas (station_id None) se eliminan siempre que coincida el tipo.
+        
+        Args:
+            kinds: Tipos a invalidar (default: todos)
+            station_ids: Estaciones a invalidar (default: todas)
+        
+        Returns:
+            Número de entradas eliminadas
+        """
+        kinds = set(kinds) if kinds is not None else None
+        station_ids = set(station_ids) if station_ids is not None else None
+        
+        def matches(key: CacheKey) -> bool:
+            if kinds is not None and key[0] not in kinds:
+                return False
+            return station_ids is None or key[1] is None or key[1] in station_ids
+        
+        with self._lock:
+            removed = self._remove(matches)
+        self._maybe_save()
+        return removed
+    
+    def on_ingest(self, table: str, station_ids: Iterable[int]) -> None:
+        """Listener de raindrop_db: invalida los tipos que dependen de la tabla ingerida."""
+        kinds = INGEST_DEPENDENCIES.get(table)
+        if kinds:
+            self.invalidate(kinds, station_ids)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._versions.clear()
+            self._dirty = True
+        self._maybe_save()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "persistent": self.persist_path is not None,
+            }
+    
+    def _maybe_save(self) -> None:
+        if self.persist_path and self._dirty and time.monotonic() - self._last_save >= PERSIST_INTERVAL_SECONDS:
+            self.save()
+    
+    def save(self) -> bool:
+        """Escribe la caché a disco de forma atómica (si la persistencia está activa)."""
+        if not self.persist_path:
+            return False
+        
+        with self._lock:
+            snapshot = {"entries": list(self._entries.items()), "versions": dict(self._versions)}
+            self._dirty = False
+            self._last_save = time.monotonic()
+        
+        try:
+            tmp_path = self.persist_path.with_suffix(self.persist_path.suffix + ".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+            return True
+        except Exception as e:
+            logger.warning(f" No se pudo guardar la caché de predicciones: {e}")
+            return False
+    
+    def _load(self) -> None:
+        if not self.persist_path.exists():
+            return
+        try:
+            with open(self.persist_path, "rb") as f:
+                snapshot = pickle.load(f)
+            for key, value in snapshot["entries"][-self.max_entries:]:
+                self._entries[key] = value
+            self._versions.update(snapshot["versions"])
+            self._last_save = time.monotonic()
+            logger.info(f" Caché de predicciones restaurada: {len(self._entries)} entradas")
+        except Exception as e:
+            logger.warning(f" Caché de predicciones en disco ignorada ({e})")
+            self._entries.clear()
+            self._versions.clear()
+
+
+_cache_instance: Optional[PredictionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """
+    Obtiene la caché de predicciones del proceso (singleton).
+    En la primera llamada la registra como listener de ingestas en raindrop_db.
+    """
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                from core.database.raindrop_db import add_ingest_listener
+                
+                persist_path = DATA_CACHE_PATH / PREDICTIONS_CACHE if PREDICTION_CACHE_PERSIST else None
+                cache = PredictionCache(persist_path=persist_path)
+                add_ingest_listener(cache.on_ingest)
+                _cache_instance = cache
+    return _cache_instance
@@ -4,9 +4,10 @@ Entrena DOS modelos RandomForestRegressor (inundación y sequía) usando datos h
 """
 
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from pathlib import Path
 import logging
+import threading
 import joblib
 import numpy as np
 import pandas as pd
@@ -15,8 +16,8 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 
-from core.database.raindrop_db import get_data_by_date_range
-from core.analysis.risk_analyzer import RiskAnalyzer, RiskLevel
+from core.database.raindrop_db import iter_weather_frames
+from core.analysis.risk_analyzer import RiskLevel
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,62 @@ logger = logging.getLogger(__name__)
 MODELS_DIR = Path(__file__).parent.parent.parent / "ml_models"
 MODELS_DIR.mkdir(exist_ok=True)
 
+# Valores por defecto cuando una observación no trae la variable (o trae 0)
+FEATURE_DEFAULTS = {
+    'temperature': 25.0,
+    'humidity': 70.0,
+    'precipitation_total': 0.0,
+    'wind_speed': 0.0,
+    'pressure': 1013.0,
+}
+
+# Promedios típicos de Panamá usados para estimar los cambios (tendencias)
+# cuando solo se dispone de una observación por estación
+PANAMA_BASELINES = {
+    'temperature': ('temp_change', 27.0),
+    'humidity': ('humidity_change', 75.0),
+    'precipitation_total': ('precip_change', 5.0),
+    'wind_speed': ('wind_change', 10.0),
+    'pressure': ('pressure_change', 1013.0),
+}
+
+# Columnas alternativas aceptadas para cada feature (p.ej. registros de forecast)
+FEATURE_ALIASES = {
+    'temperature': ['temp_avg', 'temperature'],
+    'wind_speed': ['wind_speed_max', 'wind_speed'],
+}
+
+
+def build_feature_frame(records: Union[List[Dict], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Construye la matriz de features para predicción a partir de observaciones.
+    
+    Replica de forma vectorizada la preparación que hacían los endpoints por
+    estación: valores nulos o 0 se reemplazan por los defaults y los cambios se
+    estiman contra los promedios típicos de Panamá.
+    
+    Args:
+        records: Lista de diccionarios o DataFrame con las observaciones
+        
+    Returns:
+        DataFrame con las columnas base y de cambio, una fila por registro
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records)
+    features = pd.DataFrame(index=df.index)
+    
+    for column, default in FEATURE_DEFAULTS.items():
+        values = pd.Series(np.nan, index=df.index, dtype='float64')
+        for alias in reversed(FEATURE_ALIASES.get(column, [column])):
+            if alias in df.columns:
+                candidate = pd.to_numeric(df[alias], errors='coerce')
+                values = candidate.where(candidate.notna() & (candidate != 0), values)
+        features[column] = values.fillna(default)
+    
+    for column, (change_column, baseline) in PANAMA_BASELINES.items():
+        features[change_column] = features[column] - baseline
+    
+    return features
+
 
 class RiskPredictor:
     """
@@ -48,21 +105,25 @@ class RiskPredictor:
             'temp_change', 'humidity_change', 'precip_change',
             'wind_change', 'pressure_change'
         ]
-        self.reverse_mapping = {v: k for k, v in self.label_mapping.items()}
         
         if model_path and model_path.exists():
             self.load_model(model_path)
     
     def prepare_training_data(
         self, 
-        min_samples: int = 1000
+        min_samples: int = 1000,
+        days_back: Optional[int] = None
     ) -> Tuple[pd.DataFrame, pd.Series, pd.Series]:
         """
         Prepara datos de entrenamiento desde TODA la base de datos histórica (5 años).
         Calcula riesgo de inundación y sequía como valores float (0.0-1.0).
         
+        Lee todas las estaciones con una sola consulta por bloques y calcula
+        cambios y etiquetas con operaciones vectorizadas por estación.
+        
         Args:
             min_samples: Mínimo de muestras requeridas
+            days_back: Ignorado, se usan todos los datos históricos
             
         Returns:
             Tuple con features (X), flood_risk (y_flood), drought_risk (y_drought)
@@ -70,70 +131,52 @@ class RiskPredictor:
         logger.info(f"📚 Preparando datos de entrenamiento (TODOS los datos históricos)...")
         
         # NO usar days_back - obtener TODOS los datos históricos disponibles
-        end_date = datetime.now(timezone.utc)
-        start_date = datetime(2020, 1, 1, tzinfo=timezone.utc)  # Desde inicio de datos
-        
-        all_data = []
-        analyzer = RiskAnalyzer()
+        end_date = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        start_date = '2020-01-01'  # Desde inicio de datos
         
         # Obtener todas las estaciones desde la DB
         from core.database.raindrop_db import get_all_stations
-        stations = get_all_stations()
-        logger.info(f"📊 Entrenando con datos de {len(stations)} estaciones")
+        station_ids = [station['id'] for station in get_all_stations()]
+        logger.info(f"📊 Entrenando con datos de {len(station_ids)} estaciones")
+        
+        numeric_columns = ['temperature', 'humidity', 'precipitation_total', 'wind_speed', 'pressure']
+        chunks = [
+            chunk[chunk['station_id'].isin(station_ids)]
+            for chunk in iter_weather_frames(
+                start_date=start_date,
+                end_date=end_date,
+                columns=['station_id', 'date', 'hour'] + numeric_columns
+            )
+        ]
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
         
-        # Recopilar datos de todas las estaciones
-        for station in stations:
-            station_id = station['id']
-            try:
-                station_data = get_data_by_date_range(
-                    start_date=start_date,
-                    end_date=end_date,
-                    station_id=station_id
-                )
-                
-                if len(station_data) < 3:  # Necesitamos al menos 3 registros para calcular cambios
-                    continue
-                
-                # Convertirir a DataFrame para facilitar cálculos
-                df = pd.DataFrame(station_data)
-                
-                # Limpiar valores None antes de calcular cambios
-                # Reemplazar None con el valor anterior o con 0 si no hay valor anterior
-                numeric_columns = ['temperature', 'humidity', 'precipitation_total', 'wind_speed', 'pressure']
-                for col in numeric_columns:
-                    if col in df.columns:
-                        # Convertir a numeric primero para evitar warnings de downcasting
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                        # Forward fill primero (usar valor anterior), luego backward fill, finalmente 0
-                        df[col] = df[col].ffill().bfill().fillna(0)
-                
-                # Calcular cambios (tendencias)
-                df['temp_change'] = df['temperature'].diff().fillna(0)
-                df['humidity_change'] = df['humidity'].diff().fillna(0)
-                df['precip_change'] = df['precipitation_total'].diff().fillna(0)
-                df['wind_change'] = df['wind_speed'].diff().fillna(0)
-                df['pressure_change'] = df['pressure'].diff().fillna(0)
-                
-                # Calcular riesgos de inundación y sequía para cada registro
-                for idx, row in df.iterrows():
-                    flood_risk, drought_risk = self._calculate_historical_risks(row)
-                    df.at[idx, 'flood_risk'] = flood_risk
-                    df.at[idx, 'drought_risk'] = drought_risk
-                
-                all_data.append(df)
-                
-            except Exception as e:
-                logger.warning(f"Error obteniendo datos de estación {station_id}: {e}")
-                continue
+        if not df.empty:
+            # Necesitamos al menos 3 registros por estación para calcular cambios
+            df = df[df.groupby('station_id')['station_id'].transform('size') >= 3].reset_index(drop=True)
         
-        if not all_data:
+        if df.empty:
             raise ValueError("No hay datos suficientes para entrenamiento")
         
-        # Combinar todos los datos
-        combined_df = pd.concat(all_data, ignore_index=True)
+        # Limpiar valores None antes de calcular cambios:
+        # valor anterior de la misma estación, luego el siguiente, finalmente 0
+        df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
+        by_station = df.groupby('station_id', sort=False)
+        df[numeric_columns] = by_station[numeric_columns].ffill()
+        df[numeric_columns] = df.groupby('station_id', sort=False)[numeric_columns].bfill().fillna(0)
+        
+        # Calcular cambios (tendencias) dentro de cada estación
+        changes = df.groupby('station_id', sort=False)[numeric_columns].diff().fillna(0)
+        df['temp_change'] = changes['temperature']
+        df['humidity_change'] = changes['humidity']
+        df['precip_change'] = changes['precipitation_total']
+        df['wind_change'] = changes['wind_speed']
+        df['pressure_change'] = changes['pressure']
+        
+        # Calcular riesgos de inundación y sequía para todos los registros a la vez
+        df['flood_risk'], df['drought_risk'] = self._calculate_historical_risks_batch(df)
         
         # Eliminar filas con valores nulos en features críticos
-        combined_df = combined_df.dropna(subset=self.feature_names + ['flood_risk', 'drought_risk'])
+        combined_df = df.dropna(subset=self.feature_names + ['flood_risk', 'drought_risk'])
         
         if len(combined_df) < min_samples:
             raise ValueError(f"Solo se encontraron {len(combined_df)} muestras, se necesitan al menos {min_samples}")
@@ -248,6 +291,49 @@ class RiskPredictor:
         
         return flood_risk, drought_risk
     
+    def _calculate_historical_risks_batch(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Versión vectorizada de _calculate_historical_risks para un DataFrame completo.
+        Aplica las mismas reglas y el mismo orden de suma, por lo que los
+        resultados son idénticos fila a fila.
+        
+        Args:
+            df: DataFrame con los datos meteorológicos
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (flood_risk, drought_risk) en rango [0.0, 1.0]
+        """
+        def column(name: str, default: float) -> np.ndarray:
+            if name not in df.columns:
+                return np.full(len(df), default, dtype=float)
+            return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+        
+        precip = column('precipitation_total', 0)
+        humidity = column('humidity', 0)
+        pressure = column('pressure', 1013)
+        wind = column('wind_speed', 0)
+        temp = column('temperature', 0)
+        
+        # ===== FLOOD RISK CALCULATION =====
+        flood_score = np.zeros(len(df))
+        flood_score += np.select([precip > 50, precip > 25, precip > 10, precip > 5], [0.40, 0.30, 0.15, 0.05], 0.0)
+        flood_score += np.select([humidity > 90, humidity > 85, humidity > 75], [0.20, 0.15, 0.10], 0.0)
+        flood_score += np.select([pressure < 1000, pressure < 1005, pressure < 1010], [0.20, 0.15, 0.08], 0.0)
+        flood_score += np.select([wind > 50, wind > 30], [0.10, 0.05], 0.0)
+        flood_score += np.select(
+            [(temp >= 25) & (temp <= 35), (temp >= 20) & (temp < 25)], [0.10, 0.05], 0.0
+        )
+        
+        # ===== DROUGHT RISK CALCULATION =====
+        drought_score = np.zeros(len(df))
+        drought_score += np.select([precip < 1, precip < 2, precip < 5], [0.40, 0.30, 0.15], 0.0)
+        drought_score += np.select([humidity < 30, humidity < 40, humidity < 50], [0.25, 0.20, 0.10], 0.0)
+        drought_score += np.select([temp > 38, temp > 35, temp > 32], [0.20, 0.15, 0.10], 0.0)
+        drought_score += np.select([pressure > 1020, pressure > 1015, pressure > 1013], [0.15, 0.10, 0.05], 0.0)
+        
+        # Limitar a [0.0, 1.0]
+        return np.minimum(flood_score, 1.0), np.minimum(drought_score, 1.0)
+    
     def train(
         self, 
         days_back: int = 7,
@@ -378,46 +464,61 @@ class RiskPredictor:
         
         return metrics
     
-    def predict(self, features: Dict) -> Dict:
+    def predict_batch(self, features: Union[pd.DataFrame, np.ndarray]) -> Dict[str, np.ndarray]:
         """
-        Predice los niveles de riesgo de inundación y sequía para nuevas features.
+        Predice riesgo de inundación y sequía para muchas filas a la vez.
+        Hace una sola llamada al modelo por target, sin importar el número de estaciones.
         
         Args:
-            features: Diccionario con features meteorológicas
+            features: DataFrame con las columnas de feature_names (las faltantes
+                se completan con valores por defecto) o array 2D en ese mismo orden
             
         Returns:
-            Dict con flood_risk y drought_risk (floats 0.0-1.0)
+            Dict con arrays flood_risk y drought_risk (floats 0.0-1.0)
         """
         if self.flood_model is None or self.drought_model is None:
             raise ValueError("Modelos no entrenados. Llama a train() primero.")
         
-        # Preparar features como DataFrame con nombres de columnas (igual que en el entrenamiento)
-        X = pd.DataFrame([{
-            'temperature': features.get('temperature', 0),
-            'humidity': features.get('humidity', 0),
-            'precipitation_total': features.get('precipitation_total', 0),
-            'wind_speed': features.get('wind_speed', 0),
-            'pressure': features.get('pressure', 1013),
-            'temp_change': features.get('temp_change', 0),
-            'humidity_change': features.get('humidity_change', 0),
-            'precip_change': features.get('precip_change', 0),
-            'wind_change': features.get('wind_change', 0),
-            'pressure_change': features.get('pressure_change', 0)
-        }], columns=self.feature_names)
-        
-        # Predecir con ambos modelos
-        flood_risk = float(self.flood_model.predict(X)[0])
-        drought_risk = float(self.drought_model.predict(X)[0])
-        
-        # Asegurar que estén en el rango [0.0, 1.0]
-        flood_risk = max(0.0, min(1.0, flood_risk))
-        drought_risk = max(0.0, min(1.0, drought_risk))
+        if isinstance(features, pd.DataFrame):
+            X = features.reindex(columns=self.feature_names)
+            X['pressure'] = X['pressure'].fillna(1013)
+            X = X.fillna(0)
+        else:
+            X = pd.DataFrame(np.atleast_2d(np.asarray(features, dtype=float)), columns=self.feature_names)
+        
+        if X.empty:
+            return {
+                'flood_risk': np.empty(0),
+                'drought_risk': np.empty(0)
+            }
+        
+        # Una llamada por modelo y recorte al rango [0.0, 1.0]
+        flood_risk = np.clip(self.flood_model.predict(X), 0.0, 1.0)
+        drought_risk = np.clip(self.drought_model.predict(X), 0.0, 1.0)
         
         return {
             'flood_risk': flood_risk,
             'drought_risk': drought_risk
         }
     
+    def predict(self, features: Dict) -> Dict:
+        """
+        Predice los niveles de riesgo de inundación y sequía para nuevas features.
+        
+        Args:
+            features: Diccionario con features meteorológicas
+            
+        Returns:
+            Dict con flood_risk y drought_risk (floats 0.0-1.0)
+        """
+        X = pd.DataFrame([{name: features[name] for name in self.feature_names if name in features}])
+        predictions = self.predict_batch(X)
+        
+        return {
+            'flood_risk': float(predictions['flood_risk'][0]),
+            'drought_risk': float(predictions['drought_risk'][0])
+        }
+    
     def predict_from_forecast(self, forecast_data: Dict) -> Dict:
         """
         Predice riesgo de inundación y sequía desde datos de pronóstico.
@@ -429,6 +530,19 @@ class RiskPredictor:
         Returns:
             Diccionario con predicciones de inundación y sequía
         """
+        return self.predict_batch_from_forecasts([forecast_data])[0]
+    
+    def predict_batch_from_forecasts(self, forecasts: List[Dict]) -> List[Dict]:
+        """
+        Versión por lotes de predict_from_forecast: una sola llamada al modelo
+        por target para todos los pronósticos.
+        
+        Args:
+            forecasts: Lista de pronósticos con temp_avg, humidity, precipitation_total, etc.
+            
+        Returns:
+            Lista de diccionarios con predicciones, en el mismo orden de entrada
+        """
         if self.flood_model is None or self.drought_model is None:
             # Intentar cargar el modelo guardado
             model_path = MODELS_DIR / "risk_model.joblib"
@@ -437,68 +551,38 @@ class RiskPredictor:
             else:
                 raise ValueError("Modelos no disponibles. Entrena los modelos primero.")
         
-        # Extraer datos del pronóstico
-        temp = float(forecast_data.get("temp_avg") or forecast_data.get("temperature") or 25.0)
-        humidity = float(forecast_data.get("humidity") or 70.0)
-        precip = float(forecast_data.get("precipitation_total") or 0.0)
-        wind = float(forecast_data.get("wind_speed_max") or forecast_data.get("wind_speed") or 0.0)
-        pressure = float(forecast_data.get("pressure") or 1013.0)
-        
-        # Para pronóstico, los cambios los estimamos comparando con promedios típicos
-        temp_change = temp - 27.0  # Promedio típico de Panamá
-        humidity_change = humidity - 75.0
-        precip_change = precip - 5.0
-        wind_change = wind - 10.0
-        pressure_change = pressure - 1013.0
-        
-        # Preparar features
-        features = {
-            'temperature': temp,
-            'humidity': humidity,
-            'precipitation_total': precip,
-            'wind_speed': wind,
-            'pressure': pressure,
-            'temp_change': temp_change,
-            'humidity_change': humidity_change,
-            'precip_change': precip_change,
-            'wind_change': wind_change,
-            'pressure_change': pressure_change
-        }
-        
-        # Predecir con ambos modelos
-        predictions = self.predict(features)
-        flood_risk = predictions['flood_risk']
-        drought_risk = predictions['drought_risk']
-        
-        # Determinar niveles categóricos para compatibilidad
-        flood_level = self._get_risk_level_from_prob(flood_risk)
-        drought_level = self._get_risk_level_from_prob(drought_risk)
+        # Para pronóstico, los cambios se estiman comparando con promedios típicos
+        features = build_feature_frame(forecasts)
+        predictions = self.predict_batch(features)
         
-        return {
-            "flood_risk": {
-                "probability": round(flood_risk, 3),
-                "level": flood_level,
-                "alert": flood_risk >= 0.5,
-                "confidence": round(flood_risk, 3)  # En regresión, la predicción es la confianza
-            },
-            "drought_risk": {
-                "probability": round(drought_risk, 3),
-                "level": drought_level,
-                "alert": drought_risk >= 0.5,
-                "confidence": round(drought_risk, 3)
-            },
-            "conditions": {
-                "temperature": temp,
-                "humidity": humidity,
-                "rainfall": precip,
-                "wind_speed": wind,
-                "pressure": pressure
-            },
-            "ml_prediction": {
-                "risk_level": risk_level,
-                "confidence": round(confidence, 3)
-            }
-        }
+        results = []
+        for i, conditions in enumerate(features.itertuples(index=False)):
+            flood_risk = float(predictions['flood_risk'][i])
+            drought_risk = float(predictions['drought_risk'][i])
+            
+            results.append({
+                "flood_risk": {
+                    "probability": round(flood_risk, 3),
+                    "level": self._get_risk_level_from_prob(flood_risk),
+                    "alert": flood_risk >= 0.5,
+                    "confidence": round(flood_risk, 3)  # En regresión, la predicción es la confianza
+                },
+                "drought_risk": {
+                    "probability": round(drought_risk, 3),
+                    "level": self._get_risk_level_from_prob(drought_risk),
+                    "alert": drought_risk >= 0.5,
+                    "confidence": round(drought_risk, 3)
+                },
+                "conditions": {
+                    "temperature": conditions.temperature,
+                    "humidity": conditions.humidity,
+                    "rainfall": conditions.precipitation_total,
+                    "wind_speed": conditions.wind_speed,
+                    "pressure": conditions.pressure
+                }
+            })
+        
+        return results
     
     def _get_risk_level_from_prob(self, probability: float) -> str:
         """Convierte probabilidad a nivel de riesgo (GREEN/YELLOW/RED)"""
@@ -525,6 +609,10 @@ class RiskPredictor:
         
         joblib.dump(model_data, model_path)
         logger.info(f"💾 Modelos guardados en: {model_path}")
+        
+        # Las predicciones cacheadas con el modelo anterior ya no son válidas
+        from core.ml.prediction_cache import get_prediction_cache
+        get_prediction_cache().invalidate()
     
     def load_model(self, model_path: Path):
         """Carga los modelos guardados"""
@@ -539,6 +627,31 @@ class RiskPredictor:
             raise
 
 
+_shared_predictor: Optional[Tuple[str, "RiskPredictor"]] = None
+_shared_predictor_lock = threading.Lock()
+
+
+def get_shared_predictor(model_path: Path = MODELS_DIR / "risk_model.joblib") -> RiskPredictor:
+    """
+    Predictor cargado una sola vez por proceso y compartido por los pipelines.
+    Se recarga cuando cambia el archivo del modelo (reentrenamiento).
+    
+    Args:
+        model_path: Ruta al modelo guardado
+    
+    Returns:
+        RiskPredictor con los modelos cargados
+    """
+    global _shared_predictor
+    from core.ml.prediction_cache import model_version
+    
+    version = model_version(model_path)
+    with _shared_predictor_lock:
+        if _shared_predictor is None or _shared_predictor[0] != version:
+            _shared_predictor = (version, RiskPredictor(model_path=model_path))
+        return _shared_predictor[1]
+
+
 def train_model_from_history(days_back: int = 7) -> Dict:
     """
     Función auxiliar para entrenar modelo desde datos históricos.
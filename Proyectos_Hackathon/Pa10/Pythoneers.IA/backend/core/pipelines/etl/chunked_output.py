@@ -0,0 +1,61 @@
+"""
+Escritura por bloques de datasets sintéticos a Parquet o CSV.
+
+Los generadores producen DataFrames por bloques (días × estaciones × horas);
+este módulo los vuelca al archivo a medida que llegan, así que la memoria
+queda acotada al tamaño de un bloque sin importar los años o estaciones.
+"""
+
+import logging
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def write_frames(frames: Iterable[pd.DataFrame], output_path: Path) -> int:
+    """
+    Escribe una secuencia de bloques en un único archivo.
+    
+    El formato se elige por la extensión: '.parquet' (requiere pyarrow, un
+    row group por bloque) o CSV en cualquier otro caso (cabecera en el primero).
+    
+    Args:
+        frames: Bloques con las mismas columnas y tipos
+        output_path: Archivo de salida (se sobrescribe)
+    
+    Returns:
+        Número total de filas escritas
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    total = 0
+    
+    if output_path.suffix == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Salida Parquet requiere pyarrow (pip install pyarrow)") from e
+        
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                total += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            for i, frame in enumerate(frames):
+                frame.to_csv(f, index=False, header=i == 0)
+                total += len(frame)
+    
+    logger.info(f" {total:,} filas escritas en {output_path}")
+    return total
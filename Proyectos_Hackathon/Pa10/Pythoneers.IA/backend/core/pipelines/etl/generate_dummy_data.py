@@ -6,14 +6,15 @@ de Panamá y correlaciones típicas entre variables.
 """
 
 import logging
-import random
 import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pathlib import Path
 
 from config import STATIONS
-from core.database.raindrop_db import insert_or_update_weather_data, DATABASE_PATH
+from core.database.raindrop_db import bulk_upsert_weather_data, DATABASE_PATH
+from core.pipelines.etl.chunked_output import write_frames
 
 logger = logging.getLogger(__name__)
 
@@ -57,121 +58,191 @@ WEATHER_SUMMARIES = [
 WEATHER_ICONS = ['clear', 'pcloudy', 'cloudy', 'rain', 'tstorm', 'fog']
 
 
-def generate_correlated_weather_data(base_temp: float, base_humidity: float) -> Dict:
+def generate_correlated_weather_data(
+    base_temp: np.ndarray,
+    base_humidity: np.ndarray,
+    rng: np.random.Generator
+) -> pd.DataFrame:
     """
-    Genera datos climáticos con correlaciones realistas.
+    Genera datos climáticos con correlaciones realistas para un bloque de registros.
+    
+    Todos los sorteos se hacen sobre arrays (uno por variable y bloque).
     
     Correlaciones:
     - Temperatura alta → Sensación térmica más alta
     - Humedad alta + Temperatura alta → Mayor precipitación
     - Precipitación alta → Nubosidad alta
     - Presión baja → Mayor probabilidad de lluvia
+    
+    Args:
+        base_temp: Temperatura base de cada registro
+        base_humidity: Humedad base de cada registro
+        rng: Generador aleatorio (semilla reproducible)
+    
+    Returns:
+        DataFrame con una fila por registro
     """
+    n = len(base_temp)
+    
     # Temperatura base con variación
-    temp = base_temp + random.uniform(-3, 3)
-    temp = max(WEATHER_RANGES['temperature'][0], min(WEATHER_RANGES['temperature'][1], temp))
+    temp = np.clip(base_temp + rng.uniform(-3, 3, n), *WEATHER_RANGES['temperature'])
     
     # Sensación térmica (mayor con humedad alta)
-    humidity = base_humidity + random.uniform(-10, 10)
-    humidity = max(WEATHER_RANGES['humidity'][0], min(WEATHER_RANGES['humidity'][1], humidity))
+    humidity = np.clip(base_humidity + rng.uniform(-10, 10, n), *WEATHER_RANGES['humidity'])
     feels_like = temp + (humidity / 100.0) * 5.0
     
     # Precipitación (más probable con humedad alta y temperatura alta)
     precipitation_prob = (humidity / 100.0) * 0.4 + (temp / 35.0) * 0.3
-    if random.random() < precipitation_prob:
-        # Hay precipitación
-        precip = random.uniform(0.5, WEATHER_RANGES['precipitation_total'][1])
-        # Correlación: más precipitación → más nubosidad
-        cloud_cover = int(min(100, 60 + (precip / 150.0) * 40 + random.uniform(-10, 10)))
-        precip_type = random.choice(['rain', 'drizzle', 'thunderstorm'])
-        summary = random.choice(['Lluvioso', 'Tormenta', 'Llovizna', 'Cielo cubierto'])
-        icon = 'rain' if precip < 50 else 'tstorm'
-        # Presión más baja con lluvia
-        pressure = random.uniform(1005, 1012)
-    else:
-        # Sin precipitación
-        precip = 0.0
-        cloud_cover = int(random.uniform(0, 70))
-        precip_type = 'none'
-        if cloud_cover < 30:
-            summary = 'Despejado'
-            icon = 'clear'
-        elif cloud_cover < 60:
-            summary = 'Parcialmente nublado'
-            icon = 'pcloudy'
-        else:
-            summary = 'Nublado'
-            icon = 'cloudy'
-        pressure = random.uniform(1010, 1020)
+    raining = rng.random(n) < precipitation_prob
+    precip = np.where(raining, rng.uniform(0.5, WEATHER_RANGES['precipitation_total'][1], n), 0.0)
+    
+    # Correlación: más precipitación → más nubosidad
+    cloud_cover = np.where(
+        raining,
+        np.minimum(100, 60 + (precip / 150.0) * 40 + rng.uniform(-10, 10, n)),
+        rng.uniform(0, 70, n)
+    ).astype(int)
+    
+    # Sin lluvia: resumen e icono según nubosidad
+    dry_level = np.digitize(cloud_cover, [30, 60])  # 0: <30, 1: <60, 2: resto
+    rain_summaries = np.array(['Lluvioso', 'Tormenta', 'Llovizna', 'Cielo cubierto'])
+    summary = np.where(
+        raining,
+        rain_summaries[rng.integers(0, len(rain_summaries), n)],
+        np.array(['Despejado', 'Parcialmente nublado', 'Nublado'])[dry_level]
+    )
+    icon = np.where(
+        raining,
+        np.where(precip < 50, 'rain', 'tstorm'),
+        np.array(['clear', 'pcloudy', 'cloudy'])[dry_level]
+    )
+    precip_type = np.where(
+        raining,
+        np.array(['rain', 'drizzle', 'thunderstorm'])[rng.integers(0, 3, n)],
+        'none'
+    )
+    
+    # Presión más baja con lluvia
+    pressure = np.where(raining, rng.uniform(1005, 1012, n), rng.uniform(1010, 1020, n))
     
     # Viento
-    wind_speed = random.uniform(WEATHER_RANGES['wind_speed'][0], WEATHER_RANGES['wind_speed'][1])
-    wind_angle = random.randint(WEATHER_RANGES['wind_angle'][0], WEATHER_RANGES['wind_angle'][1] - 1)  # 0-359
-    wind_direction = WIND_DIRECTIONS[min(wind_angle // 45, 7)]  # Asegurar índice válido 0-7
-    
-    return {
-        'temperature': round(temp, 1),
-        'feels_like': round(feels_like, 1),
-        'humidity': round(humidity, 1),
-        'wind_speed': round(wind_speed, 1),
+    wind_speed = rng.uniform(*WEATHER_RANGES['wind_speed'], n)
+    wind_angle = rng.integers(WEATHER_RANGES['wind_angle'][0], WEATHER_RANGES['wind_angle'][1], n)  # 0-359
+    wind_direction = np.array(WIND_DIRECTIONS)[np.minimum(wind_angle // 45, 7)]
+    
+    return pd.DataFrame({
+        'temperature': np.round(temp, 1),
+        'feels_like': np.round(feels_like, 1),
+        'humidity': np.round(humidity, 1),
+        'wind_speed': np.round(wind_speed, 1),
         'wind_direction': wind_direction,
         'wind_angle': wind_angle,
-        'precipitation_total': round(precip, 2),
+        'precipitation_total': np.round(precip, 2),
         'precipitation_type': precip_type,
-        'pressure': round(pressure, 1),
+        'pressure': np.round(pressure, 1),
         'cloud_cover': cloud_cover,
         'summary': summary,
         'icon': icon
-    }
+    })
 
 
-def generate_seasonal_pattern(month: int, hour: int) -> tuple:
+def generate_seasonal_pattern(month: np.ndarray, hour: np.ndarray) -> tuple:
     """
-    Genera patrones estacionales realistas para Panamá.
+    Genera patrones estacionales realistas para Panamá (escalares o arrays).
     
     - Estación seca (Enero-Abril): menos lluvia, más calor
     - Estación lluviosa (Mayo-Diciembre): más lluvia, más humedad
     - Patrón diario: más calor al mediodía, más fresco en la madrugada
     """
-    # Estación del año
-    if 1 <= month <= 4:
-        # Estación seca
-        base_temp = 28.0
-        base_humidity = 65.0
-    else:
-        # Estación lluviosa
-        base_temp = 26.0
-        base_humidity = 85.0
-    
-    # Variación diurna
-    if 6 <= hour <= 18:
-        # Día
-        temp_adjustment = 3.0 + np.sin((hour - 6) / 12 * np.pi) * 4.0
-    else:
-        # Noche
-        temp_adjustment = -2.0
+    month = np.asarray(month)
+    hour = np.asarray(hour)
+    
+    # Estación del año: seca (1-4) o lluviosa
+    dry_season = (1 <= month) & (month <= 4)
+    base_temp = np.where(dry_season, 28.0, 26.0)
+    base_humidity = np.where(dry_season, 65.0, 85.0)
+    
+    # Variación diurna: día (6-18) o noche
+    daytime = (6 <= hour) & (hour <= 18)
+    temp_adjustment = np.where(daytime, 3.0 + np.sin((hour - 6) / 12 * np.pi) * 4.0, -2.0)
     
     return base_temp + temp_adjustment, base_humidity
 
 
+def generate_station_block(
+    station: Dict,
+    timestamps: pd.DatetimeIndex,
+    use_random: bool = False,
+    seed: Optional[int] = None,
+    timestamp_strings: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """
+    Genera todos los registros de una estación para las horas dadas.
+    
+    Args:
+        station: Estación (id, name, lat, lon, elevation, region)
+        timestamps: Horas a generar (UTC)
+        use_random: Bases de temperatura/humedad aleatorias en lugar de estacionales
+        seed: Semilla global; cada estación deriva la suya de (seed, id), así que
+              el resultado no depende del orden ni del subconjunto de estaciones
+        timestamp_strings: timestamps ya formateados en ISO (se reutilizan entre estaciones)
+    
+    Returns:
+        DataFrame con metadata de la estación y las variables climáticas
+    """
+    rng = np.random.default_rng(None if seed is None else [seed, station['id']])
+    n = len(timestamps)
+    
+    if use_random:
+        # Modo aleatorio: temperaturas y humedad completamente random
+        # para incluir escenarios de alto riesgo
+        base_temp = rng.uniform(*WEATHER_RANGES['temperature'], n)
+        base_humidity = rng.uniform(*WEATHER_RANGES['humidity'], n)
+    else:
+        # Modo conocimiento: usar patrones estacionales
+        base_temp, base_humidity = generate_seasonal_pattern(timestamps.month, timestamps.hour)
+    
+    block = generate_correlated_weather_data(base_temp, base_humidity, rng)
+    block.insert(0, 'station_id', station['id'])
+    block.insert(1, 'station_name', station['name'])
+    block.insert(2, 'region', station.get('region', 'Panama'))
+    block.insert(3, 'latitude', station['lat'])
+    block.insert(4, 'longitude', station['lon'])
+    block.insert(5, 'elevation', station.get('elevation', 0))
+    if timestamp_strings is None:
+        timestamp_strings = np.array([ts.isoformat() for ts in timestamps], dtype=object)
+    block.insert(6, 'timestamp', timestamp_strings)
+    return block
+
+
 def generate_dummy_weather_data(
     days_back: int = 365,
     stations_to_use: List[Dict] = None,
     use_random: bool = False,
-    records_per_day: int = 24
+    records_per_day: int = 24,
+    job=None,
+    seed: Optional[int] = None,
+    output_path: Optional[Path] = None
 ) -> int:
     """
     Genera datos climáticos dummy para entrenamiento del modelo.
     
+    Cada estación se genera como un bloque vectorizado y se inserta (o se
+    escribe al archivo) antes de pasar a la siguiente, así que la memoria
+    queda acotada a una estación.
+    
     Args:
         days_back: Cuántos días hacia atrás generar datos (default: 365 = 1 año)
         stations_to_use: Lista de estaciones a usar (default: todas de STATIONS)
         use_random: Si True, genera datos completamente aleatorios.
                    Si False, genera datos basados en patrones estacionales (default).
         records_per_day: Número de registros por día (default: 24 = cada hora)
+        job: PipelineJob que lo ejecuta (opcional), para reportar progreso y cancelar
+        seed: Semilla para reproducir exactamente los mismos datos (default: aleatorio)
+        output_path: Si se indica, escribe a Parquet/CSV en lugar de la base de datos
         
     Returns:
-        Número de registros insertados
+        Número de registros insertados (o escritos)
     """
     mode_text = "aleatorios" if use_random else "con patrones estacionales"
     logger.info(f" Iniciando generación de datos para {days_back} días ({mode_text})...")
@@ -189,9 +260,10 @@ def generate_dummy_weather_data(
     end_date = datetime.now(timezone.utc)
     start_date = end_date - timedelta(days=days_back)
     
-    # Generar e insertar datos por estación (no acumular todo en memoria)
-    total_inserted = 0
+    # Horas a generar (las mismas para todas las estaciones)
     hours_between_records = 24 // records_per_day
+    timestamps = pd.date_range(start_date, end_date, freq=f"{hours_between_records}h")
+    timestamp_strings = np.array([ts.isoformat() for ts in timestamps], dtype=object)
     
     logger.info(f" Rango de fechas: {start_date.date()} a {end_date.date()}")
     logger.info(" Iniciando generación e inserción...\n")
@@ -204,71 +276,54 @@ def generate_dummy_weather_data(
     generation_progress["start_time"] = datetime.now(timezone.utc).isoformat()
     generation_progress["error"] = None
     
-    for idx, station in enumerate(stations, 1):
-        # Actualizar progreso: estación actual
-        generation_progress["current_station"] = idx
-        generation_progress["station_name"] = station['name']
-        
-        logger.info(f" [{idx}/{num_stations}] Generando datos para {station['name']} (ID: {station['id']})")
-        
-        station_weather_data = []
-        station_records = 0
-        current_date = start_date
-        
-        while current_date <= end_date:
-            if use_random:
-                # Modo aleatorio: generar temperaturas y humedad completamente random
-                # para incluir escenarios de alto riesgo
-                base_temp = random.uniform(WEATHER_RANGES['temperature'][0], WEATHER_RANGES['temperature'][1])
-                base_humidity = random.uniform(WEATHER_RANGES['humidity'][0], WEATHER_RANGES['humidity'][1])
-            else:
-                # Modo conocimiento: usar patrones estacionales
-                base_temp, base_humidity = generate_seasonal_pattern(
-                    current_date.month,
-                    current_date.hour
-                )
-            
-            # Generar datos correlacionados
-            weather_data = generate_correlated_weather_data(base_temp, base_humidity)
-            
-            # Agregar metadata de la estación
-            weather_record = {
-                'station_id': station['id'],
-                'station_name': station['name'],
-                'region': station.get('region', 'Panama'),
-                'latitude': station['lat'],
-                'longitude': station['lon'],
-                'elevation': station.get('elevation', 0),
-                'timestamp': current_date.isoformat(),
-                **weather_data
-            }
+    def station_blocks():
+        # Un bloque por estación; al escribir a archivo se consume de forma perezosa
+        for idx, station in enumerate(stations, 1):
+            if job and job.cancelled:
+                logger.warning(f" Generación cancelada tras {idx - 1}/{num_stations} estaciones")
+                break
             
-            station_weather_data.append(weather_record)
-            station_records += 1
+            # Actualizar progreso: estación actual
+            generation_progress["current_station"] = idx
+            generation_progress["station_name"] = station['name']
             
-            # Avanzar tiempo según records_per_day
-            current_date += timedelta(hours=hours_between_records)
-        
-        # Insertar datos de esta estación inmediatamente (en lotes pequeños)
-        logger.info(f"     Insertando {station_records} registros...")
-        batch_size = 100
-        station_inserted = 0
+            logger.info(f" [{idx}/{num_stations}] Generando datos para {station['name']} (ID: {station['id']})")
+            yield idx, station, generate_station_block(station, timestamps, use_random, seed, timestamp_strings)
+    
+    def report(idx, station, total):
+        # Actualizar progreso después de completar cada estación
+        generation_progress["records_generated"] = total
+        generation_progress["percentage"] = (idx / num_stations) * 100
+        if job:
+            job.report(idx / num_stations, f"Estación {idx}/{num_stations}: {station['name']}")
+    
+    total_inserted = 0
+    
+    if output_path is not None:
+        def frames():
+            nonlocal total_inserted
+            for idx, station, block in station_blocks():
+                yield block
+                total_inserted += len(block)
+                report(idx, station, total_inserted)
         
-        for i in range(0, len(station_weather_data), batch_size):
-            batch = station_weather_data[i:i + batch_size]
+        write_frames(frames(), output_path)
+    else:
+        for idx, station, block in station_blocks():
+            # Insertar datos de esta estación inmediatamente (un solo upsert en bloque)
+            logger.info(f"     Insertando {len(block)} registros...")
+            station_inserted = 0
+            
             try:
-                count = insert_or_update_weather_data(batch)
-                station_inserted += count
+                result = bulk_upsert_weather_data(block.to_dict('records'))
+                station_inserted = result["inserted"] + result["updated"]
             except Exception as e:
                 logger.error(f" Error insertando lote: {e}")
-        
-        total_inserted += station_inserted
-        
-        # Actualizar progreso después de completar cada estación
-        generation_progress["records_generated"] = total_inserted
-        generation_progress["percentage"] = (idx / num_stations) * 100
-        
-        logger.info(f"     ✓ {station_inserted} registros insertados para {station['name']}")
+            
+            total_inserted += station_inserted
+            report(idx, station, total_inserted)
+            
+            logger.info(f"     ✓ {station_inserted} registros insertados para {station['name']}")
     
     logger.info(f" Generación completada: {total_inserted} registros insertados/actualizados")
     
@@ -285,7 +340,14 @@ def generate_dummy_weather_data(
     return total_inserted
 
 
-def run(days: int = 365, use_random: bool = False, records_per_day: int = 24):
+def run(
+    days: int = 365,
+    use_random: bool = False,
+    records_per_day: int = 24,
+    job=None,
+    seed: Optional[int] = None,
+    output_path: Optional[Path] = None
+):
     """
     Ejecuta el pipeline de generación de datos dummy.
     
@@ -293,6 +355,9 @@ def run(days: int = 365, use_random: bool = False, records_per_day: int = 24):
         days: Número de días de historia a generar (default: 365 = 1 año)
         use_random: Genera datos aleatorios (True) o basados en patrones estacionales (False, recomendado)
         records_per_day: Registros por día (default: 24 = cada hora)
+        job: PipelineJob que lo ejecuta (opcional), para reportar progreso y cancelar
+        seed: Semilla para datos reproducibles (default: aleatorio)
+        output_path: Escribir a Parquet/CSV en lugar de la base de datos
     """
     try:
         # Resetear progreso
@@ -308,7 +373,10 @@ def run(days: int = 365, use_random: bool = False, records_per_day: int = 24):
         logger.info(" PIPELINE: GENERACIÓN DE DATOS DUMMY - 1 AÑO")
         logger.info("=" * 60)
         
-        inserted = generate_dummy_weather_data(days_back=days, use_random=use_random, records_per_day=records_per_day)
+        inserted = generate_dummy_weather_data(
+            days_back=days, use_random=use_random, records_per_day=records_per_day, job=job,
+            seed=seed, output_path=output_path
+        )
         
         if inserted > 0:
             logger.info(f" Pipeline completado exitosamente: {inserted} registros")
@@ -336,6 +404,8 @@ if __name__ == "__main__":
     days = 365  # Default: 1 año
     use_random = False  # Default: usar patrones estacionales
     records_per_day = 24  # Default: cada hora
+    seed = None  # Default: no reproducible
+    output_path = None  # Default: insertar en la base de datos
     
     if '--days' in sys.argv:
         idx = sys.argv.index('--days')
@@ -352,4 +422,14 @@ if __name__ == "__main__":
         if idx + 1 < len(sys.argv):
             records_per_day = int(sys.argv[idx + 1])
     
-    run(days=days, use_random=use_random, records_per_day=records_per_day)
+    if '--seed' in sys.argv:
+        idx = sys.argv.index('--seed')
+        if idx + 1 < len(sys.argv):
+            seed = int(sys.argv[idx + 1])
+    
+    if '--output' in sys.argv:
+        idx = sys.argv.index('--output')
+        if idx + 1 < len(sys.argv):
+            output_path = Path(sys.argv[idx + 1])
+    
+    run(days=days, use_random=use_random, records_per_day=records_per_day, seed=seed, output_path=output_path)
@@ -0,0 +1,329 @@
+"""
+Cliente concurrente para la API de Meteosource.
+
+Compartido por el pipeline de clima actual y el de pronósticos:
+- Concurrencia acotada (asyncio + pool de conexiones HTTP reutilizadas)
+- Token bucket para el ritmo de peticiones por segundo
+- Presupuesto diario de llamadas compartido en el proceso (plan gratuito: 400/día)
+- Reintentos con backoff exponencial ante 429, 5xx y errores de red
+- Omite estaciones cuyos datos siguen frescos
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Configuración (sobrescribible por variables de entorno)
+METEOSOURCE_BASE_URL = os.getenv("METEOSOURCE_BASE_URL", "https://www.meteosource.com/api/v1/free")
+METEOSOURCE_DAILY_BUDGET = int(os.getenv("METEOSOURCE_DAILY_BUDGET", "400"))
+METEOSOURCE_MAX_CONCURRENCY = int(os.getenv("METEOSOURCE_MAX_CONCURRENCY", "8"))
+METEOSOURCE_RATE_PER_SECOND = float(os.getenv("METEOSOURCE_RATE_PER_SECOND", "5"))
+
+# Códigos HTTP que se reintentan y los que detienen toda la ejecución (clave inválida, plan agotado)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+ABORT_STATUS_CODES = {401, 402, 403}
+
+
+class DailyCallBudget:
+    """Presupuesto diario de llamadas a la API, compartido por todos los pipelines del proceso."""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._day = None
+        self._used = 0
+        self._lock = threading.Lock()
+    
+    def _roll(self) -> None:
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+    
+    def try_consume(self) -> bool:
+        """Reserva una llamada; devuelve False si el presupuesto del día está agotado."""
+        with self._lock:
+            self._roll()
+            if self._used >= self.limit:
+                return False
+            self._used += 1
+            return True
+    
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            self._roll()
+            return max(self.limit - self._used, 0)
+
+
+# Presupuesto único del proceso (clima actual y pronósticos consumen de la misma cuota)
+daily_budget = DailyCallBudget(METEOSOURCE_DAILY_BUDGET)
+
+
+class TokenBucket:
+    """Token bucket asíncrono: permite ráfagas de `capacity` y un ritmo sostenido de `rate` por segundo."""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    """Parsea un timestamp ISO; los valores sin zona horaria se asumen en UTC."""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def split_fresh_stations(
+    stations: List[Dict],
+    last_updates: Dict[int, str],
+    max_age: timedelta,
+    now: Optional[datetime] = None
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Separa las estaciones que necesitan datos nuevos de las que siguen frescas.
+    
+    Args:
+        stations: Estaciones candidatas
+        last_updates: {station_id: timestamp ISO de la última actualización}
+        max_age: Antigüedad máxima para considerar un dato fresco
+        now: Instante de referencia (default: ahora en UTC)
+    
+    Returns:
+        Tuple (estaciones a consultar, estaciones frescas omitidas)
+    """
+    now = now or datetime.now(timezone.utc)
+    stale, fresh = [], []
+    
+    for station in stations:
+        last = _parse_timestamp(last_updates[station["id"]]) if station["id"] in last_updates else None
+        if last is not None and now - last < max_age:
+            fresh.append(station)
+        else:
+            stale.append(station)
+    
+    return stale, fresh
+
+
+class MeteosourceFetcher:
+    """
+    Descarga datos de Meteosource para muchas estaciones en paralelo.
+    
+    Cada petición consume una llamada del presupuesto diario y un token del bucket;
+    los reintentos también cuentan, igual que en la cuota real de la API.
+    
+    on_progress(hechas, total) se llama al terminar cada estación y should_stop()
+    se consulta antes de cada petición (cancelación desde el job que lo ejecuta).
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = METEOSOURCE_BASE_URL,
+        max_concurrency: int = METEOSOURCE_MAX_CONCURRENCY,
+        rate_per_second: float = METEOSOURCE_RATE_PER_SECOND,
+        budget: Optional[DailyCallBudget] = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        timeout: float = 30,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ):
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/point"
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.budget = budget if budget is not None else daily_budget
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self.stats = {}
+        self._abort_reason = None
+        self._cooldown_until = 0.0
+    
+    def fetch_all(
+        self,
+        stations: List[Dict],
+        params: Dict,
+        last_updates: Optional[Dict[int, str]] = None,
+        max_age: Optional[timedelta] = None
+    ) -> List[Tuple[Dict, Optional[Dict]]]:
+        """
+        Consulta el endpoint /point para cada estación.
+        
+        Args:
+            stations: Estaciones con lat/lon/id/name
+            params: Parámetros de consulta comunes (sections, units, ...)
+            last_updates: {station_id: timestamp} para omitir estaciones frescas
+            max_age: Antigüedad máxima de un dato fresco (requerido con last_updates)
+        
+        Returns:
+            Lista de (estación, respuesta JSON o None) en el orden de entrada,
+            sin las estaciones omitidas por frescura
+        """
+        fresh = []
+        if last_updates is not None and max_age is not None:
+            stations, fresh = split_fresh_stations(stations, last_updates, max_age)
+        
+        self.stats = {"requested": len(stations), "ok": 0, "failed": 0, "fresh": len(fresh), "calls": 0}
+        self._abort_reason = None
+        
+        if fresh:
+            logger.info(f" {len(fresh)} estaciones con datos frescos omitidas")
+        if not stations:
+            return []
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            results = asyncio.run(self._fetch_all_async(stations, params))
+        else:
+            # Llamado desde un event loop: ejecutar en un hilo propio
+            with ThreadPoolExecutor(max_workers=1) as runner:
+                results = runner.submit(asyncio.run, self._fetch_all_async(stations, params)).result()
+        
+        self.stats["ok"] = sum(1 for data in results if data is not None)
+        self.stats["failed"] = len(results) - self.stats["ok"]
+        logger.info(
+            f" Meteosource: {self.stats['ok']}/{len(stations)} OK | "
+            f"{self.stats['calls']} llamadas | presupuesto restante: {self.budget.remaining}"
+        )
+        return list(zip(stations, results))
+    
+    async def _fetch_all_async(self, stations: List[Dict], params: Dict) -> List[Optional[Dict]]:
+        bucket = TokenBucket(self.rate_per_second)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        done = 0
+        
+        async def tracked(station: Dict, executor: ThreadPoolExecutor) -> Optional[Dict]:
+            nonlocal done
+            result = await self._fetch_station(station, params, bucket, semaphore, executor)
+            done += 1
+            if self.on_progress:
+                self.on_progress(done, len(stations))
+            return result
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="meteosource") as executor:
+            return await asyncio.gather(*[tracked(station, executor) for station in stations])
+    
+    def _abort(self, reason: str) -> None:
+        if self._abort_reason is None:
+            self._abort_reason = reason
+            logger.error(f" ✗ Deteniendo descargas de Meteosource: {reason}")
+    
+    def _get(self, query: Dict) -> requests.Response:
+        return self.session.get(self.url, params=query, timeout=self.timeout)
+    
+    async def _fetch_station(
+        self,
+        station: Dict,
+        params: Dict,
+        bucket: TokenBucket,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor
+    ) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        query = {"lat": station["lat"], "lon": station["lon"], **params, "key": self.api_key}
+        
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            
+            try:
+                async with semaphore:
+                    # Comprobar dentro del semáforo: otra petición pudo abortar mientras esperábamos
+                    if self._abort_reason:
+                        return None
+                    if self.should_stop and self.should_stop():
+                        self._abort("ejecución cancelada")
+                        return None
+                    if not self.budget.try_consume():
+                        self._abort("presupuesto diario de llamadas agotado")
+                        return None
+                    
+                    # Si la API respondió 429, todas las peticiones esperan el Retry-After
+                    cooldown = self._cooldown_until - time.monotonic()
+                    if cooldown > 0:
+                        await asyncio.sleep(cooldown)
+                    
+                    await bucket.acquire()
+                    self.stats["calls"] += 1
+                    response = await loop.run_in_executor(executor, self._get, query)
+            except requests.exceptions.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        logger.error(f" Respuesta no JSON para {station['name']}")
+                        return None
+                
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code in ABORT_STATUS_CODES:
+                    self._abort(error)
+                    return None
+                if response.status_code not in RETRY_STATUS_CODES:
+                    logger.error(f" Error en request para {station['name']}: {error}")
+                    return None
+                retry_after = response.headers.get("Retry-After")
+                
+                if response.status_code == 429 and attempt == self.max_retries:
+                    # Cuota del servidor agotada: no tiene sentido seguir con las demás estaciones
+                    self._abort(error)
+                    return None
+            
+            if attempt < self.max_retries:
+                try:
+                    delay = float(retry_after)
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                except (TypeError, ValueError):
+                    delay = self.backoff_base * (2 ** attempt) * (1 + random.random() * 0.25)
+                logger.warning(
+                    f" Reintento {attempt + 1}/{self.max_retries} para {station['name']} "
+                    f"en {delay:.1f}s ({error})"
+                )
+                await asyncio.sleep(delay)
+        
+        logger.error(f" Error en request para {station['name']}: {error}")
+        return None
+    
+    def close(self) -> None:
+        self.session.close()
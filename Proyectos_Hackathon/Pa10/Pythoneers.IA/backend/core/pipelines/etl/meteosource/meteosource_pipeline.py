@@ -9,15 +9,15 @@ Free plan: 400 calls/day - Current weather + 7-day forecast
 import os
 import sys
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import List, Dict, Optional
-import time
 import warnings
 
-import requests
 from dotenv import load_dotenv
 
+from core.pipelines.etl.meteosource.fetcher import MeteosourceFetcher
+
 # Cargar variables de entorno desde .env
 load_dotenv()
 
@@ -64,8 +64,14 @@ logger.propagate = False
 # Paths (ya no se usan archivos CSV/JSON, solo base de datos)
 BACKEND_DIR = Path(__file__).parent.parent.parent.parent.parent
 
-# API Configuration
-METEOSOURCE_API_URL = "https://www.meteosource.com/api/v1/free/point"
+# API Configuration (URL base, concurrencia y presupuesto diario en fetcher.py)
+CURRENT_PARAMS = {
+    "sections": "current",  # Solo datos actuales
+    "units": "metric",
+}
+
+# Una lectura más reciente que esto no se vuelve a pedir (el job corre cada hora)
+CURRENT_MAX_AGE = timedelta(minutes=45)
 
 
 def get_stations_from_db() -> List[Dict]:
@@ -99,6 +105,44 @@ def get_api_key() -> str:
     return api_key
 
 
+def parse_current_weather(station: Dict, data: Dict) -> Dict:
+    """
+    Extrae los datos climáticos actuales de la respuesta de Meteosource.
+    
+    Args:
+        station: Diccionario con información de la estación
+        data: Respuesta JSON del endpoint /point (sección current)
+    
+    Returns:
+        Diccionario con datos climáticos
+    """
+    current = data.get("current") or {}
+    wind = current.get("wind") or {}
+    precipitation = current.get("precipitation") or {}
+    
+    return {
+        "station_id": station["id"],
+        "station_name": station["name"],
+        "region": station["region"],
+        "latitude": station["lat"],
+        "longitude": station["lon"],
+        "elevation": station["elevation"],
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "temperature": current.get("temperature"),
+        "feels_like": current.get("feels_like"),
+        "humidity": current.get("humidity"),
+        "wind_speed": wind.get("speed"),
+        "wind_direction": wind.get("dir"),
+        "wind_angle": wind.get("angle"),
+        "precipitation_total": precipitation.get("total", 0),
+        "precipitation_type": precipitation.get("type", "none"),
+        "pressure": current.get("pressure"),
+        "cloud_cover": current.get("cloud_cover"),
+        "summary": current.get("summary"),
+        "icon": current.get("icon"),
+    }
+
+
 def fetch_weather_data(station: Dict, api_key: str) -> Optional[Dict]:
     """
     Obtiene datos climáticos actuales para una estación específica.
@@ -110,89 +154,78 @@ def fetch_weather_data(station: Dict, api_key: str) -> Optional[Dict]:
     Returns:
         Diccionario con datos climáticos o None si falla
     """
+    logger.info(f"Obteniendo datos para {station['name']} (ID: {station['id']})")
+    
+    fetcher = MeteosourceFetcher(api_key=api_key, timeout=10)
     try:
-        params = {
-            "lat": station['lat'],  # Formato decimal: 9.0892 o -9.0892
-            "lon": station['lon'],  # Formato decimal: -79.3680 o 79.3680
-            "sections": "current",  # Solo datos actuales
-            "units": "metric",
-            "key": api_key
-        }
-        
-        logger.info(f"Obteniendo datos para {station['name']} (ID: {station['id']})")
-        
-        response = requests.get(METEOSOURCE_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Extraer datos relevantes
-        current = data.get("current", {})
-        wind = current.get("wind", {})
-        precipitation = current.get("precipitation", {})
-        
-        weather_data = {
-            "station_id": station["id"],
-            "station_name": station["name"],
-            "region": station["region"],
-            "latitude": station["lat"],
-            "longitude": station["lon"],
-            "elevation": station["elevation"],
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "temperature": current.get("temperature"),
-            "feels_like": current.get("feels_like"),
-            "humidity": current.get("humidity"),
-            "wind_speed": wind.get("speed"),
-            "wind_direction": wind.get("dir"),
-            "wind_angle": wind.get("angle"),
-            "precipitation_total": precipitation.get("total", 0),
-            "precipitation_type": precipitation.get("type", "none"),
-            "pressure": current.get("pressure"),
-            "cloud_cover": current.get("cloud_cover"),
-            "summary": current.get("summary"),
-            "icon": current.get("icon"),
-        }
-        
-        logger.info(f" Datos obtenidos para {station['name']}")
-        return weather_data
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f" Error al obtener datos para {station['name']}: {e}")
+        [(_, data)] = fetcher.fetch_all([station], CURRENT_PARAMS)
+    finally:
+        fetcher.close()
+    
+    if data is None:
         return None
+    
+    try:
+        return parse_current_weather(station, data)
     except Exception as e:
         logger.error(f" Error inesperado para {station['name']}: {e}")
         return None
 
 
-def fetch_all_stations(api_key: str, delay: float = 0.5) -> List[Dict]:
+def fetch_all_stations(
+    api_key: str,
+    stations: Optional[List[Dict]] = None,
+    fetcher: Optional[MeteosourceFetcher] = None,
+    skip_fresh: bool = True
+) -> List[Dict]:
     """
-    Obtiene datos de todas las estaciones con un delay entre requests.
+    Obtiene datos de todas las estaciones en paralelo.
+    
+    El ritmo de peticiones y el presupuesto diario los controla MeteosourceFetcher;
+    se omiten las estaciones con una lectura más reciente que CURRENT_MAX_AGE.
     
     Args:
         api_key: API key de Meteosource
-        delay: Segundos de espera entre requests (para respetar rate limits)
+        stations: Estaciones a consultar (default: todas las de la base de datos)
+        fetcher: Cliente de Meteosource (default: uno nuevo con api_key)
+        skip_fresh: Omitir estaciones con datos recientes
         
     Returns:
         Lista de diccionarios con datos de todas las estaciones
     """
-    all_data = []
-    
     # Obtener estaciones desde la base de datos
-    stations = get_stations_from_db()
+    stations = get_stations_from_db() if stations is None else stations
+    
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = MeteosourceFetcher(api_key=api_key, timeout=10)
+    
+    last_updates = None
+    if skip_fresh:
+        try:
+            from core.database.raindrop_db import get_station_last_observations
+            last_updates = get_station_last_observations()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer la última lectura por estación, se consultan todas: {e}")
     
     logger.info(f"🚀 Iniciando extracción de datos para {len(stations)} estaciones...")
     
-    for i, station in enumerate(stations):
-        weather_data = fetch_weather_data(station, api_key)
-        
-        if weather_data:
-            all_data.append(weather_data)
-        
-        # Delay entre requests (excepto en el último)
-        if i < len(stations) - 1:
-            time.sleep(delay)
+    all_data = []
+    try:
+        results = fetcher.fetch_all(stations, CURRENT_PARAMS, last_updates, CURRENT_MAX_AGE)
+    finally:
+        if own_fetcher:
+            fetcher.close()
+    
+    for station, data in results:
+        if data is None:
+            continue
+        try:
+            all_data.append(parse_current_weather(station, data))
+        except Exception as e:
+            logger.error(f" Error inesperado para {station['name']}: {e}")
     
-    logger.info(f"✅ Extracción completada: {len(all_data)}/{len(stations)} estaciones exitosas")
+    logger.info(f"✅ Extracción completada: {len(all_data)}/{len(results)} estaciones exitosas")
     return all_data
 
 
@@ -234,8 +267,13 @@ def train_ml_model() -> Dict:
         return {}
 
 
-def run():
-    """Ejecuta el pipeline completo de Meteosource."""
+def run(job=None):
+    """
+    Ejecuta el pipeline completo de Meteosource.
+    
+    Args:
+        job: PipelineJob que lo ejecuta (opcional), para reportar progreso y cancelar
+    """
     try:
         logger.info("=" * 70)
         logger.info("INICIANDO PIPELINE DE METEOSOURCE")
@@ -246,13 +284,31 @@ def run():
         logger.info(" API key configurada")
         
         # 2. Extraer datos de todas las estaciones
-        weather_data = fetch_all_stations(api_key, delay=0.5)
+        fetcher = MeteosourceFetcher(
+            api_key=api_key,
+            timeout=10,
+            on_progress=(lambda done, total: job.report(0.9 * done / total, f"Estaciones {done}/{total}")) if job else None,
+            should_stop=(lambda: job.cancelled) if job else None,
+        )
+        try:
+            weather_data = fetch_all_stations(api_key, fetcher=fetcher)
+        finally:
+            fetcher.close()
+        
+        if job and job.cancelled:
+            logger.warning("Pipeline de Meteosource cancelado")
+            return False
         
         if not weather_data:
+            if fetcher.stats.get("fresh") and not fetcher.stats.get("failed"):
+                logger.info(" Todas las estaciones tienen datos recientes, no se requieren nuevas llamadas")
+                return True
             logger.error("No se pudieron obtener datos de ninguna estación")
             return False
         
         # 3. Guardar directamente en base de datos
+        if job:
+            job.report(0.95, "Guardando en base de datos")
         records_saved = save_to_database(weather_data)
         
         # Obtener número total de estaciones para el resumen
@@ -0,0 +1,441 @@
+"""
+Ejecución de pipelines dentro del proceso de la API sobre un pool de workers.
+
+- Cada ejecución es un job con ID, estado, progreso (0-1) y sus últimos logs
+- Dos disparos del mismo pipeline (mismos parámetros) mientras uno está en cola
+  o corriendo devuelven el mismo job en lugar de lanzar otro
+- La cancelación es cooperativa: el pipeline consulta job.cancelled entre pasos
+- Los workers son hilos persistentes, por lo que reutilizan los modelos ya cargados
+  y las conexiones SQLite por hilo de raindrop_db (sin arrancar otro intérprete)
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuración (sobrescribible por variables de entorno)
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "2"))
+
+# Jobs terminados que se conservan para consulta y líneas de log por job
+JOB_HISTORY_SIZE = 100
+JOB_LOG_LINES = 200
+
+# Loggers de pipelines que no propagan al root (se les añade el capturador de logs)
+NON_PROPAGATING_LOGGERS = ("core.pipelines.etl.meteosource.meteosource_pipeline",)
+
+# Estados de un job
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PipelineJob:
+    """Una ejecución de un pipeline: estado, progreso, logs y bandera de cancelación."""
+    
+    def __init__(self, pipeline: str, params: Dict[str, Any], manager: "PipelineJobManager"):
+        self.id = uuid.uuid4().hex[:12]
+        self.pipeline = pipeline
+        self.params = params
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "En cola"
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.logs = deque(maxlen=JOB_LOG_LINES)
+        
+        self._manager = manager
+        self._cancel_event = threading.Event()
+        self._done_event = threading.Event()
+        self._future = None
+    
+    @property
+    def cancelled(self) -> bool:
+        """True si se pidió cancelar el job (el pipeline debe detenerse en el siguiente paso)."""
+        return self._cancel_event.is_set()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+    
+    def report(self, progress: float, message: Optional[str] = None) -> None:
+        """
+        Actualiza el progreso del job (lo llama el pipeline).
+        
+        Args:
+            progress: Fracción completada (0-1), nunca retrocede
+            message: Descripción del paso actual
+        """
+        self.progress = max(self.progress, min(1.0, float(progress)))
+        if message:
+            self.message = message
+        self._manager._emit("pipeline_progress", self, message)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que el job termine.
+        
+        Returns:
+            True si terminó con éxito
+        """
+        self._done_event.wait(timeout)
+        return self.status == SUCCEEDED
+    
+    def to_dict(self, include_logs: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "pipeline": self.pipeline,
+            "params": self.params,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "error": self.error,
+            "cancel_requested": self.cancelled,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if isinstance(self.result, dict):
+            data["result"] = self.result
+        if include_logs:
+            data["logs"] = list(self.logs)
+        return data
+
+
+class _JobLogHandler(logging.Handler):
+    """Copia los logs emitidos desde el hilo de cada job a su buffer y a los listeners."""
+    
+    def __init__(self, manager: "PipelineJobManager"):
+        super().__init__(level=logging.INFO)
+        self.manager = manager
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        job = self.manager._jobs_by_thread.get(record.thread)
+        if job is None or record.name == __name__:
+            return
+        try:
+            line = {
+                "message": record.getMessage().strip(),
+                "level": record.levelname.lower(),
+                "timestamp": _now(),
+            }
+        except Exception:
+            return
+        if line["message"]:
+            job.logs.append(line)
+            self.manager._emit("pipeline_log", job, line["message"], level=line["level"])
+
+
+class PipelineJobManager:
+    """
+    Pool de workers para ejecutar pipelines como jobs.
+    
+    Cada pipeline registrado es una función `target(job, **params)` que devuelve
+    un valor verdadero (bool o dict de resultados) si terminó bien.
+    """
+    
+    def __init__(self, pipelines: Dict[str, Callable[..., Any]], max_workers: int = PIPELINE_MAX_WORKERS):
+        self.pipelines = pipelines
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-worker")
+        self._jobs: "OrderedDict[str, PipelineJob]" = OrderedDict()
+        self._active: Dict[tuple, PipelineJob] = {}  # clave de deduplicación -> job en cola/corriendo
+        self._jobs_by_thread: Dict[int, PipelineJob] = {}
+        self._listeners: List[Callable[[str, PipelineJob, Dict[str, Any]], None]] = []
+        self._lock = threading.RLock()
+        
+        self._log_handler = _JobLogHandler(self)
+        logging.getLogger().addHandler(self._log_handler)
+        for name in NON_PROPAGATING_LOGGERS:
+            logging.getLogger(name).addHandler(self._log_handler)
+    
+    @staticmethod
+    def _dedup_key(pipeline: str, params: Dict[str, Any]) -> tuple:
+        return (pipeline, tuple(sorted((key, repr(value)) for key, value in params.items())))
+    
+    def submit(self, pipeline: str, **params) -> PipelineJob:
+        """
+        Encola un pipeline. Si ya hay un job igual en cola o corriendo, devuelve ese.
+        
+        Args:
+            pipeline: Nombre del pipeline registrado
+            **params: Parámetros para la función del pipeline
+        
+        Returns:
+            Job nuevo o el ya activo
+        
+        Raises:
+            KeyError: Si el pipeline no existe
+        """
+        if pipeline not in self.pipelines:
+            raise KeyError(f"Pipeline '{pipeline}' no registrado")
+        
+        key = self._dedup_key(pipeline, params)
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None and not active.cancelled:
+                logger.info(f" Pipeline '{pipeline}' ya en ejecución (job {active.id}), se reutiliza")
+                return active
+            
+            job = PipelineJob(pipeline, params, self)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._trim_history()
+            job._future = self._executor.submit(self._run, job, key)
+        
+        logger.info(f" Job {job.id} encolado: {pipeline} {params or ''}")
+        self._emit("pipeline_queued", job)
+        return job
+    
+    def get(self, job_id: str) -> Optional[PipelineJob]:
+        return self._jobs.get(job_id)
+    
+    def list_jobs(self, pipeline: Optional[str] = None, active_only: bool = False) -> List[PipelineJob]:
+        """Jobs más recientes primero, opcionalmente filtrados por pipeline o solo activos."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [
+            job for job in reversed(jobs)
+            if (pipeline is None or job.pipeline == pipeline) and not (active_only and job.finished)
+        ]
+    
+    def cancel(self, job_id: str) -> Optional[PipelineJob]:
+        """
+        Pide cancelar un job. Si aún está en cola no llega a ejecutarse;
+        si está corriendo se detiene en el siguiente punto de control del pipeline.
+        
+        Returns:
+            El job, o None si no existe
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        
+        job._cancel_event.set()
+        job.message = "Cancelación solicitada"
+        with self._lock:
+            key = self._dedup_key(job.pipeline, job.params)
+            if self._active.get(key) is job:
+                del self._active[key]  # un nuevo disparo crea otro job
+        
+        if job._future is not None and job._future.cancel():
+            self._finish(job, CANCELLED)
+        else:
+            self._emit("pipeline_progress", job, job.message)
+        logger.info(f" Cancelación solicitada para job {job.id} ({job.pipeline})")
+        return job
+    
+    def add_listener(self, callback: Callable[[str, PipelineJob, Dict[str, Any]], None]) -> None:
+        """Registra callback(evento, job, extra) para los cambios de estado y logs de los jobs."""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, PipelineJob, Dict[str, Any]], None]) -> None:
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+    
+    def shutdown(self, timeout: float = 10) -> None:
+        """Cancela los jobs activos y espera (hasta timeout) a que terminen los que están corriendo."""
+        for job in self.list_jobs(active_only=True):
+            self.cancel(job.id)
+        deadline = time.monotonic() + timeout
+        for job in self.list_jobs(active_only=True):
+            job.wait(max(0.0, deadline - time.monotonic()))
+        self._executor.shutdown(wait=False)
+        logging.getLogger().removeHandler(self._log_handler)
+        for name in NON_PROPAGATING_LOGGERS:
+            logging.getLogger(name).removeHandler(self._log_handler)
+    
+    def _run(self, job: PipelineJob, key: tuple) -> None:
+        if job.cancelled:
+            self._finish(job, CANCELLED, key=key)
+            return
+        
+        thread_id = threading.get_ident()
+        self._jobs_by_thread[thread_id] = job
+        job.status = RUNNING
+        job.started_at = _now()
+        job.message = "En ejecución"
+        self._emit("pipeline_started", job)
+        logger.info(f" Job {job.id} iniciado: {job.pipeline}")
+        
+        start = time.monotonic()
+        try:
+            result = self.pipelines[job.pipeline](job, **job.params)
+            job.result = result
+            if job.cancelled:
+                status = CANCELLED
+            elif result:
+                status = SUCCEEDED
+            else:
+                status = FAILED
+                job.error = "El pipeline finalizó con errores"
+        except Exception as e:
+            logger.error(f" Job {job.id} ({job.pipeline}) falló: {e}", exc_info=True)
+            status = CANCELLED if job.cancelled else FAILED
+            job.error = str(e)
+        finally:
+            self._jobs_by_thread.pop(thread_id, None)
+        
+        self._finish(job, status, key=key)
+        logger.info(f" Job {job.id} ({job.pipeline}) terminó: {status} en {time.monotonic() - start:.1f}s")
+    
+    def _finish(self, job: PipelineJob, status: str, key: Optional[tuple] = None) -> None:
+        with self._lock:
+            if job.finished:
+                return
+            job.status = status
+            job.finished_at = _now()
+            if status == SUCCEEDED:
+                job.progress = 1.0
+                job.message = "Completado"
+            elif status == CANCELLED:
+                job.message = "Cancelado"
+            else:
+                job.message = job.error or "Falló"
+            key = key or self._dedup_key(job.pipeline, job.params)
+            if self._active.get(key) is job:
+                del self._active[key]
+        job._done_event.set()
+        self._emit("pipeline_completed", job)
+    
+    def _trim_history(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - JOB_HISTORY_SIZE)]:
+            del self._jobs[job_id]
+    
+    def _emit(self, event: str, job: PipelineJob, message: Optional[str] = None, **extra) -> None:
+        if message:
+            extra["message"] = message
+        for callback in list(self._listeners):
+            try:
+                callback(event, job, extra)
+            except Exception as e:
+                # Los logs de este módulo no pasan por el capturador de jobs (no hay recursión)
+                logger.warning(f" Error en listener de jobs: {e}")
+
+
+# ----------------------------------------------------------------------
+# Pipelines registrados
+# ----------------------------------------------------------------------
+
+def run_meteosource_job(job: PipelineJob) -> bool:
+    """Datos actuales de Meteosource para todas las estaciones, puntuando anomalías de las lecturas nuevas."""
+    from core.pipelines.etl.meteosource.meteosource_pipeline import run
+    success = run(job=job)
+    
+    if success and not job.cancelled:
+        from config import ANOMALY_VARIABLES
+        from services.risk_calculator import RiskCalculator
+        
+        # Estado incremental por estación: solo se leen las lecturas posteriores al último puntaje
+        calculator = RiskCalculator()
+        for variable in ANOMALY_VARIABLES:
+            anomalies = calculator.update_anomaly_state(variable)
+            if anomalies:
+                logger.info(f" {len(anomalies)} anomalías en {variable}")
+    
+    return success
+
+
+def run_forecast_job(job: PipelineJob) -> bool:
+    """Pronósticos de Meteosource con riesgos pre-calculados."""
+    from core.pipelines.etl.meteosource.forecast_pipeline import run
+    return run(job=job)
+
+
+def run_training_job(job: PipelineJob, days_back: int = 7, min_incidents: int = 0) -> Dict[str, Any]:
+    """
+    Reentrena los modelos de riesgo.
+    
+    Args:
+        days_back: Días de histórico (ver train_model_from_history)
+        min_incidents: Si > 0, solo entrena cuando hay al menos ese número de incidentes correlacionados
+    """
+    if min_incidents:
+        job.report(0.05, "Contando incidentes correlacionados")
+        from core.ml.incident_correlation import get_incident_training_data
+        X, _, _ = get_incident_training_data()
+        if len(X) < min_incidents:
+            logger.info(f" Esperando más incidentes para re-entrenamiento ({len(X)}/{min_incidents})")
+            return {"skipped": True, "incidents": len(X)}
+    
+    if job.cancelled:
+        return {}
+    job.report(0.1, "Entrenando modelos")
+    from core.ml import train_model_from_history
+    metrics = train_model_from_history(days_back=days_back)
+    return {
+        "skipped": False,
+        "train_samples": metrics.get("train_samples"),
+        "training_time": metrics.get("training_time"),
+    }
+
+
+def run_generate_dummy_job(
+    job: PipelineJob,
+    days: int = 365,
+    use_random: bool = True,
+    records_per_day: int = 24,
+    seed: Optional[int] = None
+) -> bool:
+    """Datos climáticos sintéticos para entrenamiento (reproducibles si se indica seed)."""
+    from core.pipelines.etl.generate_dummy_data import run
+    return run(days=days, use_random=use_random, records_per_day=records_per_day, job=job, seed=seed)
+
+
+def run_archive_weather_job(job: PipelineJob, hot_days: Optional[int] = None) -> Dict[str, Any]:
+    """Archiva en particiones mensuales las lecturas fuera de la ventana caliente."""
+    from core.database.raindrop_db import archive_weather_data, WEATHER_HOT_DAYS
+    job.report(0.1, "Archivando lecturas antiguas")
+    return {"archived": archive_weather_data(hot_days or WEATHER_HOT_DAYS)}
+
+
+PIPELINE_TARGETS = {
+    "meteosource": run_meteosource_job,
+    "forecast": run_forecast_job,
+    "training": run_training_job,
+    "generate_dummy": run_generate_dummy_job,
+    "archive_weather": run_archive_weather_job,
+}
+
+_manager_instance: Optional[PipelineJobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> PipelineJobManager:
+    """Obtiene el pool de jobs de pipelines del proceso (singleton)."""
+    global _manager_instance
+    if _manager_instance is None:
+        with _manager_lock:
+            if _manager_instance is None:
+                _manager_instance = PipelineJobManager(PIPELINE_TARGETS)
+    return _manager_instance
+
+
+def shutdown_job_manager(timeout: float = 10) -> None:
+    """Detiene el pool de jobs si se llegó a crear."""
+    global _manager_instance
+    with _manager_lock:
+        manager, _manager_instance = _manager_instance, None
+    if manager is not None:
+        manager.shutdown(timeout)
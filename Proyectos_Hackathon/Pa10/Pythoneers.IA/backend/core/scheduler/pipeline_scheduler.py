@@ -2,7 +2,8 @@
 Scheduler para ejecutar el pipeline de Meteosource automáticamente cada hora.
 
 Utiliza APScheduler para programar la ejecución del pipeline y garantizar
-que los datos se actualicen regularmente.
+que los datos se actualicen regularmente. Las ejecuciones se encolan en el pool
+de jobs de core.pipelines.jobs, compartido con los disparos desde la API.
 """
 
 import logging
@@ -13,6 +14,8 @@ from pathlib import Path
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
+from core.pipelines.jobs import get_job_manager
+
 # Suprimir warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", category=RuntimeWarning)
@@ -30,22 +33,20 @@ scheduler = None
 
 
 def run_meteosource_pipeline():
-    """Ejecuta el pipeline de Meteosource."""
+    """Ejecuta el pipeline de Meteosource (espera a que termine el job)."""
     try:
         logger.info("=" * 50)
         logger.info("Iniciando ejecución programada del pipeline")
         logger.info(f"Timestamp: {datetime.now(timezone.utc).isoformat()}")
         logger.info("=" * 50)
         
-        # Importar y ejecutar el pipeline
-        from core.pipelines.etl.meteosource.meteosource_pipeline import run
-        
-        success = run()
+        job = get_job_manager().submit("meteosource")
+        success = job.wait()
         
         if success:
             logger.info(" Pipeline ejecutado exitosamente")
         else:
-            logger.error(" Pipeline falló")
+            logger.error(f" Pipeline falló ({job.status})")
             
         return success
         
@@ -55,61 +56,41 @@ def run_meteosource_pipeline():
 
 
 def run_forecast_pipeline():
-    """Ejecuta el pipeline de pronósticos (forecast) en un thread separado para no bloquear el servidor."""
-    import threading
-    
-    def _run_in_thread():
-        try:
-            logger.info("=" * 50)
-            logger.info("Iniciando ejecución programada del pipeline de pronósticos")
-            logger.info(f"Timestamp: {datetime.now(timezone.utc).isoformat()}")
-            logger.info("=" * 50)
-            
-            # Importar y ejecutar el pipeline de forecast
-            from core.pipelines.etl.meteosource.forecast_pipeline import run
-            
-            success = run()
-            
-            if success:
-                logger.info(" Pipeline de pronósticos ejecutado exitosamente")
-            else:
-                logger.error(" Pipeline de pronósticos falló")
-                
-            return success
-            
-        except Exception as e:
-            logger.error(f"Error ejecutando pipeline de pronósticos: {e}", exc_info=True)
-            return False
+    """Encola el pipeline de pronósticos sin esperar, para no bloquear el servidor."""
+    try:
+        logger.info("=" * 50)
+        logger.info("Iniciando ejecución programada del pipeline de pronósticos")
+        logger.info(f"Timestamp: {datetime.now(timezone.utc).isoformat()}")
+        logger.info("=" * 50)
+        
+        job = get_job_manager().submit("forecast")
+        logger.info(f" Pipeline de pronósticos en segundo plano (job {job.id})")
+        return True
     
-    # Ejecutar en thread separado para no bloquear el servidor
-    thread = threading.Thread(target=_run_in_thread, daemon=True, name="ForecastPipeline")
-    thread.start()
-    logger.info(" Pipeline de pronósticos iniciado en thread separado")
-    return True
+    except Exception as e:
+        logger.error(f"Error ejecutando pipeline de pronósticos: {e}", exc_info=True)
+        return False
 
 
 def run_model_training():
-    """Ejecuta el entrenamiento del modelo ML."""
+    """Ejecuta el entrenamiento del modelo ML (espera a que termine el job)."""
     try:
         logger.info("=" * 50)
         logger.info("Iniciando entrenamiento programado del modelo ML")
         logger.info(f"Timestamp: {datetime.now(timezone.utc).isoformat()}")
         logger.info("=" * 50)
         
-        # Importar y ejecutar el entrenamiento
-        from core.ml import train_model_from_history
-        
         # Entrenar con 7 días de datos históricos
-        metrics = train_model_from_history(days_back=7)
+        job = get_job_manager().submit("training", days_back=7)
         
-        if metrics:
+        if job.wait():
+            metrics = job.result or {}
             logger.info(" Modelo entrenado exitosamente")
-            logger.info(f"   - Accuracy: {metrics.get('accuracy', 'N/A'):.4f}")
             logger.info(f"   - Muestras de entrenamiento: {metrics.get('train_samples', 0)}")
-            logger.info(f"   - Tiempo de entrenamiento: {metrics.get('training_time', 0):.2f}s")
+            logger.info(f"   - Tiempo de entrenamiento: {metrics.get('training_time') or 0:.2f}s")
             return True
         else:
-            logger.error(" Entrenamiento del modelo falló")
+            logger.error(f" Entrenamiento del modelo falló ({job.status})")
             return False
             
     except Exception as e:
@@ -117,6 +98,20 @@ def run_model_training():
         return False
 
 
+def run_weather_archive():
+    """Archiva las lecturas horarias antiguas en particiones mensuales (espera a que termine el job)."""
+    try:
+        job = get_job_manager().submit("archive_weather")
+        if job.wait():
+            logger.info(f" Archivado completado: {(job.result or {}).get('archived', 0)} lecturas")
+            return True
+        logger.error(f" Archivado de lecturas falló ({job.status})")
+        return False
+    except Exception as e:
+        logger.error(f"Error ejecutando archivado programado: {e}", exc_info=True)
+        return False
+
+
 def start_scheduler():
     """Inicia el scheduler para ejecutar el pipeline cada hora."""
     global scheduler
@@ -161,6 +156,16 @@ def start_scheduler():
         max_instances=1  # Solo una instancia a la vez
     )
     
+    # Archivar lecturas antiguas en particiones mensuales todos los días a las 3:00 AM
+    scheduler.add_job(
+        run_weather_archive,
+        trigger=CronTrigger(hour=3, minute=0),
+        id='weather_archive',
+        name='Weather Archive - Daily',
+        replace_existing=True,
+        max_instances=1
+    )
+    
     scheduler.start()
     
     logger.info(" Scheduler iniciado")
@@ -224,9 +229,9 @@ def execute_training_now():
 
 
 def execute_forecast_now():
-    """Ejecuta el pipeline de pronósticos inmediatamente en un thread separado."""
+    """Encola el pipeline de pronósticos inmediatamente (no espera a que termine)."""
     logger.info("Ejecución manual del pipeline de pronósticos solicitada")
-    return run_forecast_pipeline()  # Ya ejecuta en thread separado
+    return run_forecast_pipeline()  # Ya se ejecuta en el pool de jobs
 
 
 if __name__ == "__main__":
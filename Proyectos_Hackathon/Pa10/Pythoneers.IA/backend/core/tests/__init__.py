@@ -0,0 +1,3 @@
+"""
+Tests unitarios del core de rAIndrop
+"""
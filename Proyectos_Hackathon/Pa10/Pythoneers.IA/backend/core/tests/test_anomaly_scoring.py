@@ -0,0 +1,90 @@
+"""
+Tests de detección de anomalías: z-score agrupado y puntuación incremental (Welford).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import core.database.raindrop_db as db
+from services.risk_calculator import RiskCalculator
+
+
+def test_grouped_zscore_matches_per_station_loop():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"station_id": rng.integers(0, 20, 3000), "LLUVIA": rng.normal(5, 2, 3000)})
+    data.loc[rng.integers(0, 3000, 100), "LLUVIA"] = np.nan
+    data.loc[data["station_id"] == 3, "LLUVIA"] = 1.0  # desviación 0: sin anomalías
+
+    expected = []
+    for station_id, group in data.groupby("station_id"):
+        values = group["LLUVIA"].dropna()
+        if values.nunique() < 2:
+            continue
+        z_scores = np.abs(stats.zscore(values))
+        expected += [(station_id, values.iloc[i], z_scores[i]) for i in np.where(z_scores > 2)[0]]
+
+    anomalies = RiskCalculator().detect_anomalies(data)
+    assert len(anomalies) == len(expected)
+    assert np.allclose([(a["station_id"], a["value"], a["z_score"]) for a in anomalies], expected)
+    assert all(a["severity"] == ("high" if a["z_score"] > 3 else "medium") for a in anomalies)
+
+
+def test_incremental_scoring_matches_sequential_welford():
+    rng = np.random.default_rng(1)
+    readings = pd.DataFrame(
+        [(sid, f"2024-01-{h // 24 + 1:02d}", h % 24, f"t{h}", rng.normal(100 + sid, 3)) for sid in range(4) for h in range(60)],
+        columns=["station_id", "date", "hour", "timestamp", "value"],
+    )
+
+    calculator = RiskCalculator()
+    state, scored = {}, []
+    for start, end in [(0, 50), (50, 51), (51, 240)]:  # lotes que cortan estaciones por la mitad
+        batch = readings.iloc[start:end]
+        anomalies, states = calculator.score_incremental(batch, state, z_threshold=-1)
+        state.update({s["station_id"]: s for s in states})
+        scored += anomalies
+
+    for station_id, group in readings.groupby("station_id"):
+        values = group["value"].to_numpy()
+        expected = [abs(values[i] - values[:i].mean()) / values[:i].std() for i in range(3, len(values))]
+        assert np.allclose([a["z_score"] for a in scored if a["station_id"] == station_id], expected)
+        assert state[station_id]["n"] == len(values)
+        assert np.isclose(state[station_id]["mean"], values.mean())
+        assert np.isclose(state[station_id]["m2"], ((values - values.mean()) ** 2).sum())
+
+
+def test_update_anomaly_state_reads_only_new_readings(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(db, "_ingest_listeners", [])
+    db.init_database()
+
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+    def ingest(hours, rainfall):
+        db.bulk_upsert_weather_data([
+            {
+                "station_id": station_id, "station_name": f"Estación {station_id}", "region": "Panama",
+                "latitude": 9.0, "longitude": -79.5, "elevation": 10,
+                "timestamp": (start + timedelta(hours=h)).isoformat(),
+                "precipitation_total": rainfall(station_id, h),
+            }
+            for station_id in (1, 2)
+            for h in hours
+        ])
+
+    ingest(range(48), lambda station_id, h: 1.0 + (h % 3) * 0.5)
+    calculator = RiskCalculator()
+    assert calculator.update_anomaly_state("precipitation_total") == []
+    assert db.get_anomaly_state("precipitation_total")[1]["n"] == 48
+
+    ingest([48], lambda station_id, h: 40.0 if station_id == 2 else 1.5)
+    assert db.get_unscored_readings("precipitation_total")["station_id"].tolist() == [1, 2]
+
+    anomalies = calculator.update_anomaly_state("precipitation_total")
+    assert [(a["station_id"], a["severity"]) for a in anomalies] == [(2, "high")]
+    assert db.get_unscored_readings("precipitation_total").empty
+    assert db.get_anomaly_state("precipitation_total", {2})[2]["n"] == 49
+    db.close_all_connections()
@@ -0,0 +1,97 @@
+"""
+Tests de las conexiones por hilo: reutilización, aislamiento entre hilos,
+transacciones anidadas y reapertura tras close_all_connections.
+"""
+
+import threading
+
+import pytest
+
+import core.database.raindrop_db as db
+
+
+@pytest.fixture
+def conn_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", tmp_path / "test.db")
+    db.close_all_connections()
+    with db.get_connection() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS t (v INTEGER)")
+    yield db
+    db.close_all_connections()
+
+
+def _values():
+    with db.get_read_connection() as conn:
+        return [row[0] for row in conn.execute("SELECT v FROM t ORDER BY v")]
+
+
+def _in_thread(fn):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", fn()))
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
+def test_connection_reused_within_thread(conn_db):
+    with db.get_connection() as first, db.get_connection() as second:
+        assert first is second
+    with db.get_read_connection() as read_first, db.get_read_connection() as read_second:
+        assert read_first is read_second is not first
+
+
+def test_connections_isolated_across_threads(conn_db):
+    with db.get_connection() as main_conn:
+        pass
+
+    def worker():
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            return conn
+
+    worker_conn = _in_thread(worker)
+    assert worker_conn is not main_conn
+    assert _values() == [1]
+
+
+def test_nested_transactions_commit_once(conn_db):
+    with db.get_connection() as outer:
+        outer.execute("INSERT INTO t VALUES (1)")
+        with db.get_connection() as inner:
+            inner.execute("INSERT INTO t VALUES (2)")
+        # El bloque anidado no confirma: otro hilo todavía no ve las filas
+        assert _in_thread(_values) == []
+    assert _values() == [1, 2]
+
+
+def test_nested_rollback_reverts_outer_transaction(conn_db):
+    with pytest.raises(RuntimeError):
+        with db.get_connection() as outer:
+            outer.execute("INSERT INTO t VALUES (1)")
+            with db.get_connection() as inner:
+                inner.execute("INSERT INTO t VALUES (2)")
+                raise RuntimeError("fallo dentro")
+    assert _values() == []
+
+    # La profundidad vuelve a cero: la siguiente transacción confirma normalmente
+    with db.get_connection() as conn:
+        conn.execute("INSERT INTO t VALUES (3)")
+    assert _values() == [3]
+
+
+def test_reopens_connections_closed_by_another_thread(conn_db):
+    with db.get_connection() as before:
+        pass
+    with db.get_read_connection() as read_before:
+        pass
+
+    # close_all_connections desde otro hilo cierra estas conexiones, pero no
+    # limpia el estado de este hilo
+    _in_thread(db.close_all_connections)
+
+    with db.get_connection() as after:
+        after.execute("INSERT INTO t VALUES (1)")
+    assert after is not before
+    with db.get_read_connection() as read_after:
+        assert read_after is not read_before
+    assert _values() == [1]
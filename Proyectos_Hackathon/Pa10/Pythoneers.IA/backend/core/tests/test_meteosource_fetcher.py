@@ -0,0 +1,173 @@
+"""
+Pruebas de MeteosourceFetcher contra un servidor HTTP local que simula la API.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from core.pipelines.etl.meteosource.fetcher import (
+    DailyCallBudget,
+    MeteosourceFetcher,
+    split_fresh_stations,
+)
+
+
+class MockMeteosource:
+    """Servidor /point: responde 429 la primera vez a `flaky_lat`, 500 siempre a `broken_lat`."""
+
+    def __init__(self, flaky_lat=None, broken_lat=None, status=None, delay=0.0):
+        self.flaky_lat = flaky_lat
+        self.broken_lat = broken_lat
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                with mock.lock:
+                    mock.requests.append(query)
+                    attempts = sum(1 for q in mock.requests if q["lat"] == query["lat"])
+                    mock.in_flight += 1
+                    mock.max_in_flight = max(mock.max_in_flight, mock.in_flight)
+                try:
+                    time.sleep(mock.delay)
+                    if mock.status is not None:
+                        self._reply(mock.status, {"detail": "forced"})
+                    elif query["lat"] == mock.broken_lat:
+                        self._reply(500, {"detail": "boom"})
+                    elif query["lat"] == mock.flaky_lat and attempts == 1:
+                        self._reply(429, {"detail": "slow down"}, {"Retry-After": "0"})
+                    else:
+                        self._reply(200, {"lat": query["lat"], "current": {"temperature": 27.0}})
+                finally:
+                    with mock.lock:
+                        mock.in_flight -= 1
+
+            def _reply(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _stations(n):
+    return [{"id": i, "name": f"Estación {i}", "lat": f"{8 + i / 100:.2f}", "lon": "-79.50"} for i in range(n)]
+
+
+def _fetcher(mock, budget=100, **kwargs):
+    options = {"max_concurrency": 4, "rate_per_second": 1000, "backoff_base": 0.01}
+    options.update(kwargs)
+    return MeteosourceFetcher(
+        api_key="test-key",
+        base_url=mock.base_url,
+        budget=DailyCallBudget(budget),
+        **options,
+    )
+
+
+def test_fetch_all_returns_results_in_order_and_retries():
+    stations = _stations(12)
+    with MockMeteosource(flaky_lat=stations[3]["lat"], broken_lat=stations[7]["lat"], delay=0.02) as mock:
+        fetcher = _fetcher(mock, max_retries=2)
+        results = fetcher.fetch_all(stations, {"sections": "current"})
+
+    assert [station["id"] for station, _ in results] == list(range(12))
+    assert results[3][1]["lat"] == stations[3]["lat"]  # 429 reintentado con éxito
+    assert results[7][1] is None  # 500 persistente tras agotar reintentos
+    assert all(data is not None for i, (_, data) in enumerate(results) if i != 7)
+
+    # 11 éxitos + 1 reintento del 429 + 3 intentos de la estación rota
+    assert fetcher.stats["calls"] == len(mock.requests) == 15
+    assert fetcher.stats["ok"] == 11 and fetcher.stats["failed"] == 1
+    assert 1 < mock.max_in_flight <= 4
+    assert all(q["key"] == "test-key" and q["sections"] == "current" for q in mock.requests)
+
+
+def test_daily_budget_stops_requests():
+    with MockMeteosource() as mock:
+        fetcher = _fetcher(mock, budget=5)
+        results = fetcher.fetch_all(_stations(10), {})
+
+    assert len(mock.requests) == 5
+    assert sum(1 for _, data in results if data is not None) == 5
+    assert fetcher.budget.remaining == 0
+
+
+@pytest.mark.parametrize("status", [401, 429])
+def test_auth_or_quota_errors_abort_remaining_stations(status):
+    with MockMeteosource(status=status) as mock:
+        fetcher = _fetcher(mock, max_concurrency=1, max_retries=1)
+        results = fetcher.fetch_all(_stations(10), {})
+
+    assert all(data is None for _, data in results)
+    if status == 401:
+        assert len(mock.requests) == 1
+    else:
+        # Cada estación en cola llega a intentar una vez antes de que la primera agote sus reintentos
+        assert len(mock.requests) <= 11
+
+
+def test_token_bucket_limits_request_rate():
+    with MockMeteosource() as mock:
+        fetcher = _fetcher(mock, rate_per_second=20)
+        started = time.monotonic()
+        fetcher.fetch_all(_stations(30), {})
+        elapsed = time.monotonic() - started
+
+    # Ráfaga inicial de 20 tokens y 10 más a 20/s
+    assert elapsed >= 0.45
+
+
+def test_fresh_stations_are_skipped():
+    now = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+    stations = _stations(4)
+    last_updates = {
+        0: (now - timedelta(minutes=10)).isoformat(),
+        1: (now - timedelta(hours=2)).isoformat(),
+        2: "2024-06-01T11:30:00",  # sin zona horaria: UTC
+    }
+
+    stale, fresh = split_fresh_stations(stations, last_updates, timedelta(minutes=45), now=now)
+
+    assert [s["id"] for s in fresh] == [0, 2]
+    assert [s["id"] for s in stale] == [1, 3]
+
+    with MockMeteosource() as mock:
+        fetcher = _fetcher(mock)
+        recent = {0: datetime.now(timezone.utc).isoformat()}
+        results = fetcher.fetch_all(stations, {}, recent, timedelta(minutes=45))
+
+    assert [station["id"] for station, _ in results] == [1, 2, 3]
+    assert fetcher.stats["fresh"] == 1
+    assert len(mock.requests) == 3
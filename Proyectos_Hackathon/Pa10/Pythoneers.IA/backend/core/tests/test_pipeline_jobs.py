@@ -0,0 +1,89 @@
+"""
+Tests del pool de jobs de pipelines: deduplicación, progreso, cancelación y logs.
+"""
+
+import logging
+import threading
+
+from core.pipelines.jobs import PipelineJobManager, SUCCEEDED, FAILED, CANCELLED
+
+logger = logging.getLogger("core.pipelines.etl.test_pipeline")
+logger.setLevel(logging.INFO)  # la API configura INFO en el root; pytest no
+
+
+def _make_manager(max_workers=1):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow(job, steps=5):
+        started.set()
+        for step in range(1, steps + 1):
+            if job.cancelled:
+                return False
+            release.wait(5)
+            job.report(step / steps, f"Paso {step}/{steps}")
+            logger.info(f"paso {step}")
+        return True
+
+    def broken(job):
+        raise ValueError("sin datos")
+
+    manager = PipelineJobManager({"slow": slow, "broken": broken}, max_workers=max_workers)
+    return manager, release, started
+
+
+def test_concurrent_triggers_share_one_job():
+    manager, release, started = _make_manager()
+    try:
+        first = manager.submit("slow")
+        assert manager.submit("slow") is first
+        other = manager.submit("slow", steps=2)  # parámetros distintos: otro job
+        assert other is not first
+
+        events = []
+        manager.add_listener(lambda event, job, extra: events.append((event, job.id)))
+        started.wait(5)
+        release.set()
+        assert first.wait(5) and other.wait(5)
+
+        assert first.status == SUCCEEDED and first.progress == 1.0
+        assert [line["message"] for line in first.logs] == [f"paso {i}" for i in range(1, 6)]
+        assert ("pipeline_completed", first.id) in events
+        assert manager.submit("slow") is not first  # terminado: un nuevo disparo crea otro job
+        assert [job.id for job in manager.list_jobs("slow")][1:] == [other.id, first.id]
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_cancel_running_and_queued_jobs():
+    manager, release, started = _make_manager()
+    try:
+        running = manager.submit("slow")
+        queued = manager.submit("slow", steps=2)
+        started.wait(5)
+
+        manager.cancel(queued.id)
+        assert queued.status == CANCELLED  # nunca llegó a ejecutarse
+
+        manager.cancel(running.id)
+        release.set()
+        assert not running.wait(5)
+        assert running.status == CANCELLED
+        assert running.progress < 1.0
+        assert manager.list_jobs(active_only=True) == []
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_failed_pipeline_reports_error():
+    manager, _, _ = _make_manager()
+    try:
+        job = manager.submit("broken")
+        assert not job.wait(5)
+        assert job.status == FAILED
+        assert job.error == "sin datos"
+        assert manager.get(job.id).to_dict()["status"] == FAILED
+    finally:
+        manager.shutdown()
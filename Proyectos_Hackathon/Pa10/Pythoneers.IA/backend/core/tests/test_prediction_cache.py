@@ -0,0 +1,119 @@
+"""
+Tests de la caché de predicciones: LRU, contadores, invalidación y persistencia.
+"""
+
+import numpy as np
+import pytest
+
+import core.database.raindrop_db as db
+from core.ml.prediction_cache import PredictionCache, model_version
+
+
+def test_lru_eviction_and_counters():
+    cache = PredictionCache(max_entries=3)
+    for station_id in range(3):
+        cache.set("station_risk", station_id, "t0", "v1", station_id * 10)
+
+    assert cache.get("station_risk", 0, "t0", "v1") == 0  # 0 pasa a ser la más reciente
+    cache.set("station_risk", 3, "t0", "v1", 30)  # expulsa la 1
+
+    assert cache.get("station_risk", 1, "t0", "v1") is None
+    assert cache.get_many("station_risk", [(0, "t0"), (2, "t0"), (3, "t0"), (2, "t1")], "v1") == {
+        (0, "t0"): 0, (2, "t0"): 20, (3, "t0"): 30
+    }
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (4, 2)
+
+
+def test_new_model_version_discards_previous_entries():
+    cache = PredictionCache()
+    cache.set("station_risk", 1, "t0", "v1", 0.5)
+    cache.set("forecast", None, "t0", "v1", {"a": 1})
+
+    assert cache.get("station_risk", 1, "t0", "v2") is None
+    assert cache.stats()["entries"] == 1  # solo queda el forecast (otro tipo)
+    assert cache.get("forecast", None, "t0", "v1") == {"a": 1}
+
+
+def test_model_version_changes_with_file(tmp_path):
+    model_file = tmp_path / "model.joblib"
+    assert model_version(model_file) == "none"
+
+    model_file.write_bytes(b"a")
+    first = model_version(model_file)
+    model_file.write_bytes(b"bb")
+    assert model_version(model_file) not in ("none", first)
+
+
+def test_ingest_invalidates_affected_stations(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(db, "_ingest_listeners", [])
+    db.init_database()
+
+    cache = PredictionCache()
+    db.add_ingest_listener(cache.on_ingest)
+    cache.set_many("station_risk", {(1, "t0"): 0.1, (2, "t0"): 0.2}, "v1")
+    cache.set("forecast", None, "t0", "v1", {})
+
+    db.bulk_upsert_weather_data([{
+        "station_id": 1, "station_name": "Uno", "region": "Panama",
+        "latitude": 9.0, "longitude": -79.5, "elevation": 10,
+        "timestamp": "2024-06-01T10:00:00+00:00", "temperature": 27.0,
+    }])
+
+    assert cache.get("station_risk", 1, "t0", "v1") is None
+    assert cache.get("station_risk", 2, "t0", "v1") == 0.2
+    assert cache.get("forecast", None, "t0", "v1") == {}
+
+    db.insert_or_update_forecast_data([{"station_id": 2, "forecast_date": "2024-06-01"}])
+    assert cache.get("forecast", None, "t0", "v1") is None
+    db.close_all_connections()
+
+
+def test_persistence_roundtrip(tmp_path):
+    path = tmp_path / "cache.pkl"
+    cache = PredictionCache(persist_path=path)
+    cache.set("station_risk", 1, "t0", "v1", (0.3, 0.7))
+    assert cache.save()
+
+    restored = PredictionCache(persist_path=path)
+    assert restored.get("station_risk", 1, "t0", "v1") == (0.3, 0.7)
+    assert restored.get("station_risk", 1, "t0", "v2") is None
+    assert restored.stats()["entries"] == 0
+
+
+def test_station_risks_cache_only_model_output(monkeypatch):
+    import api.stations as stations
+
+    cache = PredictionCache()
+    monkeypatch.setattr(stations, "get_prediction_cache", lambda: cache)
+    stations_data = [
+        {"station_id": 1, "timestamp": "t0", "precipitation_total": 25.0, "humidity": 80.0},
+        {"station_id": 2, "timestamp": "t0", "precipitation_total": 0.0, "humidity": 30.0},
+    ]
+
+    # Sin modelo: cálculo simple, que no se guarda en caché
+    monkeypatch.setattr(stations, "get_risk_predictor", lambda: None)
+    flood, drought = stations._predict_station_risks(stations_data)
+    assert flood[0] == pytest.approx(0.62)
+    assert cache.stats()["entries"] == 0
+
+    class FakePredictor:
+        calls = 0
+
+        def predict_batch(self, features):
+            FakePredictor.calls += 1
+            n = len(features)
+            return {"flood_risk": np.full(n, 0.9), "drought_risk": np.full(n, 0.1)}
+
+    # Con el modelo de vuelta se calcula de nuevo y se cachea
+    monkeypatch.setattr(stations, "get_risk_predictor", lambda: FakePredictor())
+    monkeypatch.setattr(stations, "build_feature_frame", lambda frame: frame)
+    for _ in range(2):
+        flood, drought = stations._predict_station_risks(stations_data)
+        assert list(flood) == [0.9, 0.9] and list(drought) == [0.1, 0.1]
+    assert FakePredictor.calls == 1
+    assert cache.stats()["entries"] == 2
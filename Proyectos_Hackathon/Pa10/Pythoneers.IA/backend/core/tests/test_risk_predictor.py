@@ -0,0 +1,114 @@
+"""
+Tests del RiskPredictor: paridad entre el etiquetado vectorizado y el original por fila,
+y entre las predicciones en lote y las de una sola fila.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from core.ml.prediction_cache import PredictionCache
+from core.ml.risk_predictor import RiskPredictor, build_feature_frame
+
+
+def _weather_frame(n: int = 5000, seed: int = 7) -> pd.DataFrame:
+    """Genera condiciones aleatorias incluyendo los umbrales exactos de las reglas y nulos."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'precipitation_total': rng.choice([0, 0.5, 1, 1.5, 2, 3, 5, 7, 10, 20, 25, 40, 50, 80], n),
+        'humidity': rng.choice([10, 30, 35, 40, 45, 50, 60, 75, 80, 85, 88, 90, 95], n).astype(float),
+        'pressure': rng.choice([990, 1000, 1003, 1005, 1008, 1010, 1013, 1014, 1015, 1018, 1020, 1025], n).astype(float),
+        'wind_speed': rng.choice([0, 10, 30, 40, 50, 60], n).astype(float),
+        'temperature': rng.choice([15, 20, 22, 25, 30, 32, 33, 35, 36, 38, 40], n).astype(float),
+    })
+    # Mezclar valores continuos y algunos nulos
+    df['humidity'] += rng.normal(0, 1, n).round(2)
+    df.loc[rng.random(n) < 0.02, 'pressure'] = np.nan
+    df.loc[rng.random(n) < 0.02, 'temperature'] = np.nan
+    return df
+
+
+def test_vectorized_labels_match_row_function():
+    predictor = RiskPredictor()
+    df = _weather_frame()
+    
+    flood, drought = predictor._calculate_historical_risks_batch(df)
+    expected = [predictor._calculate_historical_risks(row) for _, row in df.iterrows()]
+    
+    np.testing.assert_array_equal(flood, np.array([e[0] for e in expected]))
+    np.testing.assert_array_equal(drought, np.array([e[1] for e in expected]))
+
+
+def test_vectorized_labels_use_row_defaults_for_missing_columns():
+    predictor = RiskPredictor()
+    df = pd.DataFrame({'precipitation_total': [0.0, 60.0]})
+    
+    flood, drought = predictor._calculate_historical_risks_batch(df)
+    expected = [predictor._calculate_historical_risks(row) for _, row in df.iterrows()]
+    
+    np.testing.assert_array_equal(flood, [e[0] for e in expected])
+    np.testing.assert_array_equal(drought, [e[1] for e in expected])
+
+
+def _fitted_predictor() -> RiskPredictor:
+    """RiskPredictor con bosques pequeños entrenados sobre condiciones aleatorias (sin base de datos)."""
+    predictor = RiskPredictor()
+    df = _weather_frame(n=600)
+    features = build_feature_frame(df)
+    flood, drought = predictor._calculate_historical_risks_batch(df)
+    predictor.flood_model = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0)
+    predictor.drought_model = RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0)
+    predictor.flood_model.fit(features[predictor.feature_names], flood)
+    predictor.drought_model.fit(features[predictor.feature_names], drought)
+    return predictor
+
+
+def _stations() -> list:
+    """Últimas observaciones de algunas estaciones, con nulos, ceros y columnas faltantes."""
+    return [
+        {'station_id': 1, 'timestamp': 't1', 'temperature': 31.0, 'humidity': 88.0,
+         'precipitation_total': 42.0, 'wind_speed': 12.0, 'pressure': 1004.0},
+        {'station_id': 2, 'timestamp': 't1', 'temperature': 35.5, 'humidity': 35.0,
+         'precipitation_total': 0.0, 'wind_speed': 5.0, 'pressure': None},
+        {'station_id': 3, 'timestamp': 't1', 'temperature': None, 'humidity': 60.0,
+         'precipitation_total': 3.0},
+        {'station_id': 4, 'timestamp': 't1', 'temp_avg': 27.0, 'humidity': 95.0,
+         'precipitation_total': 80.0, 'wind_speed': 45.0, 'pressure': 998.0},
+    ]
+
+
+def test_predict_batch_matches_row_predict():
+    predictor = _fitted_predictor()
+    features = build_feature_frame(_stations())
+    
+    batch = predictor.predict_batch(features)
+    for i, row in enumerate(features.to_dict('records')):
+        single = predictor.predict(row)
+        assert batch['flood_risk'][i] == single['flood_risk']
+        assert batch['drought_risk'][i] == single['drought_risk']
+        assert 0.0 <= single['flood_risk'] <= 1.0 and 0.0 <= single['drought_risk'] <= 1.0
+
+
+def test_predict_batch_from_forecasts_matches_single_forecast():
+    predictor = _fitted_predictor()
+    forecasts = _stations()
+    
+    assert predictor.predict_batch_from_forecasts(forecasts) == [
+        predictor.predict_from_forecast(forecast) for forecast in forecasts
+    ]
+
+
+def test_station_risks_use_model_batch(monkeypatch):
+    # Import local: el router de estaciones arrastra FastAPI y la configuración
+    import api.stations as stations
+    
+    predictor = _fitted_predictor()
+    monkeypatch.setattr(stations, 'get_risk_predictor', lambda: predictor)
+    monkeypatch.setattr(stations, 'get_prediction_cache', lambda: PredictionCache())
+    monkeypatch.setattr(stations, 'model_version', lambda path: 'test')
+    
+    flood, drought = stations._predict_station_risks(_stations())
+    expected = [predictor.predict(row) for row in build_feature_frame(_stations()).to_dict('records')]
+    
+    np.testing.assert_array_equal(flood, [e['flood_risk'] for e in expected])
+    np.testing.assert_array_equal(drought, [e['drought_risk'] for e in expected])
@@ -0,0 +1,67 @@
+"""
+Tests del índice espacial: las búsquedas en lote coinciden con el recorrido haversine por estación.
+"""
+
+import numpy as np
+
+from config import STATIONS
+from core.ml.incident_correlation import haversine_distance, find_nearby_stations, find_closest_station
+from core.utils.spatial_index import get_station_index
+
+
+def _random_points(n: int = 300, seed: int = 3):
+    """Puntos sobre Panamá y alrededores (algunos lejos de toda estación)."""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(6.5, 10.5, n), rng.uniform(-83.5, -76.5, n)
+
+
+def _brute_force_nearby(lat, lon, max_distance_km):
+    nearby = [
+        (station['id'], haversine_distance(lat, lon, station['lat'], station['lon']))
+        for station in STATIONS
+    ]
+    return sorted([item for item in nearby if item[1] <= max_distance_km], key=lambda x: x[1])
+
+
+def test_batch_radius_matches_brute_force():
+    lats, lons = _random_points()
+    results = get_station_index(STATIONS).query_radius(lats, lons, max_distance_km=50)
+
+    for lat, lon, found in zip(lats, lons, results):
+        expected = _brute_force_nearby(lat, lon, 50)
+        # Tolerancia en el borde del radio por redondeo de coma flotante
+        expected_ids = {sid for sid, d in expected if d < 50 - 1e-6}
+        assert expected_ids <= {sid for sid, _ in found} <= {sid for sid, _ in _brute_force_nearby(lat, lon, 50 + 1e-6)}
+        assert [d for _, d in found] == sorted(d for _, d in found)
+        for station_id, distance in found:
+            assert np.isclose(distance, dict(expected).get(station_id, distance), atol=1e-6)
+
+    assert find_nearby_stations(lats[0], lons[0], STATIONS) == results[0]
+
+
+def test_batch_nearest_matches_brute_force():
+    lats, lons = _random_points(seed=11)
+    station_ids, distances = get_station_index(STATIONS).query_nearest(lats, lons, k=3)
+
+    assert station_ids.shape == distances.shape == (len(lats), 3)
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        expected = sorted(
+            (haversine_distance(lat, lon, station['lat'], station['lon']), station['id'])
+            for station in STATIONS
+        )[:3]
+        assert np.allclose(distances[i], [d for d, _ in expected], atol=1e-6)
+
+        closest_id, closest_distance = find_closest_station(lat, lon, STATIONS)
+        assert np.isclose(closest_distance, expected[0][0], atol=1e-6)
+        # Puede haber estaciones con las mismas coordenadas: comparar por distancia
+        closest = next(station for station in STATIONS if station['id'] == closest_id)
+        assert np.isclose(haversine_distance(lat, lon, closest['lat'], closest['lon']), expected[0][0], atol=1e-6)
+
+
+def test_index_is_reused_until_stations_change():
+    index = get_station_index(STATIONS)
+    assert get_station_index(list(STATIONS)) is index
+
+    moved = [dict(station) for station in STATIONS]
+    moved[0]['lat'] += 0.5
+    assert get_station_index(moved) is not index
@@ -0,0 +1,42 @@
+"""
+Tests de los generadores sintéticos vectorizados: reproducibilidad y escritura por bloques.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+import generate_training_dataset as training
+from config import STATIONS
+from core.pipelines.etl.generate_dummy_data import generate_dummy_weather_data
+
+
+def test_training_dataset_is_reproducible_across_chunk_sizes(tmp_path):
+    kwargs = dict(start_date=datetime(2020, 4, 20), end_date=datetime(2020, 5, 10), n_stations=6, seed=7)
+    rows = training.generate_dataset(output_file=tmp_path / "a.csv", days_per_chunk=3, **kwargs)
+    training.generate_dataset(output_file=tmp_path / "b.csv", days_per_chunk=30, **kwargs)
+
+    assert rows == 20 * 6 * 24
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+
+    df = pd.read_csv(tmp_path / "a.csv")
+    assert list(df.columns) == ["station_id", "TEMP", "HUMEDAD", "VIENTO", "elevation_m", "LLUVIA"]
+    assert df["station_id"].tolist()[:25] == [1] * 24 + [2]  # día -> estación -> hora
+    assert df["LLUVIA"].between(0, 120).all()
+    assert df.loc[df["LLUVIA"] > 0, "HUMEDAD"].min() >= 85
+    assert df.loc[df["LLUVIA"] == 0, "HUMEDAD"].max() <= 85
+
+
+def test_dummy_weather_seed_is_per_station(tmp_path):
+    generate_dummy_weather_data(days_back=3, stations_to_use=STATIONS[:4], seed=3, output_path=tmp_path / "all.csv")
+    generate_dummy_weather_data(days_back=3, stations_to_use=STATIONS[2:4], seed=3, output_path=tmp_path / "sub.csv")
+
+    weather_columns = ["station_id", "temperature", "humidity", "precipitation_total", "summary", "icon"]
+    full = pd.read_csv(tmp_path / "all.csv")
+    subset = pd.read_csv(tmp_path / "sub.csv")
+
+    assert full["station_id"].nunique() == 4
+    assert full[full["station_id"].isin(subset["station_id"])][weather_columns].reset_index(drop=True).equals(
+        subset[weather_columns]
+    )
+    assert (full.loc[full["precipitation_total"] == 0, "precipitation_type"] == "none").all()
@@ -0,0 +1,280 @@
+"""
+Tests del almacenamiento por niveles: rollups incrementales, particiones mensuales e histórico.
+"""
+
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import core.database.raindrop_db as db
+
+
+@pytest.fixture
+def weather_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", tmp_path / "test.db")
+    monkeypatch.setattr(db, "_ingest_listeners", [])
+    db.init_database()
+    yield db
+    db.close_all_connections()
+
+
+def _records(days: int = 120, stations=(1, 2), seed: int = 0):
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return [
+        {
+            "station_id": station_id, "station_name": f"Estación {station_id}", "region": "Panama",
+            "latitude": 9.0, "longitude": -79.5, "elevation": 10,
+            "timestamp": (now - timedelta(hours=h)).isoformat(),
+            "temperature": float(rng.normal(27, 2)), "humidity": float(rng.uniform(50, 100)),
+            "precipitation_total": float(rng.exponential(1.0)), "wind_speed": float(rng.uniform(0, 20)),
+            "pressure": 1010.0,
+        }
+        for station_id in stations
+        for h in range(24 * days)
+    ]
+
+
+def _expected_daily(records):
+    df = pd.DataFrame(records)
+    df["date"] = df["timestamp"].str[:10]
+    return df.groupby(["station_id", "date"]).agg(
+        obs_count=("temperature", "size"),
+        temperature_avg=("temperature", "mean"),
+        temperature_max=("temperature", "max"),
+        precipitation_total=("precipitation_total", "sum"),
+    ).reset_index()
+
+
+def _daily_rollup():
+    with db.get_read_connection() as conn:
+        return pd.read_sql_query(
+            "SELECT station_id, date, obs_count, temperature_avg, temperature_max, precipitation_total "
+            "FROM weather_daily ORDER BY station_id, date",
+            conn
+        )
+
+
+def test_rollups_match_hourly_data(weather_db):
+    records = _records()
+    # Ingesta en bloques pequeños: días y semanas repartidos entre bloques
+    db.bulk_upsert_weather_data(records, chunk_size=1000)
+
+    expected = _expected_daily(records)
+    daily = _daily_rollup()
+    assert len(daily) == len(expected)
+    assert np.allclose(daily.iloc[:, 2:].values, expected.iloc[:, 2:].values)
+
+    with db.get_read_connection() as conn:
+        weekly = pd.read_sql_query("SELECT * FROM weather_weekly ORDER BY station_id, week_start", conn)
+    assert weekly["obs_count"].sum() == len(records)
+    assert (pd.to_datetime(weekly["week_start"]).dt.weekday == 0).all()
+
+    # Una actualización de una hora existente se refleja en el día y la semana
+    updated = dict(records[100], temperature=60.0)
+    db.bulk_upsert_weather_data([updated])
+    day = updated["timestamp"][:10]
+    assert db.get_weather_history(1, day, day, "daily")[0]["temperature_max"] == 60.0
+    assert max(row["temperature_max"] for row in db.get_weather_history(1, day, day, "weekly")) == 60.0
+
+
+def test_bulk_upsert_counts(weather_db):
+    records = _records(days=2, stations=(1,))
+    db.bulk_upsert_weather_data(records[:10])
+
+    invalid = [
+        dict(records[20], timestamp="no-es-fecha"),
+        dict(records[21], station_id=None),
+        dict(records[22], latitude=None),
+        dict(records[23], longitude="n/a"),
+        {k: v for k, v in records[24].items() if k != "elevation"},
+        dict(records[25], latitude=float("nan")),
+    ]
+    batch = [dict(r, temperature=40.0) for r in records[:4]] + records[10:15] + invalid
+    result = db.bulk_upsert_weather_data(batch)
+    assert result == {"inserted": 5, "updated": 4, "skipped": len(invalid)}
+
+    with db.get_read_connection() as conn:
+        count, updated = conn.execute(
+            "SELECT COUNT(*), SUM(temperature = 40.0) FROM weather_hourly"
+        ).fetchone()
+    assert (count, updated) == (15, 4)
+
+
+def test_archive_keeps_history_readable(weather_db):
+    records = _records()
+    db.bulk_upsert_weather_data(records)
+    daily_before = _daily_rollup()
+
+    moved = db.archive_weather_data(hot_days=30)
+    assert 0 < moved < len(records)
+
+    with db.get_read_connection() as conn:
+        partitions = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name GLOB 'weather_hourly_p[0-9]*'"
+        ).fetchone()[0]
+        hot_rows = conn.execute("SELECT COUNT(*) FROM weather_hourly").fetchone()[0]
+    assert partitions >= 3
+    assert hot_rows == len(records) - moved
+
+    # Entrenamiento e histórico siguen viendo todas las lecturas, en orden
+    frames = pd.concat(db.iter_weather_frames("2000-01-01", "2100-01-01", columns=["station_id", "date", "hour"]))
+    assert len(frames) == len(records)
+    keys = list(frames.itertuples(index=False, name=None))
+    assert keys == sorted(keys)
+    assert _daily_rollup().equals(daily_before)
+    assert len(db.get_latest_data_by_station(1, limit=24 * 60)) == 24 * 60
+
+    # Una lectura tardía de un mes archivado va a su partición (sin duplicar en la tabla caliente)
+    late = dict(records[24 * 100], temperature=55.0)
+    assert db.bulk_upsert_weather_data([late]) == {"inserted": 0, "updated": 1, "skipped": 0}
+    day = late["timestamp"][:10]
+    hour = int(late["timestamp"][11:13])
+    assert db.get_weather_at_hours([(1, day, hour)], ["temperature"])["temperature"].tolist() == [55.0]
+    assert db.get_weather_history(1, day, day, "daily")[0]["temperature_max"] == 55.0
+
+    assert db.archive_weather_data(hot_days=30) == 0  # la ventana no avanzó
+
+
+def test_history_resolution(weather_db):
+    db.bulk_upsert_weather_data(_records(days=40, stations=(1,)))
+    end = datetime.now(timezone.utc).date()
+
+    hourly = db.get_weather_history(1, (end - timedelta(days=2)).isoformat(), end.isoformat(), "hourly")
+    daily = db.get_weather_history(1, (end - timedelta(days=30)).isoformat(), end.isoformat(), "daily")
+    weekly = db.get_weather_history(1, (end - timedelta(days=30)).isoformat(), end.isoformat(), "weekly")
+
+    assert 24 < len(hourly) <= 72
+    assert len(daily) == 31
+    assert 5 <= len(weekly) <= 6
+    assert [row["date"] for row in hourly] == sorted(row["date"] for row in hourly)
+    with pytest.raises(ValueError):
+        db.get_weather_history(1, end.isoformat(), end.isoformat(), "monthly")
+
+
+# Consultas anteriores a station_latest: unión con el MAX(fecha hora) de cada estación
+_OLD_LATEST_SQL = """
+    SELECT w1.* FROM weather_hourly w1
+    INNER JOIN (
+        SELECT station_id, MAX(date || ' ' || printf('%02d', hour)) as max_datetime
+        FROM weather_hourly
+        {where}
+        GROUP BY station_id
+    ) w2 ON w1.station_id = w2.station_id
+    AND (w1.date || ' ' || printf('%02d', w1.hour)) = w2.max_datetime
+    ORDER BY w1.station_id
+"""
+
+
+def _old_stations_latest():
+    with db.get_read_connection() as conn:
+        rows = conn.execute(_OLD_LATEST_SQL.format(where="WHERE humidity IS NOT NULL AND humidity > 0")).fetchall()
+        if not rows:
+            rows = conn.execute(_OLD_LATEST_SQL.format(where="")).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _reading(station_id, timestamp, humidity):
+    return {
+        "station_id": station_id, "station_name": f"Estación {station_id}", "region": "Panama",
+        "latitude": 9.0, "longitude": -79.5, "elevation": 10,
+        "timestamp": timestamp, "temperature": 27.0, "humidity": humidity,
+    }
+
+
+def test_station_latest_matches_max_join(weather_db):
+    # Lotes fuera de orden: las lecturas más recientes llegan primero
+    db.bulk_upsert_weather_data([
+        _reading(1, "2024-06-02T10:00:00+00:00", 70.0),
+        _reading(2, "2024-06-02T10:00:00+00:00", 0.0),    # empata con la 1; sin humedad válida
+        _reading(3, "2024-06-02T09:00:00+00:00", None),
+    ])
+    db.bulk_upsert_weather_data([
+        _reading(1, "2024-06-01T23:00:00+00:00", 60.0),
+        _reading(2, "2024-06-02T08:00:00+00:00", 55.0),   # última válida de la 2, anterior a la última
+        _reading(2, "2024-06-01T10:00:00+00:00", 50.0),
+        _reading(3, "2024-06-02T09:00:00+00:00", 65.0),   # misma hora: sustituye a la lectura sin humedad
+        _reading(4, "2024-06-01T05:00:00+00:00", 0.0),    # sin ninguna lectura válida: no aparece
+    ])
+    latest = db.get_all_stations_latest()
+    assert latest == _old_stations_latest()
+    assert [(row["station_id"], row["timestamp"]) for row in latest] == [
+        (1, "2024-06-02T10:00:00+00:00"), (2, "2024-06-02T08:00:00+00:00"), (3, "2024-06-02T09:00:00+00:00")
+    ]
+
+    # Una actualización que invalida la humedad mueve el puntero a la lectura válida anterior
+    db.bulk_upsert_weather_data([_reading(1, "2024-06-02T10:30:00+00:00", 0.0)])
+    assert db.get_all_stations_latest() == _old_stations_latest()
+    assert db.get_all_stations_latest()[0]["timestamp"] == "2024-06-01T23:00:00+00:00"
+
+    # Sin humedad válida en ninguna estación: último registro de cada una
+    with db.get_connection() as conn:
+        conn.execute("UPDATE weather_hourly SET humidity = 0")
+    db.refresh_station_latest()
+    latest = db.get_all_stations_latest()
+    assert latest == _old_stations_latest()
+    assert [row["station_id"] for row in latest] == [1, 2, 3, 4]
+    assert db.get_station_last_observations() == {row["station_id"]: row["timestamp"] for row in latest}
+
+
+def test_latest_pointers_survive_archiving(weather_db):
+    # La estación 2 solo tiene lecturas de hace más de 60 días
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=60)).isoformat()
+    records = _records(days=40, stations=(1,)) + [
+        r for r in _records(days=120, stations=(2,), seed=1) if r["timestamp"] < cutoff
+    ]
+    db.bulk_upsert_weather_data(records)
+    expected = {
+        station_id: max(r["timestamp"] for r in records if r["station_id"] == station_id)
+        for station_id in (1, 2)
+    }
+
+    def assert_latest():
+        latest = db.get_all_stations_latest()
+        assert [row["station_id"] for row in latest] == [1, 2]
+        assert {row["station_id"]: row["timestamp"] for row in latest} == expected
+        assert db.get_station_last_observations() == expected
+
+    # Justo después de archivar: los punteros de la 2 apuntan a su partición
+    assert db.archive_weather_data(hot_days=30) > 0
+    with db.get_read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weather_hourly WHERE station_id = 2").fetchone()[0] == 0
+    assert_latest()
+
+    # Una ingesta de la estación 1 no pierde el puntero archivado de la 2
+    db.bulk_upsert_weather_data([dict(records[0], temperature=30.0)])
+    assert_latest()
+    assert db.get_all_stations_latest()[0]["temperature"] == 30.0
+
+
+def test_clear_script_removes_all_tiers(weather_db):
+    scripts_dir = Path(__file__).resolve().parents[2] / "scripts"
+    spec = importlib.util.spec_from_file_location("clear_weather_data", scripts_dir / "clear_weather_data.py")
+    clear_script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(clear_script)
+
+    records = _records(days=60)
+    db.bulk_upsert_weather_data(records)
+    db.archive_weather_data(hot_days=30)
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        assert clear_script.count_weather_records(cursor) == len(records)
+        clear_script.delete_weather_records(cursor)
+        assert clear_script.count_weather_records(cursor) == 0
+
+    with db.get_read_connection() as conn:
+        assert db._partition_tables(conn.cursor()) == []
+        assert db._get_meta(conn.cursor(), "hot_start_date") is None
+        for table in ("weather_daily", "weather_weekly", "station_latest"):
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
+    assert db.get_all_stations_latest() == []
+
+    # Tras limpiar, una lectura antigua vuelve a la tabla caliente
+    db.bulk_upsert_weather_data(records[-1:])
+    with db.get_read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM weather_hourly").fetchone()[0] == 1
@@ -0,0 +1,118 @@
+"""
+Índice espacial de estaciones para búsquedas por radio y vecinos más cercanos.
+
+Usa un BallTree con métrica haversine (coordenadas en radianes), por lo que cada
+consulta cuesta O(log n) en lugar de recorrer todas las estaciones.
+"""
+
+import threading
+from typing import List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371  # Radio de la Tierra en km
+
+
+class StationIndex:
+    """BallTree (haversine) sobre las coordenadas de las estaciones."""
+    
+    def __init__(self, stations: List[Dict]):
+        self.station_ids = np.array([station['id'] for station in stations])
+        coords = np.array([[station['lat'], station['lon']] for station in stations], dtype=float)
+        self.tree = BallTree(np.radians(coords.reshape(-1, 2)), metric='haversine') if len(stations) else None
+    
+    def __len__(self) -> int:
+        return len(self.station_ids)
+    
+    @staticmethod
+    def _points(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        return np.radians(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+    
+    def query_radius(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        max_distance_km: float
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Estaciones dentro de un radio para cada punto (en lote).
+        
+        Args:
+            lats: Latitudes de los puntos
+            lons: Longitudes de los puntos
+            max_distance_km: Radio de búsqueda en km
+        
+        Returns:
+            Por cada punto, lista de (station_id, distance_km) ordenada por distancia
+        """
+        if self.tree is None or len(lats) == 0:
+            return [[] for _ in range(len(lats))]
+        
+        indices, distances = self.tree.query_radius(
+            self._points(lats, lons),
+            r=max_distance_km / EARTH_RADIUS_KM,
+            return_distance=True,
+            sort_results=True
+        )
+        
+        return [
+            [(int(self.station_ids[i]), float(d * EARTH_RADIUS_KM)) for i, d in zip(point_idx, point_dist)]
+            for point_idx, point_dist in zip(indices, distances)
+        ]
+    
+    def query_nearest(
+        self,
+        lats: Sequence[float],
+        lons: Sequence[float],
+        k: int = 1
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Las k estaciones más cercanas a cada punto (en lote).
+        
+        Args:
+            lats: Latitudes de los puntos
+            lons: Longitudes de los puntos
+            k: Número de vecinos por punto
+        
+        Returns:
+            Tuple (station_ids, distances_km), ambos de forma (n_puntos, k)
+        """
+        k = min(k, len(self))
+        if self.tree is None or k == 0 or len(lats) == 0:
+            return np.empty((len(lats), 0), dtype=int), np.empty((len(lats), 0))
+        
+        distances, indices = self.tree.query(self._points(lats, lons), k=k)
+        return self.station_ids[indices], distances * EARTH_RADIUS_KM
+
+
+# Caché del último índice construido, por huella de (id, lat, lon) de las estaciones
+_index_lock = threading.Lock()
+_cached_index: Optional[Tuple[tuple, StationIndex]] = None
+
+
+def get_station_index(stations: Optional[List[Dict]] = None) -> StationIndex:
+    """
+    Devuelve el índice de las estaciones, reconstruyéndolo solo si cambiaron.
+    
+    Args:
+        stations: Lista de estaciones (default: tabla stations, o config.STATIONS si está vacía)
+    
+    Returns:
+        StationIndex compartido
+    """
+    global _cached_index
+    
+    if stations is None:
+        from core.database.raindrop_db import get_all_stations
+        stations = get_all_stations()
+        if not stations:
+            from config import STATIONS
+            stations = STATIONS
+    
+    fingerprint = tuple((station['id'], station['lat'], station['lon']) for station in stations)
+    
+    with _index_lock:
+        if _cached_index is None or _cached_index[0] != fingerprint:
+            _cached_index = (fingerprint, StationIndex(stations))
+        return _cached_index[1]
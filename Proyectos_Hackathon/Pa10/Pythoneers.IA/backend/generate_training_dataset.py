@@ -6,18 +6,30 @@ OBJETIVO:
 - Dataset 100% compatible con ModelTrainer (SIN modificar el modelo)
 - Usar config.py como fuente única de verdad
 
+GENERACIÓN:
+- Bloques completos (días x estaciones x 24 horas) con sorteos vectorizados
+- Cada día usa su propio generador derivado de la semilla: el resultado es
+  idéntico para la misma semilla, sin importar el tamaño de bloque
+- Los bloques se escriben al archivo a medida que se generan (memoria acotada)
+
 SALIDA:
 - CSV guardado exactamente donde ModelTrainer lo espera
+- Parquet si la ruta de salida termina en .parquet (requiere pyarrow)
+
+USO:
+    python generate_training_dataset.py [--seed 42] [--output ruta.csv|ruta.parquet]
 """
 
 # ============================================================
 # IMPORTS
 # ============================================================
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
-import random
-import math
-from datetime import datetime, timedelta
 
 # ============================================================
 # CONFIG DEL PROYECTO (MISMO QUE USA EL MODELO)
@@ -27,12 +39,12 @@ from config import (
     MASTER_DATASET,
     DATA_CLEAN_PATH
 )
+from core.pipelines.etl.chunked_output import write_frames
 
 # ============================================================
-# SEMILLAS (REPRODUCIBLE)
+# SEMILLA (REPRODUCIBLE)
 # ============================================================
-np.random.seed(42)
-random.seed(42)
+SEED = 42
 
 # ============================================================
 # PARÁMETROS GLOBALES
@@ -41,6 +53,7 @@ START_DATE = datetime(2020, 1, 1)
 END_DATE   = datetime(2025, 1, 1)   # 5 años
 N_STATIONS = 253                    # ajustado para ~11.1M
 OUTPUT_FILE = DATA_CLEAN_PATH / MASTER_DATASET
+DAYS_PER_CHUNK = 30                 # ~182k filas por bloque con 253 estaciones
 
 # ============================================================
 # REGIONES DE PANAMÁ Y FACTOR DE LLUVIA
@@ -62,143 +75,157 @@ REGIONS = {
 
 # ============================================================
 # DEFINIMOS ESTA FUNCIÓN PARA CREAR ESTACIONES SINTÉTICAS
-# Parámetros: ninguno
+# Parámetros: número de estaciones y semilla
 # Retorna: DataFrame con metadata básica de estaciones
 # ============================================================
-def generate_stations():
-    stations = []
+def generate_stations(n_stations=N_STATIONS, seed=SEED):
+    rng = np.random.default_rng(seed)
     regions = list(REGIONS.keys())
 
-    for i in range(N_STATIONS):
-        region = random.choice(regions)
-
-        stations.append({
-            "station_id": i + 1,
-            "region": region,
-            "latitude": np.random.uniform(7.0, 9.6),
-            "longitude": np.random.uniform(-83.6, -77.2),
-            "elevation": np.random.uniform(5, 1200)
-        })
-
-    return pd.DataFrame(stations)
+    return pd.DataFrame({
+        "station_id": np.arange(1, n_stations + 1),
+        "region": rng.choice(regions, n_stations),
+        "latitude": rng.uniform(7.0, 9.6, n_stations),
+        "longitude": rng.uniform(-83.6, -77.2, n_stations),
+        "elevation": rng.uniform(5, 1200, n_stations),
+    })
 
 # ============================================================
 # DEFINIMOS ESTA FUNCIÓN PARA SABER SI ES TEMPORADA LLUVIOSA
-# Panamá: mayo a noviembre
+# Panamá: mayo a noviembre (acepta un mes o un array de meses)
 # ============================================================
-def is_rainy_season(date):
-    return 5 <= date.month <= 11
+def is_rainy_season(month):
+    return (5 <= month) & (month <= 11)
 
 # ============================================================
 # DEFINIMOS ESTA FUNCIÓN PARA CICLO DIURNO DE TEMPERATURA
+# Acepta escalares o arrays (se combinan por broadcasting)
 # ============================================================
 def diurnal_temperature(hour, tmin, tmax):
-    angle = (hour - 6) / 24 * 2 * math.pi
-    return (tmax + tmin) / 2 + (tmax - tmin) / 2 * math.sin(angle)
+    angle = (hour - 6) / 24 * 2 * np.pi
+    return (tmax + tmin) / 2 + (tmax - tmin) / 2 * np.sin(angle)
+
+# ============================================================
+# DEFINIMOS ESTA FUNCIÓN PARA GENERAR UN BLOQUE DE DÍAS
+# Parámetros: estaciones, fechas del bloque, semilla
+# Retorna: DataFrame ordenado por día -> estación -> hora
+# ============================================================
+def generate_block(stations, dates, seed=SEED):
+    n_days, n_stations = len(dates), len(stations)
+    shape = (n_stations, 24)
+
+    # Sorteos por día con un generador derivado de (semilla, día)
+    draws = {key: np.empty((n_days,) + shape) for key in ("temp", "rain", "amount", "hum", "wind", "gust", "press")}
+    for i, day in enumerate(dates):
+        rng = np.random.default_rng([seed, day.toordinal()])
+        draws["temp"][i] = rng.normal(0, 0.8, shape)
+        draws["rain"][i] = rng.random(shape)
+        draws["amount"][i] = rng.gamma(2.0, 12.0, shape)
+        draws["hum"][i] = rng.random(shape)
+        draws["wind"][i] = rng.uniform(3, 12, shape)
+        draws["gust"][i] = rng.uniform(5, 15, shape)
+        draws["press"][i] = rng.uniform(-2, 2, shape)
+
+    # Ejes: (día, estación, hora)
+    hour = np.arange(24)[None, None, :]
+    elevation = stations["elevation"].to_numpy()[None, :, None]
+    rain_factor = stations["region"].map(REGIONS).to_numpy(dtype=float)[None, :, None]
+    rainy = is_rainy_season(np.array([day.month for day in dates]))[:, None, None]
+
+    # ================================
+    # TEMPERATURA
+    # ================================
+    elev_factor = -0.006 * elevation
+    temperature = diurnal_temperature(hour, 22 + elev_factor, 34 + elev_factor) + draws["temp"]
+
+    # ================================
+    # LLUVIA (CLAVE PARA EL MODELO)
+    # ================================
+    prob = np.where(rainy, 0.35, 0.05) + np.where(rainy & (14 <= hour) & (hour <= 19), 0.25, 0.0)
+    raining = draws["rain"] < prob
+    LLUVIA = np.where(raining, np.minimum(draws["amount"] * rain_factor, 120), 0.0)
+
+    # ================================
+    # HUMEDAD
+    # ================================
+    humidity = np.where(LLUVIA > 0, 85 + 15 * draws["hum"], 55 + 30 * draws["hum"])
+
+    # ================================
+    # VIENTO
+    # ================================
+    wind_speed = draws["wind"] + np.where(LLUVIA > 0, draws["gust"], 0.0)
+
+    # ================================
+    # PRESIÓN
+    # ================================
+    pressure = 1013 - (elevation / 100) * 12 + draws["press"]
+
+    # ================================
+    # ARMAMOS EL BLOQUE (USANDO FEATURE_COLUMNS)
+    # ================================
+    block = {
+        "station_id": np.broadcast_to(stations["station_id"].to_numpy()[None, :, None], LLUVIA.shape)
+    }
+    columns = {
+        "TEMP": temperature,
+        "HUMEDAD": humidity,
+        "VIENTO": wind_speed,
+        "elevation_m": pressure,
+        "LLUVIA": LLUVIA,
+    }
+    for name, values in columns.items():
+        if name in FEATURE_COLUMNS:
+            block[name] = np.round(np.broadcast_to(values, LLUVIA.shape), 2)
+
+    return pd.DataFrame({name: values.ravel() for name, values in block.items()})
 
 # ============================================================
 # FUNCIÓN PRINCIPAL DE GENERACIÓN DEL DATASET
 # ============================================================
-def generate_dataset():
+def generate_dataset(
+    start_date=START_DATE,
+    end_date=END_DATE,
+    n_stations=N_STATIONS,
+    output_file=OUTPUT_FILE,
+    seed=SEED,
+    days_per_chunk=DAYS_PER_CHUNK,
+):
+    started = time.perf_counter()
+
     print(" Generando estaciones...")
-    stations = generate_stations()
+    stations = generate_stations(n_stations, seed)
+    dates = list(pd.date_range(start_date, end_date, freq="D", inclusive="left").to_pydatetime())
 
-    records = []
-    current_date = START_DATE
+    def blocks():
+        for i in range(0, len(dates), days_per_chunk):
+            yield generate_block(stations, dates[i:i + days_per_chunk], seed)
 
     print(" Generando datos climáticos horarios...")
-    while current_date < END_DATE:
-        rainy = is_rainy_season(current_date)
-
-        for _, st in stations.iterrows():
-            elev_factor = -0.006 * st.elevation
-            tmin = 22 + elev_factor
-            tmax = 34 + elev_factor
-            rain_factor = REGIONS[st.region]
-
-            for hour in range(24):
-                # ================================
-                # TEMPERATURA
-                # ================================
-                temperature = diurnal_temperature(hour, tmin, tmax)
-                temperature += np.random.normal(0, 0.8)
-
-                # ================================
-                # LLUVIA (CLAVE PARA EL MODELO)
-                # ================================
-                prob = 0.35 if rainy else 0.05
-                if rainy and 14 <= hour <= 19:
-                    prob += 0.25
-
-                if np.random.rand() < prob:
-                    LLUVIA = min(np.random.gamma(2.0, 12.0) * rain_factor, 120)
-                else:
-                    LLUVIA = 0.0
-
-                # ================================
-                # HUMEDAD
-                # ================================
-                humidity = (
-                    np.random.uniform(85, 100)
-                    if LLUVIA > 0
-                    else np.random.uniform(55, 85)
-                )
-
-                # ================================
-                # VIENTO
-                # ================================
-                wind_speed = np.random.uniform(3, 12)
-                if LLUVIA > 0:
-                    wind_speed += np.random.uniform(5, 15)
-
-                # ================================
-                # PRESIÓN
-                # ================================
-                pressure = 1013 - (st.elevation / 100) * 12
-                pressure += np.random.uniform(-2, 2)
-
-                # ================================
-                # ARMAMOS EL REGISTRO (USANDO FEATURE_COLUMNS)
-                # ================================
-                record = {
-                    "station_id": st.station_id
-                }
-
-                if "TEMP" in FEATURE_COLUMNS:
-                    record["TEMP"] = round(temperature, 2)
-
-                if "HUMEDAD" in FEATURE_COLUMNS:
-                    record["HUMEDAD"] = round(humidity, 2)
-
-                if "VIENTO" in FEATURE_COLUMNS:
-                    record["VIENTO"] = round(wind_speed, 2)
-
-                if "elevation_m" in FEATURE_COLUMNS:
-                    record["elevation_m"] = round(pressure, 2)
-
-                if "LLUVIA" in FEATURE_COLUMNS:
-                    record["LLUVIA"] = round(LLUVIA, 2)
-
-                records.append(record)
-
-        current_date += timedelta(days=1)
-
-    # ========================================================
-    # GUARDAMOS DATASET FINAL
-    # ========================================================
-    df = pd.DataFrame(records)
-
-    DATA_CLEAN_PATH.mkdir(parents=True, exist_ok=True)
-    df.to_csv(OUTPUT_FILE, index=False)
+    rows = write_frames(blocks(), Path(output_file))
 
     print("=======================================")
     print(f" Dataset generado correctamente")
-    print(f" Filas: {len(df):,}")
-    print(f" Archivo: {OUTPUT_FILE}")
+    print(f" Filas: {rows:,}")
+    print(f" Archivo: {output_file}")
+    print(f" Tiempo: {time.perf_counter() - started:.1f}s")
     print("=======================================")
+    return rows
 
 # ============================================================
 # EJECUCIÓN
 # ============================================================
 if __name__ == "__main__":
-    generate_dataset()
+    seed = SEED
+    output_file = OUTPUT_FILE
+
+    if "--seed" in sys.argv:
+        idx = sys.argv.index("--seed")
+        if idx + 1 < len(sys.argv):
+            seed = int(sys.argv[idx + 1])
+
+    if "--output" in sys.argv:
+        idx = sys.argv.index("--output")
+        if idx + 1 < len(sys.argv):
+            output_file = Path(sys.argv[idx + 1])
+
+    generate_dataset(output_file=output_file, seed=seed)
@@ -10,7 +10,9 @@ import logging
 from pathlib import Path
 
 from core.scheduler import start_scheduler, stop_scheduler
-from core.database.raindrop_db import init_database
+from core.database.raindrop_db import init_database, close_all_connections
+from core.ml.prediction_cache import get_prediction_cache
+from core.pipelines.jobs import shutdown_job_manager
 from api import health_router, stations_router, predictions_router, pipelines_router, risk_router, ml_router, incidents_router
 from api.forecast import router as forecast_router
 
@@ -36,7 +38,10 @@ async def lifespan(app: FastAPI):
     init_database()
     logger.info(" Base de datos inicializada")
     
-    # Ejecutar pipeline de pronósticos inmediatamente al inicio (en thread separado)
+    # Caché de predicciones (restaura la copia en disco y se registra para invalidar en ingestas)
+    get_prediction_cache()
+    
+    # Ejecutar pipeline de pronósticos inmediatamente al inicio (en el pool de jobs)
     logger.info(" Iniciando generación de pronósticos en segundo plano...")
     try:
         from core.scheduler import execute_forecast_now
@@ -58,6 +63,11 @@ async def lifespan(app: FastAPI):
     logger.info(" Deteniendo rAIndrop Backend...")
     stop_scheduler()
     logger.info(" Scheduler detenido")
+    shutdown_job_manager()
+    logger.info(" Jobs de pipelines detenidos")
+    get_prediction_cache().save()
+    close_all_connections()
+    logger.info(" Conexiones a la base de datos cerradas")
 
 
 # Crear app FastAPI
@@ -1,5 +1,6 @@
 """
-Script para limpiar todos los datos de la tabla weather_hourly.
+Script para limpiar todos los datos climáticos horarios: weather_hourly, sus particiones
+mensuales archivadas (weather_hourly_pYYYYMM) y las tablas derivadas (rollups, punteros).
 Útil para hacer pruebas limpias o resetear la base de datos.
 """
 
@@ -15,9 +16,48 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tablas derivadas de las lecturas horarias (se vacían junto con ellas)
+DERIVED_TABLES = ["weather_daily", "weather_weekly", "station_latest", "anomaly_state"]
+
+
+def _partition_tables(cursor):
+    """Particiones mensuales archivadas (weather_hourly_pYYYYMM)"""
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+        ("weather_hourly_p[0-9][0-9][0-9][0-9][0-9][0-9]",)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def count_weather_records(cursor):
+    """Lecturas horarias en la tabla caliente y en todas las particiones"""
+    return sum(
+        cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ["weather_hourly"] + _partition_tables(cursor)
+    )
+
+
+def delete_weather_records(cursor):
+    """
+    Borra las lecturas horarias de todos los niveles de almacenamiento:
+    vacía weather_hourly, elimina las particiones, vacía rollups y punteros
+    y borra storage_meta.hot_start_date (la ventana caliente vuelve a cubrir todo)
+    """
+    cursor.execute("DELETE FROM weather_hourly")
+    for table in _partition_tables(cursor):
+        cursor.execute(f"DROP TABLE {table}")
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in cursor.fetchall()}
+    for table in DERIVED_TABLES:
+        if table in existing:
+            cursor.execute(f"DELETE FROM {table}")
+    if "storage_meta" in existing:
+        cursor.execute("DELETE FROM storage_meta WHERE key = 'hot_start_date'")
+
 
 def clear_weather_data():
-    """Elimina todos los registros de la tabla weather_hourly"""
+    """Elimina todas las lecturas horarias (tabla caliente, particiones y tablas derivadas)"""
     
     # Ruta a la base de datos
     db_path = Path(__file__).parent.parent / "core" / "database" / "raindrop.db"
@@ -33,8 +73,7 @@ def clear_weather_data():
         cursor = conn.cursor()
         
         # Contar registros antes de eliminar
-        cursor.execute("SELECT COUNT(*) FROM weather_hourly")
-        count_before = cursor.fetchone()[0]
+        count_before = count_weather_records(cursor)
         logger.info(f"📊 Registros actuales: {count_before:,}")
         
         if count_before == 0:
@@ -53,12 +92,11 @@ def clear_weather_data():
         
         # Eliminar todos los registros
         logger.info("🗑️  Eliminando registros...")
-        cursor.execute("DELETE FROM weather_hourly")
+        delete_weather_records(cursor)
         conn.commit()
         
         # Verificar que se eliminaron
-        cursor.execute("SELECT COUNT(*) FROM weather_hourly")
-        count_after = cursor.fetchone()[0]
+        count_after = count_weather_records(cursor)
         
         # Optimizar la base de datos (recuperar espacio)
         logger.info("🔧 Optimizando base de datos (VACUUM)...")
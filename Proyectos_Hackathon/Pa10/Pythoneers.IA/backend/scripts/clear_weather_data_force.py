@@ -1,5 +1,6 @@
 """
-Script para limpiar todos los datos de la tabla weather_hourly SIN confirmación.
+Script para limpiar todos los datos climáticos horarios SIN confirmación
+(weather_hourly, particiones archivadas y tablas derivadas, igual que clear_weather_data.py).
 Útil para scripts automatizados o CI/CD.
 
 ⚠️ CUIDADO: Este script elimina datos sin pedir confirmación
@@ -9,6 +10,8 @@ import sqlite3
 import logging
 from pathlib import Path
 
+from clear_weather_data import count_weather_records, delete_weather_records
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,7 +22,7 @@ logger = logging.getLogger(__name__)
 
 
 def clear_weather_data_force():
-    """Elimina todos los registros de la tabla weather_hourly sin confirmación"""
+    """Elimina todas las lecturas horarias sin confirmación"""
     
     # Ruta a la base de datos
     db_path = Path(__file__).parent.parent / "core" / "database" / "raindrop.db"
@@ -35,8 +38,7 @@ def clear_weather_data_force():
         cursor = conn.cursor()
         
         # Contar registros antes de eliminar
-        cursor.execute("SELECT COUNT(*) FROM weather_hourly")
-        count_before = cursor.fetchone()[0]
+        count_before = count_weather_records(cursor)
         logger.info(f"📊 Registros a eliminar: {count_before:,}")
         
         if count_before == 0:
@@ -46,12 +48,11 @@ def clear_weather_data_force():
         
         # Eliminar todos los registros (sin confirmación)
         logger.info("🗑️  Eliminando registros...")
-        cursor.execute("DELETE FROM weather_hourly")
+        delete_weather_records(cursor)
         conn.commit()
         
         # Verificar que se eliminaron
-        cursor.execute("SELECT COUNT(*) FROM weather_hourly")
-        count_after = cursor.fetchone()[0]
+        count_after = count_weather_records(cursor)
         
         # Optimizar la base de datos (recuperar espacio)
         logger.info("🔧 Optimizando base de datos (VACUUM)...")
@@ -41,6 +41,7 @@ from config import (
     MODEL_METADATA,
     FEATURE_IMPORTANCES,
 )
+from core.ml.prediction_cache import get_prediction_cache
 
 logger = logging.getLogger(__name__)
 
@@ -263,6 +264,9 @@ class ModelTrainer:
                 joblib.dump(model, model_file)
                 logger.info(f"    Saved {model_file}")
 
+            # Descartar predicciones cacheadas con los modelos anteriores
+            get_prediction_cache().invalidate()
+
             # Guardar metadatos
             metadata_file = self.models_path / MODEL_METADATA
             with open(metadata_file, "w") as f:
@@ -7,7 +7,6 @@ import pandas as pd
 import numpy as np
 import logging
 import joblib
-import json
 from pathlib import Path
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -15,14 +14,13 @@ from datetime import datetime
 from config import (
     DATA_CLEAN_PATH,
     MODELS_PATH,
-    DATA_CACHE_PATH,
     FEATURE_COLUMNS,
     MODEL_FLOOD,
     MODEL_DROUGHT,
     LATEST_IMHPA,
-    PREDICTIONS_CACHE,
     RISK_LEVELS,
 )
+from core.ml.prediction_cache import get_prediction_cache, model_version
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +33,6 @@ class Predictor:
     def __init__(self):
         self.data_path = DATA_CLEAN_PATH
         self.models_path = MODELS_PATH
-        self.cache_path = DATA_CACHE_PATH
         self.feature_columns = FEATURE_COLUMNS
         self.models = {}
         self.risk_levels = RISK_LEVELS
@@ -62,6 +59,25 @@ class Predictor:
             logger.error(f" Error loading models: {str(e)}")
             return False
 
+    def _latest_data_file(self) -> Optional[Path]:
+        """Data file used for predictions: IMHPA first, ETESA historical as fallback"""
+        for file_name in (LATEST_IMHPA, "master_dataset_final.csv"):
+            file_path = self.data_path / file_name
+            if file_path.exists():
+                return file_path
+        return None
+
+    def _data_signature(self) -> Optional[str]:
+        """Identifies the current input data (file + mtime) for the prediction cache"""
+        file_path = self._latest_data_file()
+        if file_path is None:
+            return None
+        return f"{file_path.name}:{file_path.stat().st_mtime_ns}"
+
+    def _model_version(self) -> str:
+        """Version of the flood + drought models on disk (changes on retrain)"""
+        return model_version(self.models_path / MODEL_FLOOD, self.models_path / MODEL_DROUGHT)
+
     def get_latest_data(self) -> Optional[pd.DataFrame]:
         """
         Get latest data for prediction
@@ -70,17 +86,17 @@ class Predictor:
         try:
             logger.info(" Fetching latest data...")
 
+            file_path = self._latest_data_file()
+
             # Intentar obtener últimos datos de IMHPA
-            imhpa_file = self.data_path / LATEST_IMHPA
-            if imhpa_file.exists():
-                df = pd.read_csv(imhpa_file)
+            if file_path is not None and file_path.name == LATEST_IMHPA:
+                df = pd.read_csv(file_path)
                 logger.info(f"    Using IMHPA data ({len(df)} records)")
                 return df
 
             # Recurrir al conjunto de datos maestro
-            master_file = self.data_path / "master_dataset_final.csv"
-            if master_file.exists():
-                df = pd.read_csv(master_file)
+            if file_path is not None:
+                df = pd.read_csv(file_path)
                 # Obtener últimos registros por estación
                 df = df.sort_values("date" if "date" in df.columns else 0).drop_duplicates(
                     subset=["station_id"] if "station_id" in df.columns else [0], keep="last"
@@ -106,6 +122,14 @@ class Predictor:
             List of predictions with station info and scores
         """
         try:
+            # Reutilizar predicciones mientras no cambien los datos ni el modelo
+            cache = get_prediction_cache()
+            data_signature = self._data_signature()
+            version = self._model_version()
+            cached = cache.get(f"{model_type}_predictions", None, data_signature, version)
+            if cached is not None:
+                return cached
+
             logger.info(f" Generating {model_type} predictions...")
 
             # Cargar modelos si es necesario
@@ -157,6 +181,7 @@ class Predictor:
                 results.append(result)
 
             logger.info(f" Generated {len(results)} {model_type} predictions")
+            cache.set(f"{model_type}_predictions", None, data_signature, version, results)
             return results
 
         except Exception as e:
@@ -172,7 +197,7 @@ class Predictor:
 
             for pred in predictions:
                 if pred["station_id"] == station_id:
-                    return pred
+                    return dict(pred)  # copia: la lista está compartida en la caché
 
             logger.warning(f" Station {station_id} not found in predictions")
             return None
@@ -243,11 +268,11 @@ class Predictor:
             return None
 
     def cache_predictions(self, predictions: Dict) -> bool:
-        """Save predictions to cache"""
+        """Save predictions to the shared prediction cache"""
         try:
-            cache_file = self.cache_path / PREDICTIONS_CACHE
-            with open(cache_file, "w") as f:
-                json.dump(predictions, f, indent=2)
+            get_prediction_cache().set(
+                "predictions", None, self._data_signature(), self._model_version(), predictions
+            )
             logger.info(f" Predictions cached")
             return True
         except Exception as e:
@@ -255,13 +280,11 @@ class Predictor:
             return False
 
     def get_cached_predictions(self) -> Optional[Dict]:
-        """Load predictions from cache"""
+        """Load predictions from the shared prediction cache (None if data or models changed)"""
         try:
-            cache_file = self.cache_path / PREDICTIONS_CACHE
-            if cache_file.exists():
-                with open(cache_file, "r") as f:
-                    return json.load(f)
-            return None
+            return get_prediction_cache().get(
+                "predictions", None, self._data_signature(), self._model_version()
+            )
         except Exception as e:
             logger.error(f" Error loading cached predictions: {str(e)}")
             return None
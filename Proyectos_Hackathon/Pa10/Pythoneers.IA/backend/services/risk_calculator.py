@@ -6,7 +6,7 @@ Calculates risk scores and detects anomalies
 import pandas as pd
 import numpy as np
 import logging
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set, Tuple
 from datetime import datetime
 from scipy import stats
 
@@ -16,6 +16,13 @@ from config import (
     FLOOD_THRESHOLD_HIGH,
     DROUGHT_THRESHOLD_LOW,
     DROUGHT_THRESHOLD_HIGH,
+    ANOMALY_Z_THRESHOLD,
+    ANOMALY_MIN_SAMPLES,
+)
+from core.database.raindrop_db import (
+    get_unscored_readings,
+    get_anomaly_state,
+    save_anomaly_state,
 )
 
 logger = logging.getLogger(__name__)
@@ -85,6 +92,10 @@ class RiskCalculator:
         """
         Detect anomalies in data using Z-score method
 
+        Z-scores are computed per station in one grouped pass over the frame
+        (population std, same as scipy.stats.zscore). Stations with fewer than
+        ANOMALY_MIN_SAMPLES readings are skipped.
+
         Returns:
             List of anomalies with station and details
         """
@@ -93,41 +104,157 @@ class RiskCalculator:
                 logger.warning(f" Variable {variable} not found in data")
                 return []
 
-            anomalies = []
+            group_key = "station_id" if "station_id" in data.columns else 0
+            frame = data[[group_key, variable]].dropna(subset=[variable])
 
-            # Agrupar por estación
-            for station_id, group in data.groupby("station_id" if "station_id" in data.columns else 0):
-                values = group[variable].dropna()
+            # Media, desviación y tamaño por estación, alineados con cada fila
+            grouped = frame.groupby(group_key)[variable]
+            counts = grouped.transform("size")
+            std = grouped.transform("std", ddof=0)
+            z_scores = (frame[variable] - grouped.transform("mean")).abs() / std.where(std > 0)
 
-                if len(values) < 3:
-                    continue
+            mask = (counts >= ANOMALY_MIN_SAMPLES) & (z_scores > z_threshold)
+            hits = frame[mask].assign(z_score=z_scores[mask]).sort_values(group_key, kind="stable")
 
-                # Calcular puntuaciones Z
-                z_scores = np.abs(stats.zscore(values))
+            anomalies = pd.DataFrame({
+                "station_id": hits[group_key].astype(int),
+                "variable": variable,
+                "value": hits[variable].astype(float),
+                "z_score": hits["z_score"].astype(float),
+                "timestamp": datetime.utcnow().isoformat(),
+                "severity": np.where(hits["z_score"] > 3, "high", "medium"),
+            }).to_dict("records")
+
+            logger.info(f" Detected {len(anomalies)} anomalies in {variable}")
+            return anomalies
+
+        except Exception as e:
+            logger.error(f" Error detecting anomalies: {str(e)}")
+            return []
 
-                # Encontrar anomalías
-                anomaly_indices = np.where(z_scores > z_threshold)[0]
+    def score_incremental(
+        self,
+        readings: pd.DataFrame,
+        state: Dict[int, Dict],
+        variable: str = "precipitation_total",
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Score new readings against running per-station statistics
 
-                for idx in anomaly_indices:
-                    value = values.iloc[idx]
-                    z_score = z_scores[idx]
+        Each reading is scored against every earlier reading of its station
+        (stored state plus the readings before it in this batch), exactly as a
+        sequential Welford update would, but computed with grouped cumulative
+        sums. Values are centred on the stored mean (or the first new value)
+        before accumulating to keep the variance numerically stable.
 
-                    anomalies.append(
-                        {
-                            "station_id": int(station_id),
-                            "variable": variable,
-                            "value": float(value),
-                            "z_score": float(z_score),
-                            "timestamp": datetime.utcnow().isoformat(),
-                            "severity": "high" if z_score > 3 else "medium",
-                        }
-                    )
+        Args:
+            readings: station_id, date, hour, timestamp, value; chronological per station
+            state: {station_id: {'n', 'mean', 'm2', ...}} before these readings
 
-            logger.info(f" Detected {len(anomalies)} anomalies in {variable}")
+        Returns:
+            (anomalies, updated state rows for save_anomaly_state)
+        """
+        if readings.empty:
+            return [], []
+
+        df = readings.reset_index(drop=True)
+        station_ids = df["station_id"]
+        values = df["value"].to_numpy(dtype=float)
+
+        n0 = station_ids.map({sid: s["n"] for sid, s in state.items()}).fillna(0).to_numpy(dtype=float)
+        mean0 = station_ids.map({sid: s["mean"] for sid, s in state.items()}).to_numpy(dtype=float)
+        m2_0 = station_ids.map({sid: s["m2"] for sid, s in state.items()}).fillna(0).to_numpy(dtype=float)
+
+        # Centrar en la media previa (estación conocida) o en su primera lectura nueva
+        first = df.groupby("station_id")["value"].transform("first").to_numpy(dtype=float)
+        ref = np.where(n0 > 0, mean0, first)
+        centred = values - ref
+
+        # Acumulados del lote antes de cada fila (k lecturas previas en este lote)
+        k = df.groupby("station_id").cumcount().to_numpy(dtype=float)
+        s1 = pd.Series(centred).groupby(station_ids).cumsum().to_numpy() - centred
+        s2 = pd.Series(centred * centred).groupby(station_ids).cumsum().to_numpy() - centred * centred
+
+        def combine(k, s1, s2):
+            # Fusión de Chan del estado guardado (media centrada = 0) con k lecturas del lote
+            n = n0 + k
+            with np.errstate(invalid="ignore", divide="ignore"):
+                batch_mean = np.where(k > 0, s1 / k, 0.0)
+                batch_m2 = np.where(k > 0, s2 - s1 * batch_mean, 0.0)
+                mean = np.where(n > 0, batch_mean * k / n, 0.0)
+                m2 = m2_0 + batch_m2 + np.where(n > 0, batch_mean ** 2 * n0 * k / n, 0.0)
+            return n, mean, np.maximum(m2, 0.0)
+
+        n_prev, mean_prev, m2_prev = combine(k, s1, s2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std_prev = np.sqrt(m2_prev / n_prev)
+            z = np.where(
+                (n_prev >= ANOMALY_MIN_SAMPLES) & (std_prev > 0),
+                (centred - mean_prev) / std_prev,
+                np.nan,
+            )
+
+        hits = np.flatnonzero(np.abs(z) > z_threshold)  # NaN (sin base suficiente) nunca cuenta
+        abs_z = np.abs(z[hits])
+        anomalies = pd.DataFrame({
+            "station_id": station_ids.iloc[hits].astype(int).to_numpy(),
+            "variable": variable,
+            "value": values[hits],
+            "z_score": abs_z,
+            "timestamp": df["timestamp"].iloc[hits].to_numpy(),
+            "severity": np.where(abs_z > 3, "high", "medium"),
+        }).to_dict("records")
+
+        # Estado final: incluir la última lectura de cada estación
+        last = df.groupby("station_id").tail(1).index.to_numpy()
+        n_new, mean_new, m2_new = combine(k + 1, s1 + centred, s2 + centred * centred)
+        states = pd.DataFrame({
+            "station_id": station_ids.iloc[last].to_numpy(),
+            "n": n_new[last],
+            "mean": ref[last] + mean_new[last],
+            "m2": m2_new[last],
+            "last_date": df["date"].iloc[last].to_numpy(),
+            "last_hour": df["hour"].iloc[last].to_numpy(),
+            "last_value": values[last],
+            "last_z": pd.Series(z[last]).astype(object).where(~np.isnan(z[last]), None).to_numpy(),
+        }).to_dict("records")
+
+        return anomalies, states
+
+    def update_anomaly_state(
+        self,
+        variable: str = "precipitation_total",
+        station_ids: Optional[Set[int]] = None,
+        z_threshold: float = ANOMALY_Z_THRESHOLD,
+    ) -> List[Dict]:
+        """
+        Score readings ingested since the last call and persist the running state
+
+        Only readings newer than each station's stored watermark are read, so an
+        hourly ingest costs one indexed row per station. Readings that arrive
+        later than the watermark (backfills) are not folded into the state.
+
+        Returns:
+            List of anomalies among the new readings
+        """
+        try:
+            readings = get_unscored_readings(variable, station_ids)
+            if readings.empty:
+                return []
+
+            state = get_anomaly_state(variable, set(readings["station_id"].unique().tolist()))
+            anomalies, states = self.score_incremental(readings, state, variable, z_threshold)
+            save_anomaly_state(variable, states)
+
+            logger.info(
+                f" Scored {len(readings)} new {variable} readings "
+                f"({len(states)} stations): {len(anomalies)} anomalies"
+            )
             return anomalies
 
         except Exception as e:
-            logger.error(f" Error detecting anomalies: {str(e)}")
+            logger.error(f" Error updating anomaly state: {str(e)}")
             return []
 
     def generate_risk_alerts(self, predictions: List[Dict]) -> List[Dict]: